@@ -5,7 +5,7 @@ Módulo de análisis - Análisis de datos en tiempo real y predicciones
 from .analyzer import Analyzer
 from .image_processor import ImageProcessor
 from .report_generator import ProfessionalReport, ExecutiveSummary
-from .screener import ScreenerAutomatico, Timeframe, RecommendationType, ScreenerResult
+from .screener import ScreenerAutomatico, Timeframe, RecommendationType, ScreenerResult, RankingTopN
 from .correlation_analyzer import CorrelationAnalyzer
 from .ml_predictor import MLPredictor
 from .enhanced_analyzer import EnhancedAnalyzer
@@ -19,6 +19,7 @@ __all__ = [
     'Timeframe', 
     'RecommendationType', 
     'ScreenerResult',
+    'RankingTopN',
     'CorrelationAnalyzer',
     'MLPredictor',
     'EnhancedAnalyzer'
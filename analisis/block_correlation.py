@@ -0,0 +1,198 @@
+"""
+analisis/block_correlation.py
+Correlación por bloques para universos grandes (1.000+ símbolos)
+- Retornos estandarizados en float32 y matriz de correlación calculada en
+  bloques de columnas (nunca se materializa n x n en memoria)
+- Con huecos (NaN) cada par usa solo las filas en que ambos tienen dato,
+  igual que DataFrame.corr(): medias y varianzas por par salen de productos
+  con la máscara, como en EstadoCovarianza
+- Los bloques pueden volcarse a un .npy en disco (memmap)
+- Los k pares más y menos correlacionados se seleccionan por bloque con
+  np.argpartition y se devuelven como arrays compactos (sin dicts anidados)
+"""
+
+import logging
+from dataclasses import dataclass
+from typing import Dict, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+
+TAMANO_BLOQUE = 512
+
+logger = logging.getLogger("BlockCorrelation")
+
+
+@dataclass
+class ParesCorrelacion:
+    """Pares (fila, columna) de `tickers` con su correlación, como arrays"""
+    tickers: List[str]
+    fila: np.ndarray
+    columna: np.ndarray
+    valor: np.ndarray
+
+    def __len__(self) -> int:
+        return len(self.valor)
+
+    def a_tuplas(self) -> List[tuple]:
+        """Formato de CorrelationAnalyzer: [(ticker_a, ticker_b, correlación), ...]"""
+        return [
+            (self.tickers[i], self.tickers[j], float(v))
+            for i, j, v in zip(self.fila, self.columna, self.valor)
+        ]
+
+    def a_dict(self) -> Dict[str, list]:
+        """Columnas paralelas serializables"""
+        return {
+            "a": [self.tickers[i] for i in self.fila],
+            "b": [self.tickers[j] for j in self.columna],
+            "correlacion": np.round(self.valor.astype(np.float64), 4).tolist(),
+        }
+
+
+def estandarizar(retornos: np.ndarray) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Z-scores float32 por columna con los huecos (NaN) a 0
+
+    La media y la desviación son las de toda la columna: solo centran la
+    escala para el cálculo en float32. Con huecos, iterar_bloques vuelve a
+    centrar cada par sobre sus filas comunes.
+
+    Returns:
+        (z, máscara float32 de datos válidos o None si no hay huecos)
+    """
+    retornos = np.asarray(retornos, dtype=np.float64)
+    mascara = np.isfinite(retornos)
+    media = np.nanmean(np.where(mascara, retornos, np.nan), axis=0)
+    desviacion = np.nanstd(np.where(mascara, retornos, np.nan), axis=0, ddof=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        z = (retornos - media) / desviacion
+    z[~mascara | ~np.isfinite(z)] = 0.0
+    return z.astype(np.float32), (None if mascara.all() else mascara.astype(np.float32))
+
+
+def iterar_bloques(
+    z: np.ndarray,
+    mascara: Optional[np.ndarray] = None,
+    tamano_bloque: int = TAMANO_BLOQUE
+) -> Iterator[Tuple[int, int, np.ndarray]]:
+    """
+    Bloques del triángulo superior de la matriz de correlación
+
+    Sin máscara, producto de z-scores / (filas - 1). Con máscara, Pearson por
+    pares completos a partir de sumas restringidas a las filas comunes
+    (n, Σx, Σy, Σx², Σy², Σxy), cada una un producto de matrices del bloque.
+
+    Yields:
+        (inicio_filas, inicio_columnas, bloque float32)
+    """
+    n = z.shape[1]
+    filas_validas = z.shape[0] - 1
+    z2 = None if mascara is None else z * z
+    for i0 in range(0, n, tamano_bloque):
+        zi = z[:, i0:i0 + tamano_bloque]
+        for j0 in range(i0, n, tamano_bloque):
+            zj = z[:, j0:j0 + tamano_bloque]
+            bloque = zi.T @ zj
+            if mascara is None:
+                bloque /= filas_validas
+            else:
+                mi = mascara[:, i0:i0 + tamano_bloque]
+                mj = mascara[:, j0:j0 + tamano_bloque]
+                comunes = mi.T @ mj
+                sx = zi.T @ mj
+                sy = mi.T @ zj
+                var_x = np.clip(comunes * (z2[:, i0:i0 + tamano_bloque].T @ mj) - sx * sx, 0, None)
+                var_y = np.clip(comunes * (mi.T @ z2[:, j0:j0 + tamano_bloque]) - sy * sy, 0, None)
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    bloque = (comunes * bloque - sx * sy) / np.sqrt(var_x * var_y)
+                bloque[(comunes < 2) | ~np.isfinite(bloque)] = np.nan
+            np.clip(bloque, -1.0, 1.0, out=bloque)
+            yield i0, j0, bloque
+
+
+def _mejores(fila, columna, valor, clave, k):
+    """Conserva los k elementos de menor `clave`"""
+    if len(clave) > k:
+        seleccion = np.argpartition(clave, k - 1)[:k]
+        fila, columna, valor, clave = fila[seleccion], columna[seleccion], valor[seleccion], clave[seleccion]
+    return fila, columna, valor, clave
+
+
+def correlacion_por_bloques(
+    retornos: np.ndarray,
+    tickers: Sequence[str],
+    k: int = 20,
+    umbral_alta: Optional[float] = None,
+    umbral_baja: Optional[float] = None,
+    tamano_bloque: int = TAMANO_BLOQUE,
+    ruta: Optional[str] = None
+) -> Dict[str, object]:
+    """
+    Top-k de pares por |correlación| sin materializar la matriz completa
+
+    Args:
+        retornos: Matriz fechas x tickers (NaN = sin cotización)
+        tickers: Nombres de las columnas
+        k: Pares a conservar en cada extremo
+        umbral_alta: Solo pares con |corr| > umbral_alta en "altas"
+        umbral_baja: Solo pares con |corr| < umbral_baja en "bajas"
+        tamano_bloque: Columnas por bloque (memoria ~ fechas x bloque + bloque²)
+        ruta: .npy donde volcar la matriz completa float32 (memmap)
+
+    Returns:
+        {"altas": ParesCorrelacion, "bajas": ParesCorrelacion,
+         "correlacion_promedio": float, "pares": int, "ruta": ruta}
+    """
+    tickers = list(tickers)
+    z, mascara = estandarizar(retornos)
+    n = z.shape[1]
+    matriz = None
+    if ruta:
+        matriz = np.lib.format.open_memmap(ruta, mode="w+", dtype=np.float32, shape=(n, n))
+
+    vacio = (np.empty(0, np.int32), np.empty(0, np.int32), np.empty(0, np.float32), np.empty(0, np.float32))
+    altas, bajas = vacio, vacio
+    suma, pares = 0.0, 0
+
+    for i0, j0, bloque in iterar_bloques(z, mascara, tamano_bloque):
+        if matriz is not None:
+            alto, ancho = bloque.shape
+            matriz[i0:i0 + alto, j0:j0 + ancho] = bloque
+            matriz[j0:j0 + ancho, i0:i0 + alto] = bloque.T
+
+        filas, columnas = np.nonzero(
+            np.triu(np.ones(bloque.shape, dtype=bool), k=1) if i0 == j0 else np.isfinite(bloque)
+        )
+        valores = bloque[filas, columnas]
+        validos = np.isfinite(valores)
+        filas, columnas, valores = filas[validos], columnas[validos], valores[validos]
+        suma += float(valores.sum(dtype=np.float64))
+        pares += len(valores)
+        filas = (filas + i0).astype(np.int32)
+        columnas = (columnas + j0).astype(np.int32)
+        absolutos = np.abs(valores)
+
+        altas = _mejores(*(np.concatenate(par) for par in zip(altas, (filas, columnas, valores, -absolutos))), k)
+        bajas = _mejores(*(np.concatenate(par) for par in zip(bajas, (filas, columnas, valores, absolutos))), k)
+
+    if matriz is not None:
+        matriz.flush()
+        logger.info(f"💾 Matriz de correlación {n}x{n} volcada en {ruta}")
+
+    def _pares(seleccion, umbral, mayor) -> ParesCorrelacion:
+        fila, columna, valor, clave = seleccion
+        orden = np.argsort(clave, kind="stable")
+        fila, columna, valor = fila[orden], columna[orden], valor[orden]
+        if umbral is not None:
+            dentro = np.abs(valor) > umbral if mayor else np.abs(valor) < umbral
+            fila, columna, valor = fila[dentro], columna[dentro], valor[dentro]
+        return ParesCorrelacion(tickers, fila, columna, valor)
+
+    return {
+        "altas": _pares(altas, umbral_alta, True),
+        "bajas": _pares(bajas, umbral_baja, False),
+        "correlacion_promedio": suma / pares if pares else float("nan"),
+        "pares": pares,
+        "ruta": ruta,
+    }
@@ -4,6 +4,8 @@ Analizador de correlaciones entre activos y análisis de sentimiento
 """
 
 import logging
+import threading
+import time
 import pandas as pd
 import numpy as np
 import yfinance as yf
@@ -13,19 +15,86 @@ from scipy.stats import pearsonr, spearmanr
 import json
 import requests
 
+from data_sources.batch_history import descargar_historicos_batch
+from data_sources.ohlcv_store import PERIODOS_DIAS
+from .returns_panel import PanelRetornos, betas_moviles
+from .block_correlation import TAMANO_BLOQUE, correlacion_por_bloques
+from .systemic_correlation import DetectorContagio
+
 
 class CorrelationAnalyzer:
     """Analizador de correlaciones entre activos"""
     
-    def __init__(self):
-        """Inicializa el analizador de correlaciones"""
+    def __init__(self, market_data: Optional[Any] = None):
+        """
+        Inicializa el analizador de correlaciones
+        
+        Args:
+            market_data: MarketDataManager para los históricos (default: descarga batch directa)
+        """
         self.logger = logging.getLogger("CorrelationAnalyzer")
         self.cache = {}
         self.cache_ttl = 3600  # 1 hora (estandarizado)
         self.cache_expiry = {}
         self.SENTIMIENTO_LIMIT = 10  # PUNTO 1: Aumentado para mejor análisis
+        self.market_data = market_data
+        # Un panel de retornos compartido por período: las consultas de
+        # cualquier subconjunto de tickers se responden desde él
+        self._paneles: Dict[str, PanelRetornos] = {}
+        self._paneles_lock = threading.Lock()
+        self._carga_lock = threading.Lock()
         self.logger.info("✅ Analizador de correlaciones inicializado")
     
+    def _descargar_cierres(
+        self,
+        tickers: List[str],
+        periodo: str = '1y',
+        desde: Optional[pd.Timestamp] = None
+    ) -> pd.DataFrame:
+        """Cierres ajustados (fechas x tickers) de una descarga agrupada"""
+        if self.market_data is not None:
+            historicos = self.market_data.obtener_historicos_batch(tickers, periodo=periodo)
+        elif desde is not None:
+            historicos = descargar_historicos_batch(tickers, inicio=desde.strftime("%Y-%m-%d"))
+        else:
+            historicos = descargar_historicos_batch(tickers, periodo=periodo)
+        return pd.DataFrame({ticker: hist['Close'] for ticker, hist in historicos.items()})
+    
+    def obtener_panel(self, tickers: List[str], periodo: str = '1y') -> PanelRetornos:
+        """
+        Panel de retornos del período con los tickers pedidos cargados
+        
+        Solo descarga los tickers que el panel aún no tiene y, cuando el
+        panel supera cache_ttl, las barras nuevas del universo cargado. La
+        ventana del panel son los días del período, no la historia del
+        primer ticker cargado.
+        
+        Args:
+            tickers: Tickers requeridos
+            periodo: Periodo de datos ('1y', '6mo', '3mo', etc)
+            
+        Returns:
+            PanelRetornos compartido del período
+        """
+        with self._paneles_lock:
+            panel = self._paneles.get(periodo)
+            if panel is None:
+                panel = self._paneles[periodo] = PanelRetornos(dias=PERIODOS_DIAS.get(periodo))
+        
+        with self._carga_lock:
+            if panel.tickers and time.time() - panel.actualizado >= self.cache_ttl:
+                barras = panel.agregar_barras(
+                    self._descargar_cierres(panel.tickers, periodo, desde=panel.ultima_fecha)
+                )
+                self.logger.info(f"🔄 Panel {periodo}: {barras} barras nuevas")
+            
+            faltantes = panel.faltantes(tickers)
+            if faltantes:
+                cierres = self._descargar_cierres(faltantes, periodo)
+                if not cierres.empty:
+                    panel.agregar_tickers(cierres)
+        return panel
+    
     def calcular_correlacion_activos(
         self, 
         tickers: List[str], 
@@ -42,28 +111,25 @@ class CorrelationAnalyzer:
             Diccionario con matriz y análisis
         """
         try:
-            cache_key = f"correlation_{'_'.join(sorted(tickers))}_{periodo}"
-            if self._es_cache_valido(cache_key):
-                return self.cache[cache_key]
-            
-            # Obtener datos históricos
-            datos = yf.download(tickers, period=periodo, progress=False)['Adj Close']
-            
-            # Si es solo un ticker, yfinance retorna Series
-            if isinstance(datos, pd.Series):
-                datos = datos.to_frame(tickers[0]) if tickers else datos
+            pedidos = list(dict.fromkeys(t.upper() for t in tickers))
+            panel = self.obtener_panel(pedidos, periodo)
             
-            # Calcular retornos diarios
-            retornos = datos.pct_change().dropna()
+            sin_datos = panel.faltantes(pedidos)
+            disponibles = [t for t in pedidos if t not in sin_datos]
+            if not disponibles:
+                return {'error': f"Sin datos históricos para {', '.join(pedidos)}",
+                        'timestamp': datetime.now().isoformat()}
+            if sin_datos:
+                self.logger.warning(f"⚠️  Sin datos para correlación: {', '.join(sin_datos)}")
             
-            # Matriz de correlación (método pearson por defecto)
-            correlacion = retornos.corr()
+            # Matriz de correlación de Pearson: slicing del estado del panel
+            correlacion = panel.correlacion(disponibles)
             
             # Matriz de correlación Spearman (más robusta)
-            correlacion_spearman = retornos.corr(method='spearman')
+            correlacion_spearman = panel.correlacion_spearman(disponibles)
             
             # Volatilidades claras: diaria y anualizada
-            volatilidad_diaria = retornos.std()
+            volatilidad_diaria = panel.volatilidad(disponibles)
             volatilidad_anualizada = volatilidad_diaria * np.sqrt(252)
             
             resultado = {
@@ -78,15 +144,77 @@ class CorrelationAnalyzer:
                 'volatilidad_anualizada_pct': (volatilidad_anualizada * 100).to_dict()
             }
             
-            self.cache[cache_key] = resultado
-            self.cache_expiry[cache_key] = datetime.now()
-            
             return resultado
             
         except Exception as e:
             self.logger.warning(f"Error calculando correlaciones: {e}")
             return {'error': str(e), 'timestamp': datetime.now().isoformat()}
     
+    def analizar_universo(
+        self,
+        tickers: List[str],
+        periodo: str = '1y',
+        k: int = 20,
+        ruta_matriz: Optional[str] = None,
+        tamano_bloque: int = TAMANO_BLOQUE
+    ) -> Dict[str, Any]:
+        """
+        Diversificación de un universo grande sin construir la matriz n x n
+        
+        Calcula la correlación por bloques en float32 y devuelve los k pares
+        más y menos correlacionados como arrays paralelos. Si todos los
+        tickers están en el panel del período no hay descargas.
+        
+        Args:
+            tickers: Universo (ej: todas las posiciones)
+            periodo: Periodo de datos
+            k: Pares por extremo
+            ruta_matriz: .npy donde volcar la matriz completa (opcional)
+            tamano_bloque: Columnas por bloque
+            
+        Returns:
+            Resumen con correlación promedio, puntaje y pares extremos
+        """
+        try:
+            pedidos = list(dict.fromkeys(t.upper() for t in tickers))
+            with self._paneles_lock:
+                panel = self._paneles.get(periodo)
+            
+            if panel is not None and not panel.faltantes(pedidos):
+                retornos = panel.retornos_de(pedidos)
+            else:
+                # Sin pasar por el panel: su estado por pares crece con n²
+                cierres = self._descargar_cierres(pedidos, periodo)
+                retornos = cierres.apply(lambda s: s.dropna().pct_change()).dropna(how='all')
+            
+            if retornos.shape[1] < 2:
+                return {'error': 'Se necesitan al menos 2 tickers con datos',
+                        'timestamp': datetime.now().isoformat()}
+            
+            resumen = correlacion_por_bloques(
+                retornos.to_numpy(), list(retornos.columns), k=k,
+                tamano_bloque=tamano_bloque, ruta=ruta_matriz
+            )
+            corr_promedio = resumen['correlacion_promedio']
+            
+            return {
+                'timestamp': datetime.now().isoformat(),
+                'periodo': periodo,
+                'tickers': list(retornos.columns),
+                'sin_datos': [t for t in pedidos if t not in retornos.columns],
+                'pares_evaluados': resumen['pares'],
+                'correlacion_promedio': round(corr_promedio, 4),
+                'puntaje_diversificacion': self._calcular_puntaje_diversificacion(corr_promedio),
+                'recomendacion': self._generar_recomendacion_diversificacion(corr_promedio),
+                'pares_altamente_correlacionados': resumen['altas'].a_dict(),
+                'pares_descorrelacionados': resumen['bajas'].a_dict(),
+                'matriz_en_disco': ruta_matriz
+            }
+            
+        except Exception as e:
+            self.logger.warning(f"Error analizando universo: {e}")
+            return {'error': str(e), 'timestamp': datetime.now().isoformat()}
+    
     def calcular_beta(self, ticker: str, benchmark: str = '^GSPC', periodo: str = '1y') -> Optional[float]:
         """
         Calcula el beta de un activo respecto a un benchmark
@@ -99,31 +227,80 @@ class CorrelationAnalyzer:
         Returns:
             Valor de beta
         """
-        try:
-            cache_key = f"beta_{ticker}_{benchmark}_{periodo}"
-            if self._es_cache_valido(cache_key):
-                return self.cache[cache_key]
-            
-            # Obtener datos
-            datos = yf.download([ticker, benchmark], period=periodo, progress=False)['Adj Close']
-            
-            # Calcular retornos
-            retornos = datos.pct_change().dropna()
-            
-            # Calcular covarianza y varianza
-            cov = retornos[[ticker, benchmark]].cov().iloc[0, 1]
-            var_benchmark = retornos[benchmark].var()
-            
-            beta = cov / var_benchmark if var_benchmark != 0 else np.nan
-            
-            self.cache[cache_key] = beta
-            self.cache_expiry[cache_key] = datetime.now()
+        resultado = self.calcular_betas([ticker], benchmark, periodo)
+        if 'error' in resultado or ticker.upper() not in resultado['betas']:
+            return None
+        return resultado['betas'][ticker.upper()]['beta']
+    
+    def calcular_betas(
+        self,
+        tickers: List[str],
+        benchmark: str = '^GSPC',
+        periodo: str = '1y',
+        ventana_rolling: int = 60
+    ) -> Dict[str, Any]:
+        """
+        Beta, alfa, R² y beta móvil de varios activos contra un benchmark
+        
+        El benchmark se carga una sola vez en el panel compartido junto con
+        los tickers que falten; la regresión de todos los activos sale de las
+        sumas del panel y las betas móviles de una pasada de sumas acumuladas.
+        
+        Args:
+            tickers: Activos (ej: posiciones de una cartera)
+            benchmark: Benchmark (default: S&P 500)
+            periodo: Periodo de cálculo
+            ventana_rolling: Barras de la beta móvil
             
-            return beta
+        Returns:
+            Diccionario con métricas por ticker y series de beta móvil
+        """
+        try:
+            benchmark = benchmark.upper()
+            pedidos = [t for t in dict.fromkeys(t.upper() for t in tickers) if t != benchmark]
+            panel = self.obtener_panel([benchmark] + pedidos, periodo)
+            
+            if panel.faltantes([benchmark]):
+                return {'error': f"Sin datos del benchmark {benchmark}",
+                        'timestamp': datetime.now().isoformat()}
+            sin_datos = panel.faltantes(pedidos)
+            disponibles = [t for t in pedidos if t not in sin_datos]
+            if sin_datos:
+                self.logger.warning(f"⚠️  Sin datos para beta: {', '.join(sin_datos)}")
+            
+            regresion = panel.regresion_benchmark(disponibles, benchmark)
+            retornos = panel.retornos_de(disponibles + [benchmark]).to_numpy()
+            moviles = betas_moviles(retornos[:, :-1], retornos[:, -1], ventana_rolling)
+            
+            betas = {}
+            for k, ticker in enumerate(disponibles):
+                fila = regresion.loc[ticker]
+                validas = moviles[:, k][np.isfinite(moviles[:, k])]
+                betas[ticker] = {
+                    'beta': float(fila['beta']),
+                    'alpha_anual_pct': round(float(fila['alfa']) * 252 * 100, 2),
+                    'r2': round(float(fila['r2']), 4),
+                    'observaciones': int(fila['observaciones']),
+                    'beta_rolling_actual': round(float(validas[-1]), 4) if len(validas) else None
+                }
+            
+            return {
+                'timestamp': datetime.now().isoformat(),
+                'benchmark': benchmark,
+                'periodo': periodo,
+                'ventana_rolling': ventana_rolling,
+                'betas': betas,
+                'sin_datos': sin_datos,
+                'fechas_rolling': [f.strftime('%Y-%m-%d') for f in panel.fechas],
+                'betas_rolling': {
+                    ticker: [None if np.isnan(v) else round(float(v), 4) for v in moviles[:, k]]
+                    for k, ticker in enumerate(disponibles)
+                }
+            }
             
         except Exception as e:
-            self.logger.warning(f"Error calculando beta: {e}")
-            return None
+            self.logger.warning(f"Error calculando betas: {e}")
+            return {'error': str(e), 'timestamp': datetime.now().isoformat()}
     
     def analizar_diversificacion(self, tickers: List[str]) -> Dict[str, Any]:
         """
@@ -146,8 +323,8 @@ class CorrelationAnalyzer:
             
             # Correlación promedio (excluyendo diagonal)
             corr_promedio = []
-            for i in range(len(tickers)):
-                for j in range(i+1, len(tickers)):
+            for i in range(len(corr_matrix)):
+                for j in range(i+1, len(corr_matrix)):
                     corr_promedio.append(corr_matrix.iloc[i, j])
             
             corr_promedio_valor = np.mean(corr_promedio) if corr_promedio else 0
@@ -200,31 +377,88 @@ class CorrelationAnalyzer:
             self.logger.warning(f"Error detectando contagio: {e}")
             return {'error': str(e), 'timestamp': datetime.now().isoformat()}
     
+    def monitorear_correlacion_sistemica(
+        self,
+        tickers: List[str],
+        periodo: str = '2y',
+        ventana: int = 60,
+        umbrales: tuple = (0.3, 0.6)
+    ) -> Dict[str, Any]:
+        """
+        Correlación sistémica en ventanas móviles con eventos de cambio de régimen
+        
+        Complementa detectar_contagio_sistematico (vista estática de un activo)
+        con la evolución de la co-movilidad de todo el universo: correlación
+        promedio entre pares y cuota del primer autovalor en cada ventana.
+        Pensado para ejecutarse tras cada cierre de mercado.
+        
+        Args:
+            tickers: Universo a vigilar
+            periodo: Periodo de datos
+            ventana: Barras por ventana
+            umbrales: Cortes de correlación promedio entre regímenes bajo/medio/alto
+            
+        Returns:
+            Serie de métricas, régimen actual y eventos de cambio de régimen
+        """
+        try:
+            pedidos = list(dict.fromkeys(t.upper() for t in tickers))
+            panel = self.obtener_panel(pedidos, periodo)
+            sin_datos = panel.faltantes(pedidos)
+            disponibles = [t for t in pedidos if t not in sin_datos]
+            if len(disponibles) < 2:
+                return {'error': 'Se necesitan al menos 2 tickers con datos',
+                        'timestamp': datetime.now().isoformat()}
+            
+            detector = DetectorContagio(len(disponibles), ventana=ventana, umbrales=umbrales)
+            serie = detector.analizar(panel.retornos_de(disponibles))
+            if serie.empty:
+                return {'error': f'Se necesitan al menos {ventana} barras',
+                        'timestamp': datetime.now().isoformat()}
+            
+            actual = serie.iloc[-1]
+            return {
+                'timestamp': datetime.now().isoformat(),
+                'periodo': periodo,
+                'ventana': ventana,
+                'tickers': disponibles,
+                'sin_datos': sin_datos,
+                'regimen_actual': detector.regimen,
+                'correlacion_promedio_actual': round(float(actual['correlacion_promedio']), 4),
+                'cuota_primer_autovalor_actual': round(float(actual['cuota_primer_autovalor']), 4),
+                'recomendacion': self._generar_recomendacion_diversificacion(actual['correlacion_promedio']),
+                'serie': {
+                    'fechas': [f.strftime('%Y-%m-%d') for f in serie.index],
+                    'correlacion_promedio': serie['correlacion_promedio'].round(4).tolist(),
+                    'cuota_primer_autovalor': serie['cuota_primer_autovalor'].round(4).tolist()
+                },
+                'eventos': detector.eventos_dict()
+            }
+            
+        except Exception as e:
+            self.logger.warning(f"Error monitoreando correlación sistémica: {e}")
+            return {'error': str(e), 'timestamp': datetime.now().isoformat()}
+    
     def _encontrar_altas_correlaciones(self, corr_matrix: pd.DataFrame, umbral: float = 0.7) -> List[tuple]:
         """Encuentra pares altamente correlacionados"""
-        pares = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                if abs(corr_matrix.iloc[i, j]) > umbral:
-                    pares.append((
-                        corr_matrix.columns[i],
-                        corr_matrix.columns[j],
-                        float(corr_matrix.iloc[i, j])
-                    ))
-        return sorted(pares, key=lambda x: abs(x[2]), reverse=True)
+        return self._filtrar_pares(corr_matrix, lambda v: np.abs(v) > umbral, descendente=True)
     
     def _encontrar_bajas_correlaciones(self, corr_matrix: pd.DataFrame, umbral: float = 0.3) -> List[tuple]:
         """Encuentra pares descorrelacionados (buenos para diversificación)"""
-        pares = []
-        for i in range(len(corr_matrix.columns)):
-            for j in range(i+1, len(corr_matrix.columns)):
-                if abs(corr_matrix.iloc[i, j]) < umbral:
-                    pares.append((
-                        corr_matrix.columns[i],
-                        corr_matrix.columns[j],
-                        float(corr_matrix.iloc[i, j])
-                    ))
-        return sorted(pares, key=lambda x: abs(x[2]))
+        return self._filtrar_pares(corr_matrix, lambda v: np.abs(v) < umbral, descendente=False)
+    
+    def _filtrar_pares(self, corr_matrix: pd.DataFrame, condicion, descendente: bool) -> List[tuple]:
+        """Pares del triángulo superior que cumplen `condicion`, ordenados por |corr|"""
+        valores = corr_matrix.to_numpy(dtype=np.float64)
+        filas, columnas = np.triu_indices(len(valores), k=1)
+        correlaciones = valores[filas, columnas]
+        with np.errstate(invalid="ignore"):
+            seleccion = condicion(correlaciones)
+        filas, columnas, correlaciones = filas[seleccion], columnas[seleccion], correlaciones[seleccion]
+        clave = -np.abs(correlaciones) if descendente else np.abs(correlaciones)
+        orden = np.argsort(clave, kind="stable")
+        nombres = corr_matrix.columns
+        return [(nombres[filas[i]], nombres[columnas[i]], float(correlaciones[i])) for i in orden]
     
     def _calcular_puntaje_diversificacion(self, corr_promedio: Union[float, np.floating]) -> float:
         """Calcula puntaje de diversificación (0-100)"""
@@ -279,4 +513,6 @@ class CorrelationAnalyzer:
         """Limpia el cache"""
         self.cache.clear()
         self.cache_expiry.clear()
+        with self._paneles_lock:
+            self._paneles.clear()
         self.logger.info("Cache de correlaciones limpiado")
@@ -0,0 +1,460 @@
+"""
+analisis/indicator_engine.py
+Motor vectorizado de indicadores técnicos multi-ticker
+Calcula RSI, MACD, Bollinger, ATR, SMA/EMA y StochRSI para todo un universo
+de símbolos a la vez sobre matrices numpy (barras x tickers)
+
+Dos conjuntos de fórmulas, ambos sobre las mismas primitivas:
+- indicadores_screener(): las del ScreenerAutomatico (RSI de medias simples,
+  EMAs ajustadas, Bollinger con ddof=1, ATR simple)
+- indicadores_tecnicos(): las de la librería `ta` usadas por
+  TechnicalAnalyzer.analizar_indicadores (RSI/ATR de Wilder, EMAs sin
+  ajuste, Bollinger con ddof=0, StochRSI)
+"""
+
+import warnings
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+from numpy.lib.stride_tricks import sliding_window_view
+
+
+COLUMNAS_OHLCV = ("Open", "High", "Low", "Close", "Volume")
+
+# Últimas barras que usa TechnicalAnalyzer.analizar_indicadores (mínimo 30)
+BARRAS_ANALISIS = 60
+
+
+@dataclass
+class PanelOHLCV:
+    """
+    Matrices OHLCV alineadas (barras x tickers)
+
+    Cada columna contiene la serie de un ticker alineada por su última barra:
+    la fila -1 es la barra más reciente de cada símbolo y las series más
+    cortas se rellenan con NaN al principio.
+    """
+    tickers: List[str]
+    open: np.ndarray
+    high: np.ndarray
+    low: np.ndarray
+    close: np.ndarray
+    volume: np.ndarray
+    ultima_fecha: List[Optional[pd.Timestamp]] = field(default_factory=list)
+
+    @property
+    def forma(self):
+        return self.close.shape
+
+
+@dataclass
+class ResultadoIndicadores:
+    """
+    Último valor de cada indicador para cada ticker (un vector por indicador)
+    """
+    tickers: List[str]
+    valores: Dict[str, np.ndarray]
+
+    def para(self, ticker: str) -> Dict[str, float]:
+        """Indicadores de un ticker como dict de floats"""
+        j = self.tickers.index(ticker)
+        return {nombre: float(vector[j]) for nombre, vector in self.valores.items()}
+
+    def como_dataframe(self) -> pd.DataFrame:
+        """Tabla tickers x indicadores"""
+        return pd.DataFrame(self.valores, index=self.tickers)
+
+
+# ----------------------------------------------------------------------
+# Construcción del panel
+# ----------------------------------------------------------------------
+
+def _columna(df: pd.DataFrame, nombre: str) -> np.ndarray:
+    if nombre not in df.columns:
+        return np.full(len(df), np.nan)
+    columna = df[nombre]
+    if isinstance(columna, pd.DataFrame):
+        # yf.download de un solo ticker puede devolver columnas (campo, ticker)
+        columna = columna.iloc[:, 0]
+    return columna.to_numpy(dtype=np.float64, na_value=np.nan)
+
+
+def construir_panel(
+    historicos: Dict[str, pd.DataFrame],
+    max_barras: Optional[int] = None
+) -> PanelOHLCV:
+    """
+    Alinea los históricos de varios tickers en matrices numpy
+
+    Args:
+        historicos: {ticker: DataFrame OHLCV}
+        max_barras: Conservar solo las últimas N barras de cada ticker
+
+    Returns:
+        PanelOHLCV con forma (barras, tickers)
+    """
+    tickers = [t for t, df in historicos.items() if df is not None and not df.empty]
+    largos = [len(historicos[t]) for t in tickers]
+    filas = max(largos) if largos else 0
+    if max_barras is not None:
+        filas = min(filas, max_barras)
+
+    matrices = {c: np.full((filas, len(tickers)), np.nan) for c in COLUMNAS_OHLCV}
+    ultima_fecha = []
+    for j, ticker in enumerate(tickers):
+        df = historicos[ticker].iloc[-filas:] if filas else historicos[ticker].iloc[:0]
+        for c in COLUMNAS_OHLCV:
+            matrices[c][filas - len(df):, j] = _columna(df, c)
+        ultima_fecha.append(df.index[-1] if len(df) else None)
+
+    return PanelOHLCV(
+        tickers=tickers,
+        open=matrices["Open"],
+        high=matrices["High"],
+        low=matrices["Low"],
+        close=matrices["Close"],
+        volume=matrices["Volume"],
+        ultima_fecha=ultima_fecha,
+    )
+
+
+# ----------------------------------------------------------------------
+# Primitivas (operan por columnas sobre matrices barras x tickers)
+# ----------------------------------------------------------------------
+
+@contextmanager
+def _sin_avisos():
+    """Silencia avisos de numpy por columnas vacías o divisiones por cero"""
+    with warnings.catch_warnings(), np.errstate(invalid="ignore", divide="ignore"):
+        warnings.simplefilter("ignore", RuntimeWarning)
+        yield
+
+
+def _como_matriz(x: np.ndarray) -> np.ndarray:
+    x = np.asarray(x, dtype=np.float64)
+    return x.reshape(-1, 1) if x.ndim == 1 else x
+
+
+def _desplazar(x: np.ndarray, n: int = 1) -> np.ndarray:
+    """Equivalente a Series.shift(n) por columnas"""
+    salida = np.full_like(x, np.nan)
+    if n < len(x):
+        salida[n:] = x[:-n]
+    return salida
+
+
+def _acumular(x: np.ndarray) -> np.ndarray:
+    """Suma acumulada por columnas con una fila inicial de ceros"""
+    acum = np.empty((x.shape[0] + 1, x.shape[1]))
+    acum[0] = 0.0
+    np.cumsum(x, axis=0, out=acum[1:])
+    return acum
+
+
+def _sumas_moviles(x: np.ndarray, ventana: int, cuadrados: bool = False):
+    """
+    Suma (y opcionalmente suma de cuadrados) de cada ventana, centradas en
+    el primer valor válido de cada columna para no perder precisión, más el
+    conteo de valores válidos. O(barras x tickers) con sumas acumuladas.
+    """
+    valido = np.isfinite(x)
+    completo = bool(valido.all())
+    if completo:
+        centro = x[0].copy()
+        xc = x - centro
+    else:
+        primera = valido.argmax(axis=0)
+        centro = x[primera, np.arange(x.shape[1])]
+        centro = np.where(np.isfinite(centro), centro, 0.0)
+        xc = np.where(valido, x - centro, 0.0)
+
+    acum = _acumular(xc)
+    suma = acum[ventana:] - acum[:-ventana]
+    suma2 = None
+    if cuadrados:
+        acum2 = _acumular(xc * xc)
+        suma2 = acum2[ventana:] - acum2[:-ventana]
+    if completo:
+        n = None
+    else:
+        conteo = _acumular(valido.astype(np.float64))
+        n = conteo[ventana:] - conteo[:-ventana]
+    return suma, suma2, n, centro
+
+
+def media_movil(x: np.ndarray, ventana: int) -> np.ndarray:
+    """Media móvil simple (rolling(ventana).mean(), min_periods=ventana)"""
+    x = _como_matriz(x)
+    salida = np.full_like(x, np.nan)
+    if ventana > len(x):
+        return salida
+    suma, _, n, centro = _sumas_moviles(x, ventana)
+    media = suma / ventana + centro
+    salida[ventana - 1:] = media if n is None else np.where(n == ventana, media, np.nan)
+    return salida
+
+
+def desviacion_movil(x: np.ndarray, ventana: int, ddof: int = 1) -> np.ndarray:
+    """Desviación estándar móvil (rolling(ventana).std(ddof))"""
+    x = _como_matriz(x)
+    salida = np.full_like(x, np.nan)
+    if ventana > len(x) or ventana - ddof <= 0:
+        return salida
+    suma, suma2, n, _ = _sumas_moviles(x, ventana, cuadrados=True)
+    desviacion = np.sqrt(np.maximum(suma2 - suma * suma / ventana, 0.0) / (ventana - ddof))
+    salida[ventana - 1:] = desviacion if n is None else np.where(n == ventana, desviacion, np.nan)
+    return salida
+
+
+def _extremo_movil(x: np.ndarray, ventana: int, funcion) -> np.ndarray:
+    x = _como_matriz(x)
+    salida = np.full_like(x, np.nan)
+    if ventana > len(x):
+        return salida
+    vistas = sliding_window_view(x, ventana, axis=0)
+    salida[ventana - 1:] = funcion(vistas, axis=-1)  # NaN en la ventana -> NaN
+    return salida
+
+
+def minimo_movil(x: np.ndarray, ventana: int) -> np.ndarray:
+    """Mínimo móvil (rolling(ventana).min())"""
+    return _extremo_movil(x, ventana, np.min)
+
+
+def maximo_movil(x: np.ndarray, ventana: int) -> np.ndarray:
+    """Máximo móvil (rolling(ventana).max())"""
+    return _extremo_movil(x, ventana, np.max)
+
+
+def ema(
+    x: np.ndarray,
+    alpha: Optional[float] = None,
+    span: Optional[int] = None,
+    ajustada: bool = False,
+    min_periodos: int = 0
+) -> np.ndarray:
+    """
+    Media móvil exponencial por columnas (Series.ewm(...).mean())
+
+    La recursión avanza fila a fila pero cada paso opera sobre todos los
+    tickers a la vez. Cada columna arranca en su primer valor válido.
+
+    Args:
+        x: Matriz barras x tickers
+        alpha: Factor de suavizado (o `span`: alpha = 2 / (span + 1))
+        ajustada: Equivalente a adjust=True de pandas
+        min_periodos: Observaciones mínimas para emitir valor
+    """
+    x = _como_matriz(x)
+    if alpha is None:
+        alpha = 2.0 / (span + 1.0)
+    decaimiento = 1.0 - alpha
+    filas, columnas = x.shape
+    valido = np.isfinite(x)
+    salida = np.empty_like(x)
+
+    if ajustada:
+        # Pesos w^i sobre las observaciones válidas (huecos decaen sin aportar)
+        xv = np.where(valido, x, 0.0)
+        pesos = valido.astype(np.float64)
+        denominadores = np.empty_like(x)
+        numerador = np.zeros(columnas)
+        denominador = np.zeros(columnas)
+        for t in range(filas):
+            numerador *= decaimiento
+            numerador += xv[t]
+            denominador *= decaimiento
+            denominador += pesos[t]
+            salida[t] = numerador
+            denominadores[t] = denominador
+        with _sin_avisos():
+            salida /= denominadores
+    elif not (valido[:-1] & ~valido[1:]).any():
+        # Solo NaN iniciales: se rellenan con el primer valor (semilla de la EMA)
+        primera = valido.argmax(axis=0)
+        semilla = x[primera, np.arange(columnas)]
+        xv = np.where(valido, x, semilla)
+        valor = xv[0].copy()
+        for t in range(filas):
+            valor *= decaimiento
+            valor += alpha * xv[t]
+            salida[t] = valor
+        salida[0] = xv[0]
+    else:
+        # Caso general (ignore_na=False): un hueco conserva el valor y
+        # reduce el peso del acumulado frente a la siguiente observación
+        valor = np.full(columnas, np.nan)
+        peso = np.ones(columnas)
+        for t in range(filas):
+            iniciado = ~np.isnan(valor)
+            peso = np.where(iniciado, peso * decaimiento, peso)
+            with _sin_avisos():
+                combinado = (peso * valor + alpha * x[t]) / (peso + alpha)
+            valor = np.where(valido[t], np.where(iniciado, combinado, x[t]), valor)
+            peso = np.where(valido[t], 1.0, peso)
+            salida[t] = valor
+
+    conteo = np.cumsum(valido, axis=0)
+    salida[conteo < max(min_periodos, 1)] = np.nan
+    return salida
+
+
+def rango_verdadero(high: np.ndarray, low: np.ndarray, close: np.ndarray) -> np.ndarray:
+    """True Range: max(H-L, |H-C_prev|, |L-C_prev|) ignorando NaN"""
+    high, low, close = _como_matriz(high), _como_matriz(low), _como_matriz(close)
+    previo = _desplazar(close)
+    # fmax ignora el NaN del cierre previo en la primera barra (como max(skipna))
+    return np.fmax(np.fmax(high - low, np.abs(high - previo)), np.abs(low - previo))
+
+
+def atr_simple(high: np.ndarray, low: np.ndarray, close: np.ndarray, periodo: int = 14) -> np.ndarray:
+    """ATR como media simple del True Range"""
+    return media_movil(rango_verdadero(high, low, close), periodo)
+
+
+def atr_wilder(high: np.ndarray, low: np.ndarray, close: np.ndarray, periodo: int = 14) -> np.ndarray:
+    """ATR de Wilder (semilla = media de las primeras `periodo` barras)"""
+    tr = rango_verdadero(high, low, close)
+    semilla = media_movil(tr, periodo)
+    salida = np.full_like(tr, np.nan)
+    previo = np.full(tr.shape[1], np.nan)
+    for t in range(len(tr)):
+        previo = np.where(np.isnan(previo), semilla[t], (previo * (periodo - 1) + tr[t]) / periodo)
+        salida[t] = previo
+    return salida
+
+
+def _movimientos(close: np.ndarray):
+    """Subidas y bajadas (0 en la primera barra válida de cada ticker)"""
+    close = _como_matriz(close)
+    delta = np.diff(close, axis=0, prepend=np.nan)
+    valido = np.isfinite(close)
+    subida = np.where(valido, np.where(delta > 0, delta, 0.0), np.nan)
+    bajada = np.where(valido, np.where(delta < 0, -delta, 0.0), np.nan)
+    return subida, bajada
+
+
+def rsi_wilder(close: np.ndarray, periodo: int = 14) -> np.ndarray:
+    """RSI con suavizado de Wilder (fórmula de ta.momentum.rsi)"""
+    subida, bajada = _movimientos(close)
+    media_subida = ema(subida, alpha=1.0 / periodo, min_periodos=periodo)
+    media_bajada = ema(bajada, alpha=1.0 / periodo, min_periodos=periodo)
+    with _sin_avisos():
+        rsi = 100 - 100 / (1 + media_subida / media_bajada)
+    return np.where(media_bajada == 0, 100.0, rsi)
+
+
+def rsi_simple(close: np.ndarray, periodo: int = 14) -> np.ndarray:
+    """RSI con medias simples de subidas y bajadas"""
+    subida, bajada = _movimientos(close)
+    with _sin_avisos():
+        rs = media_movil(subida, periodo) / media_movil(bajada, periodo)
+        return 100 - 100 / (1 + rs)
+
+
+def _ultimo(x: np.ndarray) -> np.ndarray:
+    return x[-1] if len(x) else np.full(x.shape[1], np.nan)
+
+
+def _cola(x: np.ndarray, filas: int) -> np.ndarray:
+    """Últimas `filas` barras (lo único que necesita una ventana móvil final)"""
+    return x[-filas:] if filas <= len(x) else x
+
+
+def _con_respaldo(x: np.ndarray, respaldo) -> np.ndarray:
+    return np.where(np.isfinite(x), x, respaldo)
+
+
+# ----------------------------------------------------------------------
+# Conjuntos de indicadores
+# ----------------------------------------------------------------------
+
+def indicadores_screener(panel: PanelOHLCV) -> ResultadoIndicadores:
+    """
+    Indicadores del ScreenerAutomatico para todos los tickers del panel
+
+    Aplica los mismos valores de respaldo que el screener cuando falta
+    historia (RSI 50, MACD 0, medias y bandas = precio actual, ATR 0).
+
+    Returns:
+        ResultadoIndicadores con los campos de TechnicalIndicators
+    """
+    close, volume = panel.close, panel.volume
+    precio = _ultimo(close)
+
+    # Solo las EMAs necesitan toda la serie; las ventanas móviles usan la cola
+    macd = ema(close, span=12, ajustada=True) - ema(close, span=26, ajustada=True)
+    senal = ema(macd, span=9, ajustada=True)
+    media_20 = _ultimo(media_movil(_cola(close, 20), 20))
+    desviacion_20 = _ultimo(desviacion_movil(_cola(close, 20), 20, ddof=1))
+    atr = atr_simple(_cola(panel.high, 15), _cola(panel.low, 15), _cola(close, 15), 14)
+
+    valores = {
+        "rsi": _con_respaldo(_ultimo(rsi_simple(_cola(close, 15), 14)), 50.0),
+        "macd_signal": _con_respaldo(_ultimo(macd - senal), 0.0),
+        "ma_20": _con_respaldo(media_20, precio),
+        "ma_50": _con_respaldo(_ultimo(media_movil(_cola(close, 50), 50)), precio),
+        "bollinger_upper": _con_respaldo(media_20 + 2 * desviacion_20, precio),
+        "bollinger_lower": _con_respaldo(media_20 - 2 * desviacion_20, precio),
+        "precio_actual": precio,
+        "volumen_sma": _con_respaldo(_ultimo(media_movil(_cola(volume, 20), 20)), _ultimo(volume)),
+        "atr": _con_respaldo(_ultimo(atr), 0.0),
+    }
+    return ResultadoIndicadores(tickers=list(panel.tickers), valores=valores)
+
+
+def indicadores_tecnicos(panel: PanelOHLCV) -> ResultadoIndicadores:
+    """
+    Indicadores de TechnicalAnalyzer.analizar_indicadores para todo el panel
+    (mismas fórmulas que la librería `ta`, sin valores de respaldo)
+
+    Returns:
+        ResultadoIndicadores con rsi, macd, stochrsi, sma/ema, bollinger,
+        atr, volumen y desviación del cierre
+    """
+    close, volume = panel.close, panel.volume
+
+    rsi = rsi_wilder(close, 14)
+    # StochRSI %D final necesita 14 + 2 + 2 valores de RSI
+    rsi_final = _cola(rsi, 18)
+    minimo_rsi = minimo_movil(rsi_final, 14)
+    with _sin_avisos():
+        stoch = (rsi_final - minimo_rsi) / (maximo_movil(rsi_final, 14) - minimo_rsi)
+    stoch_d = media_movil(media_movil(stoch, 3), 3)
+
+    ema_12 = ema(close, span=12, min_periodos=12)
+    ema_26 = ema(close, span=26, min_periodos=26)
+    macd = ema_12 - ema_26
+    senal = ema(macd, span=9, min_periodos=9)
+
+    media_20 = _ultimo(media_movil(_cola(close, 20), 20))
+    desviacion_20 = _ultimo(desviacion_movil(_cola(close, 20), 20, ddof=0))
+
+    with _sin_avisos():
+        desviacion_cierre = np.nanstd(close, axis=0, ddof=1)
+
+    valores = {
+        "precio_actual": _ultimo(close),
+        "rsi": _ultimo(rsi),
+        "macd": _ultimo(macd),
+        "macd_senal": _ultimo(senal),
+        "macd_hist": _ultimo(macd - senal),
+        "stoch_k": _ultimo(stoch),
+        "stoch_d": _ultimo(stoch_d),
+        "sma_20": media_20,
+        "sma_50": _ultimo(media_movil(_cola(close, 50), 50)),
+        "sma_200": _ultimo(media_movil(_cola(close, 200), 200)),
+        "ema_9": _ultimo(ema(close, span=9, min_periodos=9)),
+        "ema_21": _ultimo(ema(close, span=21, min_periodos=21)),
+        "bb_superior": media_20 + 2 * desviacion_20,
+        "bb_media": media_20,
+        "bb_inferior": media_20 - 2 * desviacion_20,
+        "atr": _ultimo(atr_wilder(panel.high, panel.low, close, 14)),
+        "volumen_actual": _ultimo(volume),
+        "volumen_promedio": _ultimo(media_movil(_cola(volume, 20), 20)),
+        "desviacion_cierre": desviacion_cierre,
+    }
+    return ResultadoIndicadores(tickers=list(panel.tickers), valores=valores)
@@ -0,0 +1,275 @@
+"""
+analisis/ml_model_cache.py
+Caché de modelos entrenados para MLPredictor.predecir_precio
+Clave (ticker, horizonte, fecha de la última barra de entrenamiento)
+- LRU acotado en memoria
+- Persistencia en disco con joblib (un archivo por ticker/horizonte)
+- Política de vigencia: se reentrena solo cuando llegan N barras nuevas
+- Entrenamientos concurrentes del mismo ticker se coalescen (single-flight)
+"""
+
+import glob
+import logging
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+import joblib
+import pandas as pd
+
+from data_sources.single_flight import SingleFlight
+
+
+@dataclass
+class ModelosEntrenados:
+    """Modelos ajustados para un ticker/horizonte y la última barra que vieron"""
+    ticker: str
+    horizonte: int
+    ultima_fecha: pd.Timestamp
+    modelos: Dict[str, Any]
+    tiempos_ajuste: Dict[str, float] = field(default_factory=dict)
+    entrenado: float = field(default_factory=time.time)
+
+    @property
+    def clave(self) -> Tuple[str, int, str]:
+        return self.ticker, self.horizonte, self.ultima_fecha.strftime("%Y-%m-%d")
+
+
+class CacheModelosML:
+    """
+    Caché LRU + disco de modelos de predicción de precio
+
+    Un modelo entrenado con barras hasta la fecha F sigue sirviendo mientras
+    la serie actual tenga menos de `reentrenar_cada` barras posteriores a F;
+    las predicciones se hacen con las features más recientes.
+
+    Ejemplo:
+        cache = CacheModelosML(directorio="models/precio", reentrenar_cada=5)
+        entrada = cache.obtener_o_entrenar("AAPL", 30, datos.index, ["random_forest"],
+                                           lambda: entrenar(X, y))
+        entrada.modelos["random_forest"].predict(X[-1:])
+    """
+
+    def __init__(
+        self,
+        max_modelos: int = 32,
+        directorio: Optional[str] = "models/precio",
+        reentrenar_cada: int = 5
+    ):
+        """
+        Args:
+            max_modelos: Entradas (ticker, horizonte) en memoria
+            directorio: Carpeta de persistencia (None = solo memoria)
+            reentrenar_cada: Barras nuevas que invalidan un modelo
+        """
+        self.logger = logging.getLogger("CacheModelosML")
+        self.max_modelos = max_modelos
+        self.directorio = directorio
+        self.reentrenar_cada = reentrenar_cada
+        self._lock = threading.Lock()
+        self._memoria: "OrderedDict[Tuple[str, int], ModelosEntrenados]" = OrderedDict()
+        self._flight = SingleFlight(timeout_espera=None)
+        self._stats = {
+            "hits": 0,
+            "hits_disco": 0,
+            "misses": 0,
+            "entrenamientos": 0,
+            "expulsiones": 0,
+        }
+        if directorio:
+            os.makedirs(directorio, exist_ok=True)
+
+    # ------------------------------------------------------------------
+    # Disco
+    # ------------------------------------------------------------------
+
+    def _patron(self, ticker: str, horizonte: int) -> str:
+        nombre = re.sub(r"[^A-Za-z0-9._^=-]", "_", ticker.upper())
+        return os.path.join(self.directorio, f"{nombre}_{horizonte}d_*.joblib")
+
+    def _ruta(self, entrada: ModelosEntrenados) -> str:
+        return self._patron(entrada.ticker, entrada.horizonte).replace(
+            "*", entrada.ultima_fecha.strftime("%Y%m%d")
+        )
+
+    def _leer_disco(self, ticker: str, horizonte: int) -> Optional[ModelosEntrenados]:
+        if not self.directorio:
+            return None
+        rutas = sorted(glob.glob(self._patron(ticker, horizonte)))
+        if not rutas:
+            return None
+        try:
+            entrada = joblib.load(rutas[-1])
+        except Exception as e:
+            self.logger.warning(f"⚠️  Modelos en disco dañados para {ticker}: {str(e)}")
+            return None
+        return entrada if isinstance(entrada, ModelosEntrenados) else None
+
+    def _escribir_disco(self, entrada: ModelosEntrenados) -> None:
+        if not self.directorio:
+            return
+        ruta = self._ruta(entrada)
+        tmp = f"{ruta}.{threading.get_ident()}.tmp"
+        try:
+            joblib.dump(entrada, tmp)
+            os.replace(tmp, ruta)
+            for anterior in glob.glob(self._patron(entrada.ticker, entrada.horizonte)):
+                if anterior != ruta:
+                    os.remove(anterior)
+        except Exception as e:
+            self.logger.warning(f"⚠️  No se pudieron persistir modelos de {entrada.ticker}: {str(e)}")
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def barras_nuevas(self, entrada: ModelosEntrenados, fechas: pd.DatetimeIndex) -> int:
+        """Barras de `fechas` posteriores a la última barra de entrenamiento"""
+        ultima = entrada.ultima_fecha
+        fechas = pd.DatetimeIndex(fechas)
+        if (fechas.tz is None) != (ultima.tz is None):
+            ultima = ultima.tz_localize(None) if fechas.tz is None else ultima.tz_localize(fechas.tz)
+        return int((fechas > ultima).sum())
+
+    def _vigente(self, entrada: Optional[ModelosEntrenados], fechas: pd.DatetimeIndex,
+                 nombres: Iterable[str]) -> bool:
+        return (
+            entrada is not None
+            and all(nombre in entrada.modelos for nombre in nombres)
+            and self.barras_nuevas(entrada, fechas) < self.reentrenar_cada
+        )
+
+    def obtener(
+        self,
+        ticker: str,
+        horizonte: int,
+        fechas: pd.DatetimeIndex,
+        nombres: Iterable[str]
+    ) -> Optional[ModelosEntrenados]:
+        """
+        Modelos vigentes para la serie actual (memoria, luego disco)
+
+        Args:
+            ticker: Símbolo
+            horizonte: Días de predicción
+            fechas: Índice de la serie actual
+            nombres: Modelos requeridos (ej: ["random_forest", "gradient_boosting"])
+
+        Returns:
+            ModelosEntrenados o None si hay que reentrenar
+        """
+        nombres = list(nombres)
+        clave = (ticker.upper(), horizonte)
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if self._vigente(entrada, fechas, nombres):
+                self._memoria.move_to_end(clave)
+                self._stats["hits"] += 1
+                return entrada
+
+        entrada = self._leer_disco(ticker, horizonte)
+        if self._vigente(entrada, fechas, nombres):
+            self._guardar_memoria(entrada)
+            with self._lock:
+                self._stats["hits_disco"] += 1
+            return entrada
+
+        with self._lock:
+            self._stats["misses"] += 1
+        return None
+
+    def _guardar_memoria(self, entrada: ModelosEntrenados) -> None:
+        with self._lock:
+            clave = (entrada.ticker, entrada.horizonte)
+            self._memoria[clave] = entrada
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_modelos:
+                self._memoria.popitem(last=False)
+                self._stats["expulsiones"] += 1
+
+    def guardar(
+        self,
+        ticker: str,
+        horizonte: int,
+        ultima_fecha: pd.Timestamp,
+        modelos: Dict[str, Any],
+        tiempos_ajuste: Optional[Dict[str, float]] = None
+    ) -> ModelosEntrenados:
+        """Registra modelos recién entrenados (memoria + disco)"""
+        entrada = ModelosEntrenados(ticker.upper(), horizonte, pd.Timestamp(ultima_fecha),
+                                    dict(modelos), dict(tiempos_ajuste or {}))
+        self._guardar_memoria(entrada)
+        self._escribir_disco(entrada)
+        return entrada
+
+    def obtener_o_entrenar(
+        self,
+        ticker: str,
+        horizonte: int,
+        fechas: pd.DatetimeIndex,
+        nombres: Iterable[str],
+        entrenar: Callable[[], Tuple[Dict[str, Any], Dict[str, float]]]
+    ) -> ModelosEntrenados:
+        """
+        Devuelve los modelos vigentes o entrena (una sola vez por ticker/horizonte
+        aunque lleguen varias solicitudes concurrentes)
+
+        Args:
+            entrenar: Función que devuelve ({nombre: modelo}, {nombre: segundos de ajuste})
+        """
+        nombres = list(nombres)
+        entrada = self.obtener(ticker, horizonte, fechas, nombres)
+        if entrada is not None:
+            return entrada
+
+        def _entrenar() -> ModelosEntrenados:
+            # Otro hilo pudo terminar de entrenar mientras esperábamos
+            with self._lock:
+                entrada = self._memoria.get((ticker.upper(), horizonte))
+                if self._vigente(entrada, fechas, nombres):
+                    return entrada
+            modelos, tiempos = entrenar()
+            with self._lock:
+                self._stats["entrenamientos"] += 1
+            entrada = self.guardar(ticker, horizonte, pd.DatetimeIndex(fechas)[-1], modelos, tiempos)
+            self.logger.info(f"🧠 Modelos de {ticker.upper()} ({horizonte}d) entrenados y cacheados")
+            return entrada
+
+        return self._flight.ejecutar(("modelos", ticker.upper(), horizonte), _entrenar)
+
+    def limpiar(self, disco: bool = False) -> None:
+        """Vacía la memoria (y opcionalmente los archivos persistidos)"""
+        with self._lock:
+            self._memoria.clear()
+        if disco and self.directorio:
+            for ruta in glob.glob(os.path.join(self.directorio, "*.joblib")):
+                os.remove(ruta)
+
+    def get_stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._stats,
+                "en_memoria": len(self._memoria),
+                "max_modelos": self.max_modelos,
+                "reentrenar_cada": self.reentrenar_cada,
+                "directorio": self.directorio,
+            }
+
+
+_cache_modelos: Optional[CacheModelosML] = None
+_cache_modelos_lock = threading.Lock()
+
+
+def obtener_cache_modelos() -> CacheModelosML:
+    """Obtiene la instancia global del caché de modelos"""
+    global _cache_modelos
+    with _cache_modelos_lock:
+        if _cache_modelos is None:
+            _cache_modelos = CacheModelosML()
+        return _cache_modelos
@@ -5,9 +5,13 @@ Usa múltiples modelos para proyecciones más precisas
 """
 
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
 import numpy as np
 import pandas as pd
 import yfinance as yf
+from numpy.lib.stride_tricks import sliding_window_view
 from typing import Dict, List, Optional, Any, Tuple
 from datetime import datetime, timedelta
 from sklearn.preprocessing import MinMaxScaler
@@ -16,19 +20,117 @@ from sklearn.linear_model import LinearRegression
 from sklearn.metrics import mean_squared_error, r2_score
 import warnings
 
+from data_sources.feature_store import AlmacenFeatures, ConjuntoFeatures, obtener_almacen_features
+from .ml_model_cache import CacheModelosML, obtener_cache_modelos
+from .monte_carlo import SimuladorMonteCarlo
+
 warnings.filterwarnings('ignore')
 
+# Miembros del ensemble (en orden) y su constructor
+MODELOS_PRECIO = {
+    # PUNTO 1: Aumentado max_depth de 15 a 20 para mejor precisión
+    'random_forest': lambda: RandomForestRegressor(n_estimators=100, max_depth=20, random_state=42),
+    # PUNTO 1: Aumentado max_depth de 7 a 10
+    'gradient_boosting': lambda: GradientBoostingRegressor(n_estimators=100, max_depth=10, random_state=42),
+    'linear_regression': lambda: LinearRegression(),
+}
+
+
+
+def _ajustar_modelo(nombre: str, X: np.ndarray, y: np.ndarray) -> Tuple[str, Any, float]:
+    """Ajusta un miembro de MODELOS_PRECIO (nivel de módulo: serializable para procesos)"""
+    inicio = time.perf_counter()
+    modelo = MODELOS_PRECIO[nombre]()
+    modelo.fit(X, y)
+    return nombre, modelo, time.perf_counter() - inicio
+
+
+# Cierres previos que describe cada fila de features
+VENTANA_FEATURES = 30
+
+
+def preparar_features_ventana(
+    close: np.ndarray, ventana: int = VENTANA_FEATURES, incluir_ultimo: bool = False
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Features y objetivo de MLPredictor._preparar_features en una pasada
+
+    Fila para el día i (i = ventana..len(close)-2): los `ventana` cierres
+    previos normalizados a [0, 1] + cambio del día, volatilidad relativa,
+    tendencia y precio / media. Objetivo: cierre de i + 1.
+
+    Args:
+        incluir_ultimo: Añadir la fila del último día (y queda una fila más corta)
+
+    Returns:
+        (X, y) con X de forma (len(close) - ventana - 1) x (ventana + 4)
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(-1)
+    filas = max(len(close) - ventana - (0 if incluir_ultimo else 1), 0)
+    ventanas = sliding_window_view(close, ventana)[:filas]
+    hoy = close[ventana:ventana + filas]
+    previo = close[ventana - 1:ventana - 1 + filas]
+
+    minimo = ventanas.min(axis=1, keepdims=True)
+    maximo = ventanas.max(axis=1, keepdims=True)
+    media = ventanas.mean(axis=1)
+
+    X = np.empty((filas, ventana + 4))
+    X[:, :ventana] = (ventanas - minimo) / (maximo - minimo + 1e-8)
+    X[:, ventana] = (hoy - previo) / previo
+    X[:, ventana + 1] = ventanas.std(axis=1) / media
+    X[:, ventana + 2] = (hoy - ventanas[:, 0]) / ventanas[:, 0]
+    X[:, ventana + 3] = hoy / media
+    y = close[ventana + 1:ventana + 1 + filas].copy()
+    return X, y
+
+
+def _features_con_ultimo_dia(close: np.ndarray) -> np.ndarray:
+    return preparar_features_ventana(close, incluir_ultimo=True)[0]
+
+
+# Features de precio en el almacén compartido (una fila por día desde el cierre `ventana`)
+CONJUNTO_FEATURES_PRECIO = ConjuntoFeatures(
+    nombre="precio_ventana",
+    version=f"v1-{VENTANA_FEATURES}",
+    columnas=tuple(f"cierre_norm_{k}" for k in range(VENTANA_FEATURES)) + (
+        "cambio_dia", "volatilidad_relativa", "tendencia", "precio_media"),
+    historia=VENTANA_FEATURES,
+    calcular=_features_con_ultimo_dia
+)
+
 
 class MLPredictor:
     """Predictor de precios usando Machine Learning"""
     
-    def __init__(self):
-        """Inicializa el predictor ML"""
+    def __init__(
+        self,
+        cache_modelos: Optional[CacheModelosML] = None,
+        n_jobs: Optional[int] = None,
+        usar_procesos: bool = False,
+        simulador: Optional[SimuladorMonteCarlo] = None,
+        almacen_features: Optional[AlmacenFeatures] = None
+    ):
+        """
+        Inicializa el predictor ML
+        
+        Args:
+            cache_modelos: Caché de modelos entrenados (default: el global)
+            n_jobs: Modelos del ensemble ajustados a la vez (None = todos, 1 = secuencial)
+            usar_procesos: Ajustar en procesos en lugar de hilos
+            simulador: Motor Monte Carlo de riesgo y proyección (default: 10k trayectorias)
+            almacen_features: Almacén de features por ticker/fecha (default: el compartido)
+        """
         self.logger = logging.getLogger("MLPredictor")
         self.scaler = MinMaxScaler()
         self.cache = {}
         self.cache_ttl = 3600
         self.cache_expiry = {}
+        self.cache_modelos = cache_modelos or obtener_cache_modelos()
+        self.n_jobs = n_jobs
+        self.usar_procesos = usar_procesos
+        self.simulador = simulador or SimuladorMonteCarlo()
+        self.almacen_features = almacen_features or obtener_almacen_features()
         self.logger.info("[OK] Predictor ML inicializado")
     
     def predecir_precio(
@@ -70,7 +172,7 @@ class MLPredictor:
                        'timestamp': datetime.now().isoformat()}
             
             # Preparar features
-            X, y, precio_actual = self._preparar_features(datos)
+            X, y, precio_actual = self._preparar_features(datos, ticker)
             
             if X is None:
                 return {'error': 'Datos insuficientes para ML', 
@@ -85,9 +187,21 @@ class MLPredictor:
                 'predicciones': {}
             }
             
+            # Modelos entrenados: se reutilizan hasta que lleguen N barras nuevas
+            nombres = list(MODELOS_PRECIO) if usar_ensemble else ['random_forest']
+            entrada = self.cache_modelos.obtener_o_entrenar(
+                ticker, dias_futuros, datos.index, nombres,
+                lambda: self._entrenar_modelos(X, y, nombres)
+            )
+            modelos = entrada.modelos
+            resultado['modelos'] = {
+                'entrenados': datetime.fromtimestamp(entrada.entrenado).isoformat(),
+                'tiempos_ajuste': {n: round(t, 3) for n, t in entrada.tiempos_ajuste.items()}
+            }
+            
             if usar_ensemble:
                 # Ensemble de modelos
-                predicciones = self._ensemble_prediction(X, y, dias_futuros)
+                predicciones = self._ensemble_prediction(X, y, dias_futuros, modelos)
                 resultado['predicciones']['ensemble'] = predicciones['prediccion']
                 resultado['confianza_ensemble'] = predicciones['confianza']
                 resultado['rango'] = {
@@ -96,7 +210,7 @@ class MLPredictor:
                 }
             else:
                 # Modelo individual
-                prediccion = self._predecir_con_random_forest(X, y, dias_futuros)
+                prediccion = self._predecir_con_random_forest(X, y, dias_futuros, modelos['random_forest'])
                 resultado['predicciones']['random_forest'] = prediccion['prediccion']
                 resultado['confianza'] = prediccion['confianza']
             
@@ -190,7 +304,11 @@ class MLPredictor:
                 },
                 'precio_esperado_95': round(precio_var_95, 2),
                 'precio_esperado_99': round(precio_var_99, 2),
-                'recomendacion': self._recomendar_segun_riesgo(var_95)
+                'recomendacion': self._recomendar_segun_riesgo(var_95),
+                # VaR/CVaR y drawdowns del horizonte completo remuestreando retornos
+                'monte_carlo': self.simulador.simular(
+                    datos['Adj Close'].values, dias, metodo='bootstrap'
+                )
             }
             
             return resultado
@@ -252,7 +370,12 @@ class MLPredictor:
                 'rango_esperado': {
                     'minimo': round(escenarios['bearish'], 2),
                     'maximo': round(escenarios['bullish'], 2)
-                }
+                },
+                # Bandas de percentiles al cierre de cada año (GBM calibrado con el histórico)
+                'monte_carlo': self.simulador.simular(
+                    datos['Adj Close'].values, anos * 252, metodo='gbm',
+                    puntos_control=[252 * ano for ano in range(1, anos + 1)]
+                )
             }
             
             return resultado
@@ -261,38 +384,27 @@ class MLPredictor:
             self.logger.warning(f"Error en proyección largo plazo: {e}")
             return {'error': str(e), 'ticker': ticker}
     
-    def _preparar_features(self, datos: pd.DataFrame) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[float]]:
-        """Prepara features para el modelo"""
+    def _preparar_features(
+        self, datos: pd.DataFrame, ticker: Optional[str] = None
+    ) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], Optional[float]]:
+        """
+        Prepara features para el modelo
+        
+        Con `ticker` (e índice de fechas) las features salen del almacén y
+        solo se calculan las de los días que no tenía.
+        """
         try:
-            close = datos['Adj Close'].values
+            close = np.asarray(datos['Adj Close'].values, dtype=np.float64).reshape(-1)
             
             if len(close) < 30:
                 return None, None, None
             
-            # Crear features técnicos
-            X_list = []
-            y_list = []
-            
-            for i in range(30, len(close) - 1):
-                # Últimos 30 precios normalizados
-                ventana = close[i-30:i]
-                ventana_norm = (ventana - ventana.min()) / (ventana.max() - ventana.min() + 1e-8)
-                
-                # Features adicionales
-                cambio_pct = (close[i] - close[i-1]) / close[i-1]
-                volatilidad = np.std(ventana) / np.mean(ventana)
-                tendencia = (close[i] - close[i-30]) / close[i-30]
-                
-                features = np.concatenate([
-                    ventana_norm,
-                    [cambio_pct, volatilidad, tendencia, close[i]/np.mean(ventana)]
-                ])
-                
-                X_list.append(features)
-                y_list.append(close[i+1])
-            
-            X = np.array(X_list)
-            y = np.array(y_list)
+            if ticker and isinstance(datos.index, pd.DatetimeIndex) and not np.isnan(close).any():
+                matriz = self.almacen_features.matriz(ticker, CONJUNTO_FEATURES_PRECIO, datos['Adj Close'])
+                X = matriz.to_numpy()[:-1]
+                y = close[VENTANA_FEATURES + 1:].copy()
+            else:
+                X, y = preparar_features_ventana(close)
             precio_actual = close[-1]
             
             return X, y, precio_actual
@@ -301,13 +413,38 @@ class MLPredictor:
             self.logger.warning(f"Error preparando features: {e}")
             return None, None, None
     
+    def _entrenar_modelos(
+        self, X: np.ndarray, y: np.ndarray, nombres: List[str]
+    ) -> Tuple[Dict[str, Any], Dict[str, float]]:
+        """
+        Ajusta los modelos indicados de MODELOS_PRECIO, en paralelo si n_jobs lo permite
+        
+        Returns:
+            ({nombre: modelo}, {nombre: segundos de ajuste})
+        """
+        n_jobs = min(self.n_jobs or len(nombres), len(nombres))
+        inicio = time.perf_counter()
+        if n_jobs <= 1:
+            ajustes = [_ajustar_modelo(nombre, X, y) for nombre in nombres]
+        else:
+            pool = ProcessPoolExecutor if self.usar_procesos else ThreadPoolExecutor
+            with pool(max_workers=n_jobs) as executor:
+                futuros = [executor.submit(_ajustar_modelo, nombre, X, y) for nombre in nombres]
+                ajustes = [futuro.result() for futuro in futuros]
+        total = time.perf_counter() - inicio
+        
+        modelos = {nombre: modelo for nombre, modelo, _ in ajustes}
+        tiempos = {nombre: segundos for nombre, _, segundos in ajustes}
+        detalle = ", ".join(f"{n} {t:.2f}s" for n, t in tiempos.items())
+        self.logger.info(f"⏱️  Ajuste de modelos: {detalle} (total {total:.2f}s, n_jobs={n_jobs})")
+        return modelos, tiempos
+    
     def _predecir_con_random_forest(self, X: np.ndarray, y: np.ndarray, 
-                                    dias_futuros: int) -> Dict[str, Any]:
-        """Predicción con Random Forest"""
+                                    dias_futuros: int, rf: Any = None) -> Dict[str, Any]:
+        """Predicción con Random Forest (rf ya entrenado o se ajusta uno nuevo)"""
         try:
-            # PUNTO 1: Aumentado max_depth de 15 a 20 para mejor precisión
-            rf = RandomForestRegressor(n_estimators=100, max_depth=20, random_state=42)
-            rf.fit(X, y)
+            if rf is None:
+                rf = self._entrenar_modelos(X, y, ['random_forest'])[0]['random_forest']
             
             # Último feature para predicción
             ultimo_feature = X[-1].reshape(1, -1)
@@ -326,43 +463,26 @@ class MLPredictor:
             return {'prediccion': None, 'confianza': 0}
     
     def _ensemble_prediction(self, X: np.ndarray, y: np.ndarray, 
-                            dias_futuros: int) -> Dict[str, Any]:
-        """Predicción con ensemble de múltiples modelos"""
+                            dias_futuros: int, modelos: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Predicción con ensemble de múltiples modelos (ya entrenados o se ajustan)"""
         try:
+            if modelos is None:
+                modelos = self._entrenar_modelos(X, y, list(MODELOS_PRECIO))[0]
+            
             predicciones = []
             confianzas = []
-            
-            # Random Forest
-            # PUNTO 1: Aumentado max_depth de 15 a 20
-            rf = RandomForestRegressor(n_estimators=100, max_depth=20, random_state=42)
-            rf.fit(X, y)
-            pred_rf = rf.predict(X[-1:].reshape(1, -1))[0]
-            predicciones.append(pred_rf)
-            
-            y_pred_rf = rf.predict(X[-100:])
-            r2_rf = r2_score(y[-100:], y_pred_rf)
-            confianzas.append(max(0.1, (r2_rf + 1) * 50))
-            
-            # Gradient Boosting
-            # PUNTO 1: Aumentado max_depth de 7 a 10
-            gb = GradientBoostingRegressor(n_estimators=100, max_depth=10, random_state=42)
-            gb.fit(X, y)
-            pred_gb = gb.predict(X[-1:].reshape(1, -1))[0]
-            predicciones.append(pred_gb)
-            
-            y_pred_gb = gb.predict(X[-100:])
-            r2_gb = r2_score(y[-100:], y_pred_gb)
-            confianzas.append(max(0.1, (r2_gb + 1) * 50))
-            
-            # Linear Regression
-            lr = LinearRegression()
-            lr.fit(X, y)
-            pred_lr = lr.predict(X[-1:].reshape(1, -1))[0]
-            predicciones.append(pred_lr)
-            
-            y_pred_lr = lr.predict(X[-100:])
-            r2_lr = r2_score(y[-100:], y_pred_lr)
-            confianzas.append(max(0.1, (r2_lr + 1) * 50))
+            individuales = {}
+            
+            # Random Forest, Gradient Boosting y Linear Regression
+            for nombre in MODELOS_PRECIO:
+                modelo = modelos[nombre]
+                pred = modelo.predict(X[-1:].reshape(1, -1))[0]
+                predicciones.append(pred)
+                individuales[nombre] = float(pred)
+                
+                y_pred = modelo.predict(X[-100:])
+                r2 = r2_score(y[-100:], y_pred)
+                confianzas.append(max(0.1, (r2 + 1) * 50))
             
             # Promedio ponderado
             confianzas = np.array(confianzas)
@@ -379,11 +499,7 @@ class MLPredictor:
                 'confianza': round(confianza_promedio, 2),
                 'rango_min': float(rango_min),
                 'rango_max': float(rango_max),
-                'predicciones_individuales': {
-                    'random_forest': float(pred_rf),
-                    'gradient_boosting': float(pred_gb),
-                    'linear_regression': float(pred_lr)
-                }
+                'predicciones_individuales': individuales
             }
         except Exception as e:
             self.logger.warning(f"Error en ensemble: {e}")
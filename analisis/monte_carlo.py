@@ -0,0 +1,224 @@
+"""
+analisis/monte_carlo.py
+Motor de simulación Monte Carlo de precios
+Genera todas las trayectorias como una sola matriz numpy (trayectorias x pasos)
+en float32 con un RNG con semilla, por dos métodos:
+- GBM: incrementos log-normales con la media/desviación de los retornos log
+- Bootstrap: remuestreo de los retornos log históricos
+Resume bandas de percentiles, VaR/CVaR del horizonte y probabilidad de
+superar umbrales de drawdown
+"""
+
+import logging
+import time
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+
+METODOS = ("gbm", "bootstrap")
+
+# Filas generadas por bloque (acota los temporales de normales/índices)
+FILAS_POR_BLOQUE = 2048
+
+
+def retornos_log(precios: Sequence[float]) -> np.ndarray:
+    """Retornos logarítmicos diarios (ignora precios no positivos o NaN)"""
+    precios = np.asarray(precios, dtype=np.float64).reshape(-1)
+    precios = precios[np.isfinite(precios) & (precios > 0)]
+    return np.diff(np.log(precios))
+
+
+def simular_log_trayectorias(
+    retornos: np.ndarray,
+    pasos: int,
+    trayectorias: int,
+    metodo: str = "gbm",
+    semilla: Optional[int] = None
+) -> np.ndarray:
+    """
+    Log-precio relativo acumulado de cada trayectoria: log(P_t / P_0)
+
+    Args:
+        retornos: Retornos log históricos (calibran GBM o se remuestrean)
+        pasos: Barras simuladas por trayectoria
+        trayectorias: Número de trayectorias
+        metodo: "gbm" o "bootstrap"
+        semilla: Semilla del generador (reproducible)
+
+    Returns:
+        Matriz float32 trayectorias x pasos
+    """
+    if metodo not in METODOS:
+        raise ValueError(f"Método desconocido: {metodo} (opciones: {METODOS})")
+    retornos = np.asarray(retornos, dtype=np.float64)
+    retornos = retornos[np.isfinite(retornos)]
+    if len(retornos) < 2:
+        raise ValueError("Se necesitan al menos 2 retornos para simular")
+
+    rng = np.random.default_rng(semilla)
+    salida = np.empty((trayectorias, pasos), dtype=np.float32)
+    media = np.float32(retornos.mean())
+    desviacion = np.float32(retornos.std(ddof=1))
+    muestra = retornos.astype(np.float32)
+
+    for inicio in range(0, trayectorias, FILAS_POR_BLOQUE):
+        bloque = salida[inicio:inicio + FILAS_POR_BLOQUE]
+        if metodo == "gbm":
+            # Los retornos log ya incluyen el término -sigma^2/2 del GBM
+            rng.standard_normal(out=bloque, dtype=np.float32)
+            bloque *= desviacion
+            bloque += media
+        else:
+            indices = rng.integers(0, len(muestra), size=bloque.shape, dtype=np.int32)
+            np.take(muestra, indices, out=bloque)
+        np.cumsum(bloque, axis=1, out=bloque)
+    return salida
+
+
+def max_drawdown(log_trayectorias: np.ndarray) -> np.ndarray:
+    """
+    Máximo drawdown de cada trayectoria (fracción positiva, incluye P_0)
+
+    Args:
+        log_trayectorias: Salida de simular_log_trayectorias
+    """
+    maximo = np.maximum.accumulate(log_trayectorias, axis=1)
+    np.maximum(maximo, 0, out=maximo)
+    np.subtract(log_trayectorias, maximo, out=maximo)
+    caida = maximo.min(axis=1)
+    return -np.expm1(caida).astype(np.float64)
+
+
+def calibrar_trayectorias(
+    pasos: int,
+    presupuesto_ms: float,
+    minimo: int = 500,
+    maximo: int = 100_000,
+    metodo: str = "gbm"
+) -> int:
+    """
+    Trayectorias que caben en un presupuesto de latencia
+
+    Mide una simulación piloto pequeña y extrapola linealmente.
+    """
+    piloto = 256
+    retornos = np.random.default_rng(0).normal(0, 0.01, 500)
+    inicio = time.perf_counter()
+    log_trayectorias = simular_log_trayectorias(retornos, pasos, piloto, metodo, semilla=0)
+    max_drawdown(log_trayectorias)
+    por_trayectoria = (time.perf_counter() - inicio) / piloto
+    return int(np.clip(presupuesto_ms / 1000.0 / max(por_trayectoria, 1e-9), minimo, maximo))
+
+
+class SimuladorMonteCarlo:
+    """
+    Simulación Monte Carlo de precios con resumen de riesgo
+
+    Ejemplo:
+        simulador = SimuladorMonteCarlo(trayectorias=10_000, semilla=42)
+        resumen = simulador.simular(precios, pasos=252, metodo="bootstrap")
+        resumen["var"]["95"], resumen["prob_drawdown"]["20%"]
+    """
+
+    def __init__(
+        self,
+        trayectorias: int = 10_000,
+        semilla: Optional[int] = 42,
+        presupuesto_ms: Optional[float] = None,
+        percentiles: Sequence[float] = (5, 25, 50, 75, 95),
+        umbrales_drawdown: Sequence[float] = (0.10, 0.20, 0.30, 0.50)
+    ):
+        """
+        Args:
+            trayectorias: Trayectorias por simulación (si no hay presupuesto)
+            semilla: Semilla del RNG (None = no reproducible)
+            presupuesto_ms: Si se indica, las trayectorias se ajustan a esta latencia
+            percentiles: Percentiles de las bandas de precio
+            umbrales_drawdown: Drawdowns cuya probabilidad se reporta
+        """
+        self.logger = logging.getLogger("SimuladorMonteCarlo")
+        self.trayectorias = trayectorias
+        self.semilla = semilla
+        self.presupuesto_ms = presupuesto_ms
+        self.percentiles = list(percentiles)
+        self.umbrales_drawdown = list(umbrales_drawdown)
+        self._calibradas: Dict[tuple, int] = {}
+
+    def trayectorias_para(self, pasos: int, metodo: str) -> int:
+        """Trayectorias a simular (fijas o según el presupuesto de latencia)"""
+        if not self.presupuesto_ms:
+            return self.trayectorias
+        clave = (pasos, metodo)
+        if clave not in self._calibradas:
+            self._calibradas[clave] = calibrar_trayectorias(pasos, self.presupuesto_ms, metodo=metodo)
+        return self._calibradas[clave]
+
+    def simular(
+        self,
+        precios: Sequence[float],
+        pasos: int,
+        metodo: str = "gbm",
+        puntos_control: Optional[List[int]] = None,
+        trayectorias: Optional[int] = None
+    ) -> Dict[str, object]:
+        """
+        Simula `pasos` barras desde el último precio y resume la distribución
+
+        Args:
+            precios: Serie histórica de precios (ajustados)
+            pasos: Horizonte en barras
+            metodo: "gbm" o "bootstrap"
+            puntos_control: Pasos (1..pasos) donde reportar bandas (default: solo el final)
+            trayectorias: Sobrescribe el número de trayectorias
+
+        Returns:
+            Dict con bandas de percentiles, VaR/CVaR (% del horizonte),
+            probabilidades de drawdown y metadatos de la simulación
+        """
+        inicio = time.perf_counter()
+        precios = np.asarray(precios, dtype=np.float64).reshape(-1)
+        precio_inicial = float(precios[np.isfinite(precios)][-1])
+        n = trayectorias or self.trayectorias_para(pasos, metodo)
+
+        log_trayectorias = simular_log_trayectorias(
+            retornos_log(precios), pasos, n, metodo, self.semilla
+        )
+        puntos = sorted(set(puntos_control or [pasos]))
+
+        bandas = {}
+        for paso in puntos:
+            valores = np.percentile(log_trayectorias[:, paso - 1], self.percentiles)
+            bandas[paso] = {
+                f"p{p:g}": round(float(precio_inicial * np.exp(v)), 2)
+                for p, v in zip(self.percentiles, valores)
+            }
+
+        retorno_final = np.expm1(log_trayectorias[:, -1].astype(np.float64))
+        var, cvar = {}, {}
+        for confianza in (95, 99):
+            corte = np.percentile(retorno_final, 100 - confianza)
+            var[str(confianza)] = round(float(corte) * 100, 2)
+            cvar[str(confianza)] = round(float(retorno_final[retorno_final <= corte].mean()) * 100, 2)
+
+        drawdowns = max_drawdown(log_trayectorias)
+        prob_drawdown = {
+            f"{umbral:.0%}": round(float((drawdowns >= umbral).mean()), 4)
+            for umbral in self.umbrales_drawdown
+        }
+
+        return {
+            "metodo": metodo,
+            "trayectorias": n,
+            "pasos": pasos,
+            "semilla": self.semilla,
+            "precio_inicial": round(precio_inicial, 2),
+            "bandas": bandas,
+            "retorno_mediano": round(float(np.median(retorno_final)) * 100, 2),
+            "prob_perdida": round(float((retorno_final < 0).mean()), 4),
+            "var": var,
+            "cvar": cvar,
+            "drawdown_mediano": round(float(np.median(drawdowns)) * 100, 2),
+            "prob_drawdown": prob_drawdown,
+            "duracion_ms": round((time.perf_counter() - inicio) * 1000, 1),
+        }
@@ -0,0 +1,403 @@
+"""
+analisis/returns_panel.py
+Panel de retornos compartido para el análisis de correlaciones
+- Una matriz de retornos diarios (fechas x tickers) para todo el universo
+- Sumas por pares mantenidas de forma incremental (barras nuevas entran,
+  las más antiguas salen de la ventana) de las que se obtienen covarianza y
+  correlación de Pearson
+- Cualquier submatriz se responde por slicing del estado: O(k²), sin I/O
+"""
+
+import logging
+import threading
+import time
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def _sumas_cruzadas(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """
+    Sumas entre las columnas de `a` y de `b` sobre las filas en que ambas
+    tienen dato: (n, Σa, Σa², Σab), cada una de forma a.cols x b.cols
+    """
+    mascara_a = np.isfinite(a)
+    mascara_b = np.isfinite(b)
+    a0 = np.where(mascara_a, a, 0.0)
+    b0 = np.where(mascara_b, b, 0.0)
+    mb = mascara_b.astype(np.float64)
+    return (
+        mascara_a.astype(np.float64).T @ mb,
+        a0.T @ mb,
+        (a0 * a0).T @ mb,
+        a0.T @ b0,
+    )
+
+
+def _normalizar_indice(indice: Iterable) -> pd.DatetimeIndex:
+    indice = pd.DatetimeIndex(indice)
+    return indice.tz_localize(None) if indice.tz is not None else indice
+
+
+class EstadoCovarianza:
+    """
+    Sumas por pares de una matriz de retornos con huecos (NaN)
+
+    Cada par usa las filas en que ambos activos tienen dato, igual que
+    DataFrame.corr()/cov() de pandas. Agregar o quitar filas es O(filas·n²).
+    """
+
+    def __init__(self, n: int = 0):
+        self.n = np.zeros((n, n))
+        self.sx = np.zeros((n, n))
+        self.sxx = np.zeros((n, n))
+        self.sxy = np.zeros((n, n))
+
+    @property
+    def columnas(self) -> int:
+        return self.n.shape[0]
+
+    def agregar(self, filas: np.ndarray, signo: float = 1.0) -> None:
+        """Suma (o resta con signo=-1) la contribución de filas x columnas"""
+        filas = np.atleast_2d(np.asarray(filas, dtype=np.float64))
+        if not len(filas):
+            return
+        for acumulado, suma in zip((self.n, self.sx, self.sxx, self.sxy), _sumas_cruzadas(filas, filas)):
+            acumulado += signo * suma
+
+    def quitar(self, filas: np.ndarray) -> None:
+        """Resta la contribución de filas que salen de la ventana"""
+        self.agregar(filas, -1.0)
+
+    def extender(self, existentes: np.ndarray, nuevas: np.ndarray) -> None:
+        """
+        Añade columnas: `existentes` y `nuevas` son las mismas filas
+        (todo el historial del panel) de las columnas actuales y las nuevas
+        """
+        n, m = self.columnas, nuevas.shape[1]
+        ab = _sumas_cruzadas(existentes, nuevas)
+        ba = _sumas_cruzadas(nuevas, existentes)
+        bb = _sumas_cruzadas(nuevas, nuevas)
+        for nombre, k in (("n", 0), ("sx", 1), ("sxx", 2), ("sxy", 3)):
+            ampliada = np.zeros((n + m, n + m))
+            ampliada[:n, :n] = getattr(self, nombre)
+            ampliada[:n, n:] = ab[k]
+            ampliada[n:, :n] = ba[k]
+            ampliada[n:, n:] = bb[k]
+            setattr(self, nombre, ampliada)
+
+    def _bloques(self, indices: Optional[Sequence[int]]):
+        if indices is None:
+            return self.n, self.sx, self.sxx, self.sxy
+        malla = np.ix_(indices, indices)
+        return self.n[malla], self.sx[malla], self.sxx[malla], self.sxy[malla]
+
+    def covarianza(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Covarianza muestral (ddof=1) de las columnas indicadas"""
+        n, sx, _, sxy = self._bloques(indices)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            cov = (sxy - sx * sx.T / n) / (n - 1)
+        cov[n < 2] = np.nan
+        return cov
+
+    def correlacion(self, indices: Optional[Sequence[int]] = None) -> np.ndarray:
+        """Correlación de Pearson de las columnas indicadas"""
+        n, sx, sxx, sxy = self._bloques(indices)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            numerador = n * sxy - sx * sx.T
+            varianzas = np.clip(n * sxx - sx * sx, 0, None)
+            corr = numerador / np.sqrt(varianzas * varianzas.T)
+        corr[n < 2] = np.nan
+        np.clip(corr, -1.0, 1.0, out=corr)
+        return corr
+
+
+def betas_moviles(retornos: np.ndarray, benchmark: np.ndarray, ventana: int) -> np.ndarray:
+    """
+    Beta de cada columna contra el benchmark en ventanas móviles
+
+    Sumas acumuladas sobre las filas con ambos datos: una pasada O(fechas x k)
+    para todas las ventanas y todos los activos.
+
+    Args:
+        retornos: Matriz fechas x k
+        benchmark: Retornos del benchmark (fechas)
+        ventana: Barras por ventana
+
+    Returns:
+        Matriz fechas x k (NaN hasta completar ventana // 2 observaciones)
+    """
+    y = np.atleast_2d(np.asarray(retornos, dtype=np.float64).T).T
+    x = np.asarray(benchmark, dtype=np.float64)[:, None]
+    mascara = np.isfinite(y) & np.isfinite(x)
+    y0 = np.where(mascara, y, 0.0)
+    x0 = np.where(mascara, x, 0.0)
+
+    def movil(valores):
+        acumulado = np.vstack([np.zeros((1, valores.shape[1])), np.cumsum(valores, axis=0)])
+        resultado = acumulado[1:].copy()
+        resultado[ventana:] -= acumulado[1:-ventana]
+        return resultado
+
+    n = movil(mascara.astype(np.float64))
+    sx, sy = movil(x0), movil(y0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        betas = (n * movil(x0 * y0) - sx * sy) / (n * movil(x0 * x0) - sx * sx)
+    betas[n < max(2, ventana // 2)] = np.nan
+    betas[:ventana - 1] = np.nan
+    return betas
+
+
+class PanelRetornos:
+    """
+    Retornos diarios de un universo de tickers con covarianza incremental
+
+    Ejemplo:
+        panel = PanelRetornos()
+        panel.agregar_tickers(precios_universo)       # DataFrame fechas x tickers
+        panel.correlacion(["AAPL", "MSFT", "NVDA"])   # slicing, sin recalcular
+        panel.agregar_barras(precios_de_hoy)          # actualización incremental
+    """
+
+    def __init__(self, ventana: Optional[int] = None, dias: Optional[int] = None):
+        """
+        Args:
+            ventana: Barras que conserva el panel (None = sin límite)
+            dias: Días naturales que conserva el panel hasta su última fecha,
+                  como el período de descarga (None = sin límite)
+        """
+        self.logger = logging.getLogger("PanelRetornos")
+        self.ventana = ventana
+        self.dias = dias
+        self.tickers: List[str] = []
+        self.fechas = pd.DatetimeIndex([])
+        self.retornos = np.empty((0, 0))
+        self.estado = EstadoCovarianza()
+        self.actualizado = 0.0
+        self._indice: Dict[str, int] = {}
+        self._ultimos_precios = np.empty(0)
+        self._barras_quitadas = 0
+        self._lock = threading.RLock()
+
+    # ------------------------------------------------------------------
+    # Carga y actualización
+    # ------------------------------------------------------------------
+
+    def faltantes(self, tickers: Iterable[str]) -> List[str]:
+        """Tickers que aún no están en el panel"""
+        return [t for t in dict.fromkeys(t.upper() for t in tickers) if t not in self._indice]
+
+    @property
+    def ultima_fecha(self) -> Optional[pd.Timestamp]:
+        return self.fechas[-1] if len(self.fechas) else None
+
+    def _recortar(self, fechas: pd.DatetimeIndex) -> pd.DatetimeIndex:
+        """Fechas que caben en la ventana (días y barras) contando desde la última"""
+        if self.dias and len(fechas):
+            fechas = fechas[fechas >= fechas[-1] - pd.Timedelta(days=self.dias)]
+        return fechas[-self.ventana:] if self.ventana else fechas
+
+    def agregar_tickers(self, precios: pd.DataFrame) -> List[str]:
+        """
+        Incorpora columnas nuevas al panel
+
+        El eje de fechas es la unión de las fechas de todas las columnas
+        hasta la última fecha del panel, recortada a la ventana: un ticker
+        con historia más larga que los ya cargados amplía el eje hacia atrás
+        (y se recalcula el estado) en lugar de truncarse. Las barras
+        posteriores a la última fecha entran con agregar_barras.
+
+        Args:
+            precios: Cierres ajustados, fechas x tickers
+
+        Returns:
+            Tickers añadidos
+        """
+        precios = precios.copy()
+        precios.index = _normalizar_indice(precios.index)
+        precios.columns = [str(c).upper() for c in precios.columns]
+        with self._lock:
+            nuevos = [t for t in dict.fromkeys(precios.columns) if t not in self._indice]
+            if not nuevos:
+                return []
+            precios = precios.loc[:, ~precios.columns.duplicated()][nuevos].sort_index()
+            # Retorno de cada ticker entre sus propias barras con dato
+            retornos = precios.apply(lambda s: s.dropna().pct_change()).dropna(how="all")
+
+            if not len(self.fechas):
+                ultimos = precios.ffill().iloc[-1]
+            else:
+                retornos = retornos.loc[:self.fechas[-1]]
+                hasta_panel = precios.loc[:self.fechas[-1]].ffill()
+                ultimos = hasta_panel.iloc[-1] if len(hasta_panel) else pd.Series(np.nan, index=nuevos)
+
+            fechas = self._recortar(self.fechas.union(retornos.index))
+            matriz = retornos.reindex(fechas).to_numpy(dtype=np.float64)
+            mismo_eje = fechas.equals(self.fechas)
+            if mismo_eje:
+                self.estado.extender(self.retornos, matriz)
+                self.retornos = np.hstack([self.retornos, matriz])
+            else:
+                existentes = pd.DataFrame(self.retornos, index=self.fechas).reindex(fechas)
+                self.retornos = np.hstack([existentes.to_numpy(dtype=np.float64), matriz])
+                self.fechas = fechas
+            self._ultimos_precios = np.concatenate([self._ultimos_precios, ultimos.to_numpy(dtype=np.float64)])
+            for ticker in nuevos:
+                self._indice[ticker] = len(self.tickers)
+                self.tickers.append(ticker)
+            if not mismo_eje:
+                self.recalcular()
+            self.actualizado = time.time()
+
+        self.logger.info(f"📥 Panel: +{len(nuevos)} tickers ({len(self.tickers)} en total, {len(self.fechas)} barras)")
+        return nuevos
+
+    def agregar_barras(self, precios: pd.DataFrame) -> int:
+        """
+        Incorpora las barras posteriores a la última fecha del panel
+
+        Actualiza las sumas con las filas nuevas y resta las que salen de la
+        ventana; cada `ventana` barras retiradas se recalcula el estado exacto
+        para no acumular error de redondeo.
+
+        Args:
+            precios: Cierres ajustados, fechas x tickers (cualquier subconjunto)
+
+        Returns:
+            Barras añadidas
+        """
+        precios = precios.copy()
+        precios.index = _normalizar_indice(precios.index)
+        precios.columns = [str(c).upper() for c in precios.columns]
+        with self._lock:
+            if self.ultima_fecha is not None:
+                precios = precios[precios.index > self.ultima_fecha]
+            precios = precios.loc[:, [c for c in precios.columns if c in self._indice]].sort_index()
+            if precios.empty:
+                self.actualizado = time.time()
+                return 0
+
+            columnas = [self._indice[c] for c in precios.columns]
+            filas = np.full((len(precios), len(self.tickers)), np.nan)
+            for i, fila in enumerate(precios.to_numpy(dtype=np.float64)):
+                anteriores = self._ultimos_precios[columnas]
+                with np.errstate(divide="ignore", invalid="ignore"):
+                    filas[i, columnas] = fila / anteriores - 1
+                validos = np.isfinite(fila)
+                self._ultimos_precios[np.asarray(columnas)[validos]] = fila[validos]
+
+            self.estado.agregar(filas)
+            self.retornos = np.vstack([self.retornos, filas])
+            self.fechas = self.fechas.append(precios.index)
+
+            sobrantes = len(self.fechas) - len(self._recortar(self.fechas))
+            if sobrantes > 0:
+                self.estado.quitar(self.retornos[:sobrantes])
+                self.retornos = self.retornos[sobrantes:]
+                self.fechas = self.fechas[sobrantes:]
+                self._barras_quitadas += sobrantes
+                if self._barras_quitadas >= len(self.fechas):
+                    self.recalcular()
+            self.actualizado = time.time()
+            return len(precios)
+
+    def sincronizar(self, precios: pd.DataFrame) -> Tuple[List[str], int]:
+        """Añade los tickers que falten y las barras nuevas de un DataFrame de cierres"""
+        nuevos = self.agregar_tickers(precios)
+        return nuevos, self.agregar_barras(precios)
+
+    def recalcular(self) -> None:
+        """Reconstruye las sumas desde la matriz de retornos"""
+        with self._lock:
+            self.estado = EstadoCovarianza(len(self.tickers))
+            self.estado.agregar(self.retornos)
+            self._barras_quitadas = 0
+
+    # ------------------------------------------------------------------
+    # Consultas (slicing del estado)
+    # ------------------------------------------------------------------
+
+    def indices(self, tickers: Iterable[str]) -> List[int]:
+        """Posiciones de los tickers (KeyError si alguno no está cargado)"""
+        return [self._indice[t.upper()] for t in tickers]
+
+    def _marco(self, valores: np.ndarray, tickers: List[str]) -> pd.DataFrame:
+        return pd.DataFrame(valores, index=tickers, columns=tickers)
+
+    def covarianza(self, tickers: Sequence[str]) -> pd.DataFrame:
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            return self._marco(self.estado.covarianza(self.indices(tickers)), tickers)
+
+    def correlacion(self, tickers: Sequence[str]) -> pd.DataFrame:
+        """Correlación de Pearson del subconjunto (O(k²))"""
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            return self._marco(self.estado.correlacion(self.indices(tickers)), tickers)
+
+    def volatilidad(self, tickers: Sequence[str]) -> pd.Series:
+        """Desviación estándar diaria de los retornos de cada ticker"""
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            varianzas = np.diag(self.estado.covarianza(self.indices(tickers)))
+        return pd.Series(np.sqrt(np.clip(varianzas, 0, None)), index=tickers)
+
+    def retornos_de(self, tickers: Sequence[str]) -> pd.DataFrame:
+        """Retornos del subconjunto como DataFrame (fechas x tickers)"""
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            return pd.DataFrame(self.retornos[:, self.indices(tickers)], index=self.fechas, columns=tickers)
+
+    def regresion_benchmark(self, tickers: Sequence[str], benchmark: str) -> pd.DataFrame:
+        """
+        Regresión r_i = alfa + beta·r_benchmark de cada ticker, desde el estado
+
+        Usa las sumas por pares (ticker, benchmark): O(k), sin recorrer retornos.
+
+        Returns:
+            DataFrame por ticker: beta, alfa (diario), r2, observaciones
+        """
+        tickers = [t.upper() for t in tickers]
+        with self._lock:
+            i = np.asarray(self.indices(tickers), dtype=int)
+            b = self._indice[benchmark.upper()]
+            e = self.estado
+            n, sxy = e.n[i, b], e.sxy[i, b]
+            sx, sxx = e.sx[i, b], e.sxx[i, b]
+            sb, sbb = e.sx[b, i], e.sxx[b, i]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            covarianza = n * sxy - sx * sb
+            varianza_b = n * sbb - sb * sb
+            beta = covarianza / varianza_b
+            alfa = (sx - beta * sb) / n
+            r2 = covarianza ** 2 / (varianza_b * (n * sxx - sx * sx))
+        return pd.DataFrame(
+            {"beta": beta, "alfa": alfa, "r2": np.clip(r2, 0.0, 1.0), "observaciones": n.astype(int)},
+            index=tickers
+        )
+
+    def correlacion_spearman(self, tickers: Sequence[str]) -> pd.DataFrame:
+        """
+        Correlación de Spearman del subconjunto
+
+        Los rangos dependen de toda la ventana, así que no se mantienen de
+        forma incremental: se calculan sobre las columnas del panel (sin I/O).
+        """
+        retornos = self.retornos_de(tickers)
+        if not retornos.isna().to_numpy().any():
+            rangos = retornos.rank().to_numpy()
+            return self._marco(np.corrcoef(rangos, rowvar=False), list(retornos.columns))
+        return retornos.corr(method="spearman")
+
+    def get_stats(self) -> Dict[str, object]:
+        with self._lock:
+            return {
+                "tickers": len(self.tickers),
+                "barras": len(self.fechas),
+                "ventana": self.ventana,
+                "dias": self.dias,
+                "desde": self.fechas[0].strftime("%Y-%m-%d") if len(self.fechas) else None,
+                "hasta": self.ultima_fecha.strftime("%Y-%m-%d") if len(self.fechas) else None,
+                "actualizado": self.actualizado,
+            }
@@ -4,19 +4,34 @@ Módulo de Screener Automático - Análisis multidimensional de símbolos financ
 Agrega datos de múltiples fuentes y genera recomendaciones por horizonte temporal
 """
 
+import heapq
+import itertools
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Dict, List, Any, Optional, Tuple, Callable, Iterator
 from datetime import datetime, timedelta
 import numpy as np
 import pandas as pd
 from dataclasses import dataclass, asdict
 from enum import Enum
 
+from .indicator_engine import construir_panel, indicadores_screener
+
 try:
     from data_sources import MarketDataManager
+    from data_sources.batch_history import descargar_historicos_batch, dividir_lotes, TAMANO_LOTE_DEFAULT
+    from data_sources.ohlcv_store import PERIODOS_DIAS
 except ImportError:
     # Fallback si está en contexto diferente
     MarketDataManager = None
+    descargar_historicos_batch = None
+    TAMANO_LOTE_DEFAULT = 50
+    PERIODOS_DIAS = {}
+
+    def dividir_lotes(tickers, tamano_lote):
+        unicos = list(dict.fromkeys(t.upper() for t in tickers if t))
+        return [unicos[i:i + tamano_lote] for i in range(0, len(unicos), max(1, tamano_lote))]
 
 
 class Timeframe(Enum):
@@ -67,6 +82,57 @@ class ScreenerResult:
     niveles_clave: Dict[str, float]  # resistencia, soporte
 
 
+class RankingTopN:
+    """
+    Ranking acotado de los N mejores ScreenerResult (min-heap por score)
+    Thread-safe: los workers del screener agregan y el llamador puede
+    consultar el ranking parcial mientras el escaneo continúa
+    """
+    
+    def __init__(self, limite: int = 10):
+        self.limite = max(1, int(limite))
+        self._heap: List[Tuple[float, int, ScreenerResult]] = []
+        self._orden = itertools.count()
+        self._lock = threading.Lock()
+        self.procesados = 0
+    
+    def agregar(self, resultado: ScreenerResult, orden: Optional[int] = None) -> bool:
+        """
+        Agrega un resultado si entra en el top N
+        
+        Args:
+            resultado: Resultado del screener
+            orden: Posición del símbolo en la lista de entrada (desempate);
+                   por defecto el orden de llegada
+        
+        Returns:
+            True si el resultado quedó en el ranking
+        """
+        # En empates gana la posición menor, igual que un sort estable
+        if orden is None:
+            orden = next(self._orden)
+        entrada = (float(resultado.score), -orden, resultado)
+        with self._lock:
+            self.procesados += 1
+            if len(self._heap) < self.limite:
+                heapq.heappush(self._heap, entrada)
+                return True
+            if entrada[:2] > self._heap[0][:2]:
+                heapq.heapreplace(self._heap, entrada)
+                return True
+            return False
+    
+    def ranking(self) -> List[ScreenerResult]:
+        """Top N actual ordenado por score descendente"""
+        with self._lock:
+            entradas = sorted(self._heap, key=lambda e: e[:2], reverse=True)
+        return [resultado for _, _, resultado in entradas]
+    
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._heap)
+
+
 class ScreenerAutomatico:
     """
     Motor de screener automático para identificar oportunidades de inversión
@@ -89,7 +155,9 @@ class ScreenerAutomatico:
         self,
         ticker: str,
         timeframe: Timeframe = Timeframe.MEDIUM_TERM,
-        periodo_dias: int = 90
+        periodo_dias: int = 90,
+        datos_historicos: Optional[pd.DataFrame] = None,
+        indicadores: Optional[TechnicalIndicators] = None
     ) -> Optional[ScreenerResult]:
         """
         Analiza un símbolo y genera recomendación
@@ -98,6 +166,8 @@ class ScreenerAutomatico:
             ticker: Símbolo a analizar (AAPL, MSFT, etc)
             timeframe: Horizonte de inversión
             periodo_dias: Período de análisis histórico
+            datos_historicos: Histórico ya descargado (ej: por un lote); si falta se descarga
+            indicadores: Indicadores ya calculados (ej: por el motor vectorizado del lote)
             
         Returns:
             ScreenerResult con análisis completo o None si falla
@@ -106,13 +176,15 @@ class ScreenerAutomatico:
             self.logger.info(f"🔍 Analizando {ticker} en {timeframe.value}...")
             
             # 1. Obtener datos históricos
-            datos_historicos = self._obtener_datos_historicos(ticker, periodo_dias)
+            if datos_historicos is None:
+                datos_historicos = self._obtener_datos_historicos(ticker, periodo_dias)
             if datos_historicos is None or datos_historicos.empty:
                 self.logger.warning(f"⚠️  No se obtuvieron datos para {ticker}")
                 return None
             
             # 2. Calcular indicadores técnicos
-            indicadores = self._calcular_indicadores(datos_historicos, ticker)
+            if indicadores is None:
+                indicadores = self._calcular_indicadores(datos_historicos, ticker)
             
             # 3. Obtener datos fundamentales/actuales
             datos_actuales = self.market_data.obtener_datos_actuales(ticker)
@@ -184,6 +256,41 @@ class ScreenerAutomatico:
             self.logger.error(f"Error descargando datos para {ticker}: {e}")
             return None
     
+    def _obtener_datos_historicos_batch(
+        self,
+        tickers: List[str],
+        dias: int = 90,
+        tamano_lote: int = TAMANO_LOTE_DEFAULT
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Obtiene el histórico de varios tickers con descargas agrupadas
+
+        Pasa por MarketDataManager.obtener_historicos_batch (caché, almacén
+        OHLCV y rate limiter del proveedor) con el período más corto que
+        cubre `dias`; sin él, descarga directa con el rate limiter compartido.
+        """
+        try:
+            if hasattr(self.market_data, "obtener_historicos_batch"):
+                periodo = min(
+                    (p for p, d in PERIODOS_DIAS.items() if d >= dias),
+                    key=PERIODOS_DIAS.get, default="max"
+                )
+                return self.market_data.obtener_historicos_batch(tickers, periodo=periodo, tamano_lote=tamano_lote)
+            if descargar_historicos_batch is None:
+                return {}
+            fecha_inicio = datetime.now() - timedelta(days=dias)
+            datos = descargar_historicos_batch(
+                tickers,
+                inicio=fecha_inicio.date(),
+                fin=datetime.now().date(),
+                tamano_lote=tamano_lote,
+                rate_limiter=getattr(MarketDataManager, "_rate_limiter", None)
+            )
+            return datos
+        except Exception as e:
+            self.logger.error(f"Error en descarga batch de {len(tickers)} tickers: {e}")
+            return {}
+    
     def _calcular_indicadores(
         self,
         datos: pd.DataFrame,
@@ -192,145 +299,30 @@ class ScreenerAutomatico:
         """Calcula todos los indicadores técnicos"""
         
         try:
-            close = datos['Close']
-            volumen = datos['Volume']
-            
-            # RSI (14 períodos)
-            rsi = self._calcular_rsi(close, 14)
-            if pd.isna(rsi):
-                rsi = 50.0
-            
-            # MACD
-            macd_signal = self._calcular_macd(close)
-            if pd.isna(macd_signal):
-                macd_signal = 0.0
-            
-            # Medias móviles
-            ma_20 = float(close.rolling(20).mean().iloc[-1].item())
-            ma_50 = float(close.rolling(50).mean().iloc[-1].item())
-            
-            if pd.isna(ma_20):
-                ma_20 = float(close.iloc[-1])
-            if pd.isna(ma_50):
-                ma_50 = float(close.iloc[-1])
-            
-            # Bandas de Bollinger
-            bb = self._calcular_bollinger_bands(close, 20, 2)
-            if pd.isna(bb['upper']):
-                bb['upper'] = float(close.iloc[-1])
-            if pd.isna(bb['lower']):
-                bb['lower'] = float(close.iloc[-1])
-            
-            # ATR (Average True Range)
-            atr = self._calcular_atr(datos, 14)
-            if pd.isna(atr):
-                atr = 0.0
-            
-            # Volume SMA
-            volumen_sma = float(volumen.rolling(20).mean().iloc[-1].item())
-            if pd.isna(volumen_sma):
-                volumen_sma = float(volumen.iloc[-1].item())
-            
-            precio_actual = float(close.iloc[-1].item())
-            
-            return TechnicalIndicators(
-                rsi=float(rsi),
-                macd_signal=float(macd_signal),
-                ma_20=float(ma_20),
-                ma_50=float(ma_50),
-                bollinger_upper=float(bb['upper']),
-                bollinger_lower=float(bb['lower']),
-                precio_actual=float(precio_actual),
-                volumen_sma=float(volumen_sma),
-                atr=float(atr)
-            )
-            
+            return self._calcular_indicadores_lote({ticker: datos})[ticker]
         except Exception as e:
             self.logger.error(f"Error calculando indicadores: {e}")
             # Retornar indicadores con valores por defecto
             return TechnicalIndicators(50.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
     
-    def _calcular_rsi(self, close: pd.Series, periodo: int = 14) -> float:
-        """Calcula RSI (Relative Strength Index)"""
-        try:
-            delta = close.diff()
-            gain = (delta.where(delta > 0, 0)).rolling(window=periodo).mean()
-            loss = (-delta.where(delta < 0, 0)).rolling(window=periodo).mean()
-            
-            rs = gain / loss
-            rsi = 100 - (100 / (1 + rs))
-            result = float(rsi.iloc[-1].item())
-            
-            if pd.isna(result):
-                return 50.0
-            return result
-        except:
-            return 50.0
-    
-    def _calcular_macd(self, close: pd.Series) -> float:
-        """Calcula señal MACD vs Signal Line"""
-        try:
-            ema_12 = close.ewm(span=12).mean()
-            ema_26 = close.ewm(span=26).mean()
-            macd = ema_12 - ema_26
-            signal = macd.ewm(span=9).mean()
-            
-            result = float(macd.iloc[-1].item() - signal.iloc[-1].item())
-            if pd.isna(result):
-                return 0.0
-            return result
-        except:
-            return 0.0
-    
-    def _calcular_bollinger_bands(
+    def _calcular_indicadores_lote(
         self,
-        close: pd.Series,
-        periodo: int = 20,
-        desv_std: float = 2
-    ) -> Dict[str, float]:
-        """Calcula Bandas de Bollinger"""
-        try:
-            sma = close.rolling(window=periodo).mean()
-            std = close.rolling(window=periodo).std()
-            
-            upper = sma + (std * desv_std)
-            lower = sma - (std * desv_std)
-            
-            upper_val = float(upper.iloc[-1].item())
-            lower_val = float(lower.iloc[-1].item())
-            
-            if pd.isna(upper_val):
-                upper_val = float(close.iloc[-1])
-            if pd.isna(lower_val):
-                lower_val = float(close.iloc[-1])
-            
-            return {
-                'upper': upper_val,
-                'lower': lower_val
-            }
-        except:
-            return {'upper': float(close.iloc[-1]), 'lower': float(close.iloc[-1])}
-    
-    def _calcular_atr(self, datos: pd.DataFrame, periodo: int = 14) -> float:
-        """Calcula Average True Range"""
-        try:
-            high = datos['High']
-            low = datos['Low']
-            close = datos['Close']
-            
-            tr1 = high - low
-            tr2 = abs(high - close.shift())
-            tr3 = abs(low - close.shift())
-            
-            tr = pd.concat([tr1, tr2, tr3], axis=1).max(axis=1)
-            atr = tr.rolling(window=periodo).mean()
+        historicos: Dict[str, pd.DataFrame]
+    ) -> Dict[str, TechnicalIndicators]:
+        """
+        Calcula los indicadores de todos los tickers en una sola pasada vectorizada
+        
+        Args:
+            historicos: {ticker: DataFrame OHLCV}
             
-            result = float(atr.iloc[-1])
-            if pd.isna(result):
-                return 0.0
-            return result
-        except:
-            return 0.0
+        Returns:
+            {ticker: TechnicalIndicators} (los tickers sin datos no aparecen)
+        """
+        resultado = indicadores_screener(construir_panel(historicos))
+        return {
+            ticker: TechnicalIndicators(**resultado.para(ticker))
+            for ticker in resultado.tickers
+        }
     
     def _generar_señales(
         self,
@@ -549,11 +541,74 @@ class ScreenerAutomatico:
         except:
             return 0.0
     
+    def iterar_screener(
+        self,
+        tickers: List[str],
+        timeframe: Timeframe = Timeframe.MEDIUM_TERM,
+        max_workers: int = 4,
+        tamano_lote: int = TAMANO_LOTE_DEFAULT,
+        ranking: Optional[RankingTopN] = None
+    ) -> Iterator[ScreenerResult]:
+        """
+        Analiza los símbolos en paralelo y entrega cada resultado al completarse
+        
+        Los históricos se descargan lote a lote (una llamada agrupada por lote),
+        los indicadores de cada lote se calculan en una pasada vectorizada y
+        solo hay un lote en memoria a la vez, así que el consumo no crece
+        con el número de símbolos. El rate limiter de MarketDataManager acota
+        la concurrencia efectiva contra el proveedor.
+        
+        Args:
+            tickers: Lista de símbolos a analizar
+            timeframe: Horizonte de inversión
+            max_workers: Hilos de análisis simultáneos (1 = secuencial)
+            tamano_lote: Símbolos por descarga agrupada de históricos
+            ranking: RankingTopN opcional que se actualiza con cada resultado
+            
+        Yields:
+            ScreenerResult en orden de finalización (los fallidos se omiten)
+        """
+        max_workers = max(1, int(max_workers))
+        
+        posicion = 0
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="Screener") as executor:
+            for lote in dividir_lotes(tickers, tamano_lote):
+                historicos = self._obtener_datos_historicos_batch(lote, 90, tamano_lote)
+                try:
+                    indicadores = self._calcular_indicadores_lote(historicos)
+                except Exception as e:
+                    self.logger.warning(f"⚠️  Indicadores del lote no disponibles, se calculan por símbolo: {e}")
+                    indicadores = {}
+                pendientes = {}
+                for ticker in lote:
+                    futuro = executor.submit(
+                        self.analizar_simbolo, ticker, timeframe, 90,
+                        historicos.get(ticker), indicadores.get(ticker)
+                    )
+                    pendientes[futuro] = posicion
+                    posicion += 1
+                del historicos, indicadores
+                
+                while pendientes:
+                    completados, _ = wait(pendientes, return_when=FIRST_COMPLETED)
+                    for futuro in completados:
+                        orden = pendientes.pop(futuro)
+                        resultado = futuro.result()
+                        if resultado is None:
+                            continue
+                        if ranking is not None:
+                            ranking.agregar(resultado, orden)
+                        yield resultado
+    
     def screener_por_sector(
         self,
         tickers: List[str],
         timeframe: Timeframe = Timeframe.MEDIUM_TERM,
-        limite: int = 10
+        limite: int = 10,
+        tamano_lote: int = TAMANO_LOTE_DEFAULT,
+        max_workers: int = 1,
+        callback: Optional[Callable[[ScreenerResult, List[ScreenerResult]], None]] = None
     ) -> List[ScreenerResult]:
         """
         Ejecuta screener en múltiples símbolos y retorna top N
@@ -562,23 +617,31 @@ class ScreenerAutomatico:
             tickers: Lista de símbolos a analizar
             timeframe: Horizonte de inversión
             limite: Cantidad de mejores resultados a retornar
+            tamano_lote: Símbolos por descarga agrupada de históricos
+            max_workers: Hilos de análisis simultáneos (1 = secuencial)
+            callback: Función (resultado, ranking_parcial) llamada con cada
+                      símbolo analizado
             
         Returns:
             Lista de ScreenerResult ordenada por score descendente
         """
-        self.logger.info(f"🔍 Ejecutando screener en {len(tickers)} símbolos...")
-        
-        resultados = []
+        self.logger.info(f"🔍 Ejecutando screener en {len(tickers)} símbolos ({max_workers} workers)...")
         
-        for ticker in tickers:
-            resultado = self.analizar_simbolo(ticker, timeframe)
-            if resultado:
-                resultados.append(resultado)
+        # Solo se conservan los N mejores: memoria O(limite) para los líderes
+        ranking = RankingTopN(limite)
         
-        # Ordenar por score descendente
-        resultados.sort(key=lambda x: x.score, reverse=True)
+        for resultado in self.iterar_screener(
+            tickers, timeframe, max_workers=max_workers,
+            tamano_lote=tamano_lote, ranking=ranking
+        ):
+            if callback is not None:
+                try:
+                    callback(resultado, ranking.ranking())
+                except Exception as e:
+                    self.logger.warning(f"⚠️  Error en callback del screener: {str(e)}")
         
-        return resultados[:limite]
+        self.logger.info(f"✅ Screener completado: {ranking.procesados} símbolos con resultado")
+        return ranking.ranking()
     
     def generar_reporte_texto(self, resultado: ScreenerResult) -> str:
         """Genera reporte textual del análisis"""
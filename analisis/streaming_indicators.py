@@ -0,0 +1,550 @@
+"""
+analisis/streaming_indicators.py
+Indicadores técnicos incrementales con estado persistente
+RSI de Wilder, EMA/MACD, ATR de Wilder, media/varianza móvil y StochRSI que se
+actualizan barra a barra (O(1) por barra), con las mismas fórmulas que
+indicator_engine.indicadores_tecnicos (librería `ta`)
+
+El estado de cada ticker se serializa en JSON junto a su serie en el
+OHLCVStore y solo se lee del almacén lo posterior a la última barra
+procesada. Hay dos modos:
+- ventana=BARRAS_ANALISIS (default): el estado son las últimas barras y
+  cada actualización vuelve a recorrer esa ventana fija, O(ventana) por
+  actualización. Se prefiere la paridad exacta con
+  TechnicalAnalyzer.analizar_indicadores (que siembra las EMAs al inicio de
+  su ventana) a la actualización O(1); el coste no crece con la historia.
+- ventana=None: streaming O(1) por barra nueva sobre toda la historia. Los
+  valores difieren de analizar_indicadores por el calentamiento de las EMAs
+  y medias de Wilder (empiezan en la primera barra de la serie).
+"""
+
+import logging
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, List, Optional
+
+import pandas as pd
+
+from .indicator_engine import BARRAS_ANALISIS
+
+
+# Se incrementa cuando cambia la forma del estado serializado (fuerza reconstrucción)
+VERSION_ESTADO = 2
+
+NAN = float("nan")
+
+
+def _finito(x: float) -> bool:
+    return x is not None and math.isfinite(x)
+
+
+class IndicadorIncremental:
+    """
+    Base de los indicadores incrementales
+
+    El estado son los atributos de la instancia (números, deques u otros
+    indicadores), serializables con a_dict()/desde_dict().
+    """
+
+    _tipos: Dict[str, type] = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        IndicadorIncremental._tipos[cls.__name__] = cls
+
+    def actualizar(self, *args) -> float:
+        raise NotImplementedError
+
+    @property
+    def valor(self) -> float:
+        raise NotImplementedError
+
+    def a_dict(self) -> Dict[str, Any]:
+        """Estado serializable en JSON"""
+        estado: Dict[str, Any] = {"__tipo__": type(self).__name__}
+        for nombre, valor in self.__dict__.items():
+            if isinstance(valor, IndicadorIncremental):
+                estado[nombre] = valor.a_dict()
+            elif isinstance(valor, deque):
+                estado[nombre] = {"__deque__": list(valor), "maxlen": valor.maxlen}
+            else:
+                estado[nombre] = valor
+        return estado
+
+    @classmethod
+    def desde_dict(cls, estado: Dict[str, Any]) -> "IndicadorIncremental":
+        """Reconstruye un indicador a partir de a_dict()"""
+        tipo = IndicadorIncremental._tipos[estado["__tipo__"]]
+        instancia = tipo.__new__(tipo)
+        for nombre, valor in estado.items():
+            if nombre == "__tipo__":
+                continue
+            if isinstance(valor, dict) and "__tipo__" in valor:
+                valor = IndicadorIncremental.desde_dict(valor)
+            elif isinstance(valor, dict) and "__deque__" in valor:
+                valor = deque(valor["__deque__"], maxlen=valor["maxlen"])
+            setattr(instancia, nombre, valor)
+        return instancia
+
+
+class EMAIncremental(IndicadorIncremental):
+    """EMA sin ajuste (ewm(adjust=False, min_periods)), semilla = primer valor"""
+
+    def __init__(self, span: Optional[int] = None, alpha: Optional[float] = None, min_periodos: int = 0):
+        self.alpha = alpha if alpha is not None else 2.0 / (span + 1.0)
+        self.min_periodos = min_periodos
+        self.media = NAN
+        self.n = 0
+
+    def actualizar(self, x: float) -> float:
+        if _finito(x):
+            self.media = x if self.n == 0 else self.media + self.alpha * (x - self.media)
+            self.n += 1
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        return self.media if self.n >= max(self.min_periodos, 1) else NAN
+
+
+class MediaVarianzaMovil(IndicadorIncremental):
+    """
+    Media y varianza de una ventana móvil (rolling(ventana).mean()/.std(ddof))
+
+    Mantiene sumas desplazadas por el primer valor de la ventana y las
+    recalcula exactas cada `ventana` barras para acotar el error acumulado.
+    """
+
+    def __init__(self, ventana: int, ddof: int = 1):
+        self.ventana = ventana
+        self.ddof = ddof
+        self.valores = deque(maxlen=ventana)
+        self.centro = NAN
+        self.suma = 0.0
+        self.suma2 = 0.0
+        self.invalidos = 0
+        self.desde_recalculo = 0
+
+    def actualizar(self, x: float) -> float:
+        if len(self.valores) == self.ventana:
+            saliente = self.valores[0]
+            if _finito(saliente):
+                self.suma -= saliente - self.centro
+                self.suma2 -= (saliente - self.centro) ** 2
+            else:
+                self.invalidos -= 1
+        self.valores.append(x)
+        if _finito(x):
+            if not _finito(self.centro):
+                self.centro = x
+            self.suma += x - self.centro
+            self.suma2 += (x - self.centro) ** 2
+        else:
+            self.invalidos += 1
+
+        self.desde_recalculo += 1
+        if self.desde_recalculo >= self.ventana:
+            self._recalcular()
+        return self.valor
+
+    def _recalcular(self) -> None:
+        validos = [v for v in self.valores if _finito(v)]
+        self.centro = validos[0] if validos else NAN
+        self.suma = sum(v - self.centro for v in validos)
+        self.suma2 = sum((v - self.centro) ** 2 for v in validos)
+        self.invalidos = len(self.valores) - len(validos)
+        self.desde_recalculo = 0
+
+    @property
+    def completa(self) -> bool:
+        return len(self.valores) == self.ventana and self.invalidos == 0
+
+    @property
+    def valor(self) -> float:
+        """Media de la ventana (NaN si no está completa)"""
+        return self.centro + self.suma / self.ventana if self.completa else NAN
+
+    @property
+    def desviacion(self) -> float:
+        if not self.completa or self.ventana - self.ddof <= 0:
+            return NAN
+        varianza = (self.suma2 - self.suma * self.suma / self.ventana) / (self.ventana - self.ddof)
+        return math.sqrt(max(varianza, 0.0))
+
+
+class RSIWilder(IndicadorIncremental):
+    """RSI con suavizado de Wilder (ta.momentum.rsi); la primera barra aporta 0"""
+
+    def __init__(self, periodo: int = 14):
+        self.cierre_previo = NAN
+        self.subidas = EMAIncremental(alpha=1.0 / periodo, min_periodos=periodo)
+        self.bajadas = EMAIncremental(alpha=1.0 / periodo, min_periodos=periodo)
+
+    def actualizar(self, close: float) -> float:
+        if not _finito(close):
+            return self.valor
+        delta = close - self.cierre_previo if _finito(self.cierre_previo) else 0.0
+        self.subidas.actualizar(max(delta, 0.0))
+        self.bajadas.actualizar(max(-delta, 0.0))
+        self.cierre_previo = close
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        bajada = self.bajadas.valor
+        if bajada == 0:
+            return 100.0
+        if not _finito(bajada):
+            return NAN
+        return 100 - 100 / (1 + self.subidas.valor / bajada)
+
+
+class MACDIncremental(IndicadorIncremental):
+    """MACD = EMA rápida - EMA lenta; la señal solo recibe valores de MACD válidos"""
+
+    def __init__(self, rapida: int = 12, lenta: int = 26, senal: int = 9):
+        self.rapida = EMAIncremental(span=rapida, min_periodos=rapida)
+        self.lenta = EMAIncremental(span=lenta, min_periodos=lenta)
+        self.senal = EMAIncremental(span=senal, min_periodos=senal)
+
+    def actualizar(self, close: float) -> float:
+        self.rapida.actualizar(close)
+        self.lenta.actualizar(close)
+        self.senal.actualizar(self.valor)
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        return self.rapida.valor - self.lenta.valor
+
+    @property
+    def valor_senal(self) -> float:
+        return self.senal.valor
+
+    @property
+    def histograma(self) -> float:
+        return self.valor - self.senal.valor
+
+
+class ATRWilder(IndicadorIncremental):
+    """ATR de Wilder (semilla = media de los primeros `periodo` True Range)"""
+
+    def __init__(self, periodo: int = 14):
+        self.periodo = periodo
+        self.cierre_previo = NAN
+        self.atr = NAN
+        self.suma_semilla = 0.0
+        self.n = 0
+
+    def actualizar(self, high: float, low: float, close: float) -> float:
+        rangos = [high - low]
+        if _finito(self.cierre_previo):
+            rangos += [abs(high - self.cierre_previo), abs(low - self.cierre_previo)]
+        rangos = [r for r in rangos if _finito(r)]
+        tr = max(rangos) if rangos else NAN
+        if _finito(close):
+            self.cierre_previo = close
+
+        if self.n < self.periodo:
+            if _finito(tr):
+                self.suma_semilla += tr
+                self.n += 1
+                if self.n == self.periodo:
+                    self.atr = self.suma_semilla / self.periodo
+            else:
+                # Un hueco antes de completar la semilla la reinicia (ventana NaN)
+                self.suma_semilla, self.n = 0.0, 0
+        elif _finito(tr):
+            self.atr = (self.atr * (self.periodo - 1) + tr) / self.periodo
+        return self.atr
+
+    @property
+    def valor(self) -> float:
+        return self.atr
+
+
+class StochRSIIncremental(IndicadorIncremental):
+    """StochRSI sobre una ventana de RSI con %K y %D como medias de 3"""
+
+    def __init__(self, ventana: int = 14, suavizado_k: int = 3, suavizado_d: int = 3):
+        self.rsis = deque(maxlen=ventana)
+        self.k = MediaVarianzaMovil(suavizado_k)
+        self.d = MediaVarianzaMovil(suavizado_d)
+        self.stoch = NAN
+
+    def actualizar(self, rsi: float) -> float:
+        self.rsis.append(rsi)
+        self.stoch = NAN
+        if len(self.rsis) == self.rsis.maxlen and all(_finito(r) for r in self.rsis):
+            minimo, maximo = min(self.rsis), max(self.rsis)
+            if maximo != minimo:
+                self.stoch = (rsi - minimo) / (maximo - minimo)
+        self.d.actualizar(self.k.actualizar(self.stoch))
+        return self.stoch
+
+    @property
+    def valor(self) -> float:
+        return self.stoch
+
+
+class DesviacionAcumulada(IndicadorIncremental):
+    """Media y desviación (ddof=1) de toda la serie con el algoritmo de Welford"""
+
+    def __init__(self):
+        self.n = 0
+        self.media = 0.0
+        self.m2 = 0.0
+
+    def actualizar(self, x: float) -> float:
+        if _finito(x):
+            self.n += 1
+            delta = x - self.media
+            self.media += delta / self.n
+            self.m2 += delta * (x - self.media)
+        return self.valor
+
+    @property
+    def valor(self) -> float:
+        return math.sqrt(self.m2 / (self.n - 1)) if self.n > 1 else NAN
+
+
+class IndicadoresIncrementales(IndicadorIncremental):
+    """
+    Conjunto de indicadores de TechnicalAnalyzer actualizado barra a barra
+
+    valores() devuelve las mismas claves que
+    indicator_engine.indicadores_tecnicos() para una sola serie.
+    """
+
+    def __init__(self):
+        self.rsi = RSIWilder(14)
+        self.stoch = StochRSIIncremental(14, 3, 3)
+        self.macd = MACDIncremental(12, 26, 9)
+        self.sma_20 = MediaVarianzaMovil(20, ddof=0)
+        self.sma_50 = MediaVarianzaMovil(50)
+        self.sma_200 = MediaVarianzaMovil(200)
+        self.ema_9 = EMAIncremental(span=9, min_periodos=9)
+        self.ema_21 = EMAIncremental(span=21, min_periodos=21)
+        self.atr = ATRWilder(14)
+        self.volumen = MediaVarianzaMovil(20)
+        self.desviacion = DesviacionAcumulada()
+        self.precio_actual = NAN
+        self.volumen_actual = NAN
+        self.barras = 0
+
+    def actualizar(self, high: float, low: float, close: float, volume: float = NAN) -> Dict[str, float]:
+        """Incorpora una barra (las barras sin cierre válido se ignoran)"""
+        if not _finito(close):
+            return self.valores()
+        self.stoch.actualizar(self.rsi.actualizar(close))
+        self.macd.actualizar(close)
+        for indicador in (self.sma_20, self.sma_50, self.sma_200, self.ema_9, self.ema_21, self.desviacion):
+            indicador.actualizar(close)
+        self.atr.actualizar(high, low, close)
+        self.volumen.actualizar(volume)
+        self.precio_actual = close
+        self.volumen_actual = volume
+        self.barras += 1
+        return self.valores()
+
+    def valores(self) -> Dict[str, float]:
+        media_20 = self.sma_20.valor
+        desviacion_20 = self.sma_20.desviacion
+        return {
+            "precio_actual": self.precio_actual,
+            "rsi": self.rsi.valor,
+            "macd": self.macd.valor,
+            "macd_senal": self.macd.valor_senal,
+            "macd_hist": self.macd.histograma,
+            "stoch_k": self.stoch.valor,
+            "stoch_d": self.stoch.d.valor,
+            "sma_20": media_20,
+            "sma_50": self.sma_50.valor,
+            "sma_200": self.sma_200.valor,
+            "ema_9": self.ema_9.valor,
+            "ema_21": self.ema_21.valor,
+            "bb_superior": media_20 + 2 * desviacion_20,
+            "bb_media": media_20,
+            "bb_inferior": media_20 - 2 * desviacion_20,
+            "atr": self.atr.valor,
+            "volumen_actual": self.volumen_actual,
+            "volumen_promedio": self.volumen.valor,
+            "desviacion_cierre": self.desviacion.valor,
+        }
+
+
+class IndicadoresVentana(IndicadorIncremental):
+    """
+    Indicadores de IndicadoresIncrementales sobre las últimas `ventana` barras
+
+    Las EMAs, el RSI/ATR de Wilder y la desviación del cierre dependen de la
+    barra donde empieza la serie; TechnicalAnalyzer.analizar_indicadores los
+    calcula sobre las últimas BARRAS_ANALISIS barras. Para dar los mismos
+    valores se guarda esa ventana y valores() la recorre entera: no es una
+    actualización en streaming, sino O(ventana) por cálculo, fijo respecto a
+    la longitud de la historia. IndicadoresPersistentes lo llama una vez por
+    actualización con barras nuevas y guarda el resultado en el estado.
+    """
+
+    def __init__(self, ventana: int = BARRAS_ANALISIS):
+        self.barras = deque(maxlen=ventana)
+
+    def actualizar(self, high: float, low: float, close: float, volume: float = NAN) -> None:
+        """Incorpora una barra (las barras sin cierre válido se ignoran)"""
+        if _finito(close):
+            self.barras.append([high, low, close, volume])
+
+    def valores(self) -> Dict[str, float]:
+        indicadores = IndicadoresIncrementales()
+        for barra in self.barras:
+            indicadores.actualizar(*barra)
+        return {**indicadores.valores(), "num_barras": len(self.barras)}
+
+
+class IndicadoresPersistentes:
+    """
+    Indicadores incrementales por ticker persistidos junto al OHLCVStore
+
+    Cada actualización lee del almacén solo las barras posteriores a la
+    última procesada; sin barras nuevas devuelve los valores guardados sin
+    recalcular. Con `ventana` (default) el recálculo es sobre la ventana
+    fija (ver IndicadoresVentana); con ventana=None es O(1) por barra. Las dos últimas barras se guardan como control: si el
+    almacén revisa la última (barra diaria aún abierta) se reaplica desde el
+    estado anterior; si cambia la penúltima (históricos reajustados por
+    splits/dividendos) se reconstruye desde cero.
+    """
+
+    def __init__(self, almacen, nombre: str = "indicadores", ventana: Optional[int] = BARRAS_ANALISIS):
+        """
+        Args:
+            almacen: OHLCVStore donde viven las series y su estado
+            nombre: Nombre del archivo de estado (<TICKER>.<nombre>.json)
+            ventana: Barras de la ventana de análisis, paridad con
+                     analizar_indicadores (None = streaming O(1) sobre toda la historia)
+        """
+        self.logger = logging.getLogger("IndicadoresPersistentes")
+        self.almacen = almacen
+        self.nombre = nombre
+        self.ventana = ventana
+        self.stats = {"barras_procesadas": 0, "reconstrucciones": 0, "revisiones": 0}
+
+    @staticmethod
+    def _control(df: pd.DataFrame) -> List[List[float]]:
+        """Fecha (ns UTC) y HLCV de cada barra de df"""
+        return [
+            [float(fecha.value)] + [float(fila.get(c, NAN)) for c in ("High", "Low", "Close", "Volume")]
+            for fecha, fila in df.iterrows()
+        ]
+
+    @staticmethod
+    def _mismo_control(a: List[float], b: List[float]) -> bool:
+        return all(x == y or (math.isnan(x) and math.isnan(y)) for x, y in zip(a, b))
+
+    @staticmethod
+    def _aplicar(indicadores: IndicadorIncremental, df: pd.DataFrame) -> None:
+        for fila in df.itertuples(index=False):
+            fila = fila._asdict()
+            indicadores.actualizar(fila.get("High", NAN), fila.get("Low", NAN),
+                                   fila.get("Close", NAN), fila.get("Volume", NAN))
+
+    def _procesar(
+        self,
+        indicadores: IndicadorIncremental,
+        nuevas: pd.DataFrame,
+        contexto: pd.DataFrame
+    ) -> Dict[str, Any]:
+        """Aplica las barras nuevas y devuelve el estado a persistir"""
+        self._aplicar(indicadores, nuevas.iloc[:-1])
+        anterior = indicadores.a_dict()
+        self._aplicar(indicadores, nuevas.iloc[-1:])
+        self.stats["barras_procesadas"] += len(nuevas)
+        return {
+            "version": VERSION_ESTADO,
+            "ventana": self.ventana,
+            "indicadores": indicadores.a_dict(),
+            "anterior": anterior,
+            "valores": indicadores.valores(),
+            "control": self._control(contexto.iloc[-2:]),
+        }
+
+    def _reconstruir(self, ticker: str, intervalo: str) -> Optional[Dict[str, Any]]:
+        df = self.almacen.leer(ticker, intervalo)
+        if df.empty:
+            return None
+        self.stats["reconstrucciones"] += 1
+        if self.ventana:
+            return self._procesar(IndicadoresVentana(self.ventana), df.iloc[-self.ventana:], df)
+        return self._procesar(IndicadoresIncrementales(), df, df)
+
+    def actualizar(self, ticker: str, intervalo: str = "1d") -> Optional[Dict[str, float]]:
+        """
+        Pone al día los indicadores de un ticker con las barras nuevas del almacén
+
+        Returns:
+            valores() de los indicadores o None si el almacén no tiene la serie
+        """
+        ticker = ticker.upper()
+        estado = self.almacen.leer_estado(ticker, intervalo, self.nombre)
+        if not estado or estado.get("version") != VERSION_ESTADO or estado.get("ventana") != self.ventana:
+            nuevo = self._reconstruir(ticker, intervalo)
+        else:
+            nuevo = self._incremental(ticker, intervalo, estado)
+
+        if nuevo is None:
+            return None
+        if nuevo is not estado:
+            self.almacen.guardar_estado(ticker, nuevo, intervalo, self.nombre)
+        return nuevo["valores"]
+
+    def _incremental(self, ticker: str, intervalo: str, estado: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        control = estado["control"]
+        df = self.almacen.leer(ticker, intervalo, desde=pd.Timestamp(int(control[0][0]), tz="UTC"))
+        actual = self._control(df.iloc[:len(control)])
+        if len(actual) < len(control) or any(a[0] != c[0] for a, c in zip(actual, control)):
+            # Las barras de control ya no existen: historia reescrita
+            return self._reconstruir(ticker, intervalo)
+        if len(control) == 2 and not self._mismo_control(control[0], actual[0]):
+            return self._reconstruir(ticker, intervalo)
+
+        if self._mismo_control(control[-1], actual[-1]):
+            nuevas = df.iloc[len(control):]
+            if nuevas.empty:
+                return estado
+            indicadores = IndicadorIncremental.desde_dict(estado["indicadores"])
+        else:
+            # Barra abierta revisada: se descarta y se vuelve a aplicar
+            self.stats["revisiones"] += 1
+            nuevas = df.iloc[len(control) - 1:]
+            indicadores = IndicadorIncremental.desde_dict(estado["anterior"])
+        return self._procesar(indicadores, nuevas, df)
+
+    def actualizar_lista(self, tickers: Iterable[str], intervalo: str = "1d") -> Dict[str, Dict[str, float]]:
+        """Actualiza varios tickers; omite los que no están en el almacén"""
+        resultados = {}
+        for ticker in tickers:
+            try:
+                valores = self.actualizar(ticker, intervalo)
+            except Exception as e:
+                self.logger.warning(f"⚠️  Indicadores incrementales de {ticker} fallaron: {str(e)}")
+                continue
+            if valores is not None:
+                resultados[ticker.upper()] = valores
+        return resultados
+
+    def refrescar(
+        self,
+        tickers: List[str],
+        market_data=None,
+        periodo: str = "1y",
+        intervalo: str = "1d"
+    ) -> Dict[str, Dict[str, float]]:
+        """
+        Descarga las barras nuevas (si se pasa un MarketDataManager) y
+        actualiza los indicadores de toda la watchlist
+        """
+        if market_data is not None:
+            market_data.obtener_historicos_batch(tickers, periodo=periodo, intervalo=intervalo)
+        return self.actualizar_lista(tickers, intervalo)
+
+    def get_stats(self) -> Dict[str, Any]:
+        return dict(self.stats)
@@ -0,0 +1,213 @@
+"""
+analisis/systemic_correlation.py
+Detector de correlación sistémica en ventanas móviles
+Para cada ventana de un panel de retornos calcula:
+- Correlación promedio entre pares
+- Cuota del primer autovalor de la matriz de correlación (peso del factor común)
+La covarianza de la ventana se actualiza de forma incremental (entra una barra,
+sale la más antigua) y el primer autovalor se obtiene por iteración de
+potencias partiendo del autovector de la ventana anterior. Emite eventos cuando
+el régimen de correlación cambia de forma sostenida.
+"""
+
+import logging
+from collections import deque
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+
+REGIMENES = ("bajo", "medio", "alto")
+
+
+@dataclass
+class EventoRegimen:
+    """Cambio confirmado de régimen de correlación"""
+    fecha: str
+    desde: str
+    hacia: str
+    correlacion_promedio: float
+    cuota_primer_autovalor: float
+
+
+class DetectorContagio:
+    """
+    Correlación promedio y cuota del primer autovalor en ventanas móviles
+
+    Ejemplo:
+        detector = DetectorContagio(n_activos=len(tickers), ventana=60)
+        for fecha, fila in retornos.iterrows():
+            metricas = detector.actualizar(fila.values, fecha)
+        detector.eventos
+    """
+
+    def __init__(
+        self,
+        n_activos: int,
+        ventana: int = 60,
+        umbrales: Sequence[float] = (0.3, 0.6),
+        confirmacion: int = 3,
+        histeresis: float = 0.05,
+        tolerancia: float = 1e-7,
+        max_iteraciones: int = 100
+    ):
+        """
+        Args:
+            n_activos: Columnas del panel de retornos
+            ventana: Barras por ventana
+            umbrales: Cortes de correlación promedio entre regímenes bajo/medio/alto
+            confirmacion: Ventanas seguidas en el nuevo régimen para emitir el evento
+            histeresis: Margen a cruzar más allá del umbral para cambiar de régimen
+            tolerancia: Convergencia relativa del autovalor
+            max_iteraciones: Tope de la iteración de potencias por ventana
+        """
+        self.logger = logging.getLogger("DetectorContagio")
+        self.n_activos = n_activos
+        self.ventana = ventana
+        self.umbrales = tuple(umbrales)
+        self.confirmacion = confirmacion
+        self.histeresis = histeresis
+        self.tolerancia = tolerancia
+        self.max_iteraciones = max_iteraciones
+
+        self._filas: deque = deque()
+        self._suma = np.zeros(n_activos)
+        self._productos = np.zeros((n_activos, n_activos))
+        self._autovector = np.full(n_activos, 1 / np.sqrt(max(n_activos, 1)))
+        self._actualizaciones = 0
+
+        self.regimen: Optional[str] = None
+        self._candidato: Optional[str] = None
+        self._seguidas = 0
+        self.eventos: List[EventoRegimen] = []
+
+    def _clasificar(self, correlacion: float) -> str:
+        # Los umbrales se alejan del régimen actual: subir exige superar
+        # umbral + histeresis y bajar quedar por debajo de umbral - histeresis
+        actual = REGIMENES.index(self.regimen) if self.regimen else None
+        nivel = 0
+        for k, umbral in enumerate(self.umbrales):
+            if actual is not None:
+                umbral = umbral + self.histeresis if actual <= k else umbral - self.histeresis
+            nivel += correlacion >= umbral
+        return REGIMENES[nivel]
+
+    def _recalcular(self) -> None:
+        """Sumas exactas de la ventana (acota el error de las restas)"""
+        filas = np.asarray(self._filas)
+        self._suma = filas.sum(axis=0)
+        self._productos = filas.T @ filas
+        self._actualizaciones = 0
+
+    def actualizar(self, retornos: np.ndarray, fecha: Any = None) -> Optional[Dict[str, float]]:
+        """
+        Incorpora la barra siguiente (NaN = sin cotización, cuenta como 0)
+
+        Returns:
+            Métricas de la ventana que termina en esta barra (None si aún
+            no hay `ventana` barras)
+        """
+        fila = np.nan_to_num(np.asarray(retornos, dtype=np.float64), nan=0.0)
+        self._filas.append(fila)
+        self._suma += fila
+        self._productos += np.outer(fila, fila)
+        if len(self._filas) > self.ventana:
+            saliente = self._filas.popleft()
+            self._suma -= saliente
+            self._productos -= np.outer(saliente, saliente)
+            self._actualizaciones += 1
+            if self._actualizaciones >= self.ventana:
+                self._recalcular()
+        if len(self._filas) < self.ventana:
+            return None
+
+        metricas = self._metricas()
+        self._registrar_regimen(metricas, fecha)
+        return metricas
+
+    def _metricas(self) -> Dict[str, float]:
+        w = self.ventana
+        suma, productos = self._suma, self._productos
+        varianzas = (np.diag(productos) - suma * suma / w) / (w - 1)
+        validas = varianzas > 1e-18
+        inversa = np.where(validas, 1 / np.sqrt(np.where(validas, varianzas, 1.0)), 0.0)
+        m = int(validas.sum())
+        if m < 2:
+            return {"correlacion_promedio": float("nan"), "cuota_primer_autovalor": float("nan"), "activos": m}
+
+        def correlacion_por(v):
+            # C·v sin formar C: D^-1/2 (S - s·sᵀ/w) D^-1/2 v / (w - 1)
+            u = inversa * v
+            return inversa * (productos @ u - suma * (suma @ u) / w) / (w - 1)
+
+        # Suma de todos los elementos de C (las columnas sin varianza aportan 0)
+        unos = np.ones(self.n_activos)
+        promedio = (float(unos @ correlacion_por(unos)) - m) / (m * (m - 1))
+
+        v = np.where(validas, self._autovector, 0.0)
+        v /= np.linalg.norm(v) or 1.0
+        autovalor = 0.0
+        for _ in range(self.max_iteraciones):
+            u = correlacion_por(v)
+            nuevo = float(np.linalg.norm(u))
+            if nuevo == 0:
+                break
+            v = u / nuevo
+            if abs(nuevo - autovalor) <= self.tolerancia * nuevo:
+                autovalor = nuevo
+                break
+            autovalor = nuevo
+        self._autovector = v
+
+        return {
+            "correlacion_promedio": float(promedio),
+            "cuota_primer_autovalor": autovalor / m,
+            "activos": m,
+        }
+
+    def _registrar_regimen(self, metricas: Dict[str, float], fecha: Any) -> None:
+        if not np.isfinite(metricas["correlacion_promedio"]):
+            return
+        regimen = self._clasificar(metricas["correlacion_promedio"])
+        if self.regimen is None:
+            self.regimen = regimen
+            return
+        if regimen == self.regimen:
+            self._candidato, self._seguidas = None, 0
+            return
+        if regimen != self._candidato:
+            self._candidato, self._seguidas = regimen, 0
+        self._seguidas += 1
+        if self._seguidas >= self.confirmacion:
+            evento = EventoRegimen(
+                fecha=pd.Timestamp(fecha).strftime("%Y-%m-%d") if fecha is not None else "",
+                desde=self.regimen,
+                hacia=regimen,
+                correlacion_promedio=round(metricas["correlacion_promedio"], 4),
+                cuota_primer_autovalor=round(metricas["cuota_primer_autovalor"], 4),
+            )
+            self.eventos.append(evento)
+            self.logger.info(f"🚨 Régimen de correlación {evento.desde} → {evento.hacia} ({evento.fecha})")
+            self.regimen, self._candidato, self._seguidas = regimen, None, 0
+
+    def analizar(self, retornos: pd.DataFrame) -> pd.DataFrame:
+        """
+        Recorre un panel de retornos (fechas x tickers) barra a barra
+
+        Returns:
+            DataFrame por fecha con correlacion_promedio, cuota_primer_autovalor
+            y regimen (desde la primera ventana completa)
+        """
+        filas = []
+        for fecha, fila in zip(retornos.index, retornos.to_numpy(dtype=np.float64)):
+            metricas = self.actualizar(fila, fecha)
+            if metricas is not None:
+                filas.append({"fecha": fecha, **metricas, "regimen": self.regimen})
+        if not filas:
+            return pd.DataFrame(columns=["correlacion_promedio", "cuota_primer_autovalor", "activos", "regimen"])
+        return pd.DataFrame(filas).set_index("fecha")
+
+    def eventos_dict(self) -> List[Dict[str, Any]]:
+        return [asdict(evento) for evento in self.eventos]
@@ -20,6 +20,7 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 from data_sources import MarketDataManager
 from cerebro import AnalysisMethodology
 from ia.ml_predictions import MLPredictor
+from ia.training_jobs import GestorEntrenamiento
 from config import settings
 
 # Configurar logging
@@ -37,6 +38,7 @@ CORS(app)
 market_data = MarketDataManager()
 analysis_methodology = AnalysisMethodology()
 ml_predictor = MLPredictor()
+gestor_entrenamiento = GestorEntrenamiento(ml_predictor)
 
 # Almacenamiento temporal de análisis
 analysis_cache = {}
@@ -94,16 +96,8 @@ def analyze():
             # Obtener indicadores actuales
             current_indicators = resultado.get("indicadores_tecnicos", {})
             
-            # Predicciones
-            price_pred = ml_predictor.predict_price_direction(ticker, current_indicators)
-            vol_pred = ml_predictor.predict_volatility(ticker, current_indicators)
-            conf_pred = ml_predictor.predict_confidence(ticker, current_indicators)
-            
-            resultado["ml_predictions"] = {
-                "precio": price_pred,
-                "volatilidad": vol_pred,
-                "confianza": conf_pred
-            }
+            # Predicciones (una sola normalización para los tres modelos)
+            resultado["ml_predictions"] = ml_predictor.predict_many({ticker: current_indicators})[ticker]
         
         # Guardar en caché
         _add_to_cache(ticker, resultado)
@@ -142,26 +136,34 @@ def analyze_batch():
             return jsonify({"error": "Falta lista de tickers"}), 400
         
         logger.info(f"📊 Analizando batch de {len(tickers)} tickers...")
-        
+
+        # Precarga agrupada del histórico (1y): queda en el caché compartido de
+        # MarketDataManager y cada analizar_ticker() lo reutiliza sin descargar
+        market_data.obtener_historicos_batch([t.upper() for t in tickers], periodo="1y")
+
         resultados = {}
+        analizados = []
         for ticker in tickers:
             try:
-                resultado = analysis_methodology.analizar_ticker(ticker.upper())
-                
-                if include_ml and "error" not in resultado:
-                    current_indicators = resultado.get("indicadores_tecnicos", {})
-                    price_pred = ml_predictor.predict_price_direction(ticker, current_indicators)
-                    resultado["ml_predictions"] = {
-                        "precio": price_pred
-                    }
-                
-                resultados[ticker.upper()] = resultado
-                _add_to_cache(ticker.upper(), resultado)
-                
+                resultados[ticker.upper()] = analysis_methodology.analizar_ticker(ticker.upper())
+                analizados.append(ticker.upper())
             except Exception as e:
                 logger.error(f"Error analizando {ticker}: {str(e)}")
                 resultados[ticker.upper()] = {"error": str(e)}
         
+        # Predicciones ML del lote: una matriz de features y un predict_proba
+        if include_ml:
+            indicadores = {
+                ticker: resultado.get("indicadores_tecnicos", {})
+                for ticker, resultado in resultados.items() if "error" not in resultado
+            }
+            predicciones = ml_predictor.predict_many(indicadores, ("precio",))
+            for ticker, prediccion in predicciones.items():
+                resultados[ticker]["ml_predictions"] = prediccion
+        
+        for ticker in analizados:
+            _add_to_cache(ticker, resultados[ticker])
+        
         return jsonify({
             "status": "✅ Batch completado",
             "tickers_procesados": len(resultados),
@@ -226,41 +228,65 @@ def get_status():
 
 @app.route('/api/train-ml', methods=['POST'])
 def train_ml():
-    """Entrena los modelos de ML con datos históricos"""
+    """
+    Encola un entrenamiento de los modelos de ML (se ejecuta en otro proceso)
+    POST /api/train-ml
+    {
+        "tickers": ["AAPL", "MSFT"],
+        "periodo": "1y",
+        "incremental": true,       # solo barras nuevas sobre la versión activa
+        "ventana_barras": 252      # opcional
+    }
+    """
     try:
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         tickers = data.get('tickers', ['AAPL', 'MSFT', 'GOOGL', 'TSLA'])
+        periodo = data.get('periodo', '1y')
+        incremental = bool(data.get('incremental', False))
+        ventana_barras = data.get('ventana_barras')
         
-        logger.info(f"🤖 Entrenando modelos ML con {len(tickers)} tickers...")
-        
-        # Descargar datos históricos
-        historical_data = {}
-        for ticker in tickers:
-            try:
-                logger.info(f"  📥 Descargando datos para {ticker}...")
-                df = market_data.obtener_datos_historicos(ticker, dias=252)  # 1 año
-                if df is not None and len(df) > 0:
-                    historical_data[ticker] = df
-            except Exception as e:
-                logger.warning(f"  ⚠️  Error descargando {ticker}: {str(e)}")
-        
-        if not historical_data:
-            return jsonify({"error": "No se pudieron descargar datos históricos"}), 400
+        if not tickers:
+            return jsonify({"error": "Se requiere al menos un ticker"}), 400
+        if ventana_barras is not None and (not isinstance(ventana_barras, int) or ventana_barras <= 0):
+            return jsonify({"error": "ventana_barras debe ser un entero positivo"}), 400
         
-        # Entrenar modelos
-        resultado_entrenamiento = ml_predictor.train_models(historical_data)
+        trabajo = gestor_entrenamiento.enviar(tickers, periodo, incremental=incremental,
+                                              ventana_barras=ventana_barras)
+        logger.info(
+            f"🤖 Entrenamiento ML {trabajo.id} ({'incremental' if incremental else 'completo'}) "
+            f"encolado con {len(trabajo.tickers)} tickers"
+        )
         
         return jsonify({
-            "status": "✅ Entrenamiento completado",
+            "status": "⏳ Entrenamiento encolado",
             "timestamp": datetime.now().isoformat(),
-            "resultado": resultado_entrenamiento
-        }), 200
+            "trabajo": trabajo.a_dict(),
+            "estado_url": f"/api/train-ml/{trabajo.id}"
+        }), 202
         
     except Exception as e:
-        logger.error(f"Error entrenando modelos: {str(e)}")
+        logger.error(f"Error encolando entrenamiento: {str(e)}")
         return jsonify({"error": str(e)}), 500
 
 
+@app.route('/api/train-ml/<trabajo_id>', methods=['GET'])
+def train_ml_status(trabajo_id: str):
+    """Progreso y métricas de un entrenamiento"""
+    trabajo = gestor_entrenamiento.obtener(trabajo_id)
+    if trabajo is None:
+        return jsonify({"error": f"Entrenamiento {trabajo_id} no encontrado"}), 404
+    return jsonify(_make_serializable(trabajo.a_dict())), 200
+
+
+@app.route('/api/train-ml', methods=['GET'])
+def train_ml_list():
+    """Entrenamientos recientes (más nuevo primero)"""
+    return jsonify({
+        "timestamp": datetime.now().isoformat(),
+        "trabajos": _make_serializable(gestor_entrenamiento.listar())
+    }), 200
+
+
 @app.route('/api/compare', methods=['POST'])
 def compare_tickers():
     """
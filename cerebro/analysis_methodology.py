@@ -7,19 +7,27 @@ PILAR FUNDAMENTAL: Análisis unificado basado en:
 """
 
 import logging
-from typing import Dict, Any, Optional, Tuple
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
 import pandas as pd
 import ta  # Technical Analysis library con todas las fórmulas
 
 from data_sources.market_data import MarketDataManager
+from analisis.indicator_engine import BARRAS_ANALISIS, construir_panel, indicadores_tecnicos
+from analisis.streaming_indicators import IndicadoresPersistentes
 
 
 class TechnicalAnalyzer:
     """Calcula indicadores técnicos basado en Doc 3 (fórmulas ProRealTime)"""
     
-    def __init__(self):
+    def __init__(self, indicadores_persistentes: Optional[IndicadoresPersistentes] = None):
+        """
+        Args:
+            indicadores_persistentes: Estado incremental junto al OHLCVStore
+                (si se pasa, analizar_indicadores_ticker solo procesa barras nuevas)
+        """
         self.logger = logging.getLogger("TechnicalAnalyzer")
+        self.indicadores_persistentes = indicadores_persistentes
     
     def calcular_rsi(self, precios: pd.Series, periodo: int = 14) -> pd.Series:
         """
@@ -83,109 +91,168 @@ class TechnicalAnalyzer:
         Returns:
             Dict con todos los indicadores calculados y señales
         """
-        if df.empty or len(df) < 30:
-            return {"error": "Datos insuficientes para análisis técnico"}
+        return self.analizar_indicadores_lote({"_": df})["_"]
+    
+    def analizar_indicadores_lote(self, historicos: Dict[str, pd.DataFrame]) -> Dict[str, Dict[str, Any]]:
+        """
+        Análisis técnico de varios tickers con el motor vectorizado
+        (una pasada numpy para todo el lote, mismas fórmulas que `ta`)
         
-        # Obtener últimas barras (mínimo 30 para todos los cálculos)
-        df = df.iloc[-60:]  # Últimos 60 días
+        Args:
+            historicos: {ticker: DataFrame OHLCV}
+        
+        Returns:
+            {ticker: dict de analizar_indicadores}
+        """
+        resultados = {}
+        validos = {}
+        for ticker, df in historicos.items():
+            if df is None or df.empty or len(df) < 30:
+                resultados[ticker] = {"error": "Datos insuficientes para análisis técnico"}
+            else:
+                validos[ticker] = df
+        
+        if not validos:
+            return resultados
+        
+        try:
+            # Últimos 60 días (mínimo 30 para todos los cálculos)
+            calculados = indicadores_tecnicos(construir_panel(validos, max_barras=BARRAS_ANALISIS))
+        except Exception as e:
+            self.logger.error(f"Error en análisis técnico: {str(e)}")
+            return {**resultados, **{t: {"error": str(e)} for t in validos}}
+        
+        for ticker, df in validos.items():
+            try:
+                resultados[ticker] = self._formatear_indicadores(
+                    calculados.para(ticker), min(len(df), BARRAS_ANALISIS)
+                )
+            except Exception as e:
+                self.logger.error(f"Error en análisis técnico: {str(e)}")
+                resultados[ticker] = {"error": str(e)}
+        return resultados
+    
+    def analizar_indicadores_almacen(self, tickers: List[str], intervalo: str = "1d") -> Dict[str, Dict[str, Any]]:
+        """
+        Análisis técnico desde el estado incremental guardado en el OHLCVStore
+        (solo lee y procesa las barras posteriores a la última actualización)
+        
+        Returns:
+            {ticker: dict de analizar_indicadores}; omite los tickers que no
+            están en el almacén o no tienen 30 barras
+        """
+        if self.indicadores_persistentes is None:
+            return {}
+        resultados = {}
+        for ticker, valores in self.indicadores_persistentes.actualizar_lista(tickers, intervalo).items():
+            if valores.get("num_barras", 0) >= 30:
+                resultados[ticker] = self._formatear_indicadores(valores, int(valores["num_barras"]))
+        return resultados
+    
+    def analizar_indicadores_ticker(self, ticker: str, df: pd.DataFrame) -> Dict[str, Any]:
+        """
+        analizar_indicadores(df) servido desde el estado incremental cuando el
+        almacén tiene la misma serie (mismo último cierre); si no, se calcula sobre df
+        """
+        if df is not None and not df.empty:
+            almacenado = self.analizar_indicadores_almacen([ticker]).get(ticker.upper())
+            cierre = df["Close"].iloc[-1]
+            if isinstance(cierre, pd.Series):
+                cierre = cierre.iloc[0]
+            if almacenado and almacenado["precio_actual"] == float(cierre):
+                return almacenado
+        return self.analizar_indicadores(df)
+    
+    @staticmethod
+    def _formatear_indicadores(v: Dict[str, float], num_barras: int) -> Dict[str, Any]:
+        """Convierte los valores del motor en el dict de indicadores y señales"""
+        precio = v["precio_actual"]
         
         resultado = {
             "timestamp": datetime.now().isoformat(),
-            "num_barras": len(df),
-            "precio_actual": df["Close"].iloc[-1],
+            "num_barras": num_barras,
+            "precio_actual": precio,
             "indicadores": {},
             "señales": {}
         }
         
-        try:
-            # RSI (14)
-            rsi = self.calcular_rsi(df["Close"], periodo=14)
-            rsi_actual = rsi.iloc[-1]
-            resultado["indicadores"]["RSI"] = {
-                "valor": round(rsi_actual, 2),
-                "nivel": "SOBRECOMPRA" if rsi_actual > 70 else "SOBREVENTA" if rsi_actual < 30 else "NEUTRAL",
-                "señal": "COMPRA" if rsi_actual < 30 else "VENTA" if rsi_actual > 70 else "ESPERA"
-            }
-            
-            # MACD
-            macd_diff, macd_signal, macd_hist = self.calcular_macd(df["Close"])
-            macd_diff_actual = macd_diff.iloc[-1]
-            macd_signal_actual = macd_signal.iloc[-1]
-            macd_hist_actual = macd_hist.iloc[-1]
-            resultado["indicadores"]["MACD"] = {
-                "linea_macd": round(macd_diff_actual, 4),
-                "linea_senal": round(macd_signal_actual, 4),
-                "histograma": round(macd_hist_actual, 4),
-                "señal": "COMPRA" if macd_hist_actual > 0 and macd_diff_actual > macd_signal_actual else "VENTA" if macd_hist_actual < 0 else "ESPERA"
-            }
-            
-            # Stochastic
-            k_line, d_line = self.calcular_stochastic(df["High"], df["Low"], df["Close"])
-            k_actual = k_line.iloc[-1]
-            d_actual = d_line.iloc[-1]
-            resultado["indicadores"]["STOCHASTIC"] = {
-                "linea_k": round(k_actual, 2),
-                "linea_d": round(d_actual, 2),
-                "nivel": "SOBRECOMPRA" if k_actual > 80 else "SOBREVENTA" if k_actual < 20 else "NEUTRAL",
-                "señal": "COMPRA" if k_actual < 20 else "VENTA" if k_actual > 80 else "ESPERA"
-            }
-            
-            # SMAs
-            sma20 = self.calcular_sma(df["Close"], 20).iloc[-1]
-            sma50 = self.calcular_sma(df["Close"], 50).iloc[-1]
-            sma200 = self.calcular_sma(df["Close"], 200).iloc[-1]
-            resultado["indicadores"]["MEDIAS_MOVILES"] = {
-                "SMA_20": round(sma20, 2),
-                "SMA_50": round(sma50, 2),
-                "SMA_200": round(sma200, 2),
-                "tendencia_corto": "ALCISTA" if df["Close"].iloc[-1] > sma20 else "BAJISTA",
-                "tendencia_medio": "ALCISTA" if df["Close"].iloc[-1] > sma50 else "BAJISTA",
-                "tendencia_largo": "ALCISTA" if df["Close"].iloc[-1] > sma200 else "BAJISTA"
-            }
-            
-            # EMA
-            ema9 = self.calcular_ema(df["Close"], 9).iloc[-1]
-            ema21 = self.calcular_ema(df["Close"], 21).iloc[-1]
-            resultado["indicadores"]["EMA"] = {
-                "EMA_9": round(ema9, 2),
-                "EMA_21": round(ema21, 2),
-                "señal": "COMPRA" if ema9 > ema21 else "VENTA" if ema9 < ema21 else "ESPERA"
-            }
-            
-            # Bollinger Bands
-            bb_upper, bb_mid, bb_lower = self.calcular_bollinger_bands(df["Close"], 20)
-            bb_upper_actual = bb_upper.iloc[-1]
-            bb_mid_actual = bb_mid.iloc[-1]
-            bb_lower_actual = bb_lower.iloc[-1]
-            resultado["indicadores"]["BOLLINGER_BANDS"] = {
-                "banda_superior": round(bb_upper_actual, 2),
-                "banda_media": round(bb_mid_actual, 2),
-                "banda_inferior": round(bb_lower_actual, 2),
-                "posicion": "SOBRECOMPRA" if df["Close"].iloc[-1] > bb_upper_actual else "SOBREVENTA" if df["Close"].iloc[-1] < bb_lower_actual else "NEUTRAL"
-            }
-            
-            # ATR (Volatilidad)
-            atr = self.calcular_atr(df["High"], df["Low"], df["Close"], 14).iloc[-1]
-            resultado["indicadores"]["ATR"] = {
-                "valor": round(atr, 2),
-                "volatilidad": "ALTA" if atr > df["Close"].std() else "MEDIA" if atr > df["Close"].std() * 0.5 else "BAJA"
-            }
-            
-            # Volumen
-            vol_avg = self.calcular_volumen_sma(df["Volume"], 20).iloc[-1]
-            vol_actual = df["Volume"].iloc[-1]
-            resultado["indicadores"]["VOLUMEN"] = {
-                "volumen_actual": int(vol_actual),
-                "volumen_promedio": int(vol_avg),
-                "relacion": round(vol_actual / vol_avg, 2),
-                "señal": "FUERTE" if vol_actual > vol_avg * 1.2 else "DEBIL" if vol_actual < vol_avg * 0.8 else "NORMAL"
-            }
-            
-            return resultado
-            
-        except Exception as e:
-            self.logger.error(f"Error en análisis técnico: {str(e)}")
-            return {"error": str(e)}
+        # RSI (14)
+        rsi_actual = v["rsi"]
+        resultado["indicadores"]["RSI"] = {
+            "valor": round(rsi_actual, 2),
+            "nivel": "SOBRECOMPRA" if rsi_actual > 70 else "SOBREVENTA" if rsi_actual < 30 else "NEUTRAL",
+            "señal": "COMPRA" if rsi_actual < 30 else "VENTA" if rsi_actual > 70 else "ESPERA"
+        }
+        
+        # MACD
+        macd_diff_actual = v["macd"]
+        macd_signal_actual = v["macd_senal"]
+        macd_hist_actual = v["macd_hist"]
+        resultado["indicadores"]["MACD"] = {
+            "linea_macd": round(macd_diff_actual, 4),
+            "linea_senal": round(macd_signal_actual, 4),
+            "histograma": round(macd_hist_actual, 4),
+            "señal": "COMPRA" if macd_hist_actual > 0 and macd_diff_actual > macd_signal_actual else "VENTA" if macd_hist_actual < 0 else "ESPERA"
+        }
+        
+        # Stochastic
+        k_actual = v["stoch_k"]
+        d_actual = v["stoch_d"]
+        resultado["indicadores"]["STOCHASTIC"] = {
+            "linea_k": round(k_actual, 2),
+            "linea_d": round(d_actual, 2),
+            "nivel": "SOBRECOMPRA" if k_actual > 80 else "SOBREVENTA" if k_actual < 20 else "NEUTRAL",
+            "señal": "COMPRA" if k_actual < 20 else "VENTA" if k_actual > 80 else "ESPERA"
+        }
+        
+        # SMAs
+        sma20, sma50, sma200 = v["sma_20"], v["sma_50"], v["sma_200"]
+        resultado["indicadores"]["MEDIAS_MOVILES"] = {
+            "SMA_20": round(sma20, 2),
+            "SMA_50": round(sma50, 2),
+            "SMA_200": round(sma200, 2),
+            "tendencia_corto": "ALCISTA" if precio > sma20 else "BAJISTA",
+            "tendencia_medio": "ALCISTA" if precio > sma50 else "BAJISTA",
+            "tendencia_largo": "ALCISTA" if precio > sma200 else "BAJISTA"
+        }
+        
+        # EMA
+        ema9, ema21 = v["ema_9"], v["ema_21"]
+        resultado["indicadores"]["EMA"] = {
+            "EMA_9": round(ema9, 2),
+            "EMA_21": round(ema21, 2),
+            "señal": "COMPRA" if ema9 > ema21 else "VENTA" if ema9 < ema21 else "ESPERA"
+        }
+        
+        # Bollinger Bands
+        bb_upper_actual = v["bb_superior"]
+        bb_lower_actual = v["bb_inferior"]
+        resultado["indicadores"]["BOLLINGER_BANDS"] = {
+            "banda_superior": round(bb_upper_actual, 2),
+            "banda_media": round(v["bb_media"], 2),
+            "banda_inferior": round(bb_lower_actual, 2),
+            "posicion": "SOBRECOMPRA" if precio > bb_upper_actual else "SOBREVENTA" if precio < bb_lower_actual else "NEUTRAL"
+        }
+        
+        # ATR (Volatilidad)
+        atr = v["atr"]
+        desviacion = v["desviacion_cierre"]
+        resultado["indicadores"]["ATR"] = {
+            "valor": round(atr, 2),
+            "volatilidad": "ALTA" if atr > desviacion else "MEDIA" if atr > desviacion * 0.5 else "BAJA"
+        }
+        
+        # Volumen
+        vol_avg = v["volumen_promedio"]
+        vol_actual = v["volumen_actual"]
+        resultado["indicadores"]["VOLUMEN"] = {
+            "volumen_actual": int(vol_actual),
+            "volumen_promedio": int(vol_avg),
+            "relacion": round(vol_actual / vol_avg, 2),
+            "señal": "FUERTE" if vol_actual > vol_avg * 1.2 else "DEBIL" if vol_actual < vol_avg * 0.8 else "NORMAL"
+        }
+        
+        return resultado
 
 
 class AlexanderAnalyzer:
@@ -469,7 +536,10 @@ class AnalysisMethodology:
     def __init__(self):
         self.logger = logging.getLogger("AnalysisMethodology")
         self.data_manager = MarketDataManager()
-        self.technical_analyzer = TechnicalAnalyzer()
+        almacen = self.data_manager.obtener_almacen()
+        self.technical_analyzer = TechnicalAnalyzer(
+            IndicadoresPersistentes(almacen) if almacen is not None else None
+        )
         self.alexander_analyzer = AlexanderAnalyzer()
     
     def analizar_ticker(self, ticker: str) -> Dict[str, Any]:
@@ -492,9 +562,12 @@ class AnalysisMethodology:
         }
         
         try:
+            # Contexto por análisis: histórico (1y) e info se descargan una sola vez
+            contexto = self.data_manager.crear_contexto(ticker, periodo_base="1y")
+            
             # 1️⃣  Obtener datos actuales
             self.logger.info(f"📊 Obteniendo datos actuales...")
-            datos_actuales = self.data_manager.obtener_datos_actuales(ticker)
+            datos_actuales = self.data_manager.obtener_datos_actuales(ticker, contexto=contexto)
             if "error" in datos_actuales:
                 return {**resultado_final, "error": datos_actuales["error"], "status": "error"}
             
@@ -502,38 +575,38 @@ class AnalysisMethodology:
             
             # 2️⃣  Obtener datos históricos
             self.logger.info(f"📈 Obteniendo datos históricos...")
-            df_historico = self.data_manager.obtener_historico(ticker, periodo="1y")
+            df_historico = self.data_manager.obtener_historico(ticker, periodo="1y", contexto=contexto)
             if df_historico.empty:
                 return {**resultado_final, "error": "No hay datos históricos", "status": "error"}
             
             # 3️⃣  Análisis técnico (Doc 3)
             self.logger.info(f"🔧 Calculando indicadores técnicos...")
-            indicadores = self.technical_analyzer.analizar_indicadores(df_historico)
+            indicadores = self.technical_analyzer.analizar_indicadores_ticker(ticker, df_historico)
             resultado_final["tecnico"] = indicadores
             
             # 4️⃣  Obtener fundamentales
             self.logger.info(f"📋 Obteniendo datos fundamentales...")
-            fundamentales = self.data_manager.obtener_fundamentales(ticker)
+            fundamentales = self.data_manager.obtener_fundamentales(ticker, contexto=contexto)
             resultado_final["fundamentales"] = fundamentales
             
             # 5️⃣  Contexto macro
             self.logger.info(f"🌍 Obteniendo contexto macro...")
-            contexto_macro = self.data_manager.obtener_contexto_macro()
+            contexto_macro = self.data_manager.obtener_contexto_macro(contexto=contexto)
             resultado_final["contexto_macro"] = contexto_macro
             
             # 6️⃣  Tendencia
             self.logger.info(f"📉 Calculando tendencia...")
-            tendencia = self.data_manager.obtener_tendencia(ticker)
+            tendencia = self.data_manager.obtener_tendencia(ticker, contexto=contexto)
             resultado_final["tendencia"] = tendencia
             
             # 7️⃣  Soportes/Resistencias
             self.logger.info(f"🎯 Calculando soportes y resistencias...")
-            sr = self.data_manager.obtener_soportes_resistencias(ticker)
+            sr = self.data_manager.obtener_soportes_resistencias(ticker, contexto=contexto)
             resultado_final["soportes_resistencias"] = sr
             
             # 7️⃣.5️⃣  Obtener datos de Finviz
             self.logger.info(f"🦊 Obteniendo datos de Finviz...")
-            datos_finviz = self.data_manager.obtener_datos_finviz(ticker)
+            datos_finviz = self.data_manager.obtener_datos_finviz(ticker, contexto=contexto)
             resultado_final["finviz"] = datos_finviz
             
             # 8️⃣  Análisis Alexander (Doc 1-2)
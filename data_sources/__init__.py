@@ -9,6 +9,14 @@ from .macroeconomic_data import MacroeconomicDataManager
 from .fundamental_analyzer import FundamentalAnalyzer
 from .data_validator import DataValidator
 from .data_pipeline import DataPipeline, obtener_pipeline
+from .rate_limiter import RateLimiter, TokenBucket
+from .ohlcv_store import OHLCVStore
+from .data_context import ContextoDatos
+from .single_flight import SingleFlight, SingleFlightTimeout
+from .bounded_cache import BoundedTTLCache
+from .macro_snapshot import MacroSnapshotService, obtener_servicio_macro
+from .batch_history import descargar_historicos_batch
+from .feature_store import AlmacenFeatures, ConjuntoFeatures, obtener_almacen_features
 
 try:
     from .finviz_scraper import FinvizScraper
@@ -19,7 +27,20 @@ try:
         'FundamentalAnalyzer',
         'DataValidator',
         'DataPipeline',
-        'obtener_pipeline'
+        'obtener_pipeline',
+        'RateLimiter',
+        'TokenBucket',
+        'OHLCVStore',
+        'ContextoDatos',
+        'SingleFlight',
+        'SingleFlightTimeout',
+        'BoundedTTLCache',
+        'MacroSnapshotService',
+        'obtener_servicio_macro',
+        'descargar_historicos_batch',
+        'AlmacenFeatures',
+        'ConjuntoFeatures',
+        'obtener_almacen_features'
     ]
 except ImportError:
     __all__ = [
@@ -28,5 +49,18 @@ except ImportError:
         'FundamentalAnalyzer',
         'DataValidator',
         'DataPipeline',
-        'obtener_pipeline'
+        'obtener_pipeline',
+        'RateLimiter',
+        'TokenBucket',
+        'OHLCVStore',
+        'ContextoDatos',
+        'SingleFlight',
+        'SingleFlightTimeout',
+        'BoundedTTLCache',
+        'MacroSnapshotService',
+        'obtener_servicio_macro',
+        'descargar_historicos_batch',
+        'AlmacenFeatures',
+        'ConjuntoFeatures',
+        'obtener_almacen_features'
     ]
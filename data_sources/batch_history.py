@@ -0,0 +1,147 @@
+"""
+data_sources/batch_history.py
+Descarga de históricos multi-ticker en lotes
+Agrupa N tickers en llamadas yf.download(group_by="ticker") de tamaño
+configurable y devuelve un DataFrame OHLCV por ticker
+"""
+
+import logging
+from typing import Dict, List, Optional, Iterable, Any
+
+import pandas as pd
+import yfinance as yf
+
+from .rate_limiter import RateLimiter
+
+
+logger = logging.getLogger("BatchHistory")
+
+# Un lote de ~50 símbolos es el punto en que yf.download deja de mejorar:
+# lotes mayores aumentan los fallos parciales y los reintentos
+TAMANO_LOTE_DEFAULT = 50
+
+
+def dividir_lotes(tickers: Iterable[str], tamano_lote: int) -> List[List[str]]:
+    """
+    Divide la lista de tickers (sin duplicados, en orden) en lotes
+
+    Args:
+        tickers: Símbolos a descargar
+        tamano_lote: Máximo de símbolos por llamada
+
+    Returns:
+        Lista de lotes
+    """
+    unicos = list(dict.fromkeys(t.upper() for t in tickers if t))
+    tamano = max(1, int(tamano_lote))
+    return [unicos[i:i + tamano] for i in range(0, len(unicos), tamano)]
+
+
+def separar_por_ticker(datos: Optional[pd.DataFrame], simbolos: List[str]) -> Dict[str, pd.DataFrame]:
+    """
+    Separa el resultado de yf.download en un DataFrame por ticker
+
+    Acepta columnas MultiIndex (ticker, campo) o (campo, ticker) y columnas
+    planas cuando el lote tiene un único símbolo. Descarta las filas sin
+    cierre (días en que ese ticker no cotizó) y los tickers sin datos.
+
+    Args:
+        datos: Resultado de yf.download
+        simbolos: Símbolos pedidos en la llamada
+
+    Returns:
+        {ticker: DataFrame OHLCV}
+    """
+    resultado: Dict[str, pd.DataFrame] = {}
+    if datos is None or datos.empty:
+        return resultado
+
+    columnas = datos.columns
+    for simbolo in simbolos:
+        if isinstance(columnas, pd.MultiIndex):
+            if simbolo in columnas.get_level_values(0):
+                df = datos[simbolo]
+            elif simbolo in columnas.get_level_values(1):
+                df = datos.xs(simbolo, axis=1, level=1)
+            else:
+                continue
+        elif len(simbolos) == 1:
+            df = datos
+        else:
+            continue
+
+        df = df.copy()
+        df.columns.name = None
+        if "Close" not in df.columns:
+            continue
+        df = df.dropna(subset=["Close"])
+        if not df.empty:
+            resultado[simbolo] = df
+    return resultado
+
+
+def descargar_historicos_batch(
+    tickers: Iterable[str],
+    periodo: Optional[str] = "1y",
+    intervalo: str = "1d",
+    inicio: Optional[Any] = None,
+    fin: Optional[Any] = None,
+    tamano_lote: int = TAMANO_LOTE_DEFAULT,
+    rate_limiter: Optional[RateLimiter] = None
+) -> Dict[str, pd.DataFrame]:
+    """
+    Descarga históricos de muchos tickers con una llamada yf.download por lote
+
+    Si un lote falla por completo se reintenta dividido en dos mitades
+    (hasta lotes de un símbolo), de modo que un símbolo problemático no
+    invalida el resto.
+
+    Args:
+        tickers: Símbolos a descargar
+        periodo: Período de yfinance (ignorado si se indica `inicio`)
+        intervalo: Intervalo de las barras
+        inicio: Fecha inicial (date, datetime o "YYYY-MM-DD")
+        fin: Fecha final exclusiva
+        tamano_lote: Símbolos por llamada a yf.download
+        rate_limiter: Rate limiter del proveedor (un permiso por lote)
+
+    Returns:
+        {ticker: DataFrame OHLCV}; los tickers sin datos no aparecen
+    """
+    resultado: Dict[str, pd.DataFrame] = {}
+    pendientes = dividir_lotes(tickers, tamano_lote)
+    llamadas = 0
+
+    while pendientes:
+        lote = pendientes.pop(0)
+        if rate_limiter is not None:
+            rate_limiter.adquirir(f"BATCH:{lote[0]}")
+        parametros = dict(
+            interval=intervalo, group_by="ticker", actions=True, auto_adjust=True,
+            ignore_tz=False, threads=True, progress=False
+        )
+        if inicio is not None:
+            parametros.update(start=inicio, end=fin)
+        else:
+            parametros["period"] = periodo
+
+        llamadas += 1
+        try:
+            datos = yf.download(lote if len(lote) > 1 else lote[0], **parametros)
+            por_ticker = separar_por_ticker(datos, lote)
+        except Exception as e:
+            logger.warning(f"⚠️  Lote de {len(lote)} símbolos falló: {str(e)}")
+            por_ticker = {}
+
+        if not por_ticker and len(lote) > 1:
+            mitad = len(lote) // 2
+            pendientes[:0] = [lote[:mitad], lote[mitad:]]
+            continue
+        resultado.update(por_ticker)
+
+    faltantes = len(dividir_lotes(tickers, 1)) - len(resultado)
+    logger.info(
+        f"✅ Histórico batch: {len(resultado)} tickers en {llamadas} llamadas"
+        + (f" ({faltantes} sin datos)" if faltantes else "")
+    )
+    return resultado
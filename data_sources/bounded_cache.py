@@ -0,0 +1,311 @@
+"""
+data_sources/bounded_cache.py
+Caché acotado LRU + TTL con contabilidad de memoria
+- Límite de entradas y de bytes (expulsión LRU)
+- TTL distinto por tipo de entrada (cotización, fundamentales, histórico)
+- Ventana de gracia por tipo: entradas vencidas que aún pueden servirse
+  como "stale" mientras se revalidan (stale-while-revalidate)
+- Limpieza de expirados en segundo plano
+- Estadísticas de hits/misses/expulsiones
+"""
+
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Any, Hashable, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+def estimar_tamano(valor: Any, _profundidad: int = 0) -> int:
+    """
+    Estima el tamaño en bytes de un valor cacheado
+
+    Args:
+        valor: DataFrame, ndarray, dict, lista o escalar
+
+    Returns:
+        Bytes aproximados (recorre dicts/listas hasta 4 niveles)
+    """
+    if isinstance(valor, (pd.DataFrame, pd.Series)):
+        return int(valor.memory_usage(deep=True).sum()) if isinstance(valor, pd.DataFrame) \
+            else int(valor.memory_usage(deep=True))
+    if isinstance(valor, np.ndarray):
+        return int(valor.nbytes)
+    tamano = sys.getsizeof(valor)
+    if _profundidad >= 4:
+        return tamano
+    if isinstance(valor, dict):
+        for k, v in valor.items():
+            tamano += estimar_tamano(k, _profundidad + 1) + estimar_tamano(v, _profundidad + 1)
+    elif isinstance(valor, (list, tuple, set)):
+        for v in valor:
+            tamano += estimar_tamano(v, _profundidad + 1)
+    return tamano
+
+
+class _Entrada:
+    """Entrada del caché (valor + metadatos)"""
+    __slots__ = ("valor", "tipo", "creado", "expira", "tamano")
+
+    def __init__(self, valor: Any, tipo: str, ttl: float, tamano: int):
+        self.valor = valor
+        self.tipo = tipo
+        self.creado = time.time()
+        self.expira = self.creado + ttl
+        self.tamano = tamano
+
+
+class BoundedTTLCache:
+    """
+    Caché thread-safe acotado por número de entradas y por bytes
+
+    Las claves se agrupan por tipo ("cotizacion", "fundamentales",
+    "historico"), cada uno con su propio TTL. Al superar cualquiera de los
+    límites se expulsan las entradas menos usadas recientemente.
+
+    Ejemplo:
+        cache = BoundedTTLCache(max_bytes=32 * 1024 * 1024,
+                                ttl_por_tipo={"cotizacion": 60, "fundamentales": 3600})
+        cache.guardar("cotizacion", "AAPL", datos)
+        datos = cache.obtener("cotizacion", "AAPL")
+    """
+
+    def __init__(
+        self,
+        max_entradas: int = 5000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_por_tipo: Optional[Dict[str, float]] = None,
+        ttl_default: float = 60.0,
+        intervalo_limpieza: float = 30.0,
+        gracia_por_tipo: Optional[Dict[str, float]] = None
+    ):
+        """
+        Args:
+            max_entradas: Máximo de entradas simultáneas
+            max_bytes: Presupuesto de memoria (bytes estimados)
+            ttl_por_tipo: {tipo: segundos de vida}
+            ttl_default: TTL para tipos no configurados
+            intervalo_limpieza: Segundos entre barridos de expirados (0 = sin hilo de limpieza)
+            gracia_por_tipo: {tipo: segundos que una entrada vencida se conserva para servirla stale}
+        """
+        self.logger = logging.getLogger("BoundedTTLCache")
+        self.max_entradas = max_entradas
+        self.max_bytes = max_bytes
+        self.ttl_por_tipo = dict(ttl_por_tipo or {})
+        self.ttl_default = ttl_default
+        self.intervalo_limpieza = intervalo_limpieza
+        self.gracia_por_tipo = dict(gracia_por_tipo or {})
+
+        self._lock = threading.Lock()
+        self._datos: "OrderedDict[Tuple[str, Hashable], _Entrada]" = OrderedDict()
+        self._bytes = 0
+        self._hilo_limpieza: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._stats = {
+            "hits": 0,
+            "misses": 0,
+            "hits_stale": 0,
+            "expulsiones": 0,
+            "expirados": 0,
+            "rechazados_por_tamano": 0,
+        }
+        self._stats_por_tipo: Dict[str, Dict[str, int]] = {}
+
+    # ------------------------------------------------------------------
+    # Operaciones
+    # ------------------------------------------------------------------
+
+    def ttl(self, tipo: str) -> float:
+        """TTL configurado para un tipo de entrada"""
+        return self.ttl_por_tipo.get(tipo, self.ttl_default)
+
+    def gracia(self, tipo: str) -> float:
+        """Ventana de gracia (stale) configurada para un tipo de entrada"""
+        return self.gracia_por_tipo.get(tipo, 0.0)
+
+    def _contar(self, tipo: str, evento: str) -> None:
+        self._stats[evento] += 1
+        por_tipo = self._stats_por_tipo.setdefault(tipo, {"hits": 0, "misses": 0})
+        if evento in por_tipo:
+            por_tipo[evento] += 1
+
+    def _quitar(self, clave: Tuple[str, Hashable]) -> None:
+        entrada = self._datos.pop(clave, None)
+        if entrada is not None:
+            self._bytes -= entrada.tamano
+
+    def obtener(self, tipo: str, clave: Hashable) -> Optional[Any]:
+        """
+        Obtiene un valor vigente
+
+        Args:
+            tipo: Tipo de entrada ("cotizacion", "fundamentales", "historico")
+            clave: Clave dentro del tipo (ej: ticker)
+
+        Returns:
+            Valor cacheado o None si no existe o expiró
+        """
+        completa = (tipo, clave)
+        with self._lock:
+            entrada = self._datos.get(completa)
+            if entrada is None:
+                self._contar(tipo, "misses")
+                return None
+            ahora = time.time()
+            if ahora >= entrada.expira:
+                # Dentro de la ventana de gracia se conserva para obtener_con_estado()
+                if ahora >= entrada.expira + self.gracia(tipo):
+                    self._quitar(completa)
+                    self._stats["expirados"] += 1
+                self._contar(tipo, "misses")
+                return None
+            self._datos.move_to_end(completa)
+            self._contar(tipo, "hits")
+            return entrada.valor
+
+    def obtener_con_estado(self, tipo: str, clave: Hashable) -> Optional[Tuple[Any, float, float]]:
+        """
+        Obtiene un valor vigente o vencido dentro de su ventana de gracia
+
+        Args:
+            tipo: Tipo de entrada
+            clave: Clave dentro del tipo
+
+        Returns:
+            Tupla (valor, edad_segundos, vencido_hace_segundos) o None.
+            vencido_hace <= 0 indica que la entrada sigue vigente.
+        """
+        completa = (tipo, clave)
+        with self._lock:
+            entrada = self._datos.get(completa)
+            if entrada is None:
+                self._contar(tipo, "misses")
+                return None
+            ahora = time.time()
+            vencido_hace = ahora - entrada.expira
+            if vencido_hace >= self.gracia(tipo):
+                self._quitar(completa)
+                self._stats["expirados"] += 1
+                self._contar(tipo, "misses")
+                return None
+            self._datos.move_to_end(completa)
+            if vencido_hace < 0:
+                self._contar(tipo, "hits")
+            else:
+                self._stats["hits_stale"] += 1
+            return entrada.valor, ahora - entrada.creado, vencido_hace
+
+    def guardar(self, tipo: str, clave: Hashable, valor: Any, ttl: Optional[float] = None) -> bool:
+        """
+        Guarda un valor con el TTL de su tipo
+
+        Args:
+            tipo: Tipo de entrada
+            clave: Clave dentro del tipo
+            valor: Valor a cachear
+            ttl: TTL explícito (default: el del tipo)
+
+        Returns:
+            False si el valor por sí solo excede el presupuesto de memoria
+        """
+        tamano = estimar_tamano(valor)
+        if tamano > self.max_bytes:
+            with self._lock:
+                self._stats["rechazados_por_tamano"] += 1
+            return False
+
+        entrada = _Entrada(valor, tipo, self.ttl(tipo) if ttl is None else ttl, tamano)
+        completa = (tipo, clave)
+        with self._lock:
+            self._quitar(completa)
+            self._datos[completa] = entrada
+            self._bytes += tamano
+            while self._datos and (len(self._datos) > self.max_entradas or self._bytes > self.max_bytes):
+                antigua, _ = next(iter(self._datos.items()))
+                self._quitar(antigua)
+                self._stats["expulsiones"] += 1
+        self._iniciar_limpieza()
+        return True
+
+    def eliminar(self, tipo: str, clave: Hashable) -> None:
+        """Elimina una entrada"""
+        with self._lock:
+            self._quitar((tipo, clave))
+
+    def limpiar(self) -> None:
+        """Vacía el caché (conserva estadísticas)"""
+        with self._lock:
+            self._datos.clear()
+            self._bytes = 0
+
+    def purgar_expirados(self) -> int:
+        """
+        Elimina todas las entradas expiradas
+
+        Returns:
+            Número de entradas eliminadas
+        """
+        ahora = time.time()
+        with self._lock:
+            expiradas = [
+                c for c, e in self._datos.items()
+                if ahora >= e.expira + self.gracia(e.tipo)
+            ]
+            for clave in expiradas:
+                self._quitar(clave)
+            self._stats["expirados"] += len(expiradas)
+        return len(expiradas)
+
+    # ------------------------------------------------------------------
+    # Limpieza en segundo plano
+    # ------------------------------------------------------------------
+
+    def _iniciar_limpieza(self) -> None:
+        """Arranca el hilo de limpieza con la primera escritura (no al importar)"""
+        if self.intervalo_limpieza <= 0 or self._hilo_limpieza is not None:
+            return
+        with self._lock:
+            if self._hilo_limpieza is not None:
+                return
+            self._hilo_limpieza = threading.Thread(
+                target=self._bucle_limpieza, name="BoundedTTLCache-limpieza", daemon=True
+            )
+            self._hilo_limpieza.start()
+
+    def _bucle_limpieza(self) -> None:
+        while not self._detener.wait(self.intervalo_limpieza):
+            try:
+                eliminadas = self.purgar_expirados()
+                if eliminadas:
+                    self.logger.debug(f"🧹 {eliminadas} entradas expiradas eliminadas")
+            except Exception as e:
+                self.logger.warning(f"⚠️  Error en limpieza de caché: {str(e)}")
+
+    def detener(self) -> None:
+        """Detiene el hilo de limpieza"""
+        self._detener.set()
+
+    # ------------------------------------------------------------------
+    # Estadísticas
+    # ------------------------------------------------------------------
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._datos)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hits, misses, expulsiones, ocupación y ratio de aciertos"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entradas"] = len(self._datos)
+            stats["bytes"] = self._bytes
+            stats["max_entradas"] = self.max_entradas
+            stats["max_bytes"] = self.max_bytes
+            stats["por_tipo"] = {t: dict(v) for t, v in self._stats_por_tipo.items()}
+        consultas = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = round(stats["hits"] / consultas, 3) if consultas else 0.0
+        return stats
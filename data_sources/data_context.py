@@ -0,0 +1,149 @@
+"""
+data_sources/data_context.py
+Contexto de datos por análisis (request-scoped)
+Descarga UNA vez la ventana histórica más amplia y el dict `info` de un ticker
+y deriva las vistas más cortas ("3mo", "1mo", ...) recortando en memoria
+"""
+
+import logging
+import threading
+from datetime import datetime
+from typing import Dict, Optional, Any, Callable
+
+import pandas as pd
+
+from .ohlcv_store import PERIODOS_DIAS, inicio_periodo
+
+
+def dias_periodo(periodo: str) -> float:
+    """
+    Longitud aproximada de un período de yfinance en días (para compararlos)
+
+    Args:
+        periodo: "1mo", "1y", "ytd", "max", etc
+
+    Returns:
+        Días naturales ("max" = infinito)
+    """
+    if periodo == "max":
+        return float("inf")
+    if periodo == "ytd":
+        hoy = datetime.now()
+        return (hoy - datetime(hoy.year, 1, 1)).days + 1
+    if periodo not in PERIODOS_DIAS:
+        raise ValueError(f"Período no soportado: {periodo}")
+    return PERIODOS_DIAS[periodo]
+
+
+class ContextoDatos:
+    """
+    Contexto de datos de un único análisis de ticker
+
+    MarketDataManager recibe el contexto en todos sus métodos y lo usa como
+    memo: la primera llamada descarga, las siguientes reutilizan. No tiene
+    TTL propio; se crea al inicio de un análisis y se descarta al terminar.
+
+    Ejemplo:
+        contexto = market_data.crear_contexto("AAPL", periodo_base="1y")
+        hist_1y = market_data.obtener_historico("AAPL", "1y", contexto=contexto)
+        tendencia = market_data.obtener_tendencia("AAPL", contexto=contexto)  # sin descarga
+    """
+
+    def __init__(self, ticker: str, periodo_base: str = "1y", intervalo: str = "1d"):
+        """
+        Args:
+            ticker: Símbolo del instrumento
+            periodo_base: Ventana histórica mínima a descargar en la primera consulta
+            intervalo: Intervalo de las barras del histórico
+        """
+        self.logger = logging.getLogger("ContextoDatos")
+        self.ticker = ticker
+        self.periodo_base = periodo_base
+        self.intervalo = intervalo
+
+        self._lock = threading.RLock()
+        self._historico: Optional[pd.DataFrame] = None
+        self._periodo_cargado: Optional[str] = None
+        self._memo: Dict[str, Any] = {}
+        self.descargas: Dict[str, int] = {}
+
+    def aplica_a(self, ticker: str, intervalo: str = "1d") -> bool:
+        """True si el contexto corresponde al ticker/intervalo pedido"""
+        return ticker.upper() == self.ticker.upper() and intervalo == self.intervalo
+
+    def _contar(self, clave: str) -> None:
+        self.descargas[clave] = self.descargas.get(clave, 0) + 1
+
+    def obtener(self, clave: str, cargador: Callable[[], Any]) -> Any:
+        """
+        Devuelve el valor memorizado para `clave` o lo carga una sola vez
+
+        Los errores no se memorizan: si el cargador lanza una excepción,
+        la siguiente llamada vuelve a intentarlo.
+
+        Args:
+            clave: Nombre del dato ("info", "macro", "finviz", ...)
+            cargador: Función sin argumentos que descarga el dato
+        """
+        with self._lock:
+            if clave not in self._memo:
+                self._memo[clave] = cargador()
+                self._contar(clave)
+            return self._memo[clave]
+
+    def info(self, cargador: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """Dict `info` de yfinance, descargado una sola vez"""
+        return self.obtener("info", cargador)
+
+    def historico(self, periodo: str, cargador: Callable[[str], pd.DataFrame]) -> pd.DataFrame:
+        """
+        Histórico del período pedido, recortado de la ventana descargada
+
+        Si se pide un período más amplio que el cargado, se vuelve a descargar
+        la ventana mayor (una sola vez) y las siguientes consultas la recortan.
+        Devuelve siempre una copia: el llamador puede añadir columnas sin
+        alterar lo que ven los demás consumidores del análisis.
+
+        Args:
+            periodo: Período de yfinance
+            cargador: Función (periodo) -> DataFrame que descarga el histórico
+        """
+        with self._lock:
+            necesita_carga = (
+                self._historico is None
+                or dias_periodo(periodo) > dias_periodo(self._periodo_cargado)
+            )
+            if necesita_carga:
+                periodo_carga = periodo
+                if dias_periodo(self.periodo_base) > dias_periodo(periodo):
+                    periodo_carga = self.periodo_base
+                hist = cargador(periodo_carga)
+                self._contar("historico")
+                if hist is None or hist.empty:
+                    return pd.DataFrame()
+                self._historico = hist
+                self._periodo_cargado = periodo_carga
+
+            if periodo == self._periodo_cargado:
+                return self._historico.copy()
+            return self._recortar(self._historico, periodo).copy()
+
+    @staticmethod
+    def _recortar(hist: pd.DataFrame, periodo: str) -> pd.DataFrame:
+        inicio = inicio_periodo(periodo)
+        if inicio is None or hist.empty:
+            return hist
+        indice = pd.DatetimeIndex(hist.index)
+        if indice.tz is None:
+            inicio = inicio.tz_localize(None)
+        return hist[indice >= inicio]
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Descargas realizadas por tipo de dato"""
+        with self._lock:
+            return {
+                "ticker": self.ticker,
+                "periodo_cargado": self._periodo_cargado,
+                "descargas": dict(self.descargas),
+                "total_descargas": sum(self.descargas.values()),
+            }
@@ -0,0 +1,319 @@
+"""
+data_sources/feature_store.py
+Almacén de features de ML en disco (columnar, numpy memmap)
+Clave (ticker, conjunto de features + versión, fecha): cada predictor
+registra su conjunto y el almacén calcula solo las filas de las barras
+nuevas, reutilizando las ya guardadas. Mismo layout que OHLCVStore.
+El directorio puede compartirse entre procesos (p. ej. el proceso de
+entrenamiento de ia/training_jobs): las escrituras se serializan con un
+lock de archivo y el manifest se relee antes de modificarlo.
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+try:
+    import fcntl
+except ImportError:
+    # Sin flock (Windows): solo se serializan los hilos del proceso
+    fcntl = None
+
+
+@dataclass(frozen=True)
+class ConjuntoFeatures:
+    """
+    Definición de un conjunto de features derivado de los cierres
+
+    `calcular(cierres)` devuelve una fila por barra a partir de la posición
+    `historia` (len(cierres) - historia filas); la fila de la barra t solo
+    puede depender de cierres[t - historia:t + 1].
+    """
+    nombre: str
+    version: str
+    columnas: Tuple[str, ...]
+    historia: int
+    calcular: Callable[[np.ndarray], np.ndarray]
+
+    @property
+    def clave(self) -> str:
+        return re.sub(r"[^A-Za-z0-9._-]", "_", f"{self.nombre}-{self.version}")
+
+
+class AlmacenFeatures:
+    """
+    Matrices de features por ticker alineadas por fecha
+
+    Layout en disco:
+        base_dir/manifest.json
+        base_dir/manifest.lock                             (lock entre procesos)
+        base_dir/<conjunto>-<version>/<TICKER>.idx.npy     (int64, ns UTC)
+        base_dir/<conjunto>-<version>/<TICKER>.cierre.npy  (float64, cierres usados)
+        base_dir/<conjunto>-<version>/<TICKER>.val.npy     (float64, filas x columnas)
+
+    Si los cierres guardados ya no coinciden con los recibidos (ajuste por
+    dividendos o splits) la serie se recalcula completa.
+
+    Ejemplo:
+        almacen = obtener_almacen_features()
+        X = almacen.matriz("AAPL", CONJUNTO, datos["Close"])   # DataFrame fechas x columnas
+    """
+
+    def __init__(self, base_dir: str = "data/features", tolerancia: float = 1e-9):
+        """
+        Args:
+            base_dir: Directorio raíz del almacén
+            tolerancia: Diferencia relativa de cierres que invalida lo guardado
+        """
+        self.logger = logging.getLogger("AlmacenFeatures")
+        self.base_dir = base_dir
+        self.tolerancia = tolerancia
+        self._manifest_path = os.path.join(base_dir, "manifest.json")
+        self._bloqueo_path = os.path.join(base_dir, "manifest.lock")
+        self._lock = threading.RLock()
+        os.makedirs(base_dir, exist_ok=True)
+        self._firma_manifest: Optional[Tuple[int, int, int]] = None
+        self._manifest: Dict[str, Dict[str, Any]] = {}
+        self._refrescar_manifest()
+        self._stats = {"filas_reutilizadas": 0, "filas_calculadas": 0, "recalculos": 0}
+
+    # ------------------------------------------------------------------
+    # Manifest y rutas
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _clave(ticker: str, conjunto: ConjuntoFeatures) -> str:
+        return f"{ticker.upper()}|{conjunto.clave}"
+
+    def _cargar_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️  Manifest corrupto, se reconstruirá: {str(e)}")
+            return {}
+
+    def _firma(self) -> Optional[Tuple[int, int, int]]:
+        try:
+            st = os.stat(self._manifest_path)
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size, st.st_ino
+
+    def _refrescar_manifest(self) -> None:
+        """Relee el manifest si otro proceso lo reemplazó desde la última lectura"""
+        firma = self._firma()
+        if firma != self._firma_manifest:
+            self._manifest = self._cargar_manifest()
+            self._firma_manifest = firma
+
+    @contextmanager
+    def _bloqueo(self):
+        """
+        Sección crítica entre hilos y procesos sobre el directorio
+
+        Dentro, el manifest en memoria es el del disco: cada proceso aplica
+        sus cambios sobre la última versión en lugar de sobre su copia.
+        """
+        with self._lock:
+            if fcntl is None:
+                self._refrescar_manifest()
+                yield
+                return
+            with open(self._bloqueo_path, "a") as f:
+                fcntl.flock(f, fcntl.LOCK_EX)
+                try:
+                    self._refrescar_manifest()
+                    yield
+                finally:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    @staticmethod
+    def _temporal(ruta: str) -> str:
+        """Nombre temporal único por proceso y escritura"""
+        return f"{ruta}.{os.getpid()}.{uuid.uuid4().hex[:6]}.tmp"
+
+    def _guardar_manifest(self) -> None:
+        tmp = self._temporal(self._manifest_path)
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._manifest_path)
+        self._firma_manifest = self._firma()
+
+    def _rutas(self, ticker: str, conjunto: ConjuntoFeatures) -> Tuple[str, str, str]:
+        nombre = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        carpeta = os.path.join(self.base_dir, conjunto.clave)
+        return tuple(os.path.join(carpeta, f"{nombre}.{parte}.npy") for parte in ("idx", "cierre", "val"))
+
+    def _leer(self, ticker: str, conjunto: ConjuntoFeatures) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        if self._clave(ticker, conjunto) not in self._manifest:
+            return None
+        try:
+            return tuple(np.load(ruta, mmap_mode="r") for ruta in self._rutas(ticker, conjunto))
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️  Features dañadas para {ticker} ({conjunto.clave}): {str(e)}")
+            return None
+
+    def _escribir(self, ticker: str, conjunto: ConjuntoFeatures,
+                  idx: np.ndarray, cierres: np.ndarray, valores: np.ndarray) -> None:
+        rutas = self._rutas(ticker, conjunto)
+        os.makedirs(os.path.dirname(rutas[0]), exist_ok=True)
+        # Escritura atómica: los lectores con mmap abierto conservan el archivo anterior
+        for ruta, datos in zip(rutas, (idx, cierres, valores)):
+            tmp = self._temporal(ruta)
+            with open(tmp, "wb") as f:
+                np.save(f, datos)
+            os.replace(tmp, ruta)
+        self._manifest[self._clave(ticker, conjunto)] = {
+            "ticker": ticker.upper(),
+            "conjunto": conjunto.nombre,
+            "version": conjunto.version,
+            "columnas": list(conjunto.columnas),
+            "filas": int(len(idx)),
+            "desde": pd.Timestamp(idx[0], tz="UTC").isoformat() if len(idx) else None,
+            "hasta": pd.Timestamp(idx[-1], tz="UTC").isoformat() if len(idx) else None,
+            "actualizado": time.time(),
+        }
+        self._guardar_manifest()
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _normalizar(cierres: pd.Series) -> Tuple[pd.DatetimeIndex, np.ndarray, np.ndarray]:
+        serie = pd.Series(np.asarray(cierres, dtype=np.float64).reshape(-1), index=cierres.index).dropna()
+        indice = pd.DatetimeIndex(serie.index)
+        indice_utc = indice.tz_localize("UTC") if indice.tz is None else indice.tz_convert("UTC")
+        return indice, indice_utc.values.astype("datetime64[ns]").astype(np.int64), serie.to_numpy()
+
+    def matriz(self, ticker: str, conjunto: ConjuntoFeatures, cierres: pd.Series) -> pd.DataFrame:
+        """
+        Features de `conjunto` para cada barra de `cierres` con historia suficiente
+
+        Solo se calculan las barras posteriores a las guardadas; el resultado
+        es idéntico a conjunto.calcular(cierres) sobre la serie completa.
+
+        Args:
+            ticker: Símbolo del instrumento
+            conjunto: Definición del conjunto de features
+            cierres: Serie de cierres con índice de fechas
+
+        Returns:
+            DataFrame (fechas[historia:] x conjunto.columnas)
+        """
+        indice, idx, valores_cierre = self._normalizar(cierres)
+        h = conjunto.historia
+        if len(idx) <= h:
+            return pd.DataFrame(columns=list(conjunto.columnas), dtype=np.float64)
+
+        with self._bloqueo():
+            guardado = self._leer(ticker, conjunto)
+            filas = self._filas_reutilizables(guardado, idx, valores_cierre, h)
+            if filas is None:
+                if guardado is not None:
+                    self._stats["recalculos"] += 1
+                    self.logger.info(f"♻️  Cierres de {ticker} cambiaron: features de {conjunto.clave} recalculadas")
+                X = np.asarray(conjunto.calcular(valores_cierre), dtype=np.float64)
+                self._stats["filas_calculadas"] += len(X)
+                self._escribir(ticker, conjunto, idx, valores_cierre, X)
+                return pd.DataFrame(X, index=indice[h:], columns=list(conjunto.columnas))
+
+            # `desde`: primera fila guardada que pedimos; `nuevas`: barras tras la última guardada
+            desde, reutilizadas, nuevas = filas
+            g_idx, g_cierre, g_val = guardado
+            partes = [np.asarray(g_val[desde:desde + reutilizadas])]
+            if nuevas:
+                inicio = len(idx) - nuevas
+                cola = conjunto.calcular(valores_cierre[inicio - h:])
+                partes.append(np.asarray(cola, dtype=np.float64))
+                self._escribir(
+                    ticker, conjunto,
+                    np.concatenate([g_idx, idx[inicio:]]),
+                    np.concatenate([g_cierre, valores_cierre[inicio:]]),
+                    np.vstack([g_val, cola])
+                )
+            self._stats["filas_reutilizadas"] += reutilizadas
+            self._stats["filas_calculadas"] += nuevas
+            X = np.vstack(partes) if len(partes) > 1 else partes[0]
+            return pd.DataFrame(X, index=indice[h:], columns=list(conjunto.columnas))
+
+    def _filas_reutilizables(
+        self,
+        guardado: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]],
+        idx: np.ndarray,
+        cierres: np.ndarray,
+        h: int
+    ) -> Optional[Tuple[int, int, int]]:
+        """
+        (fila guardada inicial, filas reutilizadas, barras nuevas) o None si
+        hay que recalcular (sin datos, cierres distintos o historia anterior
+        a la guardada)
+        """
+        if guardado is None:
+            return None
+        g_idx, g_cierre, g_val = guardado
+        if len(g_idx) == 0 or len(g_val) != len(g_idx) - h:
+            return None
+
+        # Las barras pedidas deben ser un tramo contiguo de las guardadas + barras nuevas
+        inicio = int(np.searchsorted(g_idx, idx[0]))
+        comunes = min(len(g_idx) - inicio, len(idx))
+        if inicio >= len(g_idx) or comunes <= 0 or g_idx[inicio] != idx[0]:
+            return None
+        if not np.array_equal(g_idx[inicio:inicio + comunes], idx[:comunes]):
+            return None
+        if not np.allclose(g_cierre[inicio:inicio + comunes], cierres[:comunes],
+                           rtol=self.tolerancia, atol=0):
+            return None
+
+        # Fila de features de la barra idx[h]: posición inicio + h - h = inicio
+        reutilizadas = max(comunes - h, 0)
+        nuevas = len(idx) - comunes
+        if reutilizadas == 0 and nuevas:
+            return None
+        return inicio, reutilizadas, nuevas
+
+    def eliminar(self, ticker: str, conjunto: ConjuntoFeatures) -> None:
+        """Elimina las features guardadas de un ticker/conjunto"""
+        with self._bloqueo():
+            for ruta in self._rutas(ticker, conjunto):
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            if self._manifest.pop(self._clave(ticker, conjunto), None) is not None:
+                self._guardar_manifest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumen del almacén: series, filas guardadas y reutilización"""
+        with self._lock:
+            self._refrescar_manifest()
+            return {
+                **self._stats,
+                "directorio": self.base_dir,
+                "series": len(self._manifest),
+                "filas_totales": sum(e.get("filas", 0) for e in self._manifest.values()),
+            }
+
+
+_almacenes: Dict[str, AlmacenFeatures] = {}
+_almacenes_lock = threading.Lock()
+
+
+def obtener_almacen_features(base_dir: str = "data/features") -> AlmacenFeatures:
+    """Obtiene la instancia compartida del almacén de features de `base_dir`"""
+    with _almacenes_lock:
+        if base_dir not in _almacenes:
+            _almacenes[base_dir] = AlmacenFeatures(base_dir)
+        return _almacenes[base_dir]
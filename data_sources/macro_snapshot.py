@@ -0,0 +1,255 @@
+"""
+data_sources/macro_snapshot.py
+Servicio de snapshot macro compartido (SPY, QQQ, DIA, IWM, ^VIX)
+Descarga todos los índices en UNA llamada batch a yf.download, mantiene un
+snapshot refrescado en segundo plano y sirve las lecturas sin I/O
+"""
+
+import copy
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, Optional, Any, List
+
+import yfinance as yf
+
+from .rate_limiter import RateLimiter
+
+
+INDICES_MACRO = {"SPY": "SPY", "QQQ": "QQQ", "DIA": "DIA", "IWM": "IWM"}
+VOLATILIDAD_MACRO = {"VIX": "^VIX"}
+
+
+class MacroSnapshotService:
+    """
+    Snapshot macro compartido entre todos los análisis
+
+    El contexto macro es idéntico para todos los tickers dentro del mismo
+    minuto, así que se descarga una vez por intervalo de refresco y cada
+    análisis lee una copia en memoria.
+
+    Ejemplo:
+        servicio = obtener_servicio_macro()
+        contexto = servicio.obtener()  # sin I/O si el snapshot ya existe
+    """
+
+    def __init__(
+        self,
+        intervalo_refresco: float = 60.0,
+        rate_limiter: Optional[RateLimiter] = None,
+        refresco_en_segundo_plano: bool = True
+    ):
+        """
+        Args:
+            intervalo_refresco: Segundos entre refrescos del snapshot
+            rate_limiter: Rate limiter del proveedor (opcional)
+            refresco_en_segundo_plano: Mantener un hilo que refresca el snapshot
+        """
+        self.logger = logging.getLogger("MacroSnapshotService")
+        self.intervalo_refresco = intervalo_refresco
+        self.rate_limiter = rate_limiter
+        self.refresco_en_segundo_plano = refresco_en_segundo_plano
+
+        self._lock = threading.Lock()
+        self._lock_refresco = threading.Lock()
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._actualizado = 0.0
+        self._hilo: Optional[threading.Thread] = None
+        self._detener = threading.Event()
+        self._stats = {"refrescos": 0, "errores": 0, "lecturas": 0}
+
+    # ------------------------------------------------------------------
+    # Descarga
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _simbolos() -> List[str]:
+        return list(INDICES_MACRO.values()) + list(VOLATILIDAD_MACRO.values())
+
+    def _descargar_batch(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Descarga las últimas barras diarias de todos los símbolos en una llamada
+
+        Returns:
+            {simbolo: {"precio", "cambio_pct", "volumen"}}
+        """
+        simbolos = self._simbolos()
+        if self.rate_limiter is not None:
+            self.rate_limiter.adquirir("MACRO")
+        datos = yf.download(
+            simbolos, period="5d", interval="1d", group_by="ticker",
+            progress=False, threads=True, auto_adjust=False
+        )
+        resultado = {}
+        if datos is None or datos.empty:
+            return resultado
+        for simbolo in simbolos:
+            try:
+                cierre = datos[simbolo]["Close"].dropna()
+                volumen = datos[simbolo]["Volume"].dropna()
+            except KeyError:
+                continue
+            if cierre.empty:
+                continue
+            precio = float(cierre.iloc[-1])
+            cambio = None
+            if len(cierre) >= 2 and cierre.iloc[-2]:
+                cambio = round((precio / float(cierre.iloc[-2]) - 1) * 100, 2)
+            resultado[simbolo] = {
+                "precio": precio,
+                "cambio_pct": cambio,
+                "volumen": int(volumen.iloc[-1]) if not volumen.empty else None,
+            }
+        return resultado
+
+    def _descargar_info_paralelo(self, simbolos: List[str]) -> Dict[str, Dict[str, Any]]:
+        """Fallback: lee .info de los símbolos faltantes en paralelo"""
+        def leer(simbolo):
+            if self.rate_limiter is not None:
+                self.rate_limiter.adquirir(simbolo)
+            info = yf.Ticker(simbolo).info
+            return simbolo, {
+                "precio": info.get("currentPrice") or info.get("regularMarketPrice"),
+                "cambio_pct": info.get("regularMarketChangePercent"),
+                "volumen": info.get("volume"),
+            }
+
+        resultado = {}
+        with ThreadPoolExecutor(max_workers=max(1, len(simbolos))) as executor:
+            for futuro in [executor.submit(leer, s) for s in simbolos]:
+                try:
+                    simbolo, datos = futuro.result()
+                    resultado[simbolo] = datos
+                except Exception as e:
+                    self.logger.debug(f"Fallback .info falló: {str(e)}")
+        return resultado
+
+    def refrescar(self, solo_si_mayor_a: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Descarga un snapshot nuevo y lo publica
+
+        Args:
+            solo_si_mayor_a: Si se indica y otro hilo ya publicó un snapshot con
+                menos de estos segundos mientras se esperaba el lock, se reutiliza
+
+        Returns:
+            Snapshot con el formato de MarketDataManager.obtener_contexto_macro
+        """
+        with self._lock_refresco:
+            if solo_si_mayor_a is not None:
+                with self._lock:
+                    if self._snapshot is not None and time.time() - self._actualizado <= solo_si_mayor_a:
+                        return copy.deepcopy(self._snapshot)
+            try:
+                por_simbolo = self._descargar_batch()
+            except Exception as e:
+                self.logger.warning(f"⚠️  Descarga batch macro falló: {str(e)}")
+                por_simbolo = {}
+
+            faltantes = [s for s in self._simbolos() if s not in por_simbolo]
+            if faltantes:
+                por_simbolo.update(self._descargar_info_paralelo(faltantes))
+
+            snapshot = {
+                "indices": {
+                    nombre: por_simbolo[simbolo]
+                    for nombre, simbolo in INDICES_MACRO.items() if simbolo in por_simbolo
+                },
+                "volatilidad": {
+                    nombre: por_simbolo[simbolo]["precio"]
+                    for nombre, simbolo in VOLATILIDAD_MACRO.items() if simbolo in por_simbolo
+                },
+                "timestamp": datetime.now().isoformat(),
+            }
+
+            with self._lock:
+                if por_simbolo:
+                    self._snapshot = snapshot
+                    self._actualizado = time.time()
+                    self._stats["refrescos"] += 1
+                else:
+                    self._stats["errores"] += 1
+                    if self._snapshot is not None:
+                        self.logger.warning("⚠️  Sin datos macro nuevos, se conserva el snapshot anterior")
+                        return copy.deepcopy(self._snapshot)
+            self.logger.info(f"✅ Snapshot macro actualizado ({len(por_simbolo)} símbolos)")
+            return copy.deepcopy(snapshot)
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def obtener(self, max_edad: Optional[float] = None) -> Dict[str, Any]:
+        """
+        Devuelve el snapshot actual (copia) sin I/O si existe
+
+        Args:
+            max_edad: Si el snapshot es más antiguo, se refresca de forma síncrona
+                (default: 3 x intervalo_refresco, por si el hilo de refresco se detuvo)
+
+        Returns:
+            Dict con indices, volatilidad, timestamp y edad_segundos
+        """
+        self._iniciar_refresco()
+        limite = max_edad if max_edad is not None else self.intervalo_refresco * 3
+        with self._lock:
+            self._stats["lecturas"] += 1
+            snapshot = self._snapshot
+            edad = time.time() - self._actualizado
+
+        if snapshot is None or edad > limite:
+            snapshot = self.refrescar(solo_si_mayor_a=limite)
+            edad = 0.0
+        else:
+            snapshot = copy.deepcopy(snapshot)
+        snapshot["edad_segundos"] = round(edad, 1)
+        return snapshot
+
+    # ------------------------------------------------------------------
+    # Refresco programado
+    # ------------------------------------------------------------------
+
+    def _iniciar_refresco(self) -> None:
+        if not self.refresco_en_segundo_plano or self._hilo is not None:
+            return
+        with self._lock:
+            if self._hilo is not None:
+                return
+            self._hilo = threading.Thread(
+                target=self._bucle_refresco, name="MacroSnapshot-refresco", daemon=True
+            )
+            self._hilo.start()
+
+    def _bucle_refresco(self) -> None:
+        while not self._detener.wait(self.intervalo_refresco):
+            try:
+                self.refrescar()
+            except Exception as e:
+                self.logger.warning(f"⚠️  Error refrescando snapshot macro: {str(e)}")
+
+    def detener(self) -> None:
+        """Detiene el hilo de refresco"""
+        self._detener.set()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Refrescos, lecturas y antigüedad del snapshot"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["edad_segundos"] = round(time.time() - self._actualizado, 1) if self._snapshot else None
+        return stats
+
+
+# Instancia global del servicio
+_servicio_macro: Optional[MacroSnapshotService] = None
+_servicio_macro_lock = threading.Lock()
+
+
+def obtener_servicio_macro(rate_limiter: Optional[RateLimiter] = None) -> MacroSnapshotService:
+    """Obtiene la instancia global del servicio de snapshot macro"""
+    global _servicio_macro
+    with _servicio_macro_lock:
+        if _servicio_macro is None:
+            _servicio_macro = MacroSnapshotService(rate_limiter=rate_limiter)
+        return _servicio_macro
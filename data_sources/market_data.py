@@ -14,6 +14,15 @@ import socket
 import time
 import threading
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from .rate_limiter import RateLimiter
+from .ohlcv_store import OHLCVStore, PERIODOS_DIAS, INTERVALOS_ALMACENABLES, inicio_periodo
+from .data_context import ContextoDatos
+from .single_flight import SingleFlight, SingleFlightTimeout
+from .bounded_cache import BoundedTTLCache
+from .macro_snapshot import obtener_servicio_macro
+from .batch_history import descargar_historicos_batch, TAMANO_LOTE_DEFAULT
 
 # ESTABLECER TIMEOUT GLOBAL PARA YFINANCE
 socket.setdefaulttimeout(15)
@@ -29,16 +38,49 @@ class MarketDataManager:
     """Gestor centralizado de datos de mercado en tiempo real"""
     
     # CLASE - Rate Limiter para prevenir "Too Many Requests"
-    _rate_limit_lock = threading.Lock()
-    _last_request_time = {}  # {ticker: timestamp}
-    _request_cache = {}  # {ticker: (data, timestamp)}
-    _cache_ttl_seconds = 60  # Cachear por 60 segundos
+    _cache_ttl_seconds = 60  # Cachear cotizaciones por 60 segundos
+    _cache_ttl_por_tipo = {
+        "cotizacion": _cache_ttl_seconds,
+        "fundamentales": 3600,  # Cambian con los reportes trimestrales
+        "historico": 300,
+    }
+    _swr_gracia_max_segundos = 600  # Cotizaciones vencidas se conservan 10 min para stale-while-revalidate
+    _request_cache = BoundedTTLCache(
+        max_entradas=5000,
+        max_bytes=64 * 1024 * 1024,  # 64 MB
+        ttl_por_tipo=_cache_ttl_por_tipo,
+        ttl_default=_cache_ttl_seconds,
+        gracia_por_tipo={"cotizacion": _swr_gracia_max_segundos}
+    )
+    
+    # CLASE - Revalidación en segundo plano (stale-while-revalidate)
+    _swr_lock = threading.Lock()
+    _swr_executor: Optional[ThreadPoolExecutor] = None
+    _swr_en_curso: set = set()  # tickers con revalidación pendiente
     _min_request_interval = 0.5  # Mínimo 500ms entre solicitudes al mismo ticker
+    _provider_rate_limits = {"yfinance": (10.0, 20)}  # {proveedor: (req/s, ráfaga)}
+    _rate_limiter = RateLimiter(
+        intervalo_minimo_ticker=_min_request_interval,
+        limites_proveedor=_provider_rate_limits
+    )
+    
+    # CLASE - Almacén local OHLCV compartido (descargas incrementales)
+    _ohlcv_store_lock = threading.Lock()
+    _ohlcv_stores: Dict[str, OHLCVStore] = {}  # {directorio: OHLCVStore}
+    _historico_refresco_segundos = 300  # Revalidar barras contra YFinance cada 5 min
+    
+    # CLASE - Coalescencia: solicitudes simultáneas al mismo dato comparten una descarga
+    _single_flight = SingleFlight(timeout_espera=30.0)
     
     def __init__(
         self,
         polygon_api_key: Optional[str] = None,
-        alpha_vantage_key: Optional[str] = None
+        alpha_vantage_key: Optional[str] = None,
+        usar_almacen_local: bool = True,
+        almacen_dir: str = "data/ohlcv",
+        timeout_coalescencia: float = 30.0,
+        stale_while_revalidate: bool = False,
+        gracia_swr_segundos: float = 300
     ):
         """
         Inicializa el gestor de datos
@@ -46,10 +88,22 @@ class MarketDataManager:
         Args:
             polygon_api_key: API key de Polygon.io (opcional)
             alpha_vantage_key: API key de Alpha Vantage (opcional)
+            usar_almacen_local: Servir históricos desde el almacén OHLCV en disco
+            almacen_dir: Directorio del almacén OHLCV
+            timeout_coalescencia: Segundos que una solicitud espera a otra idéntica en curso
+            stale_while_revalidate: Servir cotizaciones vencidas (marcadas stale) mientras
+                se refrescan en segundo plano
+            gracia_swr_segundos: Tiempo tras el vencimiento en que aún se sirve la cotización stale
+                (acotado por _swr_gracia_max_segundos)
         """
         self.logger = logging.getLogger("MarketDataManager")
         self.polygon_api_key = polygon_api_key
         self.alpha_vantage_key = alpha_vantage_key
+        self.usar_almacen_local = usar_almacen_local
+        self.almacen_dir = almacen_dir
+        self.timeout_coalescencia = timeout_coalescencia
+        self.stale_while_revalidate = stale_while_revalidate
+        self.gracia_swr_segundos = min(gracia_swr_segundos, self._swr_gracia_max_segundos)
         
         # Inicializa Finviz scraper si está disponible
         self.finviz_scraper = None
@@ -63,81 +117,224 @@ class MarketDataManager:
         self.logger.info("[OK] Gestor de datos inicializado con Rate Limiting")
     
     @classmethod
-    def _aplicar_rate_limit(cls, ticker: str) -> None:
+    def _aplicar_rate_limit(cls, ticker: str, proveedor: str = "yfinance") -> None:
         """
         Aplica rate limiting para evitar 'Too Many Requests'
-        Espera si es necesario para respetar el intervalo mínimo
+        Reserva turno en los buckets del ticker y del proveedor y espera
+        fuera del lock, sin bloquear a hilos que piden otros tickers
         
         Args:
             ticker: Símbolo del ticker
+            proveedor: Proveedor de datos al que se hará la solicitud
         """
-        with cls._rate_limit_lock:
-            ahora = time.time()
-            ultima_solicitud = cls._last_request_time.get(ticker, 0)
-            tiempo_transcurrido = ahora - ultima_solicitud
-            
-            if tiempo_transcurrido < cls._min_request_interval:
-                tiempo_espera = cls._min_request_interval - tiempo_transcurrido
-                logging.getLogger("MarketDataManager").debug(
-                    f"⏱️  Rate limit: Esperando {tiempo_espera:.2f}s para {ticker}"
-                )
-                time.sleep(tiempo_espera)
+        cls._rate_limiter.adquirir(ticker, proveedor)
+    
+    @classmethod
+    def _obtener_almacen(cls, almacen_dir: str) -> OHLCVStore:
+        """
+        Obtiene (o crea) el almacén OHLCV compartido para un directorio
+        
+        Args:
+            almacen_dir: Directorio del almacén
             
-            cls._last_request_time[ticker] = time.time()
+        Returns:
+            Instancia única de OHLCVStore por directorio
+        """
+        with cls._ohlcv_store_lock:
+            almacen = cls._ohlcv_stores.get(almacen_dir)
+            if almacen is None:
+                almacen = OHLCVStore(almacen_dir)
+                cls._ohlcv_stores[almacen_dir] = almacen
+            return almacen
+    
+    def obtener_almacen(self) -> Optional[OHLCVStore]:
+        """Almacén OHLCV local de esta instancia (None si está desactivado)"""
+        return self._obtener_almacen(self.almacen_dir) if self.usar_almacen_local else None
     
     @classmethod
-    def _obtener_cache(cls, ticker: str) -> Optional[Dict[str, Any]]:
+    def _obtener_cache(cls, ticker: str, tipo: str = "cotizacion") -> Optional[Any]:
         """
         Obtiene datos del caché si son válidos
         
         Args:
-            ticker: Símbolo del ticker
+            ticker: Símbolo del ticker (o clave compuesta)
+            tipo: Tipo de entrada ("cotizacion", "fundamentales", "historico")
             
         Returns:
             Datos cacheados o None si expiró
         """
-        if ticker in cls._request_cache:
-            datos, timestamp = cls._request_cache[ticker]
-            if time.time() - timestamp < cls._cache_ttl_seconds:
-                logging.getLogger("MarketDataManager").debug(
-                    f"✅ Cache válido para {ticker}"
-                )
-                return datos
-            else:
-                del cls._request_cache[ticker]
-        return None
+        datos = cls._request_cache.obtener(tipo, ticker)
+        if datos is not None:
+            logging.getLogger("MarketDataManager").debug(
+                f"✅ Cache válido para {ticker} ({tipo})"
+            )
+        return datos
     
     @classmethod
-    def _guardar_cache(cls, ticker: str, datos: Dict[str, Any]) -> None:
+    def _guardar_cache(cls, ticker: str, datos: Any, tipo: str = "cotizacion") -> None:
         """
-        Guarda datos en caché con timestamp
+        Guarda datos en caché con el TTL de su tipo
         
         Args:
-            ticker: Símbolo del ticker
+            ticker: Símbolo del ticker (o clave compuesta)
             datos: Datos a cachear
+            tipo: Tipo de entrada ("cotizacion", "fundamentales", "historico")
+        """
+        cls._request_cache.guardar(tipo, ticker, datos)
+    
+    def crear_contexto(
+        self,
+        ticker: str,
+        periodo_base: str = "1y",
+        intervalo: str = "1d"
+    ) -> ContextoDatos:
+        """
+        Crea un contexto de datos para un análisis completo de un ticker
+        Todas las consultas que reciban el contexto comparten una única
+        descarga del histórico (ventana más amplia) y del dict info
+        
+        Args:
+            ticker: Símbolo del instrumento
+            periodo_base: Ventana histórica mínima a descargar
+            intervalo: Intervalo de las barras
+        
+        Returns:
+            ContextoDatos listo para pasar a los métodos del gestor
         """
-        cls._request_cache[ticker] = (datos, time.time())
+        return ContextoDatos(ticker, periodo_base=periodo_base, intervalo=intervalo)
     
-    def obtener_datos_actuales(self, ticker: str) -> Dict[str, Any]:
+    @staticmethod
+    def _contexto_para(
+        contexto: Optional[ContextoDatos],
+        ticker: str,
+        intervalo: str = "1d"
+    ) -> Optional[ContextoDatos]:
+        """Devuelve el contexto solo si corresponde al ticker/intervalo pedido"""
+        if contexto is not None and contexto.aplica_a(ticker, intervalo):
+            return contexto
+        return None
+    
+    def _descargar_info(self, ticker: str) -> Dict[str, Any]:
+        """
+        Descarga yf.Ticker(ticker).info aplicando rate limiting
+        
+        Args:
+            ticker: Símbolo del instrumento
+        
+        Returns:
+            Dict info de YFinance
+        """
+        self._aplicar_rate_limit(ticker)
+        return yf.Ticker(ticker, session=None).info
+    
+    def _obtener_info(self, ticker: str, contexto: Optional[ContextoDatos] = None) -> Dict[str, Any]:
+        """
+        Obtiene el dict info, reutilizando el del contexto si ya se descargó
+        
+        Args:
+            ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (opcional)
+        
+        Returns:
+            Dict info de YFinance
+        """
+        contexto = self._contexto_para(contexto, ticker)
+        if contexto is not None:
+            return contexto.info(lambda: self._descargar_info(ticker))
+        return self._descargar_info(ticker)
+    
+    def obtener_datos_actuales(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene datos actuales: precio, volumen, cambios
         Con manejo robusto de errores, reintentos y caché para evitar rate limiting
         
         Args:
             ticker: Símbolo del instrumento (AAPL, MSFT, etc)
+            contexto: Contexto de datos del análisis (reutiliza info/histórico)
         
         Returns:
             Dict con: precio, máximo, mínimo, volumen, cambio%
         """
         # NUEVO: Verificar caché primero
-        cache_data = self._obtener_cache(ticker)
-        if cache_data:
-            self.logger.info(f"📦 Usando datos en caché para {ticker}")
-            return cache_data
+        if self.stale_while_revalidate:
+            estado = self._request_cache.obtener_con_estado("cotizacion", ticker)
+            if estado is not None:
+                cache_data, edad, vencido_hace = estado
+                if vencido_hace < 0:
+                    self.logger.info(f"📦 Usando datos en caché para {ticker}")
+                    return cache_data
+                if vencido_hace < self.gracia_swr_segundos:
+                    self.logger.info(f"♻️  Cotización stale para {ticker} ({edad:.0f}s), revalidando en segundo plano")
+                    self._revalidar_en_segundo_plano(ticker)
+                    return {**cache_data, "stale": True, "edad_segundos": round(edad, 1)}
+        else:
+            cache_data = self._obtener_cache(ticker)
+            if cache_data:
+                self.logger.info(f"📦 Usando datos en caché para {ticker}")
+                return cache_data
         
-        # NUEVO: Aplicar rate limiting antes de llamar a YFinance
-        self._aplicar_rate_limit(ticker)
+        # NUEVO: Coalescencia - N hilos pidiendo el mismo ticker comparten una descarga
+        try:
+            return self._single_flight.ejecutar(
+                ("actuales", ticker),
+                lambda: self._descargar_datos_actuales(ticker, contexto),
+                timeout=self.timeout_coalescencia
+            )
+        except SingleFlightTimeout as e:
+            self.logger.warning(f"⚠️  {str(e)}")
+            return {"error": f"Timeout esperando datos de {ticker}", "ticker": ticker}
+    
+    def _revalidar_en_segundo_plano(self, ticker: str) -> None:
+        """
+        Programa el refresco de la cotización de un ticker en el pool SWR
+        Como máximo una revalidación pendiente por ticker
+        
+        Args:
+            ticker: Símbolo del instrumento
+        """
+        cls = type(self)
+        with cls._swr_lock:
+            if ticker in cls._swr_en_curso:
+                return
+            cls._swr_en_curso.add(ticker)
+            if cls._swr_executor is None:
+                cls._swr_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="swr")
+            executor = cls._swr_executor
+        
+        def revalidar():
+            try:
+                self._single_flight.ejecutar(
+                    ("actuales", ticker),
+                    lambda: self._descargar_datos_actuales(ticker),
+                    timeout=self.timeout_coalescencia
+                )
+            except Exception as e:
+                self.logger.warning(f"⚠️  Revalidación fallida para {ticker}: {str(e)}")
+            finally:
+                with cls._swr_lock:
+                    cls._swr_en_curso.discard(ticker)
+        
+        executor.submit(revalidar)
+    
+    def _descargar_datos_actuales(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
+        """
+        Descarga y valida los datos actuales (con reintentos) y los guarda en caché
+        
+        Args:
+            ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (opcional)
         
+        Returns:
+            Dict con datos actuales o error
+        """
         max_reintentos = 3  # Aumentado de 2 a 3
         for intento in range(max_reintentos):
             try:
@@ -146,8 +343,8 @@ class MarketDataManager:
                 validator = DataValidator()
                 
                 try:
-                    stock = yf.Ticker(ticker, session=None)
-                    info = stock.info
+                    # Rate limiting aplicado dentro de _descargar_info (solo si hay descarga)
+                    info = self._obtener_info(ticker, contexto)
                 except (TimeoutError, ConnectionError) as e:
                     if intento < max_reintentos - 1:
                         self.logger.warning(f"⚠️  Timeout/Conexión ({intento+1}/{max_reintentos}): {str(e)}")
@@ -171,7 +368,10 @@ class MarketDataManager:
                 # Si aún no tenemos precio, intentar obtener del histórico reciente
                 if precio is None or precio == 0:
                     try:
-                        hist = stock.history(period="1d")
+                        if self._contexto_para(contexto, ticker) is not None:
+                            hist = self.obtener_historico(ticker, contexto=contexto)
+                        else:
+                            hist = yf.Ticker(ticker).history(period="1d")
                         if not hist.empty:
                             precio = hist['Close'].iloc[-1]
                             self.logger.info(f"ℹ️  Usando precio del histórico para {ticker}: {precio}")
@@ -237,7 +437,8 @@ class MarketDataManager:
         self,
         ticker: str,
         periodo: str = "1y",
-        intervalo: str = "1d"
+        intervalo: str = "1d",
+        contexto: Optional[ContextoDatos] = None
     ) -> pd.DataFrame:
         """
         Obtiene datos históricos OHLCV
@@ -246,10 +447,82 @@ class MarketDataManager:
             ticker: Símbolo del instrumento
             periodo: "1d", "5d", "1mo", "3mo", "6mo", "1y", "2y", "5y", "10y", "ytd", "max"
             intervalo: "1m", "5m", "15m", "30m", "60m", "1d", "1wk", "1mo"
+            contexto: Contexto de datos del análisis (recorta la ventana ya descargada)
         
         Returns:
             DataFrame con columnas: Open, High, Low, Close, Volume, Adj Close
         """
+        contexto = self._contexto_para(contexto, ticker, intervalo)
+        if contexto is not None and (periodo in PERIODOS_DIAS or periodo in ("ytd", "max")):
+            return contexto.historico(
+                periodo, lambda p: self._descargar_historico(ticker, p, intervalo)
+            )
+        return self._descargar_historico(ticker, periodo, intervalo)
+    
+    def _descargar_historico(
+        self,
+        ticker: str,
+        periodo: str = "1y",
+        intervalo: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        Obtiene el histórico coalesciendo solicitudes idénticas simultáneas
+        Cada seguidor recibe su propia copia del DataFrame del líder
+        
+        Args:
+            ticker: Símbolo del instrumento
+            periodo: Período de yfinance
+            intervalo: Intervalo de las barras
+        
+        Returns:
+            DataFrame OHLCV (vacío si no hay datos o se agotó la espera)
+        """
+        clave = (ticker, periodo, intervalo)
+        cache_hist = self._obtener_cache(clave, tipo="historico")
+        if cache_hist is not None:
+            return cache_hist.copy()
+        
+        try:
+            hist, compartido = self._single_flight.ejecutar_con_estado(
+                ("historico", ticker, periodo, intervalo),
+                lambda: self._descargar_historico_directo(ticker, periodo, intervalo),
+                timeout=self.timeout_coalescencia
+            )
+        except SingleFlightTimeout as e:
+            self.logger.warning(f"⚠️  {str(e)}")
+            return pd.DataFrame()
+        
+        if not compartido and not hist.empty:
+            self._guardar_cache(clave, hist.copy(), tipo="historico")
+        return hist.copy() if compartido else hist
+    
+    def _descargar_historico_directo(
+        self,
+        ticker: str,
+        periodo: str = "1y",
+        intervalo: str = "1d"
+    ) -> pd.DataFrame:
+        """
+        Obtiene el histórico desde el almacén local o YFinance (sin contexto)
+        
+        Args:
+            ticker: Símbolo del instrumento
+            periodo: Período de yfinance
+            intervalo: Intervalo de las barras
+        
+        Returns:
+            DataFrame OHLCV (vacío si no hay datos)
+        """
+        if (
+            self.usar_almacen_local
+            and intervalo in INTERVALOS_ALMACENABLES
+            and (periodo in PERIODOS_DIAS or periodo in ("ytd", "max"))
+        ):
+            try:
+                return self._obtener_historico_almacen(ticker, periodo, intervalo)
+            except Exception as e:
+                self.logger.warning(f"⚠️  Almacén local no disponible para {ticker}, descargando: {str(e)}")
+        
         # NUEVO: Aplicar rate limiting
         self._aplicar_rate_limit(ticker)
         
@@ -268,22 +541,194 @@ class MarketDataManager:
             self.logger.error(f"❌ Error obteniendo histórico de {ticker}: {str(e)}")
             return pd.DataFrame()
     
-    def obtener_fundamentales(self, ticker: str) -> Dict[str, Any]:
+    def _obtener_historico_almacen(
+        self,
+        ticker: str,
+        periodo: str,
+        intervalo: str
+    ) -> pd.DataFrame:
+        """
+        Sirve el histórico desde el almacén OHLCV local
+        - Sin cobertura suficiente: descarga el período completo y lo fusiona
+        - Con cobertura: descarga solo las barras desde la última almacenada
+          (como máximo una vez cada _historico_refresco_segundos)
+        
+        Args:
+            ticker: Símbolo del instrumento
+            periodo: Período de yfinance
+            intervalo: Intervalo de las barras
+        
+        Returns:
+            DataFrame OHLCV recortado al período pedido
+        """
+        almacen = self._obtener_almacen(self.almacen_dir)
+        inicio = inicio_periodo(periodo)
+        
+        if almacen.cubre_desde(ticker, intervalo, inicio):
+            cobertura = almacen.cobertura(ticker, intervalo) or {}
+            antiguedad = time.time() - cobertura.get("verificado", 0)
+            if antiguedad >= self._historico_refresco_segundos:
+                ultima = almacen.ultima_fecha(ticker, intervalo)
+                self._aplicar_rate_limit(ticker)
+                try:
+                    nuevas = yf.Ticker(ticker).history(
+                        start=ultima.strftime("%Y-%m-%d"), interval=intervalo
+                    )
+                    if nuevas.empty:
+                        almacen.marcar_verificado(ticker, intervalo)
+                    else:
+                        almacen.escribir(ticker, nuevas, intervalo)
+                        self.logger.info(f"✅ Histórico incremental {ticker}: {len(nuevas)} barras desde {ultima.date()}")
+                except Exception as e:
+                    self.logger.warning(f"⚠️  No se pudo actualizar {ticker}, usando almacén local: {str(e)}")
+            else:
+                self.logger.debug(f"📦 Histórico local para {ticker} ({periodo})")
+        else:
+            self._aplicar_rate_limit(ticker)
+            hist = yf.Ticker(ticker).history(period=periodo, interval=intervalo)
+            if hist.empty:
+                self.logger.warning(f"⚠️  Sin datos históricos para {ticker} en período {periodo}")
+                return pd.DataFrame()
+            almacen.escribir(ticker, hist, intervalo, desde_inicio=(periodo == "max"))
+            self.logger.info(f"✅ Histórico obtenido para {ticker}: {len(hist)} barras (almacenado)")
+        
+        return almacen.leer(ticker, intervalo, desde=inicio)
+    
+    def obtener_historicos_batch(
+        self,
+        tickers: List[str],
+        periodo: str = "1y",
+        intervalo: str = "1d",
+        tamano_lote: int = TAMANO_LOTE_DEFAULT
+    ) -> Dict[str, pd.DataFrame]:
+        """
+        Obtiene el histórico de muchos tickers con descargas agrupadas
+        - Primero caché en memoria y almacén local vigente (sin red)
+        - Los tickers con almacén vencido se actualizan en un lote incremental
+        - El resto se descarga en lotes de `tamano_lote` símbolos
+        Los resultados quedan en el caché de histórico, así que un
+        obtener_historico() posterior del mismo período no descarga
+        
+        Args:
+            tickers: Símbolos a consultar
+            periodo: Período de yfinance
+            intervalo: Intervalo de las barras
+            tamano_lote: Símbolos por llamada a yf.download
+        
+        Returns:
+            {ticker: DataFrame OHLCV}; los tickers sin datos no aparecen
+        """
+        resultado: Dict[str, pd.DataFrame] = {}
+        completos: List[str] = []
+        incrementales: Dict[str, pd.Timestamp] = {}
+        
+        usar_almacen = (
+            self.usar_almacen_local
+            and intervalo in INTERVALOS_ALMACENABLES
+            and (periodo in PERIODOS_DIAS or periodo in ("ytd", "max"))
+        )
+        almacen = self._obtener_almacen(self.almacen_dir) if usar_almacen else None
+        inicio = inicio_periodo(periodo) if usar_almacen else None
+        
+        pedidos = list(dict.fromkeys(t.upper() for t in tickers if t))
+        for ticker in pedidos:
+            cache_hist = self._obtener_cache((ticker, periodo, intervalo), tipo="historico")
+            if cache_hist is not None:
+                resultado[ticker] = cache_hist.copy()
+            elif almacen is not None and almacen.cubre_desde(ticker, intervalo, inicio):
+                cobertura = almacen.cobertura(ticker, intervalo) or {}
+                if time.time() - cobertura.get("verificado", 0) >= self._historico_refresco_segundos:
+                    incrementales[ticker] = almacen.ultima_fecha(ticker, intervalo)
+                else:
+                    resultado[ticker] = almacen.leer(ticker, intervalo, desde=inicio)
+            else:
+                completos.append(ticker)
+        
+        descargados: Dict[str, pd.DataFrame] = {}
+        if incrementales:
+            desde = min(incrementales.values())
+            nuevos = descargar_historicos_batch(
+                list(incrementales), intervalo=intervalo, inicio=desde.strftime("%Y-%m-%d"),
+                tamano_lote=tamano_lote, rate_limiter=self._rate_limiter
+            )
+            for ticker in incrementales:
+                if ticker in nuevos:
+                    almacen.escribir(ticker, nuevos[ticker], intervalo)
+                else:
+                    almacen.marcar_verificado(ticker, intervalo)
+                descargados[ticker] = almacen.leer(ticker, intervalo, desde=inicio)
+        
+        if completos:
+            nuevos = descargar_historicos_batch(
+                completos, periodo=periodo, intervalo=intervalo,
+                tamano_lote=tamano_lote, rate_limiter=self._rate_limiter
+            )
+            for ticker, hist in nuevos.items():
+                if almacen is not None:
+                    almacen.escribir(ticker, hist, intervalo, desde_inicio=(periodo == "max"))
+                    hist = almacen.leer(ticker, intervalo, desde=inicio)
+                descargados[ticker] = hist
+        
+        for ticker, hist in descargados.items():
+            if hist.empty:
+                continue
+            self._guardar_cache((ticker, periodo, intervalo), hist.copy(), tipo="historico")
+            resultado[ticker] = hist
+        
+        self.logger.info(
+            f"✅ Históricos batch: {len(resultado)}/{len(pedidos)} "
+            f"tickers ({len(completos)} completos, {len(incrementales)} incrementales)"
+        )
+        return resultado
+    
+    def obtener_fundamentales(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene datos fundamentales: P/E, Market Cap, Dividend, etc
         
         Args:
             ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (reutiliza el dict info)
         
         Returns:
             Dict con datos fundamentales
         """
-        # NUEVO: Aplicar rate limiting
-        self._aplicar_rate_limit(ticker)
+        cache_data = self._obtener_cache(ticker, tipo="fundamentales")
+        if cache_data:
+            self.logger.info(f"📦 Usando fundamentales en caché para {ticker}")
+            return cache_data
         
         try:
-            stock = yf.Ticker(ticker)
-            info = stock.info
+            return self._single_flight.ejecutar(
+                ("fundamentales", ticker),
+                lambda: self._descargar_fundamentales(ticker, contexto),
+                timeout=self.timeout_coalescencia
+            )
+        except SingleFlightTimeout as e:
+            self.logger.warning(f"⚠️  {str(e)}")
+            return {"error": f"Timeout esperando fundamentales de {ticker}", "ticker": ticker}
+    
+    def _descargar_fundamentales(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
+        """
+        Descarga los datos fundamentales desde el dict info de YFinance
+        
+        Args:
+            ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (opcional)
+        
+        Returns:
+            Dict con datos fundamentales o error
+        """
+        try:
+            # Rate limiting aplicado dentro de _descargar_info (solo si hay descarga)
+            info = self._obtener_info(ticker, contexto)
             
             resultado = {
                 "ticker": ticker,
@@ -316,76 +761,63 @@ class MarketDataManager:
             }
             
             self.logger.info(f"✅ Fundamentales obtenidos para {ticker}")
+            self._guardar_cache(ticker, resultado, tipo="fundamentales")
             return resultado
             
         except Exception as e:
             self.logger.error(f"❌ Error obteniendo fundamentales de {ticker}: {str(e)}")
             return {"error": str(e), "ticker": ticker}
     
-    def obtener_contexto_macro(self) -> Dict[str, Any]:
+    def obtener_contexto_macro(self, contexto: Optional[ContextoDatos] = None) -> Dict[str, Any]:
         """
         Obtiene contexto macro: SPY, VIX, QQQ, etc
         
+        Args:
+            contexto: Contexto de datos del análisis (memoriza el resultado)
+        
+        Returns:
+            Dict con índices principales y volatilidad
+        """
+        if contexto is not None:
+            return contexto.obtener("macro", self._descargar_contexto_macro)
+        return self._descargar_contexto_macro()
+    
+    def _descargar_contexto_macro(self) -> Dict[str, Any]:
+        """
+        Obtiene el contexto macro desde el snapshot compartido
+        (una descarga batch por minuto para todo el proceso)
+        
         Returns:
             Dict con índices principales y volatilidad
         """
         try:
-            indices = {
-                "SPY": yf.Ticker("SPY"),
-                "QQQ": yf.Ticker("QQQ"),
-                "DIA": yf.Ticker("DIA"),
-                "IWM": yf.Ticker("IWM"),
-            }
-            
-            volatilidad = {
-                "VIX": yf.Ticker("^VIX"),  # Índice de volatilidad
-            }
-            
-            resultado = {
-                "indices": {},
-                "volatilidad": {},
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            # Obtener datos de índices
-            for nombre, ticker_obj in indices.items():
-                try:
-                    info = ticker_obj.info
-                    resultado["indices"][nombre] = {
-                        "precio": info.get("currentPrice"),
-                        "cambio_pct": info.get("regularMarketChangePercent"),
-                        "volumen": info.get("volume")
-                    }
-                except:
-                    pass
-            
-            # Obtener volatilidad
-            try:
-                vix_info = volatilidad["VIX"].info
-                resultado["volatilidad"]["VIX"] = vix_info.get("currentPrice")
-            except:
-                pass
-            
-            self.logger.info(f"✅ Contexto macro obtenido")
+            resultado = obtener_servicio_macro(self._rate_limiter).obtener()
+            self.logger.info(f"✅ Contexto macro obtenido (edad {resultado.get('edad_segundos', 0)}s)")
             return resultado
             
         except Exception as e:
             self.logger.error(f"❌ Error obteniendo contexto macro: {str(e)}")
             return {"error": str(e)}
     
-    def obtener_tendencia(self, ticker: str, periodo_dias: int = 20) -> Dict[str, Any]:
+    def obtener_tendencia(
+        self,
+        ticker: str,
+        periodo_dias: int = 20,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
         """
         Calcula tendencia: alcista, bajista, lateral
         
         Args:
             ticker: Símbolo del instrumento
             periodo_dias: Período para calcular tendencia
+            contexto: Contexto de datos del análisis (recorta el histórico ya descargado)
         
         Returns:
             Dict con: tendencia, intensidad, cambio%
         """
         try:
-            hist = self.obtener_historico(ticker, periodo="3mo")
+            hist = self.obtener_historico(ticker, periodo="3mo", contexto=contexto)
             
             if hist.empty or len(hist) < periodo_dias:
                 return {"tendencia": "DESCONOCIDA", "ticker": ticker, "error": "Datos insuficientes"}
@@ -431,18 +863,23 @@ class MarketDataManager:
             self.logger.error(f"❌ Error calculando tendencia de {ticker}: {str(e)}")
             return {"error": str(e), "ticker": ticker}
     
-    def obtener_soportes_resistencias(self, ticker: str) -> Dict[str, Any]:
+    def obtener_soportes_resistencias(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
         """
         Calcula soportes y resistencias basado en ATR (más robusto que Pivot Points)
         
         Args:
             ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (recorta el histórico ya descargado)
         
         Returns:
             Dict con niveles S1/S2, R1/R2, ATR-based
         """
         try:
-            hist = self.obtener_historico(ticker, periodo="1mo")
+            hist = self.obtener_historico(ticker, periodo="1mo", contexto=contexto)
             
             if hist.empty or len(hist) < 10:
                 return {"error": "Datos insuficientes", "ticker": ticker}
@@ -507,12 +944,17 @@ class MarketDataManager:
             self.logger.error(f"[ERROR] Calculando S/R de {ticker}: {str(e)}")
             return {"error": str(e), "ticker": ticker}
     
-    def obtener_datos_finviz(self, ticker: str) -> Dict[str, Any]:
+    def obtener_datos_finviz(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, Any]:
         """
         Obtiene datos de Finviz para enriquecimiento de Factor Social
         
         Args:
             ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (memoriza el resultado)
         
         Returns:
             Dict con: insider_trading, analyst_ratings, sentiment, technical
@@ -522,7 +964,13 @@ class MarketDataManager:
             return {"disponible": False, "ticker": ticker}
         
         try:
-            datos = self.finviz_scraper.obtener_datos_completos(ticker)
+            contexto = self._contexto_para(contexto, ticker)
+            if contexto is not None:
+                datos = contexto.obtener(
+                    "finviz", lambda: self.finviz_scraper.obtener_datos_completos(ticker)
+                )
+            else:
+                datos = self.finviz_scraper.obtener_datos_completos(ticker)
             self.logger.info(f"✅ Datos de Finviz obtenidos para {ticker}")
             return datos
             
@@ -530,12 +978,17 @@ class MarketDataManager:
             self.logger.error(f"❌ Error obteniendo datos de Finviz para {ticker}: {str(e)}")
             return {"error": str(e), "ticker": ticker}
     
-    def obtener_insider_summary(self, ticker: str) -> Dict[str, str]:
+    def obtener_insider_summary(
+        self,
+        ticker: str,
+        contexto: Optional[ContextoDatos] = None
+    ) -> Dict[str, str]:
         """
         Obtiene resumen simplificado de insider trading
         
         Args:
             ticker: Símbolo del instrumento
+            contexto: Contexto de datos del análisis (memoriza el resultado)
         
         Returns:
             Dict con: posicion_insider, tendencia_insiders, confianza
@@ -550,7 +1003,13 @@ class MarketDataManager:
             }
         
         try:
-            resumen = self.finviz_scraper.obtener_insider_summary(ticker)
+            contexto = self._contexto_para(contexto, ticker)
+            if contexto is not None:
+                resumen = contexto.obtener(
+                    "insider", lambda: self.finviz_scraper.obtener_insider_summary(ticker)
+                )
+            else:
+                resumen = self.finviz_scraper.obtener_insider_summary(ticker)
             self.logger.info(f"✅ Insider summary obtenido para {ticker}")
             return resumen
             
@@ -576,5 +1035,14 @@ class MarketDataManager:
             "insider_trading": "✅ Disponible" if self.finviz_scraper else "⚠️  No disponible",
             "polygon_io": "✅ Disponible" if self.polygon_api_key else "⚠️  No configurado",
             "alpha_vantage": "✅ Disponible" if self.alpha_vantage_key else "⚠️  No configurado",
+            "rate_limiter": self._rate_limiter.get_stats(),
+            "coalescencia": self._single_flight.get_stats(),
+            "cache": self._request_cache.get_stats(),
+            "stale_while_revalidate": "✅ Activo" if self.stale_while_revalidate else "Desactivado",
+            "snapshot_macro": obtener_servicio_macro(self._rate_limiter).get_stats(),
+            "almacen_ohlcv": (
+                self._obtener_almacen(self.almacen_dir).get_stats()
+                if self.usar_almacen_local else "⚠️  Desactivado"
+            ),
             "estado": "Operativo"
         }
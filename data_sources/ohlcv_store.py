@@ -0,0 +1,352 @@
+"""
+data_sources/ohlcv_store.py
+Almacén local de series OHLCV en disco (columnar, numpy memmap)
+Un par de archivos .npy por ticker/intervalo + manifest JSON con los rangos cubiertos
+Permite servir históricos localmente y descargar solo las barras nuevas
+"""
+
+import json
+import logging
+import os
+import re
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Any, Tuple
+
+import numpy as np
+import pandas as pd
+
+
+# Períodos de yfinance expresados en días naturales
+PERIODOS_DIAS = {
+    "1d": 1,
+    "5d": 5,
+    "1mo": 31,
+    "3mo": 92,
+    "6mo": 183,
+    "1y": 366,
+    "2y": 731,
+    "5y": 1827,
+    "10y": 3653,
+}
+
+# Intervalos que se persisten (las barras intradía cambian demasiado para cachearlas)
+INTERVALOS_ALMACENABLES = {"1d", "5d", "1wk", "1mo", "3mo"}
+
+# Días naturales que la primera barra agregada puede empezar después del inicio del período
+TOLERANCIA_INTERVALO_DIAS = {"5d": 7, "1wk": 7, "1mo": 31, "3mo": 92}
+
+
+def inicio_periodo(periodo: str, ahora: Optional[datetime] = None) -> Optional[pd.Timestamp]:
+    """
+    Convierte un período de yfinance en la fecha de inicio equivalente
+
+    Args:
+        periodo: "1mo", "1y", "ytd", "max", etc
+        ahora: Fecha de referencia (default: ahora)
+
+    Returns:
+        Timestamp UTC de inicio, o None para "max" (toda la historia)
+    """
+    ahora = pd.Timestamp(ahora, tz="UTC") if ahora is not None else pd.Timestamp.now(tz="UTC")
+    if periodo == "max":
+        return None
+    if periodo == "ytd":
+        return pd.Timestamp(year=ahora.year, month=1, day=1, tz="UTC")
+    if periodo not in PERIODOS_DIAS:
+        raise ValueError(f"Período no soportado por el almacén: {periodo}")
+    return (ahora - timedelta(days=PERIODOS_DIAS[periodo])).normalize()
+
+
+class OHLCVStore:
+    """
+    Almacén columnar de barras OHLCV por ticker/intervalo
+
+    Layout en disco:
+        base_dir/manifest.json
+        base_dir/<intervalo>/<TICKER>.idx.npy   (int64, ns UTC)
+        base_dir/<intervalo>/<TICKER>.val.npy   (float64, filas x columnas)
+        base_dir/<intervalo>/<TICKER>.<nombre>.json  (estado derivado, ej: indicadores)
+
+    Las lecturas usan np.load(mmap_mode="r"), así que una consulta en
+    caliente no copia el archivo completo ni toca la red.
+    """
+
+    def __init__(self, base_dir: str = "data/ohlcv"):
+        """
+        Args:
+            base_dir: Directorio raíz del almacén
+        """
+        self.logger = logging.getLogger("OHLCVStore")
+        self.base_dir = base_dir
+        self._manifest_path = os.path.join(base_dir, "manifest.json")
+        self._lock = threading.RLock()
+        os.makedirs(base_dir, exist_ok=True)
+        self._manifest: Dict[str, Dict[str, Any]] = self._cargar_manifest()
+
+    # ------------------------------------------------------------------
+    # Manifest
+    # ------------------------------------------------------------------
+
+    @staticmethod
+    def _clave(ticker: str, intervalo: str) -> str:
+        return f"{ticker.upper()}|{intervalo}"
+
+    def _cargar_manifest(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        try:
+            with open(self._manifest_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            self.logger.warning(f"⚠️  Manifest corrupto, se reconstruirá: {str(e)}")
+            return {}
+
+    def _guardar_manifest(self) -> None:
+        tmp = self._manifest_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self._manifest, f, indent=2, sort_keys=True)
+        os.replace(tmp, self._manifest_path)
+
+    def cobertura(self, ticker: str, intervalo: str = "1d") -> Optional[Dict[str, Any]]:
+        """
+        Obtiene la entrada del manifest para un ticker/intervalo
+
+        Returns:
+            Dict con: rangos, filas, columnas, tz, desde_inicio, verificado
+        """
+        with self._lock:
+            entrada = self._manifest.get(self._clave(ticker, intervalo))
+            return dict(entrada) if entrada else None
+
+    def marcar_verificado(self, ticker: str, intervalo: str = "1d") -> None:
+        """Registra que la serie se comprobó contra el proveedor (aunque no hubiera barras nuevas)"""
+        with self._lock:
+            entrada = self._manifest.get(self._clave(ticker, intervalo))
+            if entrada:
+                entrada["verificado"] = time.time()
+                self._guardar_manifest()
+
+    # ------------------------------------------------------------------
+    # Lectura / escritura
+    # ------------------------------------------------------------------
+
+    def _rutas(self, ticker: str, intervalo: str) -> Tuple[str, str]:
+        nombre = re.sub(r"[^A-Za-z0-9._-]", "_", ticker.upper())
+        carpeta = os.path.join(self.base_dir, intervalo)
+        return (
+            os.path.join(carpeta, f"{nombre}.idx.npy"),
+            os.path.join(carpeta, f"{nombre}.val.npy"),
+        )
+
+    def leer(
+        self,
+        ticker: str,
+        intervalo: str = "1d",
+        desde: Optional[pd.Timestamp] = None
+    ) -> pd.DataFrame:
+        """
+        Lee barras almacenadas
+
+        Args:
+            ticker: Símbolo del instrumento
+            intervalo: Intervalo de las barras
+            desde: Si se indica, solo barras con fecha >= desde
+
+        Returns:
+            DataFrame con el mismo formato que yfinance (vacío si no hay datos)
+        """
+        with self._lock:
+            entrada = self._manifest.get(self._clave(ticker, intervalo))
+            if not entrada:
+                return pd.DataFrame()
+            ruta_idx, ruta_val = self._rutas(ticker, intervalo)
+            try:
+                idx = np.load(ruta_idx, mmap_mode="r")
+                val = np.load(ruta_val, mmap_mode="r")
+            except (OSError, ValueError) as e:
+                self.logger.warning(f"⚠️  Archivos dañados para {ticker} ({intervalo}): {str(e)}")
+                return pd.DataFrame()
+
+            inicio = 0
+            if desde is not None:
+                inicio = int(np.searchsorted(idx, pd.Timestamp(desde).value, side="left"))
+
+            indice = pd.DatetimeIndex(pd.to_datetime(np.asarray(idx[inicio:]), utc=True))
+            if entrada.get("tz"):
+                indice = indice.tz_convert(entrada["tz"])
+            indice.name = "Date"
+            return pd.DataFrame(np.array(val[inicio:]), index=indice, columns=entrada["columnas"])
+
+    def escribir(
+        self,
+        ticker: str,
+        df: pd.DataFrame,
+        intervalo: str = "1d",
+        desde_inicio: bool = False
+    ) -> int:
+        """
+        Fusiona barras nuevas con las almacenadas (las nuevas ganan en solapes)
+
+        Args:
+            ticker: Símbolo del instrumento
+            df: DataFrame OHLCV de yfinance
+            intervalo: Intervalo de las barras
+            desde_inicio: True si df contiene toda la historia disponible ("max")
+
+        Returns:
+            Número total de barras almacenadas tras la fusión
+        """
+        if df is None or df.empty:
+            return len(self.leer(ticker, intervalo))
+
+        nuevo = df.select_dtypes(include=[np.number]).astype("float64")
+        indice = pd.DatetimeIndex(nuevo.index)
+        tz = str(indice.tz) if indice.tz is not None else None
+        nuevo.index = indice.tz_localize("UTC") if indice.tz is None else indice.tz_convert("UTC")
+
+        with self._lock:
+            clave = self._clave(ticker, intervalo)
+            entrada = self._manifest.get(clave, {})
+            existente = self.leer(ticker, intervalo)
+            if not existente.empty:
+                existente.index = existente.index.tz_convert("UTC")
+                columnas = list(dict.fromkeys(list(existente.columns) + list(nuevo.columns)))
+                combinado = pd.concat([
+                    existente.reindex(columns=columnas),
+                    nuevo.reindex(columns=columnas),
+                ])
+                combinado = combinado[~combinado.index.duplicated(keep="last")].sort_index()
+            else:
+                combinado = nuevo[~nuevo.index.duplicated(keep="last")].sort_index()
+
+            ruta_idx, ruta_val = self._rutas(ticker, intervalo)
+            os.makedirs(os.path.dirname(ruta_idx), exist_ok=True)
+            # Escritura atómica: los lectores con mmap abierto conservan el archivo anterior
+            for ruta, datos in (
+                (ruta_idx, combinado.index.values.astype("datetime64[ns]").astype(np.int64)),
+                (ruta_val, combinado.to_numpy(dtype=np.float64)),
+            ):
+                tmp = ruta + ".tmp"
+                with open(tmp, "wb") as f:
+                    np.save(f, datos)
+                os.replace(tmp, ruta)
+
+            self._manifest[clave] = {
+                "ticker": ticker.upper(),
+                "intervalo": intervalo,
+                "columnas": list(combinado.columns),
+                "tz": tz or entrada.get("tz"),
+                "filas": int(len(combinado)),
+                "rangos": [[combinado.index[0].isoformat(), combinado.index[-1].isoformat()]],
+                "desde_inicio": bool(desde_inicio or entrada.get("desde_inicio", False)),
+                "verificado": time.time(),
+            }
+            self._guardar_manifest()
+            return len(combinado)
+
+    def cubre_desde(self, ticker: str, intervalo: str, inicio: Optional[pd.Timestamp]) -> bool:
+        """
+        True si el almacén contiene barras desde `inicio` (None = toda la historia)
+
+        En barras diarias la primera barra debe caer, como tarde, en la
+        sesión hábil siguiente a la primera esperada (un feriado de margen).
+        El margen en días naturales escala con el período (hasta 3 días, por
+        el redondeo de meses de yfinance), así que un "5d" pedido tras un
+        "1d" no se da por cubierto. En intervalos agregados el margen es la
+        duración de una barra.
+        """
+        entrada = self.cobertura(ticker, intervalo)
+        if not entrada or not entrada.get("rangos"):
+            return False
+        if entrada.get("desde_inicio"):
+            return True
+        if inicio is None:
+            return False
+        primera = pd.Timestamp(entrada["rangos"][0][0])
+        if intervalo in TOLERANCIA_INTERVALO_DIAS:
+            return primera <= inicio + timedelta(days=TOLERANCIA_INTERVALO_DIAS[intervalo])
+        primera = (primera.tz_convert("UTC") if primera.tz is not None else primera.tz_localize("UTC")).normalize()
+        inicio = inicio.tz_convert("UTC") if inicio.tz is not None else inicio.tz_localize("UTC")
+        margen = min(3, max(0, (pd.Timestamp.now(tz="UTC") - inicio).days // 10))
+        primera_sesion = pd.offsets.BDay().rollforward(inicio.normalize() + timedelta(days=margen))
+        return primera <= primera_sesion + pd.offsets.BDay(1)
+
+    def ultima_fecha(self, ticker: str, intervalo: str = "1d") -> Optional[pd.Timestamp]:
+        """Fecha (UTC) de la última barra almacenada"""
+        entrada = self.cobertura(ticker, intervalo)
+        if not entrada or not entrada.get("rangos"):
+            return None
+        return pd.Timestamp(entrada["rangos"][-1][1])
+
+    # ------------------------------------------------------------------
+    # Estado derivado (junto a la serie)
+    # ------------------------------------------------------------------
+
+    def ruta_estado(self, ticker: str, intervalo: str = "1d", nombre: str = "indicadores") -> str:
+        """Ruta del JSON de estado derivado de una serie"""
+        ruta_idx, _ = self._rutas(ticker, intervalo)
+        return ruta_idx[:-len(".idx.npy")] + f".{nombre}.json"
+
+    def leer_estado(
+        self,
+        ticker: str,
+        intervalo: str = "1d",
+        nombre: str = "indicadores"
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Lee el estado derivado guardado junto a la serie
+
+        Returns:
+            Dict guardado o None si no existe o está dañado
+        """
+        ruta = self.ruta_estado(ticker, intervalo, nombre)
+        if not os.path.exists(ruta):
+            return None
+        try:
+            with open(ruta, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            self.logger.warning(f"⚠️  Estado '{nombre}' dañado para {ticker}, se reconstruirá: {str(e)}")
+            return None
+
+    def guardar_estado(
+        self,
+        ticker: str,
+        estado: Dict[str, Any],
+        intervalo: str = "1d",
+        nombre: str = "indicadores"
+    ) -> None:
+        """Guarda (atómicamente) un estado derivado junto a la serie"""
+        ruta = self.ruta_estado(ticker, intervalo, nombre)
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        tmp = f"{ruta}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(estado, f)
+        os.replace(tmp, ruta)
+
+    def eliminar(self, ticker: str, intervalo: str = "1d") -> None:
+        """Elimina la serie almacenada de un ticker/intervalo (y su estado derivado)"""
+        with self._lock:
+            ruta_idx, _ = self._rutas(ticker, intervalo)
+            prefijo = os.path.basename(ruta_idx)[:-len("idx.npy")]
+            carpeta = os.path.dirname(ruta_idx)
+            derivados = [
+                os.path.join(carpeta, f) for f in (os.listdir(carpeta) if os.path.isdir(carpeta) else [])
+                if f.startswith(prefijo) and f.endswith(".json")
+            ]
+            for ruta in list(self._rutas(ticker, intervalo)) + derivados:
+                if os.path.exists(ruta):
+                    os.remove(ruta)
+            if self._manifest.pop(self._clave(ticker, intervalo), None) is not None:
+                self._guardar_manifest()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Resumen del almacén: series y barras almacenadas"""
+        with self._lock:
+            return {
+                "directorio": self.base_dir,
+                "series": len(self._manifest),
+                "barras_totales": sum(e.get("filas", 0) for e in self._manifest.values()),
+            }
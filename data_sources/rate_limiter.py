@@ -0,0 +1,240 @@
+"""
+data_sources/rate_limiter.py
+Rate limiting con token buckets por ticker y por proveedor
+Reserva el turno bajo un lock corto y espera FUERA del lock, de modo que
+un ticker lento nunca bloquea a los hilos que piden símbolos distintos
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from typing import Dict, Optional, Any, Tuple
+
+
+class TokenBucket:
+    """
+    Token bucket con reservas a crédito
+
+    Cada reserva consume un token aunque no haya disponibles: el saldo
+    negativo representa turnos ya reservados en la cola y determina cuánto
+    debe esperar el solicitante. No es thread-safe por sí mismo; el
+    RateLimiter lo protege con su lock.
+    """
+
+    def __init__(self, tasa: float, capacidad: float = 1.0):
+        """
+        Args:
+            tasa: Tokens repuestos por segundo
+            capacidad: Máximo de tokens acumulables (tamaño de ráfaga)
+        """
+        if tasa <= 0:
+            raise ValueError("La tasa del token bucket debe ser positiva")
+        self.tasa = float(tasa)
+        self.capacidad = max(1.0, float(capacidad))
+        self._tokens = self.capacidad
+        self._ultima_actualizacion = time.monotonic()
+
+    def _reponer(self, ahora: float) -> None:
+        transcurrido = max(0.0, ahora - self._ultima_actualizacion)
+        self._tokens = min(self.capacidad, self._tokens + transcurrido * self.tasa)
+        self._ultima_actualizacion = ahora
+
+    def reservar(self, ahora: float) -> float:
+        """
+        Reserva un token
+
+        Returns:
+            Segundos que el solicitante debe esperar (0 si hay token disponible)
+        """
+        self._reponer(ahora)
+        self._tokens -= 1.0
+        if self._tokens >= 0:
+            return 0.0
+        return -self._tokens / self.tasa
+
+    def devolver(self) -> None:
+        """Devuelve un token reservado que finalmente no se usará"""
+        self._tokens = min(self.capacidad, self._tokens + 1.0)
+
+    def esta_lleno(self, ahora: float) -> bool:
+        """True si el bucket está lleno (equivalente a uno recién creado)"""
+        self._reponer(ahora)
+        return self._tokens >= self.capacidad
+
+
+class RateLimiter:
+    """
+    Rate limiter con un bucket por ticker y un bucket por proveedor
+
+    El lock solo protege la contabilidad de tokens (microsegundos); la
+    espera ocurre fuera de él con time.sleep o asyncio.sleep. Así el
+    throughput escala con el número de tickers distintos y queda acotado
+    únicamente por el límite global del proveedor.
+
+    Ejemplo:
+        limiter = RateLimiter(intervalo_minimo_ticker=0.5,
+                              limites_proveedor={"yfinance": (10.0, 20)})
+        limiter.adquirir("AAPL")
+        await limiter.adquirir_async("MSFT")
+    """
+
+    def __init__(
+        self,
+        intervalo_minimo_ticker: float = 0.5,
+        rafaga_ticker: int = 1,
+        limites_proveedor: Optional[Dict[str, Tuple[float, int]]] = None,
+        max_buckets: int = 10000
+    ):
+        """
+        Args:
+            intervalo_minimo_ticker: Segundos mínimos entre solicitudes al mismo ticker
+            rafaga_ticker: Solicitudes permitidas en ráfaga por ticker
+            limites_proveedor: {proveedor: (solicitudes_por_segundo, rafaga)}
+            max_buckets: Máximo de buckets por ticker antes de purgar los inactivos
+        """
+        self.logger = logging.getLogger("RateLimiter")
+        self.intervalo_minimo_ticker = intervalo_minimo_ticker
+        self.rafaga_ticker = rafaga_ticker
+        self.limites_proveedor = dict(limites_proveedor or {})
+        self.max_buckets = max_buckets
+
+        self._lock = threading.Lock()
+        self._buckets_ticker: Dict[Tuple[str, str], TokenBucket] = {}
+        self._buckets_proveedor: Dict[str, TokenBucket] = {}
+        self._stats = {
+            "solicitudes": 0,
+            "esperas": 0,
+            "tiempo_espera_total": 0.0,
+            "throttles_ticker": 0,
+            "throttles_proveedor": 0,
+            "rechazos": 0,
+            "buckets_purgados": 0,
+        }
+
+    def _bucket_ticker(self, ticker: str, proveedor: str) -> Optional[TokenBucket]:
+        if self.intervalo_minimo_ticker <= 0:
+            return None
+        clave = (proveedor, ticker)
+        bucket = self._buckets_ticker.get(clave)
+        if bucket is None:
+            if len(self._buckets_ticker) >= self.max_buckets:
+                self._purgar_inactivos()
+            bucket = TokenBucket(1.0 / self.intervalo_minimo_ticker, self.rafaga_ticker)
+            self._buckets_ticker[clave] = bucket
+        return bucket
+
+    def _bucket_proveedor(self, proveedor: str) -> Optional[TokenBucket]:
+        limite = self.limites_proveedor.get(proveedor)
+        if not limite:
+            return None
+        bucket = self._buckets_proveedor.get(proveedor)
+        if bucket is None:
+            tasa, rafaga = limite
+            bucket = TokenBucket(tasa, rafaga)
+            self._buckets_proveedor[proveedor] = bucket
+        return bucket
+
+    def _purgar_inactivos(self) -> None:
+        """Elimina buckets llenos: equivalen a uno nuevo, así que no se pierde estado"""
+        ahora = time.monotonic()
+        inactivos = [c for c, b in self._buckets_ticker.items() if b.esta_lleno(ahora)]
+        for clave in inactivos:
+            del self._buckets_ticker[clave]
+        self._stats["buckets_purgados"] += len(inactivos)
+
+    def reservar(
+        self,
+        ticker: str,
+        proveedor: str = "yfinance",
+        max_espera: Optional[float] = None
+    ) -> Optional[float]:
+        """
+        Reserva un turno sin esperar
+
+        Args:
+            ticker: Símbolo del ticker
+            proveedor: Nombre del proveedor de datos
+            max_espera: Si la espera supera este valor se cancela la reserva
+
+        Returns:
+            Segundos a esperar antes de hacer la solicitud, o None si se rechazó
+        """
+        with self._lock:
+            ahora = time.monotonic()
+            bucket_t = self._bucket_ticker(ticker, proveedor)
+            bucket_p = self._bucket_proveedor(proveedor)
+
+            espera_t = bucket_t.reservar(ahora) if bucket_t else 0.0
+            espera_p = bucket_p.reservar(ahora) if bucket_p else 0.0
+            espera = max(espera_t, espera_p)
+
+            if max_espera is not None and espera > max_espera:
+                if bucket_t:
+                    bucket_t.devolver()
+                if bucket_p:
+                    bucket_p.devolver()
+                self._stats["rechazos"] += 1
+                return None
+
+            self._stats["solicitudes"] += 1
+            if espera > 0:
+                self._stats["esperas"] += 1
+                self._stats["tiempo_espera_total"] += espera
+                if espera_t >= espera_p:
+                    self._stats["throttles_ticker"] += 1
+                else:
+                    self._stats["throttles_proveedor"] += 1
+            return espera
+
+    def adquirir(
+        self,
+        ticker: str,
+        proveedor: str = "yfinance",
+        max_espera: Optional[float] = None
+    ) -> bool:
+        """
+        Reserva un turno y espera (fuera del lock) hasta que llegue
+
+        Returns:
+            True si se obtuvo el turno, False si se rechazó por max_espera
+        """
+        espera = self.reservar(ticker, proveedor, max_espera)
+        if espera is None:
+            return False
+        if espera > 0:
+            self.logger.debug(f"⏱️  Rate limit: Esperando {espera:.2f}s para {ticker} ({proveedor})")
+            time.sleep(espera)
+        return True
+
+    async def adquirir_async(
+        self,
+        ticker: str,
+        proveedor: str = "yfinance",
+        max_espera: Optional[float] = None
+    ) -> bool:
+        """Versión async de adquirir(): espera con asyncio.sleep sin bloquear el loop"""
+        espera = self.reservar(ticker, proveedor, max_espera)
+        if espera is None:
+            return False
+        if espera > 0:
+            self.logger.debug(f"⏱️  Rate limit async: Esperando {espera:.2f}s para {ticker} ({proveedor})")
+            await asyncio.sleep(espera)
+        return True
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Obtiene contadores de solicitudes, esperas y throttles"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["buckets_ticker_activos"] = len(self._buckets_ticker)
+            stats["proveedores"] = list(self.limites_proveedor.keys())
+        stats["tiempo_espera_total"] = round(stats["tiempo_espera_total"], 3)
+        return stats
+
+    def reset(self) -> None:
+        """Descarta todos los buckets y contadores"""
+        with self._lock:
+            self._buckets_ticker.clear()
+            self._buckets_proveedor.clear()
+            for clave in self._stats:
+                self._stats[clave] = 0.0 if clave == "tiempo_espera_total" else 0
@@ -0,0 +1,114 @@
+"""
+data_sources/single_flight.py
+Coalescencia de solicitudes concurrentes (single-flight)
+El primer hilo que pide una clave ejecuta la descarga; los demás esperan
+su Future y comparten el resultado (o la excepción)
+"""
+
+import logging
+import threading
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from typing import Dict, Any, Callable, Hashable, Optional, Tuple
+
+
+class SingleFlightTimeout(TimeoutError):
+    """El seguidor agotó el tiempo de espera del resultado del líder"""
+
+
+class SingleFlight:
+    """
+    Agrupa llamadas concurrentes con la misma clave en una sola ejecución
+
+    Ejemplo:
+        flight = SingleFlight(timeout_espera=30)
+        datos = flight.ejecutar(("actuales", "AAPL"), lambda: descargar("AAPL"))
+    """
+
+    def __init__(self, timeout_espera: Optional[float] = 30.0):
+        """
+        Args:
+            timeout_espera: Segundos máximos que un seguidor espera al líder (None = sin límite)
+        """
+        self.logger = logging.getLogger("SingleFlight")
+        self.timeout_espera = timeout_espera
+        self._lock = threading.Lock()
+        self._en_vuelo: Dict[Hashable, Future] = {}
+        self._stats = {
+            "ejecuciones": 0,
+            "compartidas": 0,
+            "errores_compartidos": 0,
+            "timeouts": 0,
+        }
+
+    def ejecutar_con_estado(
+        self,
+        clave: Hashable,
+        funcion: Callable[[], Any],
+        timeout: Optional[float] = None
+    ) -> Tuple[Any, bool]:
+        """
+        Ejecuta `funcion` o espera a la ejecución en curso con la misma clave
+
+        Args:
+            clave: Identificador de la solicitud (ej: ("historico", "AAPL", "1y", "1d"))
+            funcion: Función sin argumentos que realiza la descarga
+            timeout: Espera máxima del seguidor (default: timeout_espera)
+
+        Returns:
+            Tupla (resultado, compartido) donde compartido=True si lo produjo otro hilo
+
+        Raises:
+            SingleFlightTimeout: Si el seguidor agota la espera
+            Exception: La misma excepción que lanzó el líder
+        """
+        with self._lock:
+            futuro = self._en_vuelo.get(clave)
+            es_lider = futuro is None
+            if es_lider:
+                futuro = Future()
+                self._en_vuelo[clave] = futuro
+                self._stats["ejecuciones"] += 1
+            else:
+                self._stats["compartidas"] += 1
+
+        if es_lider:
+            try:
+                resultado = funcion()
+            except BaseException as e:
+                futuro.set_exception(e)
+                raise
+            else:
+                futuro.set_result(resultado)
+                return resultado, False
+            finally:
+                with self._lock:
+                    self._en_vuelo.pop(clave, None)
+
+        espera = self.timeout_espera if timeout is None else timeout
+        try:
+            return futuro.result(timeout=espera), True
+        except FutureTimeoutError:
+            with self._lock:
+                self._stats["timeouts"] += 1
+            raise SingleFlightTimeout(f"Timeout ({espera}s) esperando solicitud en curso: {clave}")
+        except Exception:
+            with self._lock:
+                self._stats["errores_compartidos"] += 1
+            raise
+
+    def ejecutar(
+        self,
+        clave: Hashable,
+        funcion: Callable[[], Any],
+        timeout: Optional[float] = None
+    ) -> Any:
+        """Igual que ejecutar_con_estado() pero devuelve solo el resultado"""
+        resultado, _ = self.ejecutar_con_estado(clave, funcion, timeout)
+        return resultado
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Contadores de ejecuciones reales vs. resultados compartidos"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["en_vuelo"] = len(self._en_vuelo)
+        return stats
@@ -7,148 +7,413 @@ Entrena modelos para predecir:
 3. Volatilidad futura
 """
 
+import copy
+import hashlib
+import json
 import logging
+import threading
 import numpy as np
 import pandas as pd
-from typing import Dict, Tuple, Any, Optional
+from dataclasses import dataclass, replace
+from numpy.lib.stride_tricks import sliding_window_view
+from typing import Callable, Dict, List, Tuple, Any, Optional
 from datetime import datetime, timedelta
 from sklearn.preprocessing import StandardScaler
-from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
 from sklearn.linear_model import LinearRegression
 from sklearn.model_selection import train_test_split
 import pickle
 import os
 
+from data_sources.feature_store import AlmacenFeatures, ConjuntoFeatures, obtener_almacen_features
+from .model_registry import RegistroModelos
+from .model_selection import (
+    CANDIDATOS, CANDIDATOS_BASE, comparar_candidatos, guardar_seleccion, leer_seleccion
+)
+
 logger = logging.getLogger("MLPredictions")
 
+# Ventana de cierres de cada fila de features y columnas de la matriz
+VENTANA_FEATURES = 20
+# Barras posteriores a la ventana que miden las etiquetas (dirección y volatilidad)
+HORIZONTE_ETIQUETAS = 5
+NUM_FEATURES = 20
+COLUMNAS_FEATURES = (
+    "momentum", "volatilidad_retornos", "rsi", "rango_max_min", "momentum_2",
+    "momentum_ajustado", "tendencia_sma", "sma10_sma20", "desviacion_precio",
+    "variacion_media_abs",
+) + tuple(f"relleno_{i}" for i in range(10, NUM_FEATURES))
+
+# Tipo de predicción -> (atributo del modelo, formateador del resultado)
+_MODELOS_PREDICCION = {
+    "precio": ("price_direction_model", "_formatear_direccion"),
+    "volatilidad": ("volatility_model", "_formatear_volatilidad"),
+    "confianza": ("confidence_model", "_formatear_confianza"),
+}
+TIPOS_PREDICCION = tuple(_MODELOS_PREDICCION)
+
+
+def extraer_features_ventana(close: np.ndarray, periodo_rsi: int = 14, todas: bool = False) -> np.ndarray:
+    """
+    Matriz de features de MLPredictor._extract_features para toda la serie
+
+    Fila j = ventana close[j:j+20] (filas i = 20..len(close)-6 del bucle
+    original). Todas las filas se calculan a la vez sobre vistas deslizantes
+    de numpy, sin copiar ventanas.
+
+    Args:
+        close: Cierres (1D)
+        periodo_rsi: Período del RSI de medias simples
+        todas: Incluir también las ventanas de las últimas 5 barras (sin etiqueta)
+
+    Returns:
+        Array (len(close) - 25) x 20, o (len(close) - 19) x 20 con `todas`;
+        columnas 10..19 a cero (relleno)
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(-1)
+    filas = len(close) - VENTANA_FEATURES + 1 if todas else len(close) - VENTANA_FEATURES - 5
+    X = np.zeros((max(filas, 0), NUM_FEATURES))
+    if filas <= 0:
+        return X
+
+    ventanas = sliding_window_view(close, VENTANA_FEATURES)[:filas]
+    deltas = np.diff(close)
+    ventanas_delta = sliding_window_view(deltas, VENTANA_FEATURES - 1)[:filas]
+    ventanas_retorno = sliding_window_view(deltas / close[:-1], VENTANA_FEATURES - 1)[:filas]
+
+    primero, ultimo = ventanas[:, 0], ventanas[:, -1]
+    sma_10 = ventanas[:, -10:].mean(axis=1)
+    sma_20 = ventanas.mean(axis=1)
+    momentum = (ultimo - primero) / primero
+
+    # RSI de las últimas `periodo_rsi` variaciones de cada ventana
+    desde = VENTANA_FEATURES - 1 - periodo_rsi
+    ganancias = sliding_window_view(np.where(deltas > 0, deltas, 0), periodo_rsi)[desde:desde + filas]
+    perdidas = sliding_window_view(np.where(deltas < 0, -deltas, 0), periodo_rsi)[desde:desde + filas]
+    avg_gain, avg_loss = ganancias.mean(axis=1), perdidas.mean(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        rsi = 100 - (100 / (1 + avg_gain / avg_loss))
+    rsi = np.where(avg_loss == 0, np.where(avg_gain > 0, 100.0, 50.0), rsi)
+
+    X[:, 0] = momentum
+    X[:, 1] = ventanas_retorno.std(axis=1)
+    X[:, 2] = rsi
+    X[:, 3] = ventanas.max(axis=1) / ventanas.min(axis=1)
+    X[:, 4] = momentum
+    X[:, 5] = momentum / (ventanas_delta.std(axis=1) + 0.0001)
+    X[:, 6] = (ultimo > sma_10) & (sma_10 > sma_20)
+    X[:, 7] = sma_10 / sma_20
+    X[:, 8] = ventanas.std(axis=1)
+    X[:, 9] = np.abs(ventanas_delta).mean(axis=1)
+    return X
+
+
+def etiquetas_ventana(close: np.ndarray, filas: int) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Etiquetas de las primeras `filas` ventanas de extraer_features_ventana
+
+    La ventana j termina en close[j+19]; sus etiquetas solo miran barras
+    posteriores: dirección = close[j+24] > close[j+19] y volatilidad
+    realizada = std de los retornos close[j+19] -> close[j+24].
+
+    Returns:
+        (dirección 0/1, volatilidad realizada futura)
+    """
+    close = np.asarray(close, dtype=np.float64).reshape(-1)
+    fin = VENTANA_FEATURES - 1
+    filas = max(min(filas, len(close) - fin - HORIZONTE_ETIQUETAS), 0)
+    base = close[fin:fin + filas]
+    direccion = (close[fin + HORIZONTE_ETIQUETAS:fin + HORIZONTE_ETIQUETAS + filas] > base).astype(int)
+    retornos = np.diff(close) / close[:-1]
+    volatilidad = sliding_window_view(retornos, HORIZONTE_ETIQUETAS)[fin:fin + filas].std(axis=1, ddof=1)
+    return direccion, volatilidad
+
+
+def hash_esquema_features() -> str:
+    """Hash de las columnas de features (identifica modelos compatibles)"""
+    esquema = {"columnas": COLUMNAS_FEATURES, "ventana": VENTANA_FEATURES}
+    return hashlib.sha256(json.dumps(esquema).encode("utf-8")).hexdigest()[:16]
+
+
+def _features_todas_las_ventanas(close: np.ndarray) -> np.ndarray:
+    return extraer_features_ventana(close, todas=True)
+
+
+# Features de entrenamiento en el almacén compartido (una fila por ventana de 20 cierres)
+CONJUNTO_FEATURES = ConjuntoFeatures(
+    nombre="ia_tecnicas",
+    version=hash_esquema_features(),
+    columnas=COLUMNAS_FEATURES,
+    historia=VENTANA_FEATURES - 1,
+    calcular=_features_todas_las_ventanas
+)
+
+
+# Versiones del registro que se conservan tras cada publicación (la activa nunca se borra)
+VERSIONES_CONSERVADAS = 5
+
+# Entrenamiento incremental: filas por ticker en la ventana y crecimiento por actualización
+VENTANA_BARRAS_INCREMENTAL = 252
+ARBOLES_POR_ACTUALIZACION = 20
+MAX_ARBOLES = 200
+ETAPAS_POR_ACTUALIZACION = 20
+MAX_ETAPAS = 300
+
+
+def _ampliar_modelo(
+    modelo: Any, constructor: Callable[[], Any], X: np.ndarray, y: np.ndarray
+) -> Tuple[Any, str]:
+    """
+    Amplía una copia del modelo con warm_start sobre la ventana reciente
+    
+    RandomForest: añade ARBOLES_POR_ACTUALIZACION árboles y descarta los más
+    antiguos por encima de MAX_ARBOLES. (Hist)GradientBoosting: añade etapas
+    que corrigen el error sobre la ventana; al superar MAX_ETAPAS (o si
+    cambian las clases) se reentrena con `constructor` sobre la ventana.
+    
+    Returns:
+        (modelo, "ampliado" | "reentrenado")
+    """
+    if modelo is None or not np.array_equal(np.unique(y), modelo.classes_):
+        return constructor().fit(X, y), "reentrenado"
+    
+    modelo = copy.deepcopy(modelo)
+    if isinstance(modelo, RandomForestClassifier):
+        modelo.set_params(warm_start=True, n_estimators=len(modelo.estimators_) + ARBOLES_POR_ACTUALIZACION)
+        modelo.fit(X, y)
+        if len(modelo.estimators_) > MAX_ARBOLES:
+            modelo.estimators_ = modelo.estimators_[-MAX_ARBOLES:]
+            modelo.n_estimators = MAX_ARBOLES
+    else:
+        hist = isinstance(modelo, HistGradientBoostingClassifier)
+        etapas = (modelo.n_iter_ if hist else modelo.n_estimators_) + ETAPAS_POR_ACTUALIZACION
+        if etapas > MAX_ETAPAS:
+            return constructor().fit(X, y), "reentrenado"
+        modelo.set_params(warm_start=True, **{"max_iter" if hist else "n_estimators": etapas})
+        modelo.fit(X, y)
+    modelo.set_params(warm_start=False)
+    return modelo, "ampliado"
+
+
+@dataclass(frozen=True)
+class ConjuntoModelos:
+    """
+    Scaler y modelos que se sirven juntos
+
+    Inmutable: el predictor lo reemplaza con una sola asignación, así una
+    predicción en curso nunca combina el scaler de un entrenamiento con los
+    modelos de otro.
+    """
+    scaler: Any = None
+    price_direction_model: Any = None
+    volatility_model: Any = None
+    confidence_model: Any = None
+    version: Optional[str] = None
+
 
 class MLPredictor:
     """Predictor de ML para mercado financiero"""
     
-    def __init__(self, model_dir: str = "models"):
+    def __init__(
+        self,
+        model_dir: str = "models",
+        carga_diferida: bool = True,
+        almacen_features: Optional[AlmacenFeatures] = None,
+        versiones_conservadas: Optional[int] = VERSIONES_CONSERVADAS
+    ):
         """
         Inicializa el predictor de ML
         
         Args:
-            model_dir: Directorio para guardar/cargar modelos
+            model_dir: Raíz del registro de versiones de modelos
+            carga_diferida: Cargar la versión activa en la primera predicción
+                            (False = cargar ahora)
+            almacen_features: Almacén de features por ticker/fecha (default: el compartido)
+            versiones_conservadas: Versiones del registro que se conservan al
+                                   publicar una nueva (None = no podar)
         """
         self.logger = logging.getLogger("MLPredictor")
         self.model_dir = model_dir
         os.makedirs(model_dir, exist_ok=True)
+        self.registro = RegistroModelos(model_dir)
+        self.versiones_conservadas = versiones_conservadas
+        self.almacen_features = almacen_features or obtener_almacen_features()
         
-        # Modelos
-        self.price_direction_model = None  # Predice si sube/baja
-        self.volatility_model = None        # Predice volatilidad futura
+        # Scaler + modelos de dirección, volatilidad y confianza
+        self._modelos = ConjuntoModelos(scaler=StandardScaler())
+        self._carga_pendiente = True
+        self._lock_carga = threading.Lock()
         self.analyst_accuracy_model = None  # Predice accuracy de analistas
-        self.confidence_model = None        # Predice confianza general
         
-        # Scalers
-        self.scaler = StandardScaler()
-        
-        # Cargar modelos si existen
-        self._load_models()
+        if not carga_diferida:
+            self._load_models()
         
         self.logger.info("✅ ML Predictor inicializado")
     
-    def train_models(self, historical_data: Dict[str, pd.DataFrame]) -> Dict[str, Any]:
+    @property
+    def modelos(self) -> ConjuntoModelos:
+        """Conjunto activo (el primer acceso carga la versión activa del registro)"""
+        if self._carga_pendiente:
+            with self._lock_carga:
+                if self._carga_pendiente:
+                    self._load_models()
+        return self._modelos
+    
+    @modelos.setter
+    def modelos(self, conjunto: ConjuntoModelos):
+        self._modelos = conjunto
+        self._carga_pendiente = False
+    
+    # Acceso por atributo al conjunto activo; asignar reemplaza el conjunto completo
+    
+    @property
+    def scaler(self):
+        return self.modelos.scaler
+    
+    @scaler.setter
+    def scaler(self, valor):
+        self.modelos = replace(self.modelos, scaler=valor, version=None)
+    
+    @property
+    def price_direction_model(self):
+        return self.modelos.price_direction_model
+    
+    @price_direction_model.setter
+    def price_direction_model(self, valor):
+        self.modelos = replace(self.modelos, price_direction_model=valor, version=None)
+    
+    @property
+    def volatility_model(self):
+        return self.modelos.volatility_model
+    
+    @volatility_model.setter
+    def volatility_model(self, valor):
+        self.modelos = replace(self.modelos, volatility_model=valor, version=None)
+    
+    @property
+    def confidence_model(self):
+        return self.modelos.confidence_model
+    
+    @confidence_model.setter
+    def confidence_model(self, valor):
+        self.modelos = replace(self.modelos, confidence_model=valor, version=None)
+    
+    def instalar_modelos(self, conjunto: ConjuntoModelos) -> None:
+        """Sustituye atómicamente el scaler y los modelos que se sirven"""
+        self.modelos = conjunto
+        self.logger.info("🔄 Modelos ML activos reemplazados")
+    
+    def train_models(
+        self,
+        historical_data: Dict[str, pd.DataFrame],
+        progreso: Optional[Callable[[float, str], None]] = None,
+        incremental: bool = False,
+        ventana_barras: Optional[int] = None
+    ) -> Dict[str, Any]:
         """
         Entrena todos los modelos con datos históricos
         
+        Los modelos se ajustan aparte y se instalan juntos al final: las
+        predicciones siguen usando el conjunto anterior mientras tanto.
+        
         Args:
             historical_data: Dict con DataFrames históricos por ticker
                             {'AAPL': df, 'MSFT': df, ...}
+            progreso: Callback (fracción 0-1, mensaje) tras cada etapa
+            incremental: Ampliar los modelos activos solo con las barras
+                         posteriores al último entrenamiento (ver _entrenar_incremental)
+            ventana_barras: Filas más recientes por ticker que se usan
+                            (default: todas; VENTANA_BARRAS_INCREMENTAL en modo incremental)
         
         Returns:
             Dict con métricas de entrenamiento
         """
+        avisar = progreso or (lambda fraccion, mensaje: None)
         try:
+            if incremental:
+                previas = self._fechas_entrenadas()
+                if previas is not None:
+                    return self._entrenar_incremental(
+                        historical_data, previas, ventana_barras or VENTANA_BARRAS_INCREMENTAL, avisar
+                    )
+                self.logger.info("ℹ️  Sin versión previa con fechas: entrenamiento completo")
+            
             self.logger.info(f"🤖 Entrenando modelos con {len(historical_data)} tickers...")
             
             # Preparar features de todos los datos
-            X_all, y_direction_all, y_volatility_all = [], [], []
+            X_combined, y_direction_combined, y_volatility_combined, _, ultimas_fechas = \
+                self._datos_entrenamiento(historical_data, ventana_barras)
             
-            for ticker, df in historical_data.items():
-                if len(df) < 100:
-                    self.logger.warning(f"⚠️  {ticker} tiene menos de 100 datos, saltando...")
-                    continue
-                
-                X, y_direction, y_volatility = self._extract_features(df)
-                
-                if X is not None:
-                    X_all.append(X)
-                    y_direction_all.append(y_direction)
-                    y_volatility_all.append(y_volatility)
-            
-            if not X_all:
+            if X_combined is None:
                 return {"error": "No hay datos suficientes para entrenar"}
             
-            # Combinar todos los datos
-            X_combined = np.vstack(X_all)
-            y_direction_combined = np.concatenate(y_direction_all)
-            y_volatility_combined = np.concatenate(y_volatility_all)
-            
             # Normalizar features
-            X_scaled = self.scaler.fit_transform(X_combined)
+            scaler = StandardScaler()
+            X_scaled = scaler.fit_transform(X_combined)
+            y_confidence = self._calculate_confidence_labels(X_scaled)
+            avisar(0.1, "Features preparadas")
             
             # Split train/test
-            X_train, X_test, y_dir_train, y_dir_test, y_vol_train, y_vol_test = train_test_split(
-                X_scaled, y_direction_combined, y_volatility_combined,
-                test_size=0.2, random_state=42
-            )
+            X_train, X_test, y_dir_train, y_dir_test, y_vol_train, y_vol_test, y_conf_train, y_conf_test = \
+                train_test_split(
+                    X_scaled, y_direction_combined, y_volatility_combined, y_confidence,
+                    test_size=0.2, random_state=42
+                )
             
             # Entrenar modelo de dirección de precio
             self.logger.info("  📈 Entrenando modelo de dirección de precio...")
-            self.price_direction_model = RandomForestClassifier(
-                n_estimators=100,
-                max_depth=15,
-                random_state=42,
-                n_jobs=-1
-            )
-            self.price_direction_model.fit(X_train, y_dir_train)
-            acc_direction = self.price_direction_model.score(X_test, y_dir_test)
+            candidatos = self._candidatos()
+            price_direction_model = CANDIDATOS[candidatos["price_direction_model"]]()
+            price_direction_model.fit(X_train, y_dir_train)
+            acc_direction = price_direction_model.score(X_test, y_dir_test)
+            avisar(0.4, "Modelo de dirección entrenado")
             
             # Entrenar modelo de volatilidad
             self.logger.info("  📊 Entrenando modelo de volatilidad...")
-            self.volatility_model = GradientBoostingClassifier(
-                n_estimators=100,
-                max_depth=5,
-                random_state=42
-            )
-            self.volatility_model.fit(X_train, y_vol_train)
-            acc_volatility = self.volatility_model.score(X_test, y_vol_test)
+            volatility_model = CANDIDATOS[candidatos["volatility_model"]]()
+            volatility_model.fit(X_train, y_vol_train)
+            acc_volatility = volatility_model.score(X_test, y_vol_test)
+            avisar(0.7, "Modelo de volatilidad entrenado")
             
             # Entrenar modelo de confianza (basado en características)
             self.logger.info("  🎯 Entrenando modelo de confianza...")
-            y_confidence = self._calculate_confidence_labels(X_combined)
-            X_train_conf, X_test_conf, y_conf_train, y_conf_test = train_test_split(
-                X_scaled, y_confidence, test_size=0.2, random_state=42
-            )
-            self.confidence_model = GradientBoostingClassifier(
-                n_estimators=50,
-                max_depth=5,
-                random_state=42
-            )
-            self.confidence_model.fit(X_train_conf, y_conf_train)
-            acc_confidence = self.confidence_model.score(X_test_conf, y_conf_test)
-            
-            # Guardar modelos
-            self._save_models()
+            confidence_model, acc_confidence = None, None
+            if len(np.unique(y_conf_train)) > 1:
+                confidence_model = CANDIDATOS[candidatos["confidence_model"]]()
+                confidence_model.fit(X_train, y_conf_train)
+                acc_confidence = round(confidence_model.score(X_test, y_conf_test), 4)
+            else:
+                self.logger.warning("⚠️  Etiquetas de confianza de una sola clase: modelo omitido")
+            avisar(0.9, "Modelo de confianza entrenado")
             
             resultado = {
                 "status": "completado",
-                "modelos_entrenados": 3,
+                "modo": "completo",
+                "modelos_entrenados": 3 if confidence_model is not None else 2,
                 "accuracy_price_direction": round(acc_direction, 4),
                 "accuracy_volatility": round(acc_volatility, 4),
-                "accuracy_confidence": round(acc_confidence, 4),
+                "accuracy_confidence": acc_confidence,
                 "samples_entrenamiento": len(X_train),
                 "samples_validacion": len(X_test),
+                "candidatos": candidatos,
+                "ultimas_fechas": ultimas_fechas,
                 "timestamp": datetime.now().isoformat()
             }
             
+            # Instalar el conjunto completo de una vez y publicarlo como versión nueva
+            self.instalar_modelos(ConjuntoModelos(
+                scaler=scaler,
+                price_direction_model=price_direction_model,
+                volatility_model=volatility_model,
+                confidence_model=confidence_model
+            ))
+            resultado["version"] = self._save_models(resultado)
+            avisar(1.0, "Modelos guardados")
+            
             self.logger.info(f"✅ Modelos entrenados exitosamente")
             self.logger.info(f"   - Price Direction Accuracy: {acc_direction:.4f}")
             self.logger.info(f"   - Volatility Accuracy: {acc_volatility:.4f}")
-            self.logger.info(f"   - Confidence Accuracy: {acc_confidence:.4f}")
+            self.logger.info(f"   - Confidence Accuracy: {acc_confidence}")
             
             return resultado
             
@@ -156,45 +421,220 @@ class MLPredictor:
             self.logger.error(f"❌ Error entrenando modelos: {str(e)}")
             return {"error": str(e)}
     
-    def predict_price_direction(self, ticker: str, current_indicators: Dict) -> Dict[str, Any]:
+    def _entrenar_incremental(
+        self,
+        historical_data: Dict[str, pd.DataFrame],
+        previas: Dict[str, str],
+        ventana_barras: int,
+        avisar: Callable[[float, str], None]
+    ) -> Dict[str, Any]:
         """
-        Predice la dirección probable del precio (sube/baja)
+        Actualización diaria de los modelos activos
+        
+        - Solo cuentan como nuevas las filas posteriores a la última fecha
+          entrenada de cada ticker (guardada en el manifiesto de la versión)
+        - Los árboles/etapas nuevos se ajustan sobre las `ventana_barras`
+          filas más recientes de cada ticker (memoria acotada)
+        - El scaler se conserva: los árboles existentes dependen de él
+        - Accuracy prequential: modelos previos evaluados sobre las filas
+          nuevas antes de incorporarlas
+        """
+        conjunto = self.modelos
+        X, y_direction, y_volatility, nuevas, ultimas_fechas = \
+            self._datos_entrenamiento(historical_data, ventana_barras, previas)
+        if X is None or not nuevas.any():
+            return {
+                "status": "sin_cambios",
+                "modo": "incremental",
+                "samples_nuevos": 0,
+                "version": conjunto.version,
+                "timestamp": datetime.now().isoformat()
+            }
+        
+        self.logger.info(f"🔁 Actualización incremental: {int(nuevas.sum())} filas nuevas, ventana de {len(X)}")
+        X_scaled = conjunto.scaler.transform(X)
+        y_confidence = self._calculate_confidence_labels(X_scaled)
+        etiquetas = {
+            "price_direction_model": y_direction,
+            "volatility_model": y_volatility,
+            "confidence_model": y_confidence,
+        }
+        avisar(0.1, "Features preparadas")
+        
+        candidatos = self._candidatos()
+        modelos, accuracies, acciones = {}, {}, {}
+        for k, (nombre, y) in enumerate(etiquetas.items()):
+            previo = getattr(conjunto, nombre)
+            if previo is not None:
+                accuracies[nombre] = round(previo.score(X_scaled[nuevas], y[nuevas]), 4)
+            if len(np.unique(y)) < 2:
+                modelos[nombre], acciones[nombre] = previo, "sin_cambios"
+            else:
+                modelos[nombre], acciones[nombre] = _ampliar_modelo(
+                    previo, CANDIDATOS[candidatos[nombre]], X_scaled, y
+                )
+            avisar(0.2 + 0.25 * (k + 1), f"Modelo {nombre} actualizado")
+        
+        resultado = {
+            "status": "completado",
+            "modo": "incremental",
+            "modelos_entrenados": sum(1 for m in modelos.values() if m is not None),
+            "accuracy_price_direction": accuracies.get("price_direction_model"),
+            "accuracy_volatility": accuracies.get("volatility_model"),
+            "accuracy_confidence": accuracies.get("confidence_model"),
+            "acciones": acciones,
+            "samples_nuevos": int(nuevas.sum()),
+            "samples_entrenamiento": len(X),
+            "ultimas_fechas": {**previas, **ultimas_fechas},
+            "version_base": conjunto.version,
+            "timestamp": datetime.now().isoformat()
+        }
+        self.instalar_modelos(ConjuntoModelos(scaler=conjunto.scaler, **modelos))
+        resultado["version"] = self._save_models(resultado)
+        avisar(1.0, "Modelos guardados")
+        return resultado
+    
+    def _candidatos(self) -> Dict[str, str]:
+        """Configuración de cada modelo: la selección persistida o la base"""
+        return {**CANDIDATOS_BASE, **leer_seleccion(self.model_dir)}
+    
+    def seleccionar_modelos(
+        self,
+        historical_data: Dict[str, pd.DataFrame],
+        presupuesto_ms: Optional[float] = None,
+        accuracy_minima: Optional[Dict[str, float]] = None,
+        candidatos: Optional[List[str]] = None,
+        ventana_barras: Optional[int] = None
+    ) -> Dict[str, Any]:
+        """
+        Benchmark de configuraciones candidatas y selección por latencia
+        
+        Entrena cada candidato de ia/model_selection para los tres modelos,
+        mide accuracy, latencia por fila y por lote, tamaño y carga, y
+        persiste para cada modelo el candidato más rápido de la frontera de
+        Pareto que cumple el presupuesto y el piso de accuracy. Los
+        entrenamientos completos siguientes usan esa selección.
         
         Args:
-            ticker: Símbolo del instrumento
-            current_indicators: Dict con indicadores técnicos actuales
+            historical_data: Dict con DataFrames históricos por ticker
+            presupuesto_ms: Latencia máxima por fila (None = sin límite)
+            accuracy_minima: {modelo: piso} (default: accuracy de la
+                             configuración base menos 1 punto)
+            candidatos: Nombres de CANDIDATOS a probar (default: todos)
+            ventana_barras: Filas más recientes por ticker que se usan
         
         Returns:
-            Dict con predicción y confianza
+            Dict con la selección y las mediciones de cada modelo
         """
         try:
-            if self.price_direction_model is None:
-                return {"error": "Modelo no entrenado", "disponible": False}
-            
-            # Extraer features del indicador
-            features = self._extract_features_from_indicators(current_indicators)
-            features_scaled = self.scaler.transform([features])
-            
-            # Predicción
-            prediction = self.price_direction_model.predict(features_scaled)[0]
-            probability = self.price_direction_model.predict_proba(features_scaled)[0]
-            
-            direction = "ALCISTA" if prediction == 1 else "BAJISTA"
-            confidence = float(max(probability))
+            X, y_direction, y_volatility, _, _ = self._datos_entrenamiento(historical_data, ventana_barras)
+            if X is None:
+                return {"error": "No hay datos suficientes para entrenar"}
             
+            X_scaled = StandardScaler().fit_transform(X)
+            seleccion = comparar_candidatos(
+                X_scaled,
+                {
+                    "price_direction_model": y_direction,
+                    "volatility_model": y_volatility,
+                    "confidence_model": self._calculate_confidence_labels(X_scaled),
+                },
+                candidatos=candidatos,
+                presupuesto_ms=presupuesto_ms,
+                accuracy_minima=accuracy_minima
+            )
+            ruta = guardar_seleccion(self.model_dir, seleccion)
+            self.logger.info(f"✅ Selección de modelos guardada en {ruta}")
             return {
-                "ticker": ticker,
-                "direccion_predicha": direction,
-                "confianza": round(confidence, 4),
-                "probabilidad_alcista": round(probability[1] if len(probability) > 1 else probability[0], 4),
-                "probabilidad_bajista": round(probability[0] if len(probability) > 1 else 0, 4),
-                "disponible": True,
+                "status": "completado",
+                "seleccion": {modelo: datos["elegido"] for modelo, datos in seleccion.items()},
+                "detalle": seleccion,
+                "samples": len(X),
                 "timestamp": datetime.now().isoformat()
             }
-            
+        
         except Exception as e:
-            self.logger.error(f"Error prediciendo dirección: {str(e)}")
-            return {"error": str(e), "disponible": False}
+            self.logger.error(f"❌ Error seleccionando modelos: {str(e)}")
+            return {"error": str(e)}
+    
+    def _fechas_entrenadas(self) -> Optional[Dict[str, str]]:
+        """Última fecha entrenada por ticker de la versión activa (None si no hay)"""
+        conjunto = self.modelos
+        if conjunto.version is None or conjunto.price_direction_model is None:
+            return None
+        manifiesto = self.registro.manifiesto(conjunto.version) or {}
+        return manifiesto.get("metricas", {}).get("ultimas_fechas")
+    
+    def _datos_entrenamiento(
+        self,
+        historical_data: Dict[str, pd.DataFrame],
+        ventana_barras: Optional[int] = None,
+        previas: Optional[Dict[str, str]] = None
+    ) -> Tuple[Optional[np.ndarray], ...]:
+        """
+        Features y etiquetas de todos los tickers apiladas
+        
+        Args:
+            ventana_barras: Filas más recientes por ticker (None = todas)
+            previas: {ticker: última fecha entrenada}; las filas posteriores
+                     se marcan como nuevas
+        
+        Returns:
+            (X, y_direction, y_volatility, nuevas, ultimas_fechas); X es None
+            si ningún ticker tiene datos suficientes
+        """
+        previas = previas or {}
+        X_all, y_direction_all, y_volatility_all, nuevas_all = [], [], [], []
+        ultimas_fechas: Dict[str, str] = {}
+        
+        for ticker, df in historical_data.items():
+            if len(df) < 100:
+                self.logger.warning(f"⚠️  {ticker} tiene menos de 100 datos, saltando...")
+                continue
+            
+            X, y_direction, y_volatility = self._extract_features(df, ticker)
+            if X is None or len(X) == 0:
+                continue
+            
+            # Fila k = ventana que termina en la barra k + 19
+            nuevas = np.ones(len(X), dtype=bool)
+            if isinstance(df.index, pd.DatetimeIndex):
+                fechas = df.index[VENTANA_FEATURES - 1:VENTANA_FEATURES - 1 + len(X)].strftime("%Y-%m-%d")
+                ultimas_fechas[ticker] = fechas[-1]
+                if ticker in previas:
+                    nuevas = np.asarray(fechas > previas[ticker])
+            
+            if ventana_barras:
+                X, y_direction, y_volatility, nuevas = (
+                    a[-ventana_barras:] for a in (X, y_direction, y_volatility, nuevas)
+                )
+            X_all.append(X)
+            y_direction_all.append(y_direction)
+            y_volatility_all.append(y_volatility)
+            nuevas_all.append(nuevas)
+        
+        if not X_all:
+            return None, None, None, None, ultimas_fechas
+        return (
+            np.vstack(X_all),
+            np.concatenate(y_direction_all),
+            np.concatenate(y_volatility_all),
+            np.concatenate(nuevas_all),
+            ultimas_fechas
+        )
+    
+    def predict_price_direction(self, ticker: str, current_indicators: Dict) -> Dict[str, Any]:
+        """
+        Predice la dirección probable del precio (sube/baja)
+        
+        Args:
+            ticker: Símbolo del instrumento
+            current_indicators: Dict con indicadores técnicos actuales
+        
+        Returns:
+            Dict con predicción y confianza
+        """
+        return self.predict_many({ticker: current_indicators}, ("precio",))[ticker]["precio"]
     
     def predict_volatility(self, ticker: str, current_indicators: Dict) -> Dict[str, Any]:
         """
@@ -207,34 +647,7 @@ class MLPredictor:
         Returns:
             Dict con predicción de volatilidad
         """
-        try:
-            if self.volatility_model is None:
-                return {"error": "Modelo no entrenado", "disponible": False}
-            
-            # Extraer features
-            features = self._extract_features_from_indicators(current_indicators)
-            features_scaled = self.scaler.transform([features])
-            
-            # Predicción
-            prediction = self.volatility_model.predict(features_scaled)[0]
-            probability = self.volatility_model.predict_proba(features_scaled)[0]
-            
-            volatility_levels = ["BAJA", "MEDIA", "ALTA"]
-            volatility = volatility_levels[prediction] if prediction < len(volatility_levels) else "MEDIA"
-            confidence = float(max(probability))
-            
-            return {
-                "ticker": ticker,
-                "volatilidad_predicha": volatility,
-                "confianza": round(confidence, 4),
-                "nivel_predicho": prediction,
-                "disponible": True,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Error prediciendo volatilidad: {str(e)}")
-            return {"error": str(e), "disponible": False}
+        return self.predict_many({ticker: current_indicators}, ("volatilidad",))[ticker]["volatilidad"]
     
     def predict_confidence(self, ticker: str, current_indicators: Dict) -> Dict[str, Any]:
         """
@@ -247,34 +660,109 @@ class MLPredictor:
         Returns:
             Dict con predicción de confianza
         """
-        try:
-            if self.confidence_model is None:
-                return {"error": "Modelo no entrenado", "disponible": False}
-            
-            # Extraer features
-            features = self._extract_features_from_indicators(current_indicators)
-            features_scaled = self.scaler.transform([features])
-            
-            # Predicción
-            prediction = self.confidence_model.predict(features_scaled)[0]
-            probability = self.confidence_model.predict_proba(features_scaled)[0]
-            
-            confidence_levels = ["BAJA", "MODERADA", "ALTA"]
-            confidence = confidence_levels[prediction] if prediction < len(confidence_levels) else "MODERADA"
-            score = float(max(probability))
-            
-            return {
-                "ticker": ticker,
-                "confianza_predicha": confidence,
-                "score_confianza": round(score, 4),
-                "nivel_predicho": prediction,
-                "disponible": True,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-        except Exception as e:
-            self.logger.error(f"Error prediciendo confianza: {str(e)}")
-            return {"error": str(e), "disponible": False}
+        return self.predict_many({ticker: current_indicators}, ("confianza",))[ticker]["confianza"]
+    
+    def predict_many(
+        self,
+        indicators_by_ticker: Dict[str, Dict],
+        tipos: Tuple[str, ...] = TIPOS_PREDICCION
+    ) -> Dict[str, Dict[str, Dict[str, Any]]]:
+        """
+        Predicciones de varios tickers con una sola llamada vectorizada por modelo
+        
+        Construye una matriz de features (una fila por ticker), la normaliza
+        una vez y ejecuta un único predict_proba por modelo.
+        
+        Args:
+            indicators_by_ticker: {ticker: indicadores técnicos actuales}
+            tipos: Predicciones a calcular ("precio", "volatilidad", "confianza")
+        
+        Returns:
+            {ticker: {tipo: dict}} con el mismo formato que
+            predict_price_direction / predict_volatility / predict_confidence
+        """
+        tickers = list(indicators_by_ticker)
+        resultados: Dict[str, Dict[str, Dict[str, Any]]] = {ticker: {} for ticker in tickers}
+        if not tickers:
+            return resultados
+        
+        # Conjunto tomado una vez: scaler y modelos coherentes durante el lote
+        conjunto = self.modelos
+        scaler = conjunto.scaler
+        modelos = {tipo: getattr(conjunto, _MODELOS_PREDICCION[tipo][0]) for tipo in tipos}
+        timestamp = datetime.now().isoformat()
+        
+        X_scaled, error_features = None, None
+        if any(modelo is not None for modelo in modelos.values()):
+            try:
+                X = np.vstack([
+                    self._extract_features_from_indicators(indicators_by_ticker[ticker])
+                    for ticker in tickers
+                ])
+                X_scaled = scaler.transform(X)
+            except Exception as e:
+                error_features = str(e)
+        
+        for tipo, modelo in modelos.items():
+            if modelo is None:
+                for ticker in tickers:
+                    resultados[ticker][tipo] = {"error": "Modelo no entrenado", "disponible": False}
+                continue
+            
+            try:
+                if error_features:
+                    raise ValueError(error_features)
+                probabilidades = modelo.predict_proba(X_scaled)
+                predicciones = modelo.classes_[np.argmax(probabilidades, axis=1)]
+            except Exception as e:
+                self.logger.error(f"Error prediciendo {tipo}: {str(e)}")
+                for ticker in tickers:
+                    resultados[ticker][tipo] = {"error": str(e), "disponible": False}
+                continue
+            
+            formatear = getattr(self, _MODELOS_PREDICCION[tipo][1])
+            for fila, ticker in enumerate(tickers):
+                resultado = formatear(ticker, predicciones[fila], probabilidades[fila])
+                resultado["timestamp"] = timestamp
+                resultados[ticker][tipo] = resultado
+        
+        return resultados
+    
+    @staticmethod
+    def _formatear_direccion(ticker: str, prediction, probability: np.ndarray) -> Dict[str, Any]:
+        direction = "ALCISTA" if prediction == 1 else "BAJISTA"
+        return {
+            "ticker": ticker,
+            "direccion_predicha": direction,
+            "confianza": round(float(max(probability)), 4),
+            "probabilidad_alcista": round(probability[1] if len(probability) > 1 else probability[0], 4),
+            "probabilidad_bajista": round(probability[0] if len(probability) > 1 else 0, 4),
+            "disponible": True,
+        }
+    
+    @staticmethod
+    def _formatear_volatilidad(ticker: str, prediction, probability: np.ndarray) -> Dict[str, Any]:
+        volatility_levels = ["BAJA", "MEDIA", "ALTA"]
+        volatility = volatility_levels[prediction] if prediction < len(volatility_levels) else "MEDIA"
+        return {
+            "ticker": ticker,
+            "volatilidad_predicha": volatility,
+            "confianza": round(float(max(probability)), 4),
+            "nivel_predicho": prediction,
+            "disponible": True,
+        }
+    
+    @staticmethod
+    def _formatear_confianza(ticker: str, prediction, probability: np.ndarray) -> Dict[str, Any]:
+        confidence_levels = ["BAJA", "MODERADA", "ALTA"]
+        confidence = confidence_levels[prediction] if prediction < len(confidence_levels) else "MODERADA"
+        return {
+            "ticker": ticker,
+            "confianza_predicha": confidence,
+            "score_confianza": round(float(max(probability)), 4),
+            "nivel_predicho": prediction,
+            "disponible": True,
+        }
     
     def predict_analyst_accuracy(self, analyst_history: Dict) -> Dict[str, Any]:
         """
@@ -324,69 +812,33 @@ class MLPredictor:
             self.logger.error(f"Error prediciendo accuracy de analistas: {str(e)}")
             return {"error": str(e), "disponible": False}
     
-    def _extract_features(self, df: pd.DataFrame) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
-        """Extrae features de un DataFrame histórico"""
+    def _extract_features(
+        self, df: pd.DataFrame, ticker: Optional[str] = None
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Extrae features de un DataFrame histórico
+        
+        Con `ticker` (e índice de fechas) las features salen del almacén y
+        solo se calculan las de las barras que no tenía.
+        """
         try:
             if len(df) < 30:
                 return None, None, None
             
-            # Features de precio
-            close = df['Close'].values
-            returns = np.diff(close) / close[:-1]
-            
-            # Label: dirección próxima semana
-            future_return = np.diff(close[5:]) / close[5:-1]  # 5 días después
-            y_direction = (future_return > 0).astype(int)
+            close = np.asarray(df['Close'].values, dtype=np.float64).reshape(-1)
             
-            # Label: volatilidad
-            rolling_vol = pd.Series(returns).rolling(20).std().values[20:]
-            vol_median = np.median(rolling_vol[rolling_vol > 0])
-            y_volatility = (rolling_vol > vol_median).astype(int)
-            
-            # Features: 20 características técnicas
-            X = []
-            for i in range(20, len(close) - 5):
-                window = close[i-20:i]
-                
-                # Características básicas
-                sma_10 = np.mean(window[-10:])
-                sma_20 = np.mean(window)
-                momentum = (window[-1] - window[0]) / window[0]
-                volatility_window = np.std(np.diff(window) / window[:-1])
-                rsi = self._calculate_rsi(window)
-                
-                # Más características
-                high_low_ratio = np.max(window) / np.min(window)
-                open_close_ratio = (window[-1] - window[0]) / window[0]
-                acceleration = momentum / (np.std(np.diff(window)) + 0.0001)
-                trend = (window[-1] > sma_10) and (sma_10 > sma_20)
-                
-                feature_row = [
-                    momentum,
-                    volatility_window,
-                    rsi,
-                    high_low_ratio,
-                    open_close_ratio,
-                    acceleration,
-                    float(trend),
-                    sma_10 / sma_20,
-                    np.std(window),
-                    np.mean(np.abs(np.diff(window))),
-                ]
-                
-                # Pad to 20 features
-                while len(feature_row) < 20:
-                    feature_row.append(0)
-                
-                X.append(feature_row[:20])
-            
-            if len(X) < len(y_direction):
-                X = X[:len(y_direction)]
+            # Features: 20 características técnicas (una fila por ventana de 20 cierres)
+            if ticker and isinstance(df.index, pd.DatetimeIndex) and not np.isnan(close).any():
+                matriz = self.almacen_features.matriz(ticker, CONJUNTO_FEATURES, df['Close'])
+                X = matriz.to_numpy()[:max(len(close) - VENTANA_FEATURES - 5, 0)]
             else:
-                y_direction = y_direction[:len(X)]
-                y_volatility = y_volatility[:len(X)]
+                X = extraer_features_ventana(close)
             
-            return np.array(X), y_direction, y_volatility
+            # Labels: dirección y volatilidad de las 5 barras posteriores a cada ventana
+            y_direction, vol_futura = etiquetas_ventana(close, len(X))
+            vol_median = np.median(vol_futura[vol_futura > 0])
+            y_volatility = (vol_futura > vol_median).astype(int)
+            return X, y_direction, y_volatility
             
         except Exception as e:
             self.logger.warning(f"Error extrayendo features: {str(e)}")
@@ -446,72 +898,107 @@ class MLPredictor:
         return rsi
     
     def _calculate_confidence_labels(self, X: np.ndarray) -> np.ndarray:
-        """Calcula etiquetas de confianza basadas en features"""
-        confidence_scores = []
-        
-        for features in X:
-            # Calcula una puntuación de "consistencia"
-            variance = np.var(features)
-            mean = np.mean(features)
-            
-            if variance < 0.1:
-                confidence = 2  # ALTA
-            elif variance < 0.3:
-                confidence = 1  # MODERADA
-            else:
-                confidence = 0  # BAJA
-            
-            confidence_scores.append(confidence)
+        """
+        Calcula etiquetas de confianza basadas en features
         
-        return np.array(confidence_scores)
+        Puntuación de "consistencia" = varianza de cada fila: < 0.1 ALTA (2),
+        < 0.3 MODERADA (1), resto BAJA (0). Se espera X normalizada: en
+        crudo el RSI (0-100) domina la varianza y todas las filas son BAJA.
+        """
+        return 2 - np.digitize(np.var(X, axis=1), [0.1, 0.3])
     
-    def _save_models(self):
-        """Guarda los modelos entrenados"""
+    def _save_models(self, metricas: Optional[Dict[str, Any]] = None) -> Optional[str]:
+        """
+        Publica el conjunto activo como versión nueva del registro y la activa
+        
+        Returns:
+            Nombre de la versión (None si falla)
+        """
         try:
-            models = {
-                "price_direction": self.price_direction_model,
-                "volatility": self.volatility_model,
-                "confidence": self.confidence_model,
-                "scaler": self.scaler
-            }
-            
-            for name, model in models.items():
-                if model:
-                    path = os.path.join(self.model_dir, f"{name}_model.pkl")
-                    with open(path, "wb") as f:
-                        pickle.dump(model, f)
+            conjunto = self.modelos
+            version = self.registro.publicar(
+                {
+                    "price_direction": conjunto.price_direction_model,
+                    "volatility": conjunto.volatility_model,
+                    "confidence": conjunto.confidence_model,
+                    "scaler": conjunto.scaler
+                },
+                metricas=metricas,
+                esquema_features={"hash": hash_esquema_features(), "columnas": list(COLUMNAS_FEATURES)}
+            )
+            # Etiquetar el conjunto servido si nadie lo reemplazó mientras tanto
+            if self._modelos is conjunto:
+                self._modelos = replace(conjunto, version=version)
             
-            self.logger.info("✅ Modelos guardados exitosamente")
+            self.logger.info(f"✅ Modelos guardados exitosamente (versión {version})")
+            self.podar_versiones()
+            return version
             
         except Exception as e:
             self.logger.error(f"Error guardando modelos: {str(e)}")
+            return None
     
-    def _load_models(self):
-        """Carga modelos previamente entrenados"""
-        try:
-            for name in ["price_direction", "volatility", "confidence"]:
-                path = os.path.join(self.model_dir, f"{name}_model.pkl")
+    @staticmethod
+    def leer_modelos(model_dir: str, version: Optional[str] = None) -> Optional[ConjuntoModelos]:
+        """
+        Lee un conjunto del registro (por defecto la versión activa)
+        
+        Los arrays se mapean desde disco. Sin versiones publicadas se leen
+        los *_model.pkl del formato anterior. None si no hay modelos.
+        """
+        cargado = RegistroModelos(model_dir).cargar(version, hash_esquema=hash_esquema_features())
+        if cargado is not None:
+            modelos = cargado["modelos"]
+            version = cargado["version"]
+        elif version is None:
+            modelos = {}
+            for name in ["price_direction", "volatility", "confidence", "scaler"]:
+                path = os.path.join(model_dir, f"{name}_model.pkl")
                 if os.path.exists(path):
                     with open(path, "rb") as f:
-                        model = pickle.load(f)
-                        if name == "price_direction":
-                            self.price_direction_model = model
-                        elif name == "volatility":
-                            self.volatility_model = model
-                        elif name == "confidence":
-                            self.confidence_model = model
-            
-            # Cargar scaler
-            scaler_path = os.path.join(self.model_dir, "scaler_model.pkl")
-            if os.path.exists(scaler_path):
-                with open(scaler_path, "rb") as f:
-                    self.scaler = pickle.load(f)
-            
-            if self.price_direction_model:
-                self.logger.info("✅ Modelos cargados exitosamente")
+                        modelos[name] = pickle.load(f)
+        else:
+            return None
+        
+        if "price_direction" not in modelos and "volatility" not in modelos:
+            return None
+        return ConjuntoModelos(
+            scaler=modelos.get("scaler", StandardScaler()),
+            price_direction_model=modelos.get("price_direction"),
+            volatility_model=modelos.get("volatility"),
+            confidence_model=modelos.get("confidence"),
+            version=version
+        )
+    
+    def podar_versiones(self) -> List[str]:
+        """Borra las versiones más antiguas que `versiones_conservadas` (nunca la activa)"""
+        if not self.versiones_conservadas:
+            return []
+        borradas = self.registro.podar(conservar=self.versiones_conservadas)
+        if borradas:
+            self.logger.info(f"🧹 {len(borradas)} versiones de modelos antiguas eliminadas")
+        return borradas
+    
+    def cargar_version(self, version: Optional[str] = None) -> bool:
+        """Instala una versión del registro (por defecto la activa)"""
+        conjunto = self.leer_modelos(self.model_dir, version)
+        if conjunto is None:
+            return False
+        self.instalar_modelos(conjunto)
+        return True
+    
+    def _load_models(self):
+        """Carga la versión activa del registro"""
+        try:
+            conjunto = self.leer_modelos(self.model_dir)
+            if conjunto is not None:
+                self._modelos = conjunto
+                self.logger.info(f"✅ Modelos cargados exitosamente (versión {conjunto.version or 'pkl'})")
             
         except Exception as e:
             self.logger.warning(f"⚠️  No se pudieron cargar modelos: {str(e)}")
+        finally:
+            self._carga_pendiente = False
     
     def get_status(self) -> Dict[str, Any]:
         """Obtiene estado de los modelos"""
@@ -520,5 +1007,8 @@ class MLPredictor:
             "price_direction_model": "✅ Disponible" if self.price_direction_model else "❌ No disponible",
             "volatility_model": "✅ Disponible" if self.volatility_model else "❌ No disponible",
             "confidence_model": "✅ Disponible" if self.confidence_model else "❌ No disponible",
+            "version": self.modelos.version,
+            "versiones_registradas": len(self.registro.versiones()),
+            "candidatos": self._candidatos(),
             "estado": "✅ Operativo" if any([self.price_direction_model, self.volatility_model]) else "❌ Modelos no entrenados"
         }
@@ -0,0 +1,224 @@
+"""
+ia/model_registry.py
+Registro versionado de modelos de ML
+- Un directorio por versión: manifest.json (métricas, hash del esquema de
+  features, archivos) y un .joblib sin comprimir por modelo
+- ACTUAL apunta a la versión activa; publicar y activar son renombrados
+  atómicos, así un lector nunca ve una versión a medio escribir
+- Carga con joblib mmap_mode: los arrays numpy grandes se mapean desde el
+  archivo y varios procesos comparten las páginas de la misma versión
+"""
+
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import joblib
+
+
+ARCHIVO_MANIFIESTO = "manifest.json"
+ARCHIVO_ACTUAL = "ACTUAL"
+DIRECTORIO_VERSIONES = "versiones"
+
+
+class RegistroModelos:
+    """
+    Versiones de modelos en disco
+
+    Estructura:
+        <directorio>/ACTUAL                       nombre de la versión activa
+        <directorio>/versiones/<version>/manifest.json
+        <directorio>/versiones/<version>/<nombre>.joblib
+
+    Ejemplo:
+        registro = RegistroModelos("models")
+        version = registro.publicar({"scaler": scaler, "rf": modelo}, metricas, esquema)
+        modelos = registro.cargar()          # versión activa, mapeada en memoria
+    """
+
+    def __init__(self, directorio: str = "models", mmap_mode: Optional[str] = "r"):
+        """
+        Args:
+            directorio: Raíz del registro
+            mmap_mode: Modo de joblib.load para los arrays (None = cargar en memoria)
+        """
+        self.logger = logging.getLogger("RegistroModelos")
+        self.directorio = directorio
+        self.mmap_mode = mmap_mode
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # Rutas
+    # ------------------------------------------------------------------
+
+    @property
+    def directorio_versiones(self) -> str:
+        return os.path.join(self.directorio, DIRECTORIO_VERSIONES)
+
+    def ruta_version(self, version: str) -> str:
+        return os.path.join(self.directorio_versiones, version)
+
+    # ------------------------------------------------------------------
+    # Escritura
+    # ------------------------------------------------------------------
+
+    def publicar(
+        self,
+        modelos: Dict[str, Any],
+        metricas: Optional[Dict[str, Any]] = None,
+        esquema_features: Optional[Dict[str, Any]] = None,
+        activar: bool = True
+    ) -> str:
+        """
+        Guarda un conjunto de modelos como versión nueva
+
+        Args:
+            modelos: {nombre: objeto}; los None se omiten
+            metricas: Métricas del entrenamiento (se guardan en el manifiesto)
+            esquema_features: {"hash": ..., "columnas": [...]} de las features
+            activar: Apuntar ACTUAL a la versión nueva
+
+        Returns:
+            Nombre de la versión
+        """
+        os.makedirs(self.directorio_versiones, exist_ok=True)
+        version = f"v{datetime.now().strftime('%Y%m%d-%H%M%S-%f')}-{uuid.uuid4().hex[:6]}"
+        # Se escribe en un temporal del mismo sistema de archivos y se renombra
+        temporal = tempfile.mkdtemp(prefix=f".{version}_", dir=self.directorio_versiones)
+        try:
+            archivos = {}
+            for nombre, modelo in modelos.items():
+                if modelo is None:
+                    continue
+                archivo = f"{nombre}.joblib"
+                # Sin compresión: es lo que permite mapear los arrays al cargar
+                joblib.dump(modelo, os.path.join(temporal, archivo))
+                archivos[nombre] = archivo
+
+            manifiesto = {
+                "version": version,
+                "creado": datetime.now().isoformat(),
+                "formato": "joblib",
+                "archivos": archivos,
+                "metricas": metricas or {},
+                "esquema_features": esquema_features or {},
+            }
+            with open(os.path.join(temporal, ARCHIVO_MANIFIESTO), "w", encoding="utf-8") as f:
+                json.dump(manifiesto, f, indent=2, default=str)
+            os.rename(temporal, self.ruta_version(version))
+        except Exception:
+            shutil.rmtree(temporal, ignore_errors=True)
+            raise
+
+        self.logger.info(f"💾 Versión de modelos {version} publicada ({len(archivos)} archivos)")
+        if activar:
+            self.activar(version)
+        return version
+
+    def activar(self, version: str) -> None:
+        """Apunta ACTUAL a `version` (reemplazo atómico del puntero)"""
+        if not os.path.exists(os.path.join(self.ruta_version(version), ARCHIVO_MANIFIESTO)):
+            raise ValueError(f"Versión {version} no encontrada")
+        temporal = os.path.join(self.directorio, f".{ARCHIVO_ACTUAL}.{uuid.uuid4().hex[:6]}")
+        with open(temporal, "w", encoding="utf-8") as f:
+            f.write(version)
+        os.replace(temporal, os.path.join(self.directorio, ARCHIVO_ACTUAL))
+        self.logger.info(f"✅ Versión activa: {version}")
+
+    def podar(self, conservar: int = 5) -> List[str]:
+        """Borra las versiones más antiguas (nunca la activa)"""
+        actual = self.version_actual()
+        sobrantes = [v for v in self.versiones()[:-conservar] if v != actual] if conservar > 0 else []
+        for version in sobrantes:
+            shutil.rmtree(self.ruta_version(version), ignore_errors=True)
+        return sobrantes
+
+    # ------------------------------------------------------------------
+    # Lectura
+    # ------------------------------------------------------------------
+
+    def versiones(self) -> List[str]:
+        """Versiones publicadas, de la más antigua a la más nueva"""
+        if not os.path.isdir(self.directorio_versiones):
+            return []
+        return sorted(
+            nombre for nombre in os.listdir(self.directorio_versiones)
+            if not nombre.startswith(".")
+            and os.path.exists(os.path.join(self.ruta_version(nombre), ARCHIVO_MANIFIESTO))
+        )
+
+    def version_actual(self) -> Optional[str]:
+        try:
+            with open(os.path.join(self.directorio, ARCHIVO_ACTUAL), encoding="utf-8") as f:
+                version = f.read().strip()
+        except FileNotFoundError:
+            return None
+        return version or None
+
+    def manifiesto(self, version: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        version = version or self.version_actual()
+        if not version:
+            return None
+        try:
+            with open(os.path.join(self.ruta_version(version), ARCHIVO_MANIFIESTO), encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+
+    def listar(self) -> List[Dict[str, Any]]:
+        """Manifiestos de todas las versiones (más nueva primero)"""
+        actual = self.version_actual()
+        resultado = []
+        for version in reversed(self.versiones()):
+            manifiesto = self.manifiesto(version) or {}
+            resultado.append({
+                "version": version,
+                "activa": version == actual,
+                "creado": manifiesto.get("creado"),
+                "metricas": manifiesto.get("metricas", {}),
+                "hash_esquema": manifiesto.get("esquema_features", {}).get("hash"),
+            })
+        return resultado
+
+    def cargar(
+        self,
+        version: Optional[str] = None,
+        hash_esquema: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Carga los modelos de una versión (por defecto la activa)
+
+        Args:
+            version: Versión a cargar
+            hash_esquema: Si se indica, la versión solo se carga si sus
+                          features tienen este hash
+
+        Returns:
+            {"version", "manifiesto", "modelos": {nombre: objeto}} o None
+        """
+        with self._lock:
+            manifiesto = self.manifiesto(version)
+            if manifiesto is None:
+                return None
+            version = manifiesto["version"]
+
+            guardado = manifiesto.get("esquema_features", {}).get("hash")
+            if hash_esquema and guardado and guardado != hash_esquema:
+                self.logger.warning(
+                    f"⚠️  La versión {version} se entrenó con otro esquema de features; no se carga"
+                )
+                return None
+
+            ruta = self.ruta_version(version)
+            modelos = {
+                nombre: joblib.load(os.path.join(ruta, archivo), mmap_mode=self.mmap_mode)
+                for nombre, archivo in manifiesto.get("archivos", {}).items()
+            }
+            self.logger.info(f"📂 Modelos de la versión {version} cargados")
+            return {"version": version, "manifiesto": manifiesto, "modelos": modelos}
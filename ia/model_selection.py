@@ -0,0 +1,269 @@
+"""
+ia/model_selection.py
+Selección de modelos de ML según latencia de inferencia
+- Entrena configuraciones candidatas (bosques menos profundos,
+  HistGradientBoosting, ...) para cada modelo del MLPredictor
+- Mide accuracy, latencia por fila y por lote, tamaño serializado y
+  tiempo de carga
+- Elige, dentro de la frontera de Pareto accuracy/latencia, el candidato
+  más rápido que cumple el presupuesto y el piso de accuracy, y persiste
+  la elección junto al registro de modelos
+"""
+
+import json
+import logging
+import os
+import tempfile
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import joblib
+import numpy as np
+from sklearn.ensemble import (
+    RandomForestClassifier, GradientBoostingClassifier, HistGradientBoostingClassifier
+)
+from sklearn.model_selection import train_test_split
+
+
+logger = logging.getLogger("ModelSelection")
+
+ARCHIVO_SELECCION = "seleccion_modelos.json"
+
+# Configuraciones candidatas (nombre -> constructor)
+CANDIDATOS: Dict[str, Callable[[], Any]] = {
+    "rf_100_d15": lambda: RandomForestClassifier(n_estimators=100, max_depth=15, random_state=42, n_jobs=-1),
+    "rf_50_d10": lambda: RandomForestClassifier(n_estimators=50, max_depth=10, random_state=42, n_jobs=-1),
+    "rf_25_d6": lambda: RandomForestClassifier(n_estimators=25, max_depth=6, random_state=42, n_jobs=-1),
+    "gb_100_d5": lambda: GradientBoostingClassifier(n_estimators=100, max_depth=5, random_state=42),
+    "gb_50_d5": lambda: GradientBoostingClassifier(n_estimators=50, max_depth=5, random_state=42),
+    "gb_50_d3": lambda: GradientBoostingClassifier(n_estimators=50, max_depth=3, random_state=42),
+    "hgb_100": lambda: HistGradientBoostingClassifier(max_iter=100, early_stopping=False, random_state=42),
+    "hgb_50_d4": lambda: HistGradientBoostingClassifier(
+        max_iter=50, max_depth=4, early_stopping=False, random_state=42),
+}
+
+# Configuración histórica de cada modelo del MLPredictor (referencia del piso de accuracy)
+CANDIDATOS_BASE = {
+    "price_direction_model": "rf_100_d15",
+    "volatility_model": "gb_100_d5",
+    "confidence_model": "gb_50_d5",
+}
+
+
+@dataclass
+class MedicionCandidato:
+    """Resultado del benchmark de un candidato para un modelo"""
+    candidato: str
+    accuracy: float
+    latencia_fila_ms: float       # mediana de predict_proba sobre 1 fila
+    latencia_fila_p95_ms: float
+    latencia_lote_ms: float       # predict_proba sobre `filas_lote` filas
+    filas_lote: int
+    tamano_bytes: int
+    carga_ms: float               # joblib.load con mmap_mode="r", como el registro
+    ajuste_s: float
+
+    def a_dict(self) -> Dict[str, Any]:
+        return {k: round(v, 4) if isinstance(v, float) else v for k, v in asdict(self).items()}
+
+
+def medir_candidato(
+    candidato: str,
+    X_train: np.ndarray,
+    y_train: np.ndarray,
+    X_test: np.ndarray,
+    y_test: np.ndarray,
+    filas_lote: int = 256,
+    repeticiones: int = 50
+) -> Tuple[MedicionCandidato, Any]:
+    """
+    Ajusta un candidato y mide su coste de inferencia
+
+    Returns:
+        (medición, modelo ajustado)
+    """
+    inicio = time.perf_counter()
+    modelo = CANDIDATOS[candidato]().fit(X_train, y_train)
+    ajuste = time.perf_counter() - inicio
+    accuracy = float(modelo.score(X_test, y_test))
+
+    # Latencia por fila: una predicción aislada (ruta predict_price_direction)
+    modelo.predict_proba(X_test[:1])
+    tiempos = []
+    for i in range(repeticiones):
+        fila = X_test[i % len(X_test)].reshape(1, -1)
+        inicio = time.perf_counter()
+        modelo.predict_proba(fila)
+        tiempos.append(time.perf_counter() - inicio)
+    tiempos_ms = np.array(tiempos) * 1000
+
+    # Latencia por lote: una llamada vectorizada (ruta predict_many)
+    lote = X_test[np.arange(filas_lote) % len(X_test)]
+    lote_ms = []
+    for _ in range(3):
+        inicio = time.perf_counter()
+        modelo.predict_proba(lote)
+        lote_ms.append((time.perf_counter() - inicio) * 1000)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, f"{candidato}.joblib")
+        joblib.dump(modelo, ruta)
+        tamano = os.path.getsize(ruta)
+        inicio = time.perf_counter()
+        joblib.load(ruta, mmap_mode="r")
+        carga = (time.perf_counter() - inicio) * 1000
+
+    medicion = MedicionCandidato(
+        candidato=candidato,
+        accuracy=accuracy,
+        latencia_fila_ms=float(np.median(tiempos_ms)),
+        latencia_fila_p95_ms=float(np.percentile(tiempos_ms, 95)),
+        latencia_lote_ms=float(min(lote_ms)),
+        filas_lote=filas_lote,
+        tamano_bytes=int(tamano),
+        carga_ms=float(carga),
+        ajuste_s=float(ajuste),
+    )
+    return medicion, modelo
+
+
+def frontera_pareto(mediciones: Sequence[MedicionCandidato]) -> List[MedicionCandidato]:
+    """
+    Candidatos no dominados en (accuracy ↑, latencia por fila ↓)
+
+    Returns:
+        Frontera ordenada de más rápido a más lento
+    """
+    frontera = [
+        m for m in mediciones
+        if not any(
+            o.accuracy >= m.accuracy and o.latencia_fila_ms <= m.latencia_fila_ms
+            and (o.accuracy > m.accuracy or o.latencia_fila_ms < m.latencia_fila_ms)
+            for o in mediciones
+        )
+    ]
+    return sorted(frontera, key=lambda m: m.latencia_fila_ms)
+
+
+def elegir_candidato(
+    mediciones: Sequence[MedicionCandidato],
+    presupuesto_ms: Optional[float],
+    accuracy_minima: float
+) -> Tuple[MedicionCandidato, bool]:
+    """
+    Candidato de la frontera de Pareto para servir
+
+    El más rápido con accuracy >= accuracy_minima dentro del presupuesto.
+    Si ninguno cumple ambas cosas: el más preciso dentro del presupuesto,
+    o el más rápido de todos si ninguno entra en el presupuesto.
+
+    Returns:
+        (medición elegida, cumple presupuesto y piso)
+    """
+    frontera = frontera_pareto(mediciones)
+    en_presupuesto = [m for m in frontera if presupuesto_ms is None or m.latencia_fila_ms <= presupuesto_ms]
+    validos = [m for m in en_presupuesto if m.accuracy >= accuracy_minima]
+    if validos:
+        return validos[0], True
+    if en_presupuesto:
+        return max(en_presupuesto, key=lambda m: m.accuracy), False
+    return frontera[0], False
+
+
+def comparar_candidatos(
+    X: np.ndarray,
+    etiquetas: Dict[str, np.ndarray],
+    candidatos: Optional[Sequence[str]] = None,
+    presupuesto_ms: Optional[float] = None,
+    accuracy_minima: Optional[Dict[str, float]] = None,
+    tolerancia: float = 0.01,
+    filas_lote: int = 256,
+    test_size: float = 0.2
+) -> Dict[str, Dict[str, Any]]:
+    """
+    Benchmark de candidatos para cada modelo y elección por latencia
+
+    Args:
+        X: Features normalizadas
+        etiquetas: {modelo: y} (claves de CANDIDATOS_BASE)
+        candidatos: Nombres de CANDIDATOS a probar (default: todos)
+        presupuesto_ms: Latencia máxima por fila (None = sin límite)
+        accuracy_minima: {modelo: piso}; por defecto, la accuracy de la
+                         configuración base menos `tolerancia`
+        filas_lote: Filas de la medición por lote
+        test_size: Fracción de validación
+
+    Returns:
+        {modelo: {"elegido", "cumple", "accuracy_minima", "presupuesto_ms",
+                  "frontera", "mediciones"}}
+    """
+    nombres = list(candidatos or CANDIDATOS)
+    accuracy_minima = accuracy_minima or {}
+    resultado = {}
+
+    for modelo, y in etiquetas.items():
+        base = CANDIDATOS_BASE.get(modelo)
+        probar = nombres + ([base] if base and base not in nombres and modelo not in accuracy_minima else [])
+        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=42)
+        if len(np.unique(y_train)) < 2:
+            logger.warning(f"⚠️  {modelo}: etiquetas de una sola clase, sin selección")
+            continue
+
+        mediciones = []
+        for candidato in probar:
+            try:
+                mediciones.append(medir_candidato(candidato, X_train, y_train, X_test, y_test, filas_lote)[0])
+            except Exception as e:
+                logger.warning(f"⚠️  Candidato {candidato} falló para {modelo}: {str(e)}")
+        if not mediciones:
+            continue
+
+        if modelo in accuracy_minima:
+            piso = accuracy_minima[modelo]
+        else:
+            referencia = next((m for m in mediciones if m.candidato == base), None)
+            piso = (referencia.accuracy if referencia else max(m.accuracy for m in mediciones)) - tolerancia
+
+        elegido, cumple = elegir_candidato(mediciones, presupuesto_ms, piso)
+        resultado[modelo] = {
+            "elegido": elegido.candidato,
+            "cumple": cumple,
+            "accuracy_minima": round(piso, 4),
+            "presupuesto_ms": presupuesto_ms,
+            "frontera": [m.candidato for m in frontera_pareto(mediciones)],
+            "mediciones": [m.a_dict() for m in mediciones],
+        }
+        logger.info(
+            f"🏁 {modelo}: {elegido.candidato} (acc {elegido.accuracy:.3f}, "
+            f"{elegido.latencia_fila_ms:.2f} ms/fila){'' if cumple else ' ⚠️  sin candidato que cumpla'}"
+        )
+    return resultado
+
+
+def guardar_seleccion(directorio: str, seleccion: Dict[str, Dict[str, Any]]) -> str:
+    """Persiste la selección (reemplazo atómico) y devuelve la ruta"""
+    os.makedirs(directorio, exist_ok=True)
+    ruta = os.path.join(directorio, ARCHIVO_SELECCION)
+    tmp = ruta + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(seleccion, f, indent=2)
+    os.replace(tmp, ruta)
+    return ruta
+
+
+def leer_seleccion(directorio: str) -> Dict[str, str]:
+    """{modelo: candidato} de la selección persistida (vacío si no hay)"""
+    ruta = os.path.join(directorio, ARCHIVO_SELECCION)
+    if not os.path.exists(ruta):
+        return {}
+    try:
+        with open(ruta, encoding="utf-8") as f:
+            seleccion = json.load(f)
+    except (OSError, ValueError) as e:
+        logger.warning(f"⚠️  Selección de modelos dañada, se ignora: {str(e)}")
+        return {}
+    return {
+        modelo: datos["elegido"] for modelo, datos in seleccion.items()
+        if isinstance(datos, dict) and datos.get("elegido") in CANDIDATOS
+    }
@@ -0,0 +1,269 @@
+"""
+ia/training_jobs.py
+Trabajos de entrenamiento de ML en segundo plano
+- Cada trabajo descarga históricos y entrena en un proceso aparte (el
+  proceso que sirve predicciones no pierde CPU ni GIL)
+- El proceso informa progreso por una cola; el estado se consulta por id
+- El proceso publica una versión nueva en el registro de modelos del
+  predictor; al terminar, esa versión se instala de una vez en el
+  MLPredictor que sirve (ConjuntoModelos) y se podan las versiones antiguas
+"""
+
+import logging
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass, field, asdict
+from typing import Any, Callable, Dict, List, Optional
+
+from .ml_predictions import MLPredictor
+
+
+ESTADOS_FINALES = ("completado", "error")
+
+
+@dataclass
+class TrabajoEntrenamiento:
+    """Estado de un entrenamiento enviado al gestor"""
+    id: str
+    tickers: List[str]
+    periodo: str = "1y"
+    incremental: bool = False
+    ventana_barras: Optional[int] = None
+    estado: str = "pendiente"  # pendiente | descargando | entrenando | completado | error
+    progreso: float = 0.0
+    mensaje: str = "En cola"
+    creado: float = field(default_factory=time.time)
+    iniciado: Optional[float] = None
+    terminado: Optional[float] = None
+    metricas: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+
+    @property
+    def finalizado(self) -> bool:
+        return self.estado in ESTADOS_FINALES
+
+    def a_dict(self) -> Dict[str, Any]:
+        datos = asdict(self)
+        datos["duracion_segundos"] = (
+            round((self.terminado or time.time()) - self.iniciado, 2) if self.iniciado else None
+        )
+        return datos
+
+
+def entrenar_en_proceso(
+    tickers: List[str],
+    periodo: str,
+    directorio: str,
+    cola,
+    incremental: bool = False,
+    ventana_barras: Optional[int] = None
+) -> None:
+    """
+    Objetivo del proceso de entrenamiento (nivel de módulo: serializable)
+
+    Descarga los históricos, entrena con MLPredictor.train_models (completo o
+    incremental sobre la versión activa) y publica los modelos como versión
+    nueva del registro en `directorio`. Informa por
+    `cola` mensajes ("progreso", fracción, estado, mensaje) y uno final
+    ("completado", métricas con "version") o ("error", mensaje).
+    """
+    try:
+        from data_sources.batch_history import descargar_historicos_batch
+
+        cola.put(("progreso", 0.05, "descargando", f"Descargando {len(tickers)} tickers"))
+        historicos = descargar_historicos_batch(tickers, periodo=periodo)
+        if not historicos:
+            cola.put(("error", "No se pudieron descargar datos históricos"))
+            return
+
+        cola.put(("progreso", 0.2, "entrenando", f"Entrenando con {len(historicos)} tickers"))
+        # Sin poda aquí: la hace el gestor después de instalar la versión nueva
+        predictor = MLPredictor(model_dir=directorio, versiones_conservadas=None)
+        resultado = predictor.train_models(
+            historicos,
+            progreso=lambda fraccion, mensaje: cola.put(
+                ("progreso", 0.2 + 0.8 * fraccion, "entrenando", mensaje)
+            ),
+            incremental=incremental,
+            ventana_barras=ventana_barras
+        )
+        if "error" in resultado:
+            cola.put(("error", resultado["error"]))
+        else:
+            cola.put(("completado", resultado))
+    except Exception as e:
+        cola.put(("error", str(e)))
+
+
+class GestorEntrenamiento:
+    """
+    Cola de entrenamientos que se ejecutan de uno en uno en otro proceso
+
+    Ejemplo:
+        gestor = GestorEntrenamiento(ml_predictor)
+        trabajo = gestor.enviar(["AAPL", "MSFT"])
+        gestor.obtener(trabajo.id).a_dict()   # estado, progreso, métricas
+    """
+
+    def __init__(
+        self,
+        predictor: MLPredictor,
+        objetivo: Callable[..., None] = entrenar_en_proceso,
+        contexto: str = "spawn",
+        max_historial: int = 50,
+        timeout_segundos: float = 3600
+    ):
+        """
+        Args:
+            predictor: MLPredictor que sirve predicciones (recibe los modelos nuevos)
+            objetivo: Función del proceso (tickers, periodo, directorio del registro, cola,
+                      incremental=, ventana_barras=)
+            contexto: Método de arranque de multiprocessing (spawn es seguro con hilos)
+            max_historial: Trabajos terminados que se conservan para consulta
+            timeout_segundos: Tiempo máximo de un entrenamiento antes de abortarlo
+        """
+        self.logger = logging.getLogger("GestorEntrenamiento")
+        self.predictor = predictor
+        self.objetivo = objetivo
+        self.max_historial = max_historial
+        self.timeout_segundos = timeout_segundos
+        self._mp = multiprocessing.get_context(contexto)
+        self._trabajos: "OrderedDict[str, TrabajoEntrenamiento]" = OrderedDict()
+        self._pendientes: "queue.Queue[str]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._hilo: Optional[threading.Thread] = None
+
+    # ------------------------------------------------------------------
+    # API
+    # ------------------------------------------------------------------
+
+    def enviar(
+        self,
+        tickers: List[str],
+        periodo: str = "1y",
+        incremental: bool = False,
+        ventana_barras: Optional[int] = None
+    ) -> TrabajoEntrenamiento:
+        """
+        Encola un entrenamiento y devuelve su trabajo (estado "pendiente")
+
+        Args:
+            tickers: Símbolos con los que entrenar
+            periodo: Período de histórico a descargar
+            incremental: Ampliar la versión activa solo con las barras nuevas
+                         (MLPredictor.train_models(incremental=True))
+            ventana_barras: Filas más recientes por ticker (default del modo)
+        """
+        trabajo = TrabajoEntrenamiento(
+            id=uuid.uuid4().hex[:12],
+            tickers=list(dict.fromkeys(t.upper() for t in tickers)),
+            periodo=periodo,
+            incremental=incremental,
+            ventana_barras=ventana_barras
+        )
+        with self._lock:
+            self._trabajos[trabajo.id] = trabajo
+            self._podar()
+            if self._hilo is None or not self._hilo.is_alive():
+                self._hilo = threading.Thread(target=self._trabajador, name="entrenamiento-ml", daemon=True)
+                self._hilo.start()
+        self._pendientes.put(trabajo.id)
+        self.logger.info(f"📨 Entrenamiento {trabajo.id} encolado ({len(trabajo.tickers)} tickers)")
+        return trabajo
+
+    def obtener(self, trabajo_id: str) -> Optional[TrabajoEntrenamiento]:
+        with self._lock:
+            return self._trabajos.get(trabajo_id)
+
+    def listar(self) -> List[Dict[str, Any]]:
+        with self._lock:
+            return [trabajo.a_dict() for trabajo in reversed(self._trabajos.values())]
+
+    def esperar(self, trabajo_id: str, timeout: Optional[float] = None) -> Optional[TrabajoEntrenamiento]:
+        """Bloquea hasta que el trabajo termine (para scripts y pruebas)"""
+        limite = time.time() + timeout if timeout else None
+        while True:
+            trabajo = self.obtener(trabajo_id)
+            if trabajo is None or trabajo.finalizado:
+                return trabajo
+            if limite and time.time() >= limite:
+                return trabajo
+            time.sleep(0.05)
+
+    # ------------------------------------------------------------------
+    # Ejecución
+    # ------------------------------------------------------------------
+
+    def _podar(self) -> None:
+        terminados = [t.id for t in self._trabajos.values() if t.finalizado]
+        for trabajo_id in terminados[:max(0, len(self._trabajos) - self.max_historial)]:
+            del self._trabajos[trabajo_id]
+
+    def _actualizar(self, trabajo: TrabajoEntrenamiento, **cambios) -> None:
+        with self._lock:
+            for nombre, valor in cambios.items():
+                setattr(trabajo, nombre, valor)
+
+    def _trabajador(self) -> None:
+        while True:
+            trabajo_id = self._pendientes.get()
+            trabajo = self.obtener(trabajo_id)
+            if trabajo is not None:
+                self._ejecutar(trabajo)
+
+    def _ejecutar(self, trabajo: TrabajoEntrenamiento) -> None:
+        cola = self._mp.Queue()
+        proceso = self._mp.Process(
+            target=self.objetivo,
+            args=(trabajo.tickers, trabajo.periodo, self.predictor.model_dir, cola),
+            kwargs={"incremental": trabajo.incremental, "ventana_barras": trabajo.ventana_barras},
+            name=f"entrenamiento-{trabajo.id}",
+            daemon=True
+        )
+        self._actualizar(trabajo, estado="descargando", iniciado=time.time(), mensaje="Iniciando proceso")
+        proceso.start()
+
+        final = None
+        limite = time.time() + self.timeout_segundos
+        proceso_terminado = False
+        try:
+            while final is None:
+                try:
+                    mensaje = cola.get(timeout=0.5)
+                except queue.Empty:
+                    if proceso_terminado:
+                        final = ("error", f"El proceso terminó sin resultado (código {proceso.exitcode})")
+                    elif not proceso.is_alive():
+                        # Una vuelta más para leer lo que quedara en la cola
+                        proceso_terminado = True
+                    elif time.time() > limite:
+                        proceso.terminate()
+                        final = ("error", f"Entrenamiento abortado tras {self.timeout_segundos:.0f}s")
+                    continue
+                if mensaje[0] == "progreso":
+                    _, fraccion, estado, texto = mensaje
+                    self._actualizar(trabajo, progreso=round(fraccion, 3), estado=estado, mensaje=texto)
+                else:
+                    final = mensaje
+
+            if final[0] == "completado":
+                # La versión publicada por el proceso se mapea y se instala de una vez
+                if not self.predictor.cargar_version(final[1].get("version")):
+                    raise RuntimeError("El entrenamiento no dejó modelos")
+                self.predictor.podar_versiones()
+                self._actualizar(trabajo, estado="completado", progreso=1.0, mensaje="Modelos instalados",
+                                 metricas=final[1], terminado=time.time())
+                self.logger.info(f"✅ Entrenamiento {trabajo.id} completado y modelos instalados")
+            else:
+                self._actualizar(trabajo, estado="error", mensaje="Error", error=final[1], terminado=time.time())
+                self.logger.warning(f"⚠️  Entrenamiento {trabajo.id} falló: {final[1]}")
+        except Exception as e:
+            self._actualizar(trabajo, estado="error", mensaje="Error", error=str(e), terminado=time.time())
+            self.logger.error(f"❌ Error instalando modelos de {trabajo.id}: {str(e)}")
+        finally:
+            proceso.join(timeout=5)
+            cola.close()
@@ -0,0 +1,209 @@
+"""
+test_batch_history.py
+Pruebas de la descarga de históricos multi-ticker en lotes
+(data_sources/batch_history.py, MarketDataManager.obtener_historicos_batch y screener)
+Usa un yf.download simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import data_sources.batch_history as batch_module
+from data_sources.batch_history import descargar_historicos_batch, dividir_lotes
+import data_sources.market_data as market_data_module
+from data_sources.market_data import MarketDataManager
+from analisis.screener import ScreenerAutomatico
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestBatchHistory")
+
+
+class _FakeDownload:
+    """Sustituto de yf.download(group_by='ticker') que registra cada llamada"""
+
+    def __init__(self, fallan=()):
+        self.llamadas = []
+        self.fallan = set(fallan)
+
+    def __call__(self, tickers, **kwargs):
+        simbolos = [tickers] if isinstance(tickers, str) else list(tickers)
+        self.llamadas.append({"simbolos": simbolos, **kwargs})
+        if self.fallan & set(simbolos):
+            raise RuntimeError("símbolo inválido en el lote")
+        fin = pd.Timestamp.now(tz="America/New_York").normalize()
+        fechas = pd.bdate_range(end=fin, periods=260, tz="America/New_York", name="Date")
+        columnas = {}
+        for i, simbolo in enumerate(simbolos):
+            close = 50.0 + i + np.linspace(0, 20, len(fechas))
+            for campo, valores in (("Open", close), ("High", close + 1), ("Low", close - 1),
+                                   ("Close", close), ("Volume", np.full(len(fechas), 1e6))):
+                columnas[(simbolo, campo)] = valores
+        return pd.DataFrame(columnas, index=fechas)
+
+
+class _TickerNoUsar:
+    """yf.Ticker que falla si se usa (todo debe salir del lote)"""
+
+    def __init__(self, ticker, session=None):
+        raise AssertionError(f"Descarga individual inesperada de {ticker}")
+
+
+def _tickers(n):
+    return [f"T{i:03d}" for i in range(n)]
+
+
+def test_lotes_y_separacion():
+    """Test 1: 100 tickers en lotes de 25 = 4 llamadas y un DataFrame por ticker"""
+    fake = _FakeDownload()
+    original = batch_module.yf.download
+    batch_module.yf.download = fake
+    try:
+        datos = descargar_historicos_batch(_tickers(100) + ["T000"], periodo="1y", tamano_lote=25)
+    finally:
+        batch_module.yf.download = original
+
+    assert len(fake.llamadas) == 4
+    assert all(len(ll["simbolos"]) == 25 for ll in fake.llamadas)
+    assert len(datos) == 100
+    assert list(datos["T042"].columns) == ["Open", "High", "Low", "Close", "Volume"]
+    assert dividir_lotes(["a", "A", "b"], 10) == [["A", "B"]]
+    logger.info(f"✅ {len(datos)} tickers en {len(fake.llamadas)} llamadas")
+
+
+def test_lote_fallido_se_divide():
+    """Test 2: Un símbolo problemático no invalida el resto del lote"""
+    fake = _FakeDownload(fallan={"T005"})
+    original = batch_module.yf.download
+    batch_module.yf.download = fake
+    try:
+        datos = descargar_historicos_batch(_tickers(8), periodo="1y", tamano_lote=8)
+    finally:
+        batch_module.yf.download = original
+
+    assert "T005" not in datos
+    assert len(datos) == 7
+    logger.info(f"✅ Lote dividido en {len(fake.llamadas)} llamadas, {len(datos)} tickers recuperados")
+
+
+def test_manager_batch_alimenta_cache_y_almacen():
+    """Test 3: obtener_historicos_batch deja el histórico listo para obtener_historico"""
+    fake = _FakeDownload()
+    original_download = batch_module.yf.download
+    original_ticker = market_data_module.yf.Ticker
+    batch_module.yf.download = fake
+    market_data_module.yf.Ticker = _TickerNoUsar
+    MarketDataManager._request_cache.limpiar()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = MarketDataManager(almacen_dir=tmp)
+            inicio = time.perf_counter()
+            datos = manager.obtener_historicos_batch(_tickers(60), periodo="1y", tamano_lote=30)
+            duracion = time.perf_counter() - inicio
+            assert len(datos) == 60 and len(fake.llamadas) == 2
+
+            # Sin red: caché en memoria
+            hist = manager.obtener_historico("T010", periodo="1y")
+            assert len(hist) == len(datos["T010"])
+
+            # Sin red: almacén local vigente
+            MarketDataManager._request_cache.limpiar()
+            manager.obtener_historicos_batch(_tickers(60), periodo="1y")
+            assert len(fake.llamadas) == 2
+            logger.info(f"✅ 60 tickers en {duracion:.2f}s con 2 llamadas")
+    finally:
+        batch_module.yf.download = original_download
+        market_data_module.yf.Ticker = original_ticker
+        MarketDataManager._request_cache.limpiar()
+
+
+def test_screener_usa_lote():
+    """Test 4: screener_por_sector descarga los históricos en una sola llamada"""
+    fake = _FakeDownload()
+    original = batch_module.yf.download
+    batch_module.yf.download = fake
+
+    class _MarketDataFalso:
+        def obtener_datos_actuales(self, ticker):
+            return {"precio_actual": 100.0}
+
+    try:
+        screener = ScreenerAutomatico(market_data_manager=_MarketDataFalso())
+        screener._obtener_datos_historicos = lambda ticker, dias=90: None
+        resultados = screener.screener_por_sector(_tickers(20), limite=5)
+    finally:
+        batch_module.yf.download = original
+
+    assert len(fake.llamadas) == 1
+    assert len(resultados) == 5
+    assert resultados[0].score >= resultados[-1].score
+    logger.info(f"✅ Screener de 20 símbolos con {len(fake.llamadas)} descarga")
+
+
+def test_screener_pasa_por_manager():
+    """Test 5: El screener descarga vía MarketDataManager (caché, almacén y rate limiter)"""
+    fake = _FakeDownload()
+    original = batch_module.yf.download
+    batch_module.yf.download = fake
+    MarketDataManager._request_cache.limpiar()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            manager = MarketDataManager(almacen_dir=tmp)
+            manager.obtener_datos_actuales = lambda ticker: {"precio_actual": 100.0}
+            llamadas = []
+            batch_original = manager.obtener_historicos_batch
+            manager.obtener_historicos_batch = lambda tickers, **kwargs: (
+                llamadas.append(kwargs) or batch_original(tickers, **kwargs))
+            limitador = manager._rate_limiter.get_stats()
+
+            screener = ScreenerAutomatico(market_data_manager=manager)
+            screener._obtener_datos_historicos = lambda ticker, dias=90: None
+            assert len(screener.screener_por_sector(_tickers(20), limite=5)) == 5
+            assert llamadas[0]["periodo"] == "3mo" and len(fake.llamadas) == 1
+            assert manager._rate_limiter.get_stats() != limitador
+
+            # Segunda pasada: servida por el manager sin volver a descargar
+            screener.screener_por_sector(_tickers(20), limite=5)
+            assert len(fake.llamadas) == 1
+    finally:
+        batch_module.yf.download = original
+        MarketDataManager._request_cache.limpiar()
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Lotes y separación", test_lotes_y_separacion),
+        ("Lote fallido", test_lote_fallido_se_divide),
+        ("Manager batch", test_manager_batch_alimenta_cache_y_almacen),
+        ("Screener batch", test_screener_usa_lote),
+        ("Screener vía manager", test_screener_pasa_por_manager),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
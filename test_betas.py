@@ -0,0 +1,151 @@
+"""
+test_betas.py
+Pruebas de CorrelationAnalyzer.calcular_betas (beta, alfa, R² y beta móvil
+en lote sobre el panel de retornos compartido)
+Usa una descarga batch simulada: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.correlation_analyzer as ca_module
+from analisis.correlation_analyzer import CorrelationAnalyzer
+from analisis.returns_panel import betas_moviles
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestBetas")
+
+
+def _mercado(n_tickers=300, barras=252, semilla=0):
+    """Cierres con betas conocidas contra ^GSPC"""
+    rng = np.random.default_rng(semilla)
+    mercado = rng.normal(0.0004, 0.01, barras)
+    betas = rng.uniform(0.2, 2.0, n_tickers)
+    retornos = 0.0002 + mercado[:, None] * betas + rng.normal(0, 0.01, (barras, n_tickers))
+    fechas = pd.bdate_range("2024-01-01", periods=barras)
+    tickers = [f"P{i:03d}" for i in range(n_tickers)]
+    cierres = pd.DataFrame(100 * np.cumprod(1 + retornos, axis=0), index=fechas, columns=tickers)
+    cierres["^GSPC"] = 4000 * np.cumprod(1 + mercado)
+    return cierres, dict(zip(tickers, betas))
+
+
+class _FakeBatch:
+    def __init__(self, cierres):
+        self.cierres = cierres
+        self.llamadas = []
+
+    def __call__(self, tickers, **kwargs):
+        self.llamadas.append(list(tickers))
+        return {t: pd.DataFrame({"Close": self.cierres[t]}) for t in tickers if t in self.cierres}
+
+
+def _con_batch(fake, funcion):
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake
+    try:
+        return funcion()
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+
+def test_igual_a_ols():
+    """Test 1: Beta, alfa y R² coinciden con una regresión por ticker"""
+    cierres, _ = _mercado(n_tickers=5)
+    resultado = _con_batch(_FakeBatch(cierres), lambda: CorrelationAnalyzer().calcular_betas(
+        ["P000", "P001", "P002", "P003", "P004"], "^GSPC"))
+    retornos = cierres.pct_change().dropna()
+    for ticker, metricas in resultado["betas"].items():
+        beta, alfa = np.polyfit(retornos["^GSPC"], retornos[ticker], 1)
+        r2 = np.corrcoef(retornos["^GSPC"], retornos[ticker])[0, 1] ** 2
+        assert abs(metricas["beta"] - beta) < 1e-10
+        assert abs(metricas["alpha_anual_pct"] - round(alfa * 252 * 100, 2)) < 0.011
+        assert abs(metricas["r2"] - r2) < 1e-4
+
+
+def test_betas_moviles():
+    """Test 2: Beta móvil == cov/var de pandas rolling"""
+    cierres, _ = _mercado(n_tickers=4)
+    retornos = cierres.pct_change().iloc[1:]
+    retornos.iloc[100:103, 1] = np.nan
+    moviles = betas_moviles(retornos.iloc[:, :4].to_numpy(), retornos["^GSPC"].to_numpy(), 60)
+    for k in range(4):
+        par = retornos.iloc[:, [k, 4]]
+        esperada = par.iloc[:, 0].rolling(60, min_periods=30).cov(par.iloc[:, 1]) / \
+            par.iloc[:, 1].where(par.iloc[:, 0].notna()).rolling(60, min_periods=30).var()
+        esperada.iloc[:59] = np.nan
+        assert np.allclose(moviles[:, k], esperada.to_numpy(), equal_nan=True, atol=1e-9)
+
+
+def test_cartera_300():
+    """Test 3: 300 posiciones = una descarga y una pasada numpy"""
+    cierres, betas_reales = _mercado()
+    fake = _FakeBatch(cierres)
+    tickers = list(betas_reales)
+    analyzer = CorrelationAnalyzer()
+
+    inicio = time.perf_counter()
+    resultado = _con_batch(fake, lambda: analyzer.calcular_betas(tickers, "^GSPC", ventana_rolling=60))
+    duracion = time.perf_counter() - inicio
+
+    assert len(fake.llamadas) == 1 and "^GSPC" in fake.llamadas[0]
+    assert len(resultado["betas"]) == 300
+    errores = [abs(resultado["betas"][t]["beta"] - b) for t, b in betas_reales.items()]
+    assert np.median(errores) < 0.15
+    assert len(resultado["betas_rolling"]["P000"]) == len(resultado["fechas_rolling"])
+    logger.warning(f"✅ 300 betas + móviles en {duracion * 1000:.0f}ms con 1 descarga")
+
+    # Consultas posteriores (beta individual, contagio) no descargan
+    beta = _con_batch(fake, lambda: analyzer.calcular_beta("P010"))
+    contagio = _con_batch(fake, lambda: analyzer.detectar_contagio_sistematico("P010"))
+    assert len(fake.llamadas) == 1
+    assert beta == resultado["betas"]["P010"]["beta"] == contagio["beta"]
+
+
+def test_sin_benchmark():
+    """Test 4: Benchmark sin datos devuelve error; tickers sin datos se reportan"""
+    cierres, _ = _mercado(n_tickers=3)
+    fake = _FakeBatch(cierres.drop(columns="^GSPC"))
+    resultado = _con_batch(fake, lambda: CorrelationAnalyzer().calcular_betas(["P000"], "^GSPC"))
+    assert "error" in resultado
+
+    resultado = _con_batch(_FakeBatch(cierres), lambda: CorrelationAnalyzer().calcular_betas(["P000", "ZZZ"]))
+    assert resultado["sin_datos"] == ["ZZZ"] and list(resultado["betas"]) == ["P000"]
+    assert _con_batch(_FakeBatch(cierres), lambda: CorrelationAnalyzer().calcular_beta("ZZZ")) is None
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Igual a OLS", test_igual_a_ols),
+        ("Betas móviles", test_betas_moviles),
+        ("Cartera de 300", test_cartera_300),
+        ("Sin benchmark", test_sin_benchmark),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
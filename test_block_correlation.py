@@ -0,0 +1,186 @@
+"""
+test_block_correlation.py
+Pruebas de la correlación por bloques (analisis/block_correlation.py) y de
+CorrelationAnalyzer.analizar_universo / búsqueda vectorizada de pares
+Datos sintéticos y descarga batch simulada: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.correlation_analyzer as ca_module
+from analisis.correlation_analyzer import CorrelationAnalyzer
+from analisis.block_correlation import correlacion_por_bloques
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestBlockCorrelation")
+
+
+def _retornos(n=300, barras=250, semilla=0):
+    """Retornos con sectores (pares muy correlacionados) y ruido"""
+    rng = np.random.default_rng(semilla)
+    sectores = rng.normal(0, 0.01, (barras, 10))
+    carga = rng.uniform(0, 1.5, n)
+    retornos = sectores[:, np.arange(n) % 10] * carga + rng.normal(0, 0.01, (barras, n))
+    return retornos, [f"S{i:04d}" for i in range(n)]
+
+
+def _exhaustivo(corr, k):
+    filas, columnas = np.triu_indices(len(corr), k=1)
+    valores = corr[filas, columnas]
+    altas = np.argsort(-np.abs(valores), kind="stable")[:k]
+    bajas = np.argsort(np.abs(valores), kind="stable")[:k]
+    return (set(zip(filas[altas], columnas[altas])), set(zip(filas[bajas], columnas[bajas])),
+            valores.mean())
+
+
+def test_top_k_exacto():
+    """Test 1: Los pares top-k por bloques == búsqueda exhaustiva"""
+    retornos, tickers = _retornos()
+    corr = np.corrcoef(retornos, rowvar=False)
+    altas, bajas, media = _exhaustivo(corr, 15)
+
+    resumen = correlacion_por_bloques(retornos, tickers, k=15, tamano_bloque=64)
+    assert set(zip(resumen["altas"].fila, resumen["altas"].columna)) == altas
+    assert set(zip(resumen["bajas"].fila, resumen["bajas"].columna)) == bajas
+    assert resumen["pares"] == 300 * 299 // 2
+    assert abs(resumen["correlacion_promedio"] - media) < 1e-5
+
+    # Ordenados por |corr| y en arrays compactos
+    assert resumen["altas"].valor.dtype == np.float32
+    assert np.all(np.diff(np.abs(resumen["altas"].valor)) <= 1e-7)
+    i, j = resumen["altas"].fila[0], resumen["altas"].columna[0]
+    assert abs(resumen["altas"].valor[0] - corr[i, j]) < 1e-5
+
+
+def test_volcado_a_disco():
+    """Test 2: La matriz volcada por bloques es la matriz completa"""
+    retornos, tickers = _retornos(n=130)
+    retornos[:20, 5] = np.nan
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "corr.npy")
+        correlacion_por_bloques(retornos, tickers, k=5, tamano_bloque=50, ruta=ruta)
+        matriz = np.load(ruta, mmap_mode="r")
+        esperada = pd.DataFrame(retornos).corr().to_numpy()
+        assert matriz.shape == (130, 130)
+        assert np.allclose(matriz, esperada, atol=1e-5)
+        del matriz
+
+
+def test_huecos_pares_completos():
+    """Test 3: Con huecos cada par usa sus filas comunes, igual que DataFrame.corr()"""
+    retornos, tickers = _retornos(n=90, barras=200, semilla=3)
+    rng = np.random.default_rng(3)
+    # Huecos sueltos, altas escalonadas y retornos sesgados (medias por par distintas)
+    retornos[rng.random(retornos.shape) < 0.2] = np.nan
+    for c in range(0, 90, 7):
+        retornos[:rng.integers(20, 150), c] = np.nan
+    retornos[120:, 10] += 0.05
+    retornos[:199, 11] = np.nan
+    retornos[:, 12] = np.where(np.arange(200) < 100, retornos[:, 12], np.nan)
+    retornos[:100, 13] = np.nan
+    esperada = pd.DataFrame(retornos).corr().to_numpy()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ruta = os.path.join(tmp, "corr.npy")
+        resumen = correlacion_por_bloques(retornos, tickers, k=10, tamano_bloque=32, ruta=ruta)
+        matriz = np.load(ruta, mmap_mode="r")
+        fuera = ~np.eye(90, dtype=bool)
+        assert np.array_equal(np.isnan(matriz[fuera]), np.isnan(esperada[fuera]))
+        assert np.allclose(matriz[fuera], esperada[fuera], atol=1e-4, equal_nan=True)
+        # 11 (una fila) y los pares 12/13 sin filas comunes quedan fuera
+        assert np.isnan(matriz[11, 20]) and np.isnan(matriz[12, 13])
+        del matriz
+
+    altas, bajas, _ = _exhaustivo(np.nan_to_num(esperada, nan=0.5), 10)
+    assert set(zip(resumen["altas"].fila, resumen["altas"].columna)) == altas
+    superior = esperada[np.triu_indices(90, k=1)]
+    assert resumen["pares"] == int(np.isfinite(superior).sum())
+    assert abs(resumen["correlacion_promedio"] - np.nanmean(superior)) < 1e-5
+
+
+def test_pares_legacy():
+    """Test 4: _encontrar_altas/bajas vectorizados == recorrido original"""
+    retornos, tickers = _retornos(n=40)
+    corr = pd.DataFrame(np.corrcoef(retornos, rowvar=False), index=tickers, columns=tickers)
+    corr.iloc[2, 3] = corr.iloc[3, 2] = np.nan
+    analyzer = CorrelationAnalyzer()
+
+    def original(matriz, umbral, mayor):
+        pares = []
+        for i in range(len(matriz.columns)):
+            for j in range(i + 1, len(matriz.columns)):
+                v = matriz.iloc[i, j]
+                if (abs(v) > umbral) if mayor else (abs(v) < umbral):
+                    pares.append((matriz.columns[i], matriz.columns[j], float(v)))
+        return sorted(pares, key=lambda x: abs(x[2]), reverse=mayor)
+
+    assert analyzer._encontrar_altas_correlaciones(corr, 0.5) == original(corr, 0.5, True)
+    assert analyzer._encontrar_bajas_correlaciones(corr, 0.1) == original(corr, 0.1, False)
+
+
+def test_universo_grande():
+    """Test 5: analizar_universo con 1.200 símbolos devuelve arrays compactos"""
+    retornos, tickers = _retornos(n=1200, barras=252)
+    cierres = pd.DataFrame(100 * np.cumprod(1 + retornos, axis=0), columns=tickers,
+                           index=pd.bdate_range("2024-01-01", periods=252))
+
+    def fake_batch(simbolos, **kwargs):
+        return {t: pd.DataFrame({"Close": cierres[t]}) for t in simbolos if t in cierres}
+
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake_batch
+    try:
+        inicio = time.perf_counter()
+        resultado = CorrelationAnalyzer().analizar_universo(tickers + ["NODATA"], k=25)
+        duracion = time.perf_counter() - inicio
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+    assert "error" not in resultado, resultado
+    assert resultado["sin_datos"] == ["NODATA"]
+    assert resultado["pares_evaluados"] == 1200 * 1199 // 2
+    altas = resultado["pares_altamente_correlacionados"]
+    assert set(altas) == {"a", "b", "correlacion"} and len(altas["a"]) == 25
+    assert 0 <= resultado["puntaje_diversificacion"] <= 100
+    logger.warning(f"✅ Universo de 1.200 símbolos en {duracion:.2f}s")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Top-k exacto", test_top_k_exacto),
+        ("Volcado a disco", test_volcado_a_disco),
+        ("Huecos por pares completos", test_huecos_pares_completos),
+        ("Pares legacy", test_pares_legacy),
+        ("Universo grande", test_universo_grande),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
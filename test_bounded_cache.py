@@ -0,0 +1,186 @@
+"""
+test_bounded_cache.py
+Pruebas del caché acotado LRU + TTL (data_sources/bounded_cache.py)
+y del modo stale-while-revalidate de MarketDataManager
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_sources.bounded_cache import BoundedTTLCache, estimar_tamano
+import data_sources.market_data as market_data_module
+from data_sources.market_data import MarketDataManager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestBoundedCache")
+
+
+def test_ttl_por_tipo():
+    """Test 1: Cada tipo de entrada expira con su propio TTL"""
+    cache = BoundedTTLCache(ttl_por_tipo={"cotizacion": 0.1, "fundamentales": 10}, intervalo_limpieza=0)
+    cache.guardar("cotizacion", "AAPL", {"precio": 1})
+    cache.guardar("fundamentales", "AAPL", {"pe": 20})
+
+    time.sleep(0.15)
+    assert cache.obtener("cotizacion", "AAPL") is None
+    assert cache.obtener("fundamentales", "AAPL") == {"pe": 20}
+
+    stats = cache.get_stats()
+    assert stats["expirados"] == 1
+    assert stats["por_tipo"]["cotizacion"]["misses"] == 1
+    assert stats["por_tipo"]["fundamentales"]["hits"] == 1
+    logger.info(f"✅ TTL por tipo: {stats['por_tipo']}")
+
+
+def test_expulsion_lru_por_entradas():
+    """Test 2: Al superar max_entradas se expulsa la menos usada"""
+    cache = BoundedTTLCache(max_entradas=3, intervalo_limpieza=0)
+    for ticker in ["A", "B", "C"]:
+        cache.guardar("cotizacion", ticker, ticker)
+    cache.obtener("cotizacion", "A")  # A pasa a ser la más reciente
+    cache.guardar("cotizacion", "D", "D")
+
+    assert cache.obtener("cotizacion", "B") is None
+    assert cache.obtener("cotizacion", "A") == "A"
+    assert len(cache) == 3
+    assert cache.get_stats()["expulsiones"] == 1
+    logger.info("✅ Expulsión LRU correcta")
+
+
+def test_presupuesto_de_bytes():
+    """Test 3: El caché respeta el presupuesto de memoria"""
+    df = pd.DataFrame(np.random.rand(1000, 5))
+    tamano = estimar_tamano(df)
+    cache = BoundedTTLCache(max_bytes=int(tamano * 2.5), intervalo_limpieza=0)
+
+    for i in range(5):
+        cache.guardar("historico", f"T{i}", df.copy())
+
+    stats = cache.get_stats()
+    assert stats["bytes"] <= stats["max_bytes"]
+    assert stats["entradas"] == 2
+    assert stats["expulsiones"] == 3
+    assert cache.guardar("historico", "ENORME", pd.DataFrame(np.random.rand(10000, 5))) is False
+    logger.info(f"✅ {stats['bytes']} / {stats['max_bytes']} bytes")
+
+
+def test_limpieza_en_segundo_plano():
+    """Test 4: El hilo de limpieza elimina expirados sin nuevas lecturas"""
+    cache = BoundedTTLCache(ttl_default=0.05, intervalo_limpieza=0.05)
+    for i in range(20):
+        cache.guardar("cotizacion", f"T{i}", i)
+    time.sleep(0.3)
+    cache.detener()
+
+    assert len(cache) == 0
+    assert cache.get_stats()["bytes"] == 0
+    logger.info("✅ Expirados eliminados en segundo plano")
+
+
+def test_ventana_de_gracia():
+    """Test 5: Entradas vencidas se sirven como stale solo dentro de la gracia"""
+    cache = BoundedTTLCache(
+        ttl_por_tipo={"cotizacion": 0.05},
+        gracia_por_tipo={"cotizacion": 0.2},
+        intervalo_limpieza=0
+    )
+    cache.guardar("cotizacion", "AAPL", {"precio": 1})
+    time.sleep(0.1)
+
+    assert cache.obtener("cotizacion", "AAPL") is None
+    valor, edad, vencido_hace = cache.obtener_con_estado("cotizacion", "AAPL")
+    assert valor == {"precio": 1} and vencido_hace >= 0 and edad >= 0.1
+
+    time.sleep(0.2)
+    assert cache.obtener_con_estado("cotizacion", "AAPL") is None
+    assert cache.get_stats()["hits_stale"] == 1
+    logger.info("✅ Gracia respetada")
+
+
+class _FakeTickerLento:
+    """Sustituto de yf.Ticker con latencia y precio creciente"""
+    descargas = 0
+    lock = threading.Lock()
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        with _FakeTickerLento.lock:
+            _FakeTickerLento.descargas += 1
+            precio = 100.0 + _FakeTickerLento.descargas
+        time.sleep(0.3)
+        return {"currentPrice": precio, "open": 99.0, "dayHigh": 110.0,
+                "dayLow": 90.0, "volume": 1000, "marketCap": 10**9}
+
+
+def test_stale_while_revalidate():
+    """Test 6: Cotización vencida se devuelve al instante y se refresca en segundo plano"""
+    original = market_data_module.yf.Ticker
+    market_data_module.yf.Ticker = _FakeTickerLento
+    MarketDataManager._request_cache.limpiar()
+    _FakeTickerLento.descargas = 0
+    try:
+        manager = MarketDataManager(usar_almacen_local=False, stale_while_revalidate=True)
+        primero = manager.obtener_datos_actuales("HOT")
+        assert primero["precio_actual"] == 101.0 and "stale" not in primero
+
+        # Forzar vencimiento de la cotización cacheada
+        MarketDataManager._request_cache.guardar("cotizacion", "HOT", primero, ttl=0)
+
+        inicio = time.perf_counter()
+        stale = [manager.obtener_datos_actuales("HOT") for _ in range(5)]
+        latencia_ms = (time.perf_counter() - inicio) * 1000
+        assert all(r["stale"] is True and r["precio_actual"] == 101.0 for r in stale)
+        assert latencia_ms < 100
+
+        time.sleep(1.0)  # rate limit por ticker (0.5s) + descarga simulada (0.3s)
+        fresco = manager.obtener_datos_actuales("HOT")
+        assert fresco["precio_actual"] == 102.0 and "stale" not in fresco
+        assert _FakeTickerLento.descargas == 2
+        logger.info(f"✅ 5 lecturas stale en {latencia_ms:.1f}ms, 1 revalidación")
+    finally:
+        market_data_module.yf.Ticker = original
+        MarketDataManager._request_cache.limpiar()
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("TTL por tipo", test_ttl_por_tipo),
+        ("Expulsión LRU", test_expulsion_lru_por_entradas),
+        ("Presupuesto de bytes", test_presupuesto_de_bytes),
+        ("Limpieza en segundo plano", test_limpieza_en_segundo_plano),
+        ("Ventana de gracia", test_ventana_de_gracia),
+        ("Stale-while-revalidate", test_stale_while_revalidate),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
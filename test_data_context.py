@@ -0,0 +1,177 @@
+"""
+test_data_context.py
+Pruebas del contexto de datos por análisis (data_sources/data_context.py)
+Verifica que un análisis descarga histórico e info una sola vez (yfinance simulado)
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+
+import numpy as np
+import pandas as pd
+
+import data_sources.market_data as market_data_module
+from data_sources.market_data import MarketDataManager
+from data_sources.data_context import ContextoDatos
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestDataContext")
+
+
+class _FakeTicker:
+    """Sustituto de yf.Ticker que cuenta descargas de info e histórico"""
+    llamadas = {"info": 0, "history": []}
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        _FakeTicker.llamadas["info"] += 1
+        return {
+            "currentPrice": 150.0, "open": 149.0, "dayHigh": 151.0, "dayLow": 148.0,
+            "volume": 1000, "averageVolume": 1200, "marketCap": 10**12,
+            "trailingPE": 25.0, "longName": "Test Corp", "sector": "Technology",
+        }
+
+    def history(self, period=None, interval="1d", start=None):
+        _FakeTicker.llamadas["history"].append(period)
+        fin = pd.Timestamp.now(tz="America/New_York").normalize()
+        fechas = pd.bdate_range(end=fin, periods=260, tz="America/New_York", name="Date")
+        close = 100 + np.linspace(0, 50, len(fechas))
+        return pd.DataFrame({
+            "Open": close, "High": close + 1, "Low": close - 1,
+            "Close": close, "Volume": np.full(len(fechas), 1e6),
+        }, index=fechas)
+
+
+def _reset():
+    _FakeTicker.llamadas = {"info": 0, "history": []}
+    MarketDataManager._request_cache.limpiar()
+
+
+def test_contexto_recorta_periodos():
+    """Test 1: Períodos más cortos se derivan del histórico descargado"""
+    contexto = ContextoDatos("AAPL", periodo_base="1y")
+    cargas = []
+
+    def cargador(periodo):
+        cargas.append(periodo)
+        return _FakeTicker("AAPL").history(period=periodo)
+
+    anual = contexto.historico("1y", cargador)
+    trimestral = contexto.historico("3mo", cargador)
+    mensual = contexto.historico("1mo", cargador)
+
+    assert cargas == ["1y"]
+    assert len(anual) > len(trimestral) > len(mensual) > 0
+    assert mensual.index[-1] == anual.index[-1]
+
+    # Cada consulta recibe su copia: modificarla no altera a los demás consumidores
+    anual["SMA_20"] = anual["Close"].rolling(20).mean()
+    anual.loc[anual.index[-1], "Close"] = -1.0
+    mensual.loc[mensual.index[-1], "Close"] = -1.0
+    for periodo in ("1y", "1mo"):
+        otra = contexto.historico(periodo, cargador)
+        assert "SMA_20" not in otra.columns and otra["Close"].iloc[-1] > 0
+    assert cargas == ["1y"]
+    logger.info(f"✅ 1y/3mo/1mo = {len(anual)}/{len(trimestral)}/{len(mensual)} barras con 1 descarga")
+
+
+def test_contexto_amplia_ventana():
+    """Test 2: Pedir un período más amplio que el base recarga una vez"""
+    contexto = ContextoDatos("AAPL", periodo_base="3mo")
+    cargas = []
+
+    def cargador(periodo):
+        cargas.append(periodo)
+        return _FakeTicker("AAPL").history(period=periodo)
+
+    contexto.historico("1mo", cargador)
+    contexto.historico("1y", cargador)
+    contexto.historico("6mo", cargador)
+
+    assert cargas == ["3mo", "1y"]
+    logger.info(f"✅ Cargas: {cargas}")
+
+
+def test_manager_una_descarga_por_analisis():
+    """Test 3: Con contexto, el gestor descarga info e histórico una sola vez"""
+    original = market_data_module.yf.Ticker
+    market_data_module.yf.Ticker = _FakeTicker
+    _reset()
+    try:
+        manager = MarketDataManager(usar_almacen_local=False)
+        contexto = manager.crear_contexto("TEST", periodo_base="1y")
+
+        actuales = manager.obtener_datos_actuales("TEST", contexto=contexto)
+        hist = manager.obtener_historico("TEST", periodo="1y", contexto=contexto)
+        fundamentales = manager.obtener_fundamentales("TEST", contexto=contexto)
+        tendencia = manager.obtener_tendencia("TEST", contexto=contexto)
+        sr = manager.obtener_soportes_resistencias("TEST", contexto=contexto)
+
+        assert "error" not in actuales and "error" not in fundamentales
+        assert "error" not in tendencia
+        assert "error" not in sr and not hist.empty
+        assert _FakeTicker.llamadas["info"] == 1
+        assert _FakeTicker.llamadas["history"] == ["1y"]
+        assert contexto.get_stats()["total_descargas"] == 2
+
+        # Sin contexto se mantiene el comportamiento anterior
+        _reset()
+        manager.obtener_tendencia("TEST")
+        manager.obtener_soportes_resistencias("TEST")
+        assert _FakeTicker.llamadas["history"] == ["3mo", "1mo"]
+        logger.info("✅ 1 descarga de info y 1 de histórico por análisis")
+    finally:
+        market_data_module.yf.Ticker = original
+
+
+def test_contexto_otro_ticker_se_ignora():
+    """Test 4: Un contexto de otro ticker no contamina la consulta"""
+    original = market_data_module.yf.Ticker
+    market_data_module.yf.Ticker = _FakeTicker
+    _reset()
+    try:
+        manager = MarketDataManager(usar_almacen_local=False)
+        contexto = manager.crear_contexto("AAPL")
+        manager.obtener_fundamentales("MSFT", contexto=contexto)
+        assert contexto.get_stats()["total_descargas"] == 0
+        assert _FakeTicker.llamadas["info"] == 1
+        logger.info("✅ Contexto ignorado para otro ticker")
+    finally:
+        market_data_module.yf.Ticker = original
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Recorte de períodos", test_contexto_recorta_periodos),
+        ("Ampliación de ventana", test_contexto_amplia_ventana),
+        ("Una descarga por análisis", test_manager_una_descarga_por_analisis),
+        ("Contexto de otro ticker", test_contexto_otro_ticker_se_ignora),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
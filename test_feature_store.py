@@ -0,0 +1,175 @@
+"""
+test_feature_store.py
+Pruebas del almacén de features (data_sources/feature_store.py) y de su uso
+desde ia/ml_predictions y analisis/ml_predictor
+Series sintéticas en un directorio temporal: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import glob
+import logging
+import multiprocessing
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_sources.feature_store import AlmacenFeatures
+from ia.ml_predictions import MLPredictor as PredictorIA, CONJUNTO_FEATURES, extraer_features_ventana
+from analisis.ml_predictor import MLPredictor as PredictorPrecio, CONJUNTO_FEATURES_PRECIO
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestFeatureStore")
+
+
+def _cierres(barras=300, semilla=0):
+    rng = np.random.default_rng(semilla)
+    return pd.Series(100 * np.cumprod(1 + rng.normal(0.0005, 0.015, barras)),
+                     index=pd.bdate_range("2020-01-01", periods=barras), name="Close")
+
+
+def test_incremental():
+    """Test 1: Solo se calculan las barras nuevas y el resultado == cálculo completo"""
+    cierres = _cierres(600)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenFeatures(tmp)
+        primera = almacen.matriz("AAPL", CONJUNTO_FEATURES, cierres.iloc[:590])
+        assert almacen.get_stats()["filas_calculadas"] == 590 - 19
+
+        # Otro proceso (nueva instancia) con 10 barras más
+        almacen = AlmacenFeatures(tmp)
+        completa = almacen.matriz("AAPL", CONJUNTO_FEATURES, cierres)
+        stats = almacen.get_stats()
+        assert stats["filas_calculadas"] == 10 and stats["filas_reutilizadas"] == 590 - 19
+        assert np.array_equal(completa.to_numpy(), extraer_features_ventana(cierres.to_numpy(), todas=True))
+        assert completa.index[0] == cierres.index[19] and completa.index[-1] == cierres.index[-1]
+        assert np.array_equal(completa.to_numpy()[:len(primera)], primera.to_numpy())
+
+        # Un tramo posterior de la misma serie se sirve sin calcular nada
+        tramo = almacen.matriz("AAPL", CONJUNTO_FEATURES, cierres.iloc[100:400])
+        assert almacen.get_stats()["filas_calculadas"] == 10
+        assert np.array_equal(tramo.to_numpy(), extraer_features_ventana(cierres.iloc[100:400].to_numpy(), todas=True))
+        assert almacen.get_stats()["series"] == 1
+
+
+def test_ajuste_de_cierres():
+    """Test 2: Cierres reajustados (dividendos/splits) recalculan la serie"""
+    cierres = _cierres(300)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenFeatures(tmp)
+        almacen.matriz("MSFT", CONJUNTO_FEATURES_PRECIO, cierres)
+        ajustados = cierres * 0.98
+        matriz = almacen.matriz("MSFT", CONJUNTO_FEATURES_PRECIO, ajustados)
+        assert almacen.get_stats()["recalculos"] == 1
+        assert np.allclose(matriz.to_numpy(), CONJUNTO_FEATURES_PRECIO.calcular(ajustados.to_numpy()))
+
+        # Pedir historia anterior a la guardada también recalcula
+        almacen.matriz("IBM", CONJUNTO_FEATURES_PRECIO, ajustados.iloc[50:])
+        matriz = almacen.matriz("IBM", CONJUNTO_FEATURES_PRECIO, ajustados)
+        assert almacen.get_stats()["recalculos"] == 2 and len(matriz) == 300 - 30
+        assert len(almacen.matriz("MSFT", CONJUNTO_FEATURES_PRECIO, ajustados.iloc[:20])) == 0
+
+
+def test_predictores_comparten_almacen():
+    """Test 3: Ambos predictores obtienen del almacén las mismas X que calculando"""
+    cierres = _cierres(500)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenFeatures(tmp)
+        ia = PredictorIA(model_dir=os.path.join(tmp, "modelos"), almacen_features=almacen)
+        precio = PredictorPrecio(cache_modelos=None, almacen_features=almacen)
+
+        df = cierres.to_frame()
+        directo = ia._extract_features(df)
+        for _ in range(2):
+            almacenado = ia._extract_features(df, "AAPL")
+            assert all(np.array_equal(a, b) for a, b in zip(directo, almacenado))
+
+        datos = pd.DataFrame({"Adj Close": cierres})
+        X, y, actual = precio._preparar_features(datos)
+        for _ in range(2):
+            X_a, y_a, actual_a = precio._preparar_features(datos, "AAPL")
+            assert np.array_equal(X, X_a) and np.array_equal(y, y_a) and actual == actual_a
+
+        # Una serie por conjunto de features: versiones distintas no se mezclan
+        assert almacen.get_stats()["series"] == 2
+
+
+def test_rendimiento():
+    """Test 4: Un día nuevo sobre 10 años de historia no recalcula la historia"""
+    cierres = _cierres(2520)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = AlmacenFeatures(tmp)
+        almacen.matriz("SPY", CONJUNTO_FEATURES_PRECIO, cierres.iloc[:-1])
+        inicio = time.perf_counter()
+        almacen.matriz("SPY", CONJUNTO_FEATURES_PRECIO, cierres)
+        incremental = time.perf_counter() - inicio
+        assert almacen.get_stats()["filas_calculadas"] == 2519 - 30 + 1
+        logger.warning(f"✅ Barra nueva sobre 10 años en {incremental * 1000:.1f}ms")
+
+
+def _escribir_series(directorio, prefijo, n):
+    """Objetivo de proceso: escribe n series en un almacén compartido"""
+    almacen = AlmacenFeatures(directorio)
+    for i in range(n):
+        almacen.matriz(f"{prefijo}{i:02d}", CONJUNTO_FEATURES, _cierres(120, semilla=i))
+
+
+def test_procesos_comparten_directorio():
+    """Test 5: Varios procesos escriben en el mismo directorio sin perder entradas del manifest"""
+    with tempfile.TemporaryDirectory() as tmp:
+        anterior = AlmacenFeatures(tmp)
+        anterior.matriz("BASE", CONJUNTO_FEATURES, _cierres(120))
+
+        contexto = multiprocessing.get_context("spawn")
+        procesos = [contexto.Process(target=_escribir_series, args=(tmp, prefijo, 15)) for prefijo in "ABC"]
+        for proceso in procesos:
+            proceso.start()
+        # Mientras tanto este proceso sigue escribiendo con su instancia
+        for i in range(15):
+            anterior.matriz(f"D{i:02d}", CONJUNTO_FEATURES, _cierres(120, semilla=i))
+        for proceso in procesos:
+            proceso.join(120)
+            assert proceso.exitcode == 0
+
+        assert anterior.get_stats()["series"] == 61
+        assert AlmacenFeatures(tmp).get_stats()["series"] == 61
+        assert not glob.glob(os.path.join(tmp, "**", "*.tmp"), recursive=True)
+        # La instancia anterior reutiliza lo escrito por otro proceso
+        anterior.matriz("B03", CONJUNTO_FEATURES, _cierres(120, semilla=3))
+        assert anterior.get_stats()["filas_calculadas"] == 16 * (120 - 19)
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Incremental", test_incremental),
+        ("Ajuste de cierres", test_ajuste_de_cierres),
+        ("Predictores comparten almacén", test_predictores_comparten_almacen),
+        ("Rendimiento", test_rendimiento),
+        ("Procesos comparten directorio", test_procesos_comparten_directorio),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
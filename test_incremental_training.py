@@ -0,0 +1,148 @@
+"""
+test_incremental_training.py
+Pruebas de las etiquetas de confianza vectorizadas y del entrenamiento
+incremental de ia/ml_predictions.MLPredictor.train_models
+Series sintéticas, registro y almacén de features temporales: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+import ia.ml_predictions as ml_module
+from data_sources.feature_store import AlmacenFeatures
+from ia.ml_predictions import MLPredictor
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestIncrementalTraining")
+
+
+def _historicos(tickers=("AAA", "BBB", "CCC"), barras=400, semilla=0):
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range("2023-01-02", periods=barras)
+    return {
+        t: pd.DataFrame({"Close": 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, barras))}, index=fechas)
+        for t in tickers
+    }
+
+
+def _recortar(historicos, barras):
+    return {t: df.iloc[:barras] for t, df in historicos.items()}
+
+
+def _predictor(tmp):
+    return MLPredictor(model_dir=os.path.join(tmp, "modelos"),
+                       almacen_features=AlmacenFeatures(os.path.join(tmp, "features")))
+
+
+def test_etiquetas_vectorizadas():
+    """Test 1: Etiquetas vectorizadas == bucle original; con X normalizada hay varias clases"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, rng.uniform(0.1, 1.0, (500, 1)), (500, 20))
+    esperadas = [2 if np.var(f) < 0.1 else 1 if np.var(f) < 0.3 else 0 for f in X]
+    predictor = MLPredictor.__new__(MLPredictor)
+    assert list(predictor._calculate_confidence_labels(X)) == esperadas
+    assert set(predictor._calculate_confidence_labels(X)) == {0, 1, 2}
+
+
+def test_entrenamiento_completo():
+    """Test 2: train_models entrena los 3 modelos y registra la última fecha por ticker"""
+    historicos = _historicos()
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = _predictor(tmp)
+        resultado = predictor.train_models(historicos)
+        assert "error" not in resultado, resultado
+        assert resultado["modo"] == "completo" and resultado["modelos_entrenados"] == 3
+        # Última barra con etiqueta: las 6 finales aún no tienen retorno a 5 días
+        assert resultado["ultimas_fechas"]["AAA"] == historicos["AAA"].index[-7].strftime("%Y-%m-%d")
+        assert predictor.confidence_model is not None
+        assert predictor.modelos.version == resultado["version"]
+
+
+def test_incremental():
+    """Test 3: Solo entran las barras nuevas, con ventana acotada y árboles añadidos"""
+    historicos = _historicos(barras=430)
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = _predictor(tmp)
+        inicio = time.perf_counter()
+        base = predictor.train_models(_recortar(historicos, 400))
+        completo = time.perf_counter() - inicio
+        arboles = len(predictor.price_direction_model.estimators_)
+        etapas = predictor.volatility_model.n_estimators_
+
+        inicio = time.perf_counter()
+        resultado = predictor.train_models(_recortar(historicos, 420), incremental=True, ventana_barras=100)
+        incremental = time.perf_counter() - inicio
+        assert "error" not in resultado, resultado
+        assert resultado["modo"] == "incremental" and resultado["version_base"] == base["version"]
+        assert resultado["samples_nuevos"] == 3 * 20
+        assert resultado["samples_entrenamiento"] == 3 * 100
+        assert resultado["acciones"]["price_direction_model"] == "ampliado"
+        assert len(predictor.price_direction_model.estimators_) == arboles + ml_module.ARBOLES_POR_ACTUALIZACION
+        assert predictor.volatility_model.n_estimators_ == etapas + ml_module.ETAPAS_POR_ACTUALIZACION
+        assert 0 <= resultado["accuracy_price_direction"] <= 1
+
+        # Sin barras nuevas no se publica nada
+        otra = predictor.train_models(_recortar(historicos, 420), incremental=True)
+        assert otra["status"] == "sin_cambios" and otra["version"] == resultado["version"]
+
+        # Un proceso nuevo parte de la versión publicada (modelos mapeados desde disco)
+        mas = _predictor(tmp).train_models(historicos, incremental=True)
+        assert mas["version_base"] == resultado["version"] and mas["samples_nuevos"] == 3 * 10
+        logger.warning(f"✅ Completo {completo:.2f}s, incremental {incremental:.2f}s")
+
+
+def test_tope_de_arboles():
+    """Test 4: Por encima del tope se descartan los árboles más antiguos"""
+    historicos = _historicos(tickers=("AAA",), barras=330)
+    tope = ml_module.MAX_ARBOLES
+    ml_module.MAX_ARBOLES = 110
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            predictor = _predictor(tmp)
+            predictor.train_models(_recortar(historicos, 300))
+            primeros = predictor.price_direction_model.estimators_[:30]
+            predictor.train_models(historicos, incremental=True)
+            arboles = predictor.price_direction_model.estimators_
+            assert len(arboles) == 110 and predictor.price_direction_model.n_estimators == 110
+            assert not any(a is b for a in arboles for b in primeros[:10])
+    finally:
+        ml_module.MAX_ARBOLES = tope
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Etiquetas vectorizadas", test_etiquetas_vectorizadas),
+        ("Entrenamiento completo", test_entrenamiento_completo),
+        ("Incremental", test_incremental),
+        ("Tope de árboles", test_tope_de_arboles),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
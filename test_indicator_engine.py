@@ -0,0 +1,191 @@
+"""
+test_indicator_engine.py
+Pruebas del motor vectorizado de indicadores (analisis/indicator_engine.py)
+Compara cada indicador con la librería `ta` y con las fórmulas pandas del screener
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+import ta
+
+from analisis.indicator_engine import (
+    PanelOHLCV, construir_panel, indicadores_screener, indicadores_tecnicos, ema
+)
+from analisis.screener import ScreenerAutomatico
+from cerebro.analysis_methodology import TechnicalAnalyzer
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestIndicatorEngine")
+
+
+def _historicos(largos, semilla=0):
+    """Históricos sintéticos de distinta longitud (panel con NaN iniciales)"""
+    rng = np.random.default_rng(semilla)
+    historicos = {}
+    for j, n in enumerate(largos):
+        fechas = pd.bdate_range(end="2024-06-28", periods=n, name="Date")
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+        historicos[f"T{j}"] = pd.DataFrame({
+            "Open": close,
+            "High": close * (1 + rng.uniform(0, 0.02, n)),
+            "Low": close * (1 - rng.uniform(0, 0.02, n)),
+            "Close": close,
+            "Volume": rng.uniform(1e6, 2e6, n),
+        }, index=fechas)
+    return historicos
+
+
+def _cerca(a, b):
+    return np.isclose(a, b, rtol=1e-9, atol=1e-9, equal_nan=True)
+
+
+def test_paridad_con_ta():
+    """Test 1: indicadores_tecnicos reproduce la librería ta en un panel desigual"""
+    historicos = _historicos([60, 45, 80, 30])
+    resultado = indicadores_tecnicos(construir_panel(historicos))
+
+    for ticker, df in historicos.items():
+        close = df["Close"]
+        macd = ta.trend.MACD(close, window_fast=12, window_slow=26, window_sign=9)
+        stoch = ta.momentum.StochRSIIndicator(close, window=14, smooth1=3, smooth2=3)
+        bb = ta.volatility.BollingerBands(close, window=20)
+        esperado = {
+            "rsi": ta.momentum.rsi(close, window=14).iloc[-1],
+            "macd": macd.macd().iloc[-1],
+            "macd_senal": macd.macd_signal().iloc[-1],
+            "macd_hist": macd.macd_diff().iloc[-1],
+            "stoch_k": stoch.stochrsi().iloc[-1],
+            "stoch_d": stoch.stochrsi_d().iloc[-1],
+            "sma_20": ta.trend.sma_indicator(close, window=20).iloc[-1],
+            "ema_9": ta.trend.ema_indicator(close, window=9).iloc[-1],
+            "ema_21": ta.trend.ema_indicator(close, window=21).iloc[-1],
+            "bb_superior": bb.bollinger_hband().iloc[-1],
+            "bb_inferior": bb.bollinger_lband().iloc[-1],
+            "atr": ta.volatility.average_true_range(df["High"], df["Low"], close, window=14).iloc[-1],
+        }
+        obtenido = resultado.para(ticker)
+        for nombre, valor in esperado.items():
+            assert _cerca(valor, obtenido[nombre]), (ticker, nombre, valor, obtenido[nombre])
+    logger.info("✅ Paridad con ta en 4 tickers de 30-80 barras")
+
+
+def test_paridad_con_screener():
+    """Test 2: indicadores_screener reproduce las fórmulas pandas del screener"""
+    historicos = _historicos([90, 70, 55])
+    resultado = indicadores_screener(construir_panel(historicos))
+
+    for ticker, df in historicos.items():
+        close = df["Close"]
+        delta = close.diff()
+        ganancia = delta.where(delta > 0, 0).rolling(14).mean()
+        perdida = (-delta.where(delta < 0, 0)).rolling(14).mean()
+        macd = close.ewm(span=12).mean() - close.ewm(span=26).mean()
+        media = close.rolling(20).mean()
+        desviacion = close.rolling(20).std()
+        rango = pd.concat([
+            df["High"] - df["Low"],
+            (df["High"] - close.shift()).abs(),
+            (df["Low"] - close.shift()).abs(),
+        ], axis=1).max(axis=1)
+        esperado = {
+            "rsi": (100 - 100 / (1 + ganancia / perdida)).iloc[-1],
+            "macd_signal": (macd - macd.ewm(span=9).mean()).iloc[-1],
+            "ma_20": media.iloc[-1],
+            "ma_50": close.rolling(50).mean().iloc[-1],
+            "bollinger_upper": (media + 2 * desviacion).iloc[-1],
+            "bollinger_lower": (media - 2 * desviacion).iloc[-1],
+            "atr": rango.rolling(14).mean().iloc[-1],
+            "volumen_sma": df["Volume"].rolling(20).mean().iloc[-1],
+        }
+        obtenido = resultado.para(ticker)
+        for nombre, valor in esperado.items():
+            assert _cerca(valor, obtenido[nombre]), (ticker, nombre, valor, obtenido[nombre])
+
+    # Respaldos del screener con poca historia
+    corto = indicadores_screener(construir_panel(_historicos([10]))).para("T0")
+    assert corto["rsi"] == 50.0 and corto["atr"] == 0.0
+    assert corto["ma_50"] == corto["precio_actual"]
+    logger.info("✅ Paridad con las fórmulas del screener")
+
+
+def test_ema_con_huecos():
+    """Test 3: La EMA coincide con pandas con NaN iniciales e intermedios"""
+    rng = np.random.default_rng(3)
+    x = 100 + np.cumsum(rng.normal(0, 1, (50, 4)), axis=0)
+    x[:7, 1] = np.nan
+    x[20, 2] = np.nan
+    x[30:33, 3] = np.nan
+    for ajustada in (True, False):
+        esperado = pd.DataFrame(x).ewm(span=9, adjust=ajustada, min_periods=3).mean().to_numpy()
+        assert np.allclose(esperado, ema(x, span=9, ajustada=ajustada, min_periodos=3), equal_nan=True)
+
+
+def test_consumidores():
+    """Test 4: Screener y TechnicalAnalyzer consumen el motor en lote"""
+    historicos = _historicos([90] * 6)
+    screener = ScreenerAutomatico(market_data_manager=object())
+    lote = screener._calcular_indicadores_lote(historicos)
+    individual = screener._calcular_indicadores(historicos["T3"], "T3")
+    assert lote["T3"] == individual
+
+    analizador = TechnicalAnalyzer()
+    por_lote = analizador.analizar_indicadores_lote({**historicos, "CORTO": historicos["T0"].iloc[:10]})
+    assert "error" in por_lote["CORTO"]
+    uno = analizador.analizar_indicadores(historicos["T1"])
+    for seccion in ("RSI", "MACD", "STOCHASTIC", "BOLLINGER_BANDS", "ATR", "VOLUMEN"):
+        assert uno["indicadores"][seccion] == por_lote["T1"]["indicadores"][seccion]
+    assert uno["indicadores"]["RSI"]["valor"] == round(ta.momentum.rsi(historicos["T1"]["Close"].iloc[-60:], 14).iloc[-1], 2)
+
+
+def test_universo_grande():
+    """Test 5: Miles de símbolos en una pasada"""
+    rng = np.random.default_rng(0)
+    filas, tickers = 90, 3000
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, (filas, tickers)), axis=0))
+    panel = PanelOHLCV([f"T{i}" for i in range(tickers)], close, close * 1.01, close * 0.99,
+                       close, np.full_like(close, 1e6))
+    inicio = time.perf_counter()
+    resultado = indicadores_screener(panel)
+    duracion = time.perf_counter() - inicio
+    assert resultado.como_dataframe().shape == (tickers, 9)
+    assert np.isfinite(resultado.valores["rsi"]).all()
+    logger.info(f"✅ {tickers} símbolos en {duracion * 1000:.0f}ms")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Paridad con ta", test_paridad_con_ta),
+        ("Paridad con screener", test_paridad_con_screener),
+        ("EMA con huecos", test_ema_con_huecos),
+        ("Consumidores", test_consumidores),
+        ("Universo grande", test_universo_grande),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+test_macro_snapshot.py
+Pruebas del snapshot macro compartido (data_sources/macro_snapshot.py)
+Usa un yf.download simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import threading
+
+import numpy as np
+import pandas as pd
+
+import data_sources.macro_snapshot as macro_module
+from data_sources.macro_snapshot import MacroSnapshotService
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMacroSnapshot")
+
+
+class _FakeDownload:
+    """Sustituto de yf.download con group_by='ticker' que cuenta llamadas"""
+
+    def __init__(self):
+        self.llamadas = []
+
+    def __call__(self, simbolos, **kwargs):
+        self.llamadas.append(list(simbolos))
+        fechas = pd.bdate_range(end="2024-06-07", periods=5, name="Date")
+        columnas = {}
+        for i, simbolo in enumerate(simbolos):
+            close = 100.0 * (i + 1) + np.arange(5, dtype=float)
+            columnas[(simbolo, "Close")] = close
+            columnas[(simbolo, "Volume")] = np.full(5, 1e6)
+        return pd.DataFrame(columnas, index=fechas)
+
+
+def _con_descarga(fake, funcion):
+    original = macro_module.yf.download
+    macro_module.yf.download = fake
+    try:
+        return funcion()
+    finally:
+        macro_module.yf.download = original
+
+
+def test_snapshot_formato():
+    """Test 1: Un snapshot batch produce índices, volatilidad y variación diaria"""
+    fake = _FakeDownload()
+    servicio = MacroSnapshotService(refresco_en_segundo_plano=False)
+    snapshot = _con_descarga(fake, servicio.obtener)
+
+    assert len(fake.llamadas) == 1
+    assert set(snapshot["indices"]) == {"SPY", "QQQ", "DIA", "IWM"}
+    assert snapshot["indices"]["SPY"]["precio"] == 104.0
+    assert snapshot["indices"]["SPY"]["cambio_pct"] == round((104 / 103 - 1) * 100, 2)
+    assert snapshot["volatilidad"]["VIX"] == 504.0
+    logger.info(f"✅ Snapshot: {snapshot['indices']['SPY']}")
+
+
+def test_lecturas_concurrentes_una_descarga():
+    """Test 2: Muchos análisis concurrentes comparten una única descarga"""
+    fake = _FakeDownload()
+    servicio = MacroSnapshotService(refresco_en_segundo_plano=False)
+    resultados = []
+
+    def leer():
+        resultados.append(servicio.obtener())
+
+    def lanzar():
+        hilos = [threading.Thread(target=leer) for _ in range(20)]
+        for h in hilos:
+            h.start()
+        for h in hilos:
+            h.join()
+
+    _con_descarga(fake, lanzar)
+    assert len(fake.llamadas) == 1
+    assert len(resultados) == 20
+    # Cada lector recibe su propia copia
+    resultados[0]["indices"]["SPY"]["precio"] = -1
+    assert servicio.obtener()["indices"]["SPY"]["precio"] == 104.0
+    logger.info("✅ 20 lecturas con 1 descarga")
+
+
+def test_conserva_snapshot_si_falla():
+    """Test 3: Si el refresco no obtiene datos se conserva el snapshot anterior"""
+    servicio = MacroSnapshotService(refresco_en_segundo_plano=False)
+    _con_descarga(_FakeDownload(), servicio.obtener)
+
+    servicio._descargar_info_paralelo = lambda simbolos: {}
+    snapshot = _con_descarga(lambda *a, **k: pd.DataFrame(), servicio.refrescar)
+    assert snapshot["indices"]["SPY"]["precio"] == 104.0
+    assert servicio.get_stats()["errores"] == 1
+    logger.info("✅ Snapshot anterior conservado")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Formato del snapshot", test_snapshot_formato),
+        ("Lecturas concurrentes", test_lecturas_concurrentes_una_descarga),
+        ("Fallo de refresco", test_conserva_snapshot_si_falla),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
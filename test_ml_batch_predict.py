@@ -0,0 +1,155 @@
+"""
+test_ml_batch_predict.py
+Pruebas de la inferencia por lotes de ia/ml_predictions.MLPredictor.predict_many
+Usa modelos pequeños ajustados sobre features sintéticas: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+from ia.ml_predictions import MLPredictor
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMLBatchPredict")
+
+
+def _indicadores(n, semilla=1):
+    rng = np.random.default_rng(semilla)
+    return {
+        f"X{i:03d}": {
+            "RSI": {"valor": float(rng.uniform(10, 90))},
+            "MACD": {"linea_macd": float(rng.normal(0, 2))},
+            "STOCHASTIC": {"linea_k": float(rng.uniform(0, 100))},
+            "MEDIAS_MOVILES": {"SMA_20": float(rng.uniform(90, 110)), "SMA_50": 100.0},
+            "VOLUMEN": {"relacion": float(rng.uniform(0.5, 2))},
+        }
+        for i in range(n)
+    }
+
+
+class _ContadorLlamadas:
+    """Envuelve un modelo y cuenta las llamadas a predict_proba"""
+
+    def __init__(self, modelo):
+        self.modelo = modelo
+        self.classes_ = modelo.classes_
+        self.llamadas = 0
+
+    def predict_proba(self, X):
+        self.llamadas += 1
+        return self.modelo.predict_proba(X)
+
+
+_PREDICTOR = None
+
+
+def _predictor_entrenado():
+    """Predictor con scaler y modelos pequeños ajustados sobre features sintéticas"""
+    global _PREDICTOR
+    if _PREDICTOR is None:
+        with tempfile.TemporaryDirectory() as tmp:
+            _PREDICTOR = MLPredictor(model_dir=tmp)
+        rng = np.random.default_rng(0)
+        X = np.vstack([_PREDICTOR._extract_features_from_indicators(i) for i in _indicadores(300, 7).values()])
+        X_scaled = _PREDICTOR.scaler.fit_transform(X)
+        _PREDICTOR.price_direction_model = RandomForestClassifier(n_estimators=20, random_state=0).fit(
+            X_scaled, (X[:, 0] + rng.normal(0, 0.1, len(X)) > 0.5).astype(int))
+        _PREDICTOR.volatility_model = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(
+            X_scaled, np.digitize(X[:, 2], [0.33, 0.66]))
+        _PREDICTOR.confidence_model = GradientBoostingClassifier(n_estimators=20, random_state=0).fit(
+            X_scaled, np.digitize(X[:, 4], [0.5, 0.75]))
+    return _PREDICTOR
+
+
+def test_paridad_con_prediccion_individual():
+    """Test 1: predict_many da los mismos resultados que la ruta fila a fila"""
+    predictor = _predictor_entrenado()
+    indicadores = _indicadores(20)
+    lote = predictor.predict_many(indicadores)
+
+    for ticker, ind in indicadores.items():
+        features = predictor.scaler.transform([predictor._extract_features_from_indicators(ind)])
+        prob = predictor.price_direction_model.predict_proba(features)[0]
+        pred = predictor.price_direction_model.predict(features)[0]
+        precio = lote[ticker]["precio"]
+        assert precio["direccion_predicha"] == ("ALCISTA" if pred == 1 else "BAJISTA")
+        assert precio["probabilidad_alcista"] == round(prob[1], 4)
+
+        nivel = predictor.volatility_model.predict(features)[0]
+        assert lote[ticker]["volatilidad"]["nivel_predicho"] == nivel
+        nivel = predictor.confidence_model.predict(features)[0]
+        assert lote[ticker]["confianza"]["nivel_predicho"] == nivel
+
+    individual = predictor.predict_volatility("X003", indicadores["X003"])
+    individual.pop("timestamp")
+    por_lote = dict(lote["X003"]["volatilidad"])
+    por_lote.pop("timestamp")
+    assert individual == por_lote
+
+
+def test_una_llamada_por_modelo():
+    """Test 2: 200 tickers = un predict_proba por modelo"""
+    predictor = _predictor_entrenado()
+    originales = (predictor.price_direction_model, predictor.volatility_model, predictor.confidence_model)
+    contadores = [_ContadorLlamadas(m) for m in originales]
+    predictor.price_direction_model, predictor.volatility_model, predictor.confidence_model = contadores
+    try:
+        indicadores = _indicadores(200)
+        inicio = time.perf_counter()
+        lote = predictor.predict_many(indicadores)
+        duracion = time.perf_counter() - inicio
+    finally:
+        predictor.price_direction_model, predictor.volatility_model, predictor.confidence_model = originales
+
+    assert [c.llamadas for c in contadores] == [1, 1, 1]
+    assert len(lote) == 200 and all(r["precio"]["disponible"] for r in lote.values())
+    logger.warning(f"✅ 200 tickers x 3 modelos en {duracion * 1000:.0f}ms")
+
+
+def test_modelos_no_entrenados():
+    """Test 3: Sin modelos se conserva el dict de error por ticker"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp)
+        lote = predictor.predict_many(_indicadores(3), ("precio", "confianza"))
+    assert set(lote["X001"]) == {"precio", "confianza"}
+    assert lote["X001"]["precio"] == {"error": "Modelo no entrenado", "disponible": False}
+    assert predictor.predict_many({}) == {}
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Paridad con individual", test_paridad_con_prediccion_individual),
+        ("Una llamada por modelo", test_una_llamada_por_modelo),
+        ("Modelos no entrenados", test_modelos_no_entrenados),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""
+test_ml_ensemble_paralelo.py
+Pruebas del ajuste concurrente del ensemble de analisis/ml_predictor.MLPredictor
+(n_jobs, hilos/procesos y tiempos de ajuste por modelo)
+Datos sintéticos: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+
+import analisis.ml_predictor as ml_module
+from analisis.ml_predictor import MLPredictor, preparar_features_ventana
+from analisis.ml_model_cache import CacheModelosML
+from data_sources.feature_store import AlmacenFeatures
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMLEnsembleParalelo")
+
+
+class _ModeloLento:
+    """Estimador que tarda `segundos` en ajustarse (libera el GIL como sklearn)"""
+
+    def __init__(self, segundos):
+        self.segundos = segundos
+
+    def fit(self, X, y):
+        time.sleep(self.segundos)
+        self.media_ = float(np.mean(y))
+        return self
+
+    def predict(self, X):
+        return np.full(len(X), self.media_)
+
+
+def _datos(n=260):
+    close = 100 * np.exp(np.cumsum(np.random.default_rng(0).normal(0, 0.02, n)))
+    return preparar_features_ventana(close)
+
+
+def _predictor(directorio_features, **kwargs):
+    predictor = MLPredictor(cache_modelos=CacheModelosML(directorio=None),
+                            almacen_features=AlmacenFeatures(directorio_features), **kwargs)
+    predictor.logger.setLevel(logging.WARNING)
+    return predictor
+
+
+def test_latencia_del_mas_lento():
+    """Test 1: Con n_jobs el ajuste tarda lo que el modelo más lento, no la suma"""
+    X, y = _datos()
+    originales = dict(ml_module.MODELOS_PRECIO)
+    ml_module.MODELOS_PRECIO.update({
+        "random_forest": lambda: _ModeloLento(0.3),
+        "gradient_boosting": lambda: _ModeloLento(0.4),
+        "linear_regression": lambda: _ModeloLento(0.1),
+    })
+    try:
+        with tempfile.TemporaryDirectory() as features:
+            nombres = list(ml_module.MODELOS_PRECIO)
+            inicio = time.perf_counter()
+            _predictor(features, n_jobs=1)._entrenar_modelos(X, y, nombres)
+            secuencial = time.perf_counter() - inicio
+
+            inicio = time.perf_counter()
+            modelos, tiempos_paralelo = _predictor(features)._entrenar_modelos(X, y, nombres)
+            paralelo = time.perf_counter() - inicio
+    finally:
+        ml_module.MODELOS_PRECIO.clear()
+        ml_module.MODELOS_PRECIO.update(originales)
+
+    assert secuencial >= 0.8 and paralelo < 0.6
+    assert list(modelos) == nombres
+    assert 0.35 <= tiempos_paralelo["gradient_boosting"] < 0.6
+    logger.warning(f"✅ Ajuste secuencial {secuencial:.2f}s vs concurrente {paralelo:.2f}s")
+
+
+def test_misma_prediccion():
+    """Test 2: Hilos y procesos dan el mismo ensemble que el ajuste secuencial"""
+    X, y = _datos()
+    with tempfile.TemporaryDirectory() as features:
+        secuencial = _predictor(features, n_jobs=1)._ensemble_prediction(X, y, 30)
+        hilos = _predictor(features, n_jobs=3)._ensemble_prediction(X, y, 30)
+        procesos = _predictor(features, n_jobs=3, usar_procesos=True)._ensemble_prediction(X, y, 30)
+
+    assert secuencial["prediccion"] is not None
+    for resultado in (hilos, procesos):
+        assert resultado["predicciones_individuales"] == secuencial["predicciones_individuales"]
+        assert resultado["prediccion"] == secuencial["prediccion"]
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Latencia del más lento", test_latencia_del_mas_lento),
+        ("Misma predicción", test_misma_prediccion),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+test_ml_features.py
+Pruebas de la construcción vectorizada de features de ML
+(ia/ml_predictions.extraer_features_ventana y analisis/ml_predictor.preparar_features_ventana)
+Compara contra los bucles fila a fila originales: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from ia.ml_predictions import MLPredictor as MLPredictions, etiquetas_ventana
+from analisis.ml_predictor import MLPredictor
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMLFeatures")
+
+
+def _close(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    # Tramo plano: RSI sin pérdidas ni ganancias
+    close[40:60] = close[40]
+    return close
+
+
+def _rsi_bucle(prices, period=14):
+    if len(prices) < period:
+        return 50
+    deltas = np.diff(prices)
+    avg_gain = np.mean(np.where(deltas > 0, deltas, 0)[-period:])
+    avg_loss = np.mean(np.where(deltas < 0, -deltas, 0)[-period:])
+    if avg_loss == 0:
+        return 100 if avg_gain > 0 else 50
+    return 100 - (100 / (1 + avg_gain / avg_loss))
+
+
+def _features_bucle_ia(close):
+    """Bucle original de ia.ml_predictions.MLPredictor._extract_features"""
+    X = []
+    for i in range(20, len(close) - 5):
+        window = close[i-20:i]
+        sma_10 = np.mean(window[-10:])
+        sma_20 = np.mean(window)
+        momentum = (window[-1] - window[0]) / window[0]
+        fila = [
+            momentum,
+            np.std(np.diff(window) / window[:-1]),
+            _rsi_bucle(window),
+            np.max(window) / np.min(window),
+            (window[-1] - window[0]) / window[0],
+            momentum / (np.std(np.diff(window)) + 0.0001),
+            float((window[-1] > sma_10) and (sma_10 > sma_20)),
+            sma_10 / sma_20,
+            np.std(window),
+            np.mean(np.abs(np.diff(window))),
+        ]
+        X.append(fila + [0] * 10)
+    return np.array(X)
+
+
+def _features_bucle_analisis(close):
+    """Bucle original de analisis.ml_predictor.MLPredictor._preparar_features"""
+    X_list, y_list = [], []
+    for i in range(30, len(close) - 1):
+        ventana = close[i-30:i]
+        ventana_norm = (ventana - ventana.min()) / (ventana.max() - ventana.min() + 1e-8)
+        X_list.append(np.concatenate([
+            ventana_norm,
+            [(close[i] - close[i-1]) / close[i-1], np.std(ventana) / np.mean(ventana),
+             (close[i] - close[i-30]) / close[i-30], close[i] / np.mean(ventana)]
+        ]))
+        y_list.append(close[i+1])
+    return np.array(X_list), np.array(y_list)
+
+
+def test_paridad_ia():
+    """Test 1: _extract_features produce la misma matriz que el bucle original"""
+    close = _close(500)
+    predictor = MLPredictions.__new__(MLPredictions)
+    predictor.logger = logger
+    X, y_direction, y_volatility = predictor._extract_features(pd.DataFrame({"Close": close}))
+
+    esperado = _features_bucle_ia(close)
+    assert X.shape == esperado.shape == (475, 20)
+    assert np.allclose(X, esperado, rtol=1e-10, atol=1e-12)
+    assert len(y_direction) == len(y_volatility) == len(X)
+    assert np.array_equal(y_direction, (close[24:24 + len(X)] > close[19:19 + len(X)]).astype(int))
+    assert predictor._extract_features(pd.DataFrame({"Close": close[:20]})) == (None, None, None)
+
+
+def test_paridad_analisis():
+    """Test 2: _preparar_features produce las mismas X/y que el bucle original"""
+    close = _close(300, semilla=1)
+    predictor = MLPredictor()
+    X, y, precio = predictor._preparar_features(pd.DataFrame({"Adj Close": close}))
+
+    X_esperado, y_esperado = _features_bucle_analisis(close)
+    assert X.shape == X_esperado.shape == (269, 34)
+    assert np.allclose(X, X_esperado, rtol=1e-10, atol=1e-12)
+    assert np.array_equal(y, y_esperado)
+    assert precio == close[-1]
+
+
+def test_etiquetas_sin_fuga():
+    """Test 3: La etiqueta de la fila j solo depende de las barras posteriores a j+19"""
+    close = _close(300, semilla=3)
+    filas = len(close) - 25
+    direccion, volatilidad = etiquetas_ventana(close, filas)
+    assert len(direccion) == len(volatilidad) == filas
+
+    rng = np.random.default_rng(4)
+    for j in (0, 57, filas - 1):
+        # Reemplazar la ventana (salvo su último cierre, base del retorno) no cambia la etiqueta
+        alterado = close.copy()
+        alterado[:j + 19] = rng.uniform(1, 1000, j + 19)
+        d, v = etiquetas_ventana(alterado, filas)
+        assert d[j] == direccion[j] and np.isclose(v[j], volatilidad[j])
+
+        # Mover una barra del horizonte sí la cambia
+        alterado = close.copy()
+        alterado[j + 24] = close[j + 19] * (0.9 if direccion[j] else 1.1)
+        d, v = etiquetas_ventana(alterado, filas)
+        assert d[j] != direccion[j] and not np.isclose(v[j], volatilidad[j])
+
+    retornos = np.diff(close[19:25]) / close[19:24]
+    assert np.isclose(volatilidad[0], np.std(retornos, ddof=1))
+
+
+def test_velocidad():
+    """Test 4: Varios años de historia en una fracción del tiempo del bucle"""
+    close = _close(2500, semilla=2)
+    predictor = MLPredictions.__new__(MLPredictions)
+    predictor.logger = logger
+    df = pd.DataFrame({"Close": close})
+
+    inicio = time.perf_counter()
+    for _ in range(3):
+        _features_bucle_ia(close)
+        _features_bucle_analisis(close)
+    bucle = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    for _ in range(3):
+        predictor._extract_features(df)
+        MLPredictor._preparar_features(predictor, pd.DataFrame({"Adj Close": close}))
+    vectorizado = time.perf_counter() - inicio
+
+    assert vectorizado * 20 < bucle
+    logger.info(f"✅ Features de 2500 barras: {bucle / vectorizado:.0f}x más rápido que el bucle")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Paridad ia", test_paridad_ia),
+        ("Paridad analisis", test_paridad_analisis),
+        ("Etiquetas sin fuga", test_etiquetas_sin_fuga),
+        ("Velocidad", test_velocidad),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
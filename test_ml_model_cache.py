@@ -0,0 +1,169 @@
+"""
+test_ml_model_cache.py
+Pruebas del caché de modelos de analisis/ml_predictor.MLPredictor.predecir_precio
+(analisis/ml_model_cache.py: LRU en memoria, disco y reentrenamiento por barras nuevas)
+Usa un yf.download simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.ml_predictor as ml_module
+from analisis.ml_predictor import MLPredictor
+from analisis.ml_model_cache import CacheModelosML
+from data_sources.feature_store import AlmacenFeatures
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMLModelCache")
+
+
+class _FakeDownload:
+    """Sustituto de yf.download con una serie diaria de `barras` barras"""
+
+    def __init__(self, barras: int = 300):
+        self.barras = barras
+
+    def __call__(self, ticker, period="2y", progress=False, **kwargs):
+        rng = np.random.default_rng(sum(map(ord, ticker)))
+        close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, 600)))[:self.barras]
+        fechas = pd.bdate_range(start="2023-01-02", periods=self.barras, name="Date")
+        return pd.DataFrame({
+            "Open": close, "High": close * 1.01, "Low": close * 0.99,
+            "Close": close, "Adj Close": close, "Volume": 1e6,
+        }, index=fechas)
+
+
+def _predictor(cache, directorio_features):
+    predictor = MLPredictor(cache_modelos=cache, almacen_features=AlmacenFeatures(directorio_features))
+    predictor.logger.setLevel(logging.ERROR)
+    return predictor
+
+
+def _con_descarga(fake, funcion):
+    original = ml_module.yf.download
+    ml_module.yf.download = fake
+    try:
+        return funcion()
+    finally:
+        ml_module.yf.download = original
+
+
+def test_reutiliza_modelos():
+    """Test 1: La segunda predicción no reentrena y tarda milisegundos"""
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as features:
+        cache = CacheModelosML(directorio=tmp, reentrenar_cada=5)
+        predictor = _predictor(cache, features)
+        fake = _FakeDownload(300)
+
+        inicio = time.perf_counter()
+        frio = _con_descarga(fake, lambda: predictor.predecir_precio("AAA"))
+        t_frio = time.perf_counter() - inicio
+        predictor.limpiar_cache()
+
+        inicio = time.perf_counter()
+        caliente = _con_descarga(fake, lambda: predictor.predecir_precio("AAA"))
+        t_caliente = time.perf_counter() - inicio
+
+        assert "error" not in frio, frio
+        assert caliente["predicciones"] == frio["predicciones"]
+        stats = cache.get_stats()
+        assert stats["entrenamientos"] == 1 and stats["hits"] == 1
+        assert t_caliente * 5 < t_frio
+        logger.warning(f"✅ Frío {t_frio * 1000:.0f}ms vs caché {t_caliente * 1000:.0f}ms")
+
+
+def test_disco_y_barras_nuevas():
+    """Test 2: Otro proceso carga del disco; se reentrena tras N barras nuevas"""
+    with tempfile.TemporaryDirectory() as tmp, tempfile.TemporaryDirectory() as features:
+        _con_descarga(_FakeDownload(300),
+                      lambda: _predictor(CacheModelosML(directorio=tmp), features).predecir_precio("BBB"))
+        assert len(os.listdir(tmp)) == 1
+
+        cache = CacheModelosML(directorio=tmp, reentrenar_cada=5)
+        predictor = _predictor(cache, features)
+        _con_descarga(_FakeDownload(303), lambda: predictor.predecir_precio("BBB"))
+        assert cache.get_stats()["hits_disco"] == 1
+        assert cache.get_stats()["entrenamientos"] == 0
+
+        predictor.limpiar_cache()
+        _con_descarga(_FakeDownload(305), lambda: predictor.predecir_precio("BBB"))
+        assert cache.get_stats()["entrenamientos"] == 1
+        # Solo queda el archivo de la última fecha entrenada
+        assert len(os.listdir(tmp)) == 1
+
+
+def test_lru_y_modos():
+    """Test 3: LRU acotado y reutilización del ensemble para el modo random forest"""
+    cache = CacheModelosML(max_modelos=2, directorio=None)
+    with tempfile.TemporaryDirectory() as features:
+        predictor = _predictor(cache, features)
+        fake = _FakeDownload(200)
+        for ticker in ("C1", "C2", "C3"):
+            _con_descarga(fake, lambda: predictor.predecir_precio(ticker))
+        stats = cache.get_stats()
+        assert stats["en_memoria"] == 2 and stats["expulsiones"] == 1
+
+        predictor.limpiar_cache()
+        resultado = _con_descarga(fake, lambda: predictor.predecir_precio("C3", usar_ensemble=False))
+        assert "random_forest" in resultado["predicciones"]
+        assert cache.get_stats()["entrenamientos"] == 3
+
+
+def test_entrenamiento_concurrente():
+    """Test 4: Solicitudes simultáneas del mismo ticker entrenan una sola vez"""
+    cache = CacheModelosML(directorio=None)
+    entrenamientos = []
+
+    def entrenar():
+        entrenamientos.append(1)
+        time.sleep(0.2)
+        return {"random_forest": "modelo"}, {"random_forest": 0.2}
+
+    fechas = pd.bdate_range("2024-01-01", periods=50)
+    hilos = [threading.Thread(target=cache.obtener_o_entrenar,
+                              args=("DDD", 30, fechas, ["random_forest"], entrenar)) for _ in range(6)]
+    for hilo in hilos:
+        hilo.start()
+    for hilo in hilos:
+        hilo.join()
+    assert len(entrenamientos) == 1
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Reutiliza modelos", test_reutiliza_modelos),
+        ("Disco y barras nuevas", test_disco_y_barras_nuevas),
+        ("LRU y modos", test_lru_y_modos),
+        ("Entrenamiento concurrente", test_entrenamiento_concurrente),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
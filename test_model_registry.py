@@ -0,0 +1,182 @@
+"""
+test_model_registry.py
+Pruebas del registro versionado de modelos (ia/model_registry.py) y de la
+carga diferida de ia/ml_predictions.MLPredictor
+Modelos pequeños sobre features sintéticas: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import logging
+import pickle
+import tempfile
+
+import numpy as np
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+import ia.model_registry as registro_module
+from ia.model_registry import RegistroModelos
+from ia.ml_predictions import MLPredictor, ConjuntoModelos, hash_esquema_features
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestModelRegistry")
+
+
+def _conjunto(semilla=0):
+    rng = np.random.default_rng(semilla)
+    X = rng.uniform(0, 1, (300, 20))
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    return ConjuntoModelos(
+        scaler=scaler,
+        price_direction_model=RandomForestClassifier(n_estimators=10, random_state=semilla).fit(
+            X_scaled, (X[:, 0] > 0.5).astype(int)),
+        volatility_model=GradientBoostingClassifier(n_estimators=10, random_state=semilla).fit(
+            X_scaled, np.digitize(X[:, 2], [0.33, 0.66])),
+    )
+
+
+def _indicadores(n):
+    rng = np.random.default_rng(1)
+    return {
+        f"X{i:03d}": {
+            "RSI": {"valor": float(rng.uniform(10, 90))},
+            "MACD": {"linea_macd": float(rng.normal(0, 2))},
+            "MEDIAS_MOVILES": {"SMA_20": float(rng.uniform(90, 110)), "SMA_50": 100.0},
+        }
+        for i in range(n)
+    }
+
+
+def test_versiones():
+    """Test 1: Cada publicación es un directorio con manifiesto; ACTUAL apunta a la última"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp)
+        predictor.instalar_modelos(_conjunto(0))
+        v1 = predictor._save_models({"accuracy_price_direction": 0.6})
+        predictor.instalar_modelos(_conjunto(1))
+        v2 = predictor._save_models({"accuracy_price_direction": 0.7})
+
+        registro = RegistroModelos(tmp)
+        assert registro.versiones() == sorted([v1, v2]) and registro.version_actual() == v2
+        assert predictor.modelos.version == v2
+
+        with open(os.path.join(registro.ruta_version(v1), "manifest.json")) as f:
+            manifiesto = json.load(f)
+        assert manifiesto["metricas"]["accuracy_price_direction"] == 0.6
+        assert manifiesto["esquema_features"]["hash"] == hash_esquema_features()
+        assert set(manifiesto["archivos"]) == {"price_direction", "volatility", "scaler"}
+        assert [v["activa"] for v in registro.listar()] == [True, False]
+
+        # Volver a una versión anterior y podar sin borrar la activa
+        registro.activar(v1)
+        assert MLPredictor(model_dir=tmp).modelos.version == v1
+        assert registro.podar(conservar=1) == []
+        assert registro.versiones() == sorted([v1, v2])
+
+
+def test_poda_al_publicar():
+    """Test 2: Cada publicación poda el registro a `versiones_conservadas`"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp, versiones_conservadas=2)
+        versiones = []
+        for semilla in range(4):
+            predictor.instalar_modelos(_conjunto(semilla))
+            versiones.append(predictor._save_models())
+        registro = RegistroModelos(tmp)
+        assert registro.versiones() == versiones[-2:] and registro.version_actual() == versiones[-1]
+        assert not os.path.exists(registro.ruta_version(versiones[0]))
+
+        # Sin límite no se borra nada
+        predictor.versiones_conservadas = None
+        predictor._save_models()
+        assert len(registro.versiones()) == 3
+
+
+def test_carga_diferida_mmap():
+    """Test 3: Construir no carga nada; la primera predicción mapea la versión activa"""
+    with tempfile.TemporaryDirectory() as tmp:
+        original = _conjunto(0)
+        publicador = MLPredictor(model_dir=tmp)
+        publicador.instalar_modelos(original)
+        publicador._save_models()
+
+        cargas = []
+        joblib_load = registro_module.joblib.load
+
+        def contar(*args, **kwargs):
+            cargas.append(kwargs.get("mmap_mode"))
+            return joblib_load(*args, **kwargs)
+
+        registro_module.joblib.load = contar
+        try:
+            predictor = MLPredictor(model_dir=tmp)
+            assert cargas == []
+            lote = predictor.predict_many(_indicadores(10), ("precio", "volatilidad"))
+            predictor.predict_many(_indicadores(10))
+        finally:
+            registro_module.joblib.load = joblib_load
+
+        assert cargas == ["r", "r", "r"]
+        assert isinstance(predictor.scaler.mean_, np.memmap)
+        X = original.scaler.transform(np.vstack([
+            predictor._extract_features_from_indicators(i) for i in _indicadores(10).values()]))
+        esperada = original.volatility_model.predict(X)
+        assert [lote[t]["volatilidad"]["nivel_predicho"] for t in lote] == list(esperada)
+
+
+def test_esquema_y_formato_anterior():
+    """Test 4: Otro esquema de features no se carga; sin registro se leen los .pkl"""
+    with tempfile.TemporaryDirectory() as tmp:
+        conjunto = _conjunto(0)
+        RegistroModelos(tmp).publicar(
+            {"price_direction": conjunto.price_direction_model, "scaler": conjunto.scaler},
+            esquema_features={"hash": "otro"}
+        )
+        predictor = MLPredictor(model_dir=tmp)
+        assert predictor.price_direction_model is None
+        assert "error" in predictor.predict_many(_indicadores(2))["X000"]["precio"]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for nombre, modelo in (("price_direction", conjunto.price_direction_model), ("scaler", conjunto.scaler)):
+            with open(os.path.join(tmp, f"{nombre}_model.pkl"), "wb") as f:
+                pickle.dump(modelo, f)
+        predictor = MLPredictor(model_dir=tmp)
+        assert predictor.price_direction_model is not None and predictor.modelos.version is None
+        assert MLPredictor.leer_modelos(tmp, "v-inexistente") is None
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Versiones", test_versiones),
+        ("Poda al publicar", test_poda_al_publicar),
+        ("Carga diferida mmap", test_carga_diferida_mmap),
+        ("Esquema y formato anterior", test_esquema_y_formato_anterior),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
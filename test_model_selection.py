@@ -0,0 +1,143 @@
+"""
+test_model_selection.py
+Pruebas de la selección de modelos por latencia (ia/model_selection.py) y
+de MLPredictor.seleccionar_modelos
+Datos sintéticos y directorios temporales: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import logging
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from sklearn.ensemble import HistGradientBoostingClassifier, RandomForestClassifier
+
+from data_sources.feature_store import AlmacenFeatures
+from ia.ml_predictions import MLPredictor
+from ia.model_selection import (
+    ARCHIVO_SELECCION, MedicionCandidato, comparar_candidatos, elegir_candidato, frontera_pareto, leer_seleccion
+)
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestModelSelection")
+
+
+def _medicion(nombre, accuracy, latencia):
+    return MedicionCandidato(nombre, accuracy, latencia, latencia, latencia * 10, 256, 1000, 1.0, 0.1)
+
+
+def _historicos(barras=330, semilla=0):
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range("2023-01-02", periods=barras)
+    return {
+        t: pd.DataFrame({"Close": 100 * np.cumprod(1 + rng.normal(0.0003, 0.02, barras))}, index=fechas)
+        for t in ("AAA", "BBB")
+    }
+
+
+def test_pareto_y_eleccion():
+    """Test 1: Frontera de Pareto y elección del más rápido que cumple el piso"""
+    mediciones = [
+        _medicion("lento_preciso", 0.80, 5.0),
+        _medicion("medio", 0.78, 1.0),
+        _medicion("dominado", 0.70, 2.0),
+        _medicion("rapido", 0.60, 0.2),
+    ]
+    assert [m.candidato for m in frontera_pareto(mediciones)] == ["rapido", "medio", "lento_preciso"]
+
+    assert elegir_candidato(mediciones, None, 0.75) == (mediciones[1], True)
+    assert elegir_candidato(mediciones, 10.0, 0.79) == (mediciones[0], True)
+    # Nadie cumple el piso dentro del presupuesto: el más preciso que entra
+    assert elegir_candidato(mediciones, 1.5, 0.79) == (mediciones[1], False)
+    # Nadie entra en el presupuesto: el más rápido
+    assert elegir_candidato(mediciones, 0.01, 0.5) == (mediciones[3], False)
+
+
+def test_benchmark():
+    """Test 2: Se miden accuracy, latencias, tamaño y carga de cada candidato"""
+    rng = np.random.default_rng(0)
+    X = rng.normal(0, 1, (600, 20))
+    y = (X[:, 0] + 0.5 * X[:, 1] + rng.normal(0, 0.5, 600) > 0).astype(int)
+    resultado = comparar_candidatos(X, {"price_direction_model": y},
+                                    candidatos=["rf_25_d6", "hgb_50_d4"], filas_lote=100)
+
+    detalle = resultado["price_direction_model"]
+    medidos = {m["candidato"]: m for m in detalle["mediciones"]}
+    # La configuración base se mide siempre como referencia del piso
+    assert set(medidos) == {"rf_25_d6", "hgb_50_d4", "rf_100_d15"}
+    for m in medidos.values():
+        assert 0.5 < m["accuracy"] <= 1 and m["latencia_fila_ms"] > 0 and m["latencia_lote_ms"] > 0
+        assert m["tamano_bytes"] > 0 and m["carga_ms"] > 0 and m["filas_lote"] == 100
+    assert medidos["rf_100_d15"]["tamano_bytes"] > medidos["rf_25_d6"]["tamano_bytes"]
+    assert detalle["accuracy_minima"] == round(medidos["rf_100_d15"]["accuracy"] - 0.01, 4)
+    assert detalle["elegido"] in detalle["frontera"]
+    logger.warning("✅ " + ", ".join(
+        f"{n}: acc {m['accuracy']:.3f} {m['latencia_fila_ms']:.2f}ms/fila" for n, m in medidos.items()))
+
+
+def test_seleccion_persistida():
+    """Test 3: La selección se persiste y el entrenamiento completo e incremental la usan"""
+    historicos = _historicos()
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=os.path.join(tmp, "modelos"),
+                                almacen_features=AlmacenFeatures(os.path.join(tmp, "features")))
+        resultado = predictor.seleccionar_modelos(
+            {t: df.iloc[:300] for t, df in historicos.items()},
+            candidatos=["hgb_50_d4", "rf_25_d6"],
+            accuracy_minima={"price_direction_model": 0.0, "volatility_model": 0.0, "confidence_model": 0.0}
+        )
+        assert "error" not in resultado, resultado
+        with open(os.path.join(tmp, "modelos", ARCHIVO_SELECCION)) as f:
+            assert set(json.load(f)) == set(resultado["seleccion"])
+        seleccion = leer_seleccion(os.path.join(tmp, "modelos"))
+        assert seleccion == resultado["seleccion"]
+        assert set(seleccion.values()) <= {"hgb_50_d4", "rf_25_d6"}
+
+        entrenado = predictor.train_models({t: df.iloc[:300] for t, df in historicos.items()})
+        assert entrenado["candidatos"]["price_direction_model"] == seleccion["price_direction_model"]
+        tipo = HistGradientBoostingClassifier if seleccion["price_direction_model"] == "hgb_50_d4" \
+            else RandomForestClassifier
+        assert isinstance(predictor.price_direction_model, tipo)
+        assert predictor.get_status()["candidatos"] == seleccion
+
+        # Las actualizaciones incrementales amplían el modelo elegido
+        incremental = predictor.train_models(historicos, incremental=True)
+        assert "error" not in incremental, incremental
+        assert incremental["acciones"]["price_direction_model"] == "ampliado"
+        assert isinstance(predictor.price_direction_model, tipo)
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Pareto y elección", test_pareto_y_eleccion),
+        ("Benchmark", test_benchmark),
+        ("Selección persistida", test_seleccion_persistida),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+"""
+test_monte_carlo.py
+Pruebas del motor Monte Carlo (analisis/monte_carlo.py) y de su uso en
+MLPredictor.proyeccion_largo_plazo / analizar_riesgo_downside
+Datos sintéticos y yf.download simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.ml_predictor as ml_module
+from analisis.ml_predictor import MLPredictor
+from analisis.ml_model_cache import CacheModelosML
+from analisis.monte_carlo import (
+    SimuladorMonteCarlo,
+    calibrar_trayectorias,
+    max_drawdown,
+    simular_log_trayectorias,
+)
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestMonteCarlo")
+
+
+def _precios(n=1260, media=0.0003, desviacion=0.015, semilla=1):
+    rng = np.random.default_rng(semilla)
+    return 100 * np.exp(np.cumsum(rng.normal(media, desviacion, n)))
+
+
+def test_reproducible_float32():
+    """Test 1: Matriz float32 trayectorias x pasos, idéntica con la misma semilla"""
+    retornos = np.diff(np.log(_precios(500)))
+    for metodo in ("gbm", "bootstrap"):
+        a = simular_log_trayectorias(retornos, 60, 3000, metodo, semilla=7)
+        b = simular_log_trayectorias(retornos, 60, 3000, metodo, semilla=7)
+        c = simular_log_trayectorias(retornos, 60, 3000, metodo, semilla=8)
+        assert a.shape == (3000, 60) and a.dtype == np.float32
+        assert np.array_equal(a, b) and not np.array_equal(a, c)
+
+
+def test_estadisticas_gbm():
+    """Test 2: Los incrementos simulados reproducen la media/desviación históricas"""
+    retornos = np.random.default_rng(3).normal(0.0005, 0.02, 2000)
+    log_tray = simular_log_trayectorias(retornos, 252, 5000, "gbm", semilla=1)
+    incrementos = np.diff(log_tray.astype(np.float64), axis=1)
+    assert abs(incrementos.mean() - retornos.mean()) < 2e-4
+    assert abs(incrementos.std() - retornos.std(ddof=1)) < 2e-4
+
+    # Bootstrap solo usa valores observados
+    log_tray = simular_log_trayectorias(retornos, 20, 100, "bootstrap", semilla=1)
+    assert np.isin(log_tray[:, 0], retornos.astype(np.float32)).all()
+
+
+def test_drawdown():
+    """Test 3: max_drawdown coincide con el cálculo directo sobre precios"""
+    log_tray = np.log(np.array([[1.1, 0.88, 1.2, 0.9], [0.9, 0.8, 1.0, 1.1]], dtype=np.float32))
+    drawdowns = max_drawdown(log_tray.copy())
+    # Fila 1: pico 1.2 -> 0.9; fila 2: desde P_0 = 1 hasta 0.8
+    assert np.allclose(drawdowns, [0.25, 0.2], atol=1e-6)
+
+
+def test_resumen_riesgo():
+    """Test 4: Orden de VaR/CVaR, bandas y probabilidades de drawdown monótonas"""
+    resumen = SimuladorMonteCarlo(trayectorias=5000, semilla=42).simular(
+        _precios(), 252, metodo="bootstrap", puntos_control=[21, 126, 252]
+    )
+    assert list(resumen["bandas"]) == [21, 126, 252]
+    for bandas in resumen["bandas"].values():
+        valores = list(bandas.values())
+        assert valores == sorted(valores)
+    assert resumen["bandas"][21]["p95"] - resumen["bandas"][21]["p5"] < \
+        resumen["bandas"][252]["p95"] - resumen["bandas"][252]["p5"]
+
+    assert resumen["cvar"]["99"] <= resumen["var"]["99"] <= resumen["var"]["95"]
+    assert resumen["cvar"]["95"] <= resumen["var"]["95"]
+    probabilidades = list(resumen["prob_drawdown"].values())
+    assert probabilidades == sorted(probabilidades, reverse=True)
+    assert 0 <= resumen["prob_perdida"] <= 1
+
+
+def test_rendimiento():
+    """Test 5: 10k trayectorias x 1260 pasos en menos de 1 s"""
+    simulador = SimuladorMonteCarlo(trayectorias=10_000, semilla=0)
+    precios = _precios()
+    for metodo in ("gbm", "bootstrap"):
+        inicio = time.perf_counter()
+        resumen = simulador.simular(precios, 1260, metodo=metodo)
+        duracion = time.perf_counter() - inicio
+        assert resumen["trayectorias"] == 10_000
+        assert duracion < 1.0, f"{metodo}: {duracion:.2f}s"
+        logger.warning(f"✅ {metodo} 10k x 1260 en {duracion * 1000:.0f}ms")
+
+
+def test_presupuesto_latencia():
+    """Test 6: Con presupuesto_ms las trayectorias escalan con la latencia"""
+    pocas = calibrar_trayectorias(1260, 50)
+    muchas = calibrar_trayectorias(1260, 400)
+    assert 500 <= pocas < muchas <= 100_000
+
+    simulador = SimuladorMonteCarlo(presupuesto_ms=100)
+    n = simulador.trayectorias_para(252, "gbm")
+    assert simulador.trayectorias_para(252, "gbm") == n
+    assert simulador.simular(_precios(), 252)["trayectorias"] == n
+
+
+def test_integracion_predictor():
+    """Test 7: Proyección y riesgo downside incluyen el bloque monte_carlo"""
+    precios = _precios()
+
+    def fake_download(ticker, period="2y", progress=False, **kwargs):
+        fechas = pd.bdate_range(start="2020-01-01", periods=len(precios), name="Date")
+        return pd.DataFrame({"Close": precios, "Adj Close": precios, "Volume": 1e6}, index=fechas)
+
+    predictor = MLPredictor(
+        cache_modelos=CacheModelosML(directorio=None),
+        simulador=SimuladorMonteCarlo(trayectorias=2000, semilla=5)
+    )
+    original = ml_module.yf.download
+    ml_module.yf.download = fake_download
+    try:
+        proyeccion = predictor.proyeccion_largo_plazo("MC", anos=3)
+        riesgo = predictor.analizar_riesgo_downside("MC", dias=30)
+    finally:
+        ml_module.yf.download = original
+
+    assert "escenarios" in proyeccion and "riesgo_downside" in riesgo
+    assert list(proyeccion["monte_carlo"]["bandas"]) == [252, 504, 756]
+    assert proyeccion["monte_carlo"]["metodo"] == "gbm"
+    assert riesgo["monte_carlo"]["pasos"] == 30
+    assert riesgo["monte_carlo"]["precio_inicial"] == round(precios[-1], 2)
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Reproducible float32", test_reproducible_float32),
+        ("Estadísticas GBM", test_estadisticas_gbm),
+        ("Drawdown", test_drawdown),
+        ("Resumen de riesgo", test_resumen_riesgo),
+        ("Rendimiento", test_rendimiento),
+        ("Presupuesto de latencia", test_presupuesto_latencia),
+        ("Integración predictor", test_integracion_predictor),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+test_ohlcv_store.py
+Pruebas del almacén OHLCV local y de su uso en MarketDataManager.obtener_historico
+Usa un yfinance simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_sources.ohlcv_store import OHLCVStore, inicio_periodo
+import data_sources.market_data as market_data_module
+from data_sources.market_data import MarketDataManager
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestOHLCVStore")
+
+
+def _barras(inicio: str, n: int, base: float = 100.0) -> pd.DataFrame:
+    """Crea n barras diarias sintéticas con índice tz-aware como yfinance"""
+    fechas = pd.bdate_range(inicio, periods=n, tz="America/New_York", name="Date")
+    close = base + np.arange(n, dtype=float)
+    return pd.DataFrame({
+        "Open": close - 0.5,
+        "High": close + 1.0,
+        "Low": close - 1.0,
+        "Close": close,
+        "Volume": np.full(n, 1_000_000.0),
+    }, index=fechas)
+
+
+class _FakeTicker:
+    """Sustituto de yf.Ticker que registra las llamadas a history()"""
+    llamadas = []
+    datos = None
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    def history(self, period=None, interval="1d", start=None):
+        _FakeTicker.llamadas.append({"period": period, "start": start})
+        df = _FakeTicker.datos
+        if start is not None:
+            return df[df.index >= pd.Timestamp(start, tz=df.index.tz)]
+        desde = inicio_periodo(period)
+        return df if desde is None else df[df.index >= desde]
+
+
+def test_roundtrip_y_manifest():
+    """Test 1: Escribir y leer conserva valores, índice y zona horaria"""
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        df = _barras("2024-01-02", 50)
+        almacen.escribir("AAPL", df)
+
+        leido = almacen.leer("AAPL")
+        assert list(leido.columns) == list(df.columns)
+        assert leido.index.equals(df.index)
+        np.testing.assert_allclose(leido.to_numpy(), df.to_numpy())
+
+        cobertura = almacen.cobertura("AAPL")
+        assert cobertura["filas"] == 50
+        assert len(cobertura["rangos"]) == 1
+
+        # Un manifest recargado desde disco ve la misma serie
+        assert OHLCVStore(tmp).leer("AAPL").shape == (50, 5)
+        logger.info("✅ Roundtrip correcto")
+
+
+def test_append_incremental():
+    """Test 2: Fusionar barras solapadas reemplaza la última y agrega las nuevas"""
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        completo = _barras("2024-01-02", 40)
+        almacen.escribir("MSFT", completo.iloc[:30])
+
+        nuevas = completo.iloc[29:].copy()
+        nuevas.loc[nuevas.index[0], "Close"] = 999.0  # barra parcial corregida
+        total = almacen.escribir("MSFT", nuevas)
+
+        leido = almacen.leer("MSFT")
+        assert total == 40
+        assert leido["Close"].iloc[29] == 999.0
+        assert leido.index.is_monotonic_increasing
+        logger.info("✅ Append incremental correcto")
+
+
+def test_periodo_corto_tras_otro_mas_corto():
+    """Test 3: Un "5d" tras guardar solo la barra de un "1d" no se da por cubierto"""
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        hoy = pd.Timestamp.now(tz="America/New_York").normalize()
+        sesiones = pd.bdate_range(end=hoy, periods=260, tz="America/New_York")
+        ultima = _barras(sesiones[-1].strftime("%Y-%m-%d"), 1)
+        almacen.escribir("AAPL", ultima)
+
+        assert almacen.cubre_desde("AAPL", "1d", inicio_periodo("1d"))
+        assert not almacen.cubre_desde("AAPL", "1d", inicio_periodo("5d"))
+        assert not almacen.cubre_desde("AAPL", "1d", inicio_periodo("1mo"))
+
+        # Con las sesiones del período sí está cubierto, también con un feriado al inicio
+        desde = inicio_periodo("5d")
+        almacen.escribir("MSFT", _barras(sesiones[sesiones >= desde][0].strftime("%Y-%m-%d"), 5))
+        assert almacen.cubre_desde("MSFT", "1d", desde)
+        anio = sesiones[sesiones >= inicio_periodo("1y")]
+        almacen.escribir("NVDA", _barras(anio[1].strftime("%Y-%m-%d"), len(anio) - 1))
+        assert almacen.cubre_desde("NVDA", "1d", inicio_periodo("1y"))
+        assert not almacen.cubre_desde("NVDA", "1d", inicio_periodo("2y"))
+        logger.info("✅ Cobertura acorde al período")
+
+
+def test_historico_usa_almacen():
+    """Test 4: obtener_historico descarga una vez y luego solo barras nuevas"""
+    original = market_data_module.yf.Ticker
+    original_refresco = MarketDataManager._historico_refresco_segundos
+    market_data_module.yf.Ticker = _FakeTicker
+    MarketDataManager._request_cache.limpiar()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            hoy = pd.Timestamp.now(tz="America/New_York").normalize()
+            _FakeTicker.datos = _barras((hoy - pd.Timedelta(days=500)).strftime("%Y-%m-%d"), 350)
+            _FakeTicker.llamadas = []
+
+            manager = MarketDataManager(almacen_dir=tmp)
+
+            anual = manager.obtener_historico("TEST", periodo="1y")
+            assert not anual.empty
+            assert _FakeTicker.llamadas == [{"period": "1y", "start": None}]
+
+            # Período más corto y datos frescos: sin llamadas a la red
+            inicio = time.perf_counter()
+            mensual = manager.obtener_historico("TEST", periodo="1mo")
+            duracion_ms = (time.perf_counter() - inicio) * 1000
+            assert len(_FakeTicker.llamadas) == 1
+            assert len(mensual) < len(anual)
+            assert mensual.index[-1] == anual.index[-1]
+
+            # Datos vencidos: solo se piden las barras desde la última almacenada
+            MarketDataManager._historico_refresco_segundos = 0
+            MarketDataManager._request_cache.limpiar()
+            manager.obtener_historico("TEST", periodo="3mo")
+            assert _FakeTicker.llamadas[-1]["start"] is not None
+            assert _FakeTicker.llamadas[-1]["period"] is None
+
+            logger.info(f"✅ Lectura en caliente en {duracion_ms:.1f}ms")
+    finally:
+        market_data_module.yf.Ticker = original
+        MarketDataManager._historico_refresco_segundos = original_refresco
+        MarketDataManager._request_cache.limpiar()
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Roundtrip y manifest", test_roundtrip_y_manifest),
+        ("Append incremental", test_append_incremental),
+        ("Período corto tras otro más corto", test_periodo_corto_tras_otro_mas_corto),
+        ("Histórico desde almacén", test_historico_usa_almacen),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+test_rate_limiter.py
+Pruebas del rate limiter por token bucket (data_sources/rate_limiter.py)
+No requiere conexión: valida esperas, concurrencia y contadores
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from data_sources.rate_limiter import RateLimiter, TokenBucket
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestRateLimiter")
+
+
+def test_token_bucket_reserva():
+    """Test 1: El bucket reserva a crédito y calcula la espera"""
+    bucket = TokenBucket(tasa=2.0, capacidad=1)
+    ahora = time.monotonic()
+
+    assert bucket.reservar(ahora) == 0.0
+    assert abs(bucket.reservar(ahora) - 0.5) < 1e-6
+    assert abs(bucket.reservar(ahora) - 1.0) < 1e-6
+    logger.info("✅ Reservas encadenadas esperan 0.5s por turno")
+
+
+def test_mismo_ticker_espera():
+    """Test 2: Solicitudes seguidas al mismo ticker respetan el intervalo"""
+    limiter = RateLimiter(intervalo_minimo_ticker=0.2)
+
+    inicio = time.monotonic()
+    for _ in range(3):
+        limiter.adquirir("AAPL")
+    transcurrido = time.monotonic() - inicio
+
+    assert transcurrido >= 0.39
+    stats = limiter.get_stats()
+    assert stats["solicitudes"] == 3
+    assert stats["esperas"] == 2
+    assert stats["throttles_ticker"] == 2
+    logger.info(f"✅ 3 solicitudes a AAPL en {transcurrido:.2f}s")
+
+
+def test_tickers_distintos_no_se_bloquean():
+    """Test 3: Un ticker en espera no bloquea a los demás hilos"""
+    limiter = RateLimiter(intervalo_minimo_ticker=1.0)
+    limiter.adquirir("LENTO")
+
+    def tarea(ticker):
+        inicio = time.monotonic()
+        limiter.adquirir(ticker)
+        return time.monotonic() - inicio
+
+    with ThreadPoolExecutor(max_workers=9) as executor:
+        futuro_lento = executor.submit(tarea, "LENTO")
+        time.sleep(0.05)  # asegurar que LENTO ya está esperando
+        tiempos = list(executor.map(tarea, [f"T{i}" for i in range(8)]))
+        espera_lento = futuro_lento.result()
+
+    assert max(tiempos) < 0.2
+    assert espera_lento >= 0.9
+    logger.info(f"✅ 8 tickers atendidos en {max(tiempos):.3f}s mientras LENTO esperaba {espera_lento:.2f}s")
+
+
+def test_limite_proveedor():
+    """Test 4: El bucket del proveedor limita el total entre tickers"""
+    limiter = RateLimiter(
+        intervalo_minimo_ticker=0,
+        limites_proveedor={"yfinance": (20.0, 2)}
+    )
+
+    esperas = [limiter.reservar(f"T{i}") for i in range(4)]
+
+    assert esperas[0] == 0.0 and esperas[1] == 0.0
+    assert abs(esperas[2] - 0.05) < 1e-3
+    assert abs(esperas[3] - 0.10) < 1e-3
+    assert limiter.get_stats()["throttles_proveedor"] == 2
+    logger.info(f"✅ Esperas por proveedor: {esperas}")
+
+
+def test_max_espera_rechaza_y_devuelve():
+    """Test 5: Una reserva rechazada por max_espera no consume el turno"""
+    limiter = RateLimiter(intervalo_minimo_ticker=1.0)
+    limiter.adquirir("AAPL")
+
+    assert limiter.adquirir("AAPL", max_espera=0.1) is False
+    espera = limiter.reservar("AAPL")
+    assert espera is not None and espera <= 1.0
+    assert limiter.get_stats()["rechazos"] == 1
+    logger.info("✅ Reserva rechazada y token devuelto")
+
+
+def test_adquirir_async():
+    """Test 6: Esperas async concurrentes para tickers distintos"""
+    limiter = RateLimiter(intervalo_minimo_ticker=0.3)
+
+    async def escenario():
+        await limiter.adquirir_async("AAPL")
+        inicio = time.monotonic()
+        await asyncio.gather(
+            limiter.adquirir_async("AAPL"),
+            limiter.adquirir_async("MSFT"),
+            limiter.adquirir_async("GOOGL"),
+        )
+        return time.monotonic() - inicio
+
+    transcurrido = asyncio.run(escenario())
+    assert 0.25 <= transcurrido < 0.5
+    logger.info(f"✅ gather async completado en {transcurrido:.2f}s")
+
+
+def test_purga_buckets_inactivos():
+    """Test 7: El mapa de buckets no crece sin límite"""
+    limiter = RateLimiter(intervalo_minimo_ticker=0.001, max_buckets=50)
+    for i in range(50):
+        limiter.adquirir(f"T{i}")
+    time.sleep(0.01)
+    limiter.adquirir("NUEVO")
+
+    stats = limiter.get_stats()
+    assert stats["buckets_ticker_activos"] <= 50
+    assert stats["buckets_purgados"] > 0
+    logger.info(f"✅ Buckets purgados: {stats['buckets_purgados']}")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Token bucket", test_token_bucket_reserva),
+        ("Mismo ticker", test_mismo_ticker_espera),
+        ("Tickers distintos", test_tickers_distintos_no_se_bloquean),
+        ("Límite proveedor", test_limite_proveedor),
+        ("Max espera", test_max_espera_rechaza_y_devuelve),
+        ("Async", test_adquirir_async),
+        ("Purga buckets", test_purga_buckets_inactivos),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+test_returns_panel.py
+Pruebas del panel de retornos compartido (analisis/returns_panel.py) y de
+CorrelationAnalyzer.calcular_correlacion_activos sobre él
+Usa una descarga batch simulada: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.correlation_analyzer as ca_module
+from analisis.correlation_analyzer import CorrelationAnalyzer
+from analisis.returns_panel import PanelRetornos
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestReturnsPanel")
+
+
+def _universo(n_tickers=40, barras=300, semilla=0):
+    """Cierres con un factor común y algún hueco de cotización"""
+    rng = np.random.default_rng(semilla)
+    mercado = rng.normal(0, 0.01, (barras, 1))
+    retornos = 0.6 * mercado + rng.normal(0, 0.012, (barras, n_tickers))
+    precios = 50 * np.exp(np.cumsum(retornos, axis=0))
+    fechas = pd.bdate_range("2023-01-02", periods=barras, name="Date")
+    tickers = [f"T{i:03d}" for i in range(n_tickers)]
+    marco = pd.DataFrame(precios, index=fechas, columns=tickers)
+    if n_tickers > 7:
+        marco.iloc[40:45, 3] = np.nan
+        marco.iloc[:30, 7] = np.nan
+    return marco
+
+
+class _FakeBatch:
+    """Sustituto de descargar_historicos_batch sobre un DataFrame de cierres"""
+
+    def __init__(self, cierres):
+        self.cierres = cierres
+        self.llamadas = []
+
+    def __call__(self, tickers, periodo="1y", inicio=None, **kwargs):
+        self.llamadas.append((list(tickers), inicio))
+        datos = self.cierres if inicio is None else self.cierres.loc[inicio:]
+        return {
+            t: pd.DataFrame({"Close": datos[t].dropna()})
+            for t in tickers if t in datos.columns
+        }
+
+
+def _esperada(cierres, tickers):
+    retornos = cierres[tickers].apply(lambda s: s.dropna().pct_change())
+    return retornos.corr(), retornos.std()
+
+
+def test_igual_a_pandas():
+    """Test 1: Pearson y covarianza por pares coinciden con pandas"""
+    cierres = _universo()
+    panel = PanelRetornos()
+    panel.agregar_tickers(cierres)
+
+    tickers = ["T003", "T007", "T010", "T020"]
+    corr, std = _esperada(cierres, tickers)
+    assert np.allclose(panel.correlacion(tickers).to_numpy(), corr.to_numpy(), atol=1e-10)
+    assert np.allclose(panel.volatilidad(tickers).to_numpy(), std.to_numpy(), atol=1e-12)
+    spearman = panel.correlacion_spearman(tickers)
+    assert np.allclose(spearman.to_numpy(), panel.retornos_de(tickers).corr("spearman").to_numpy())
+
+
+def test_incremental_y_ventana():
+    """Test 2: Barras nuevas y salida de la ventana == recalcular desde cero"""
+    cierres = _universo(barras=400)
+    panel = PanelRetornos(ventana=250)
+    panel.agregar_tickers(cierres.iloc[:300])
+    for inicio in range(300, 400, 7):
+        panel.agregar_barras(cierres.iloc[inicio:inicio + 7])
+
+    assert len(panel.fechas) == 250 and panel.ultima_fecha == cierres.index[-1]
+    esperado = cierres.apply(lambda s: s.dropna().pct_change()).iloc[-250:]
+    tickers = list(cierres.columns[:10])
+    assert np.allclose(panel.correlacion(tickers).to_numpy(), esperado[tickers].corr().to_numpy(), atol=1e-9)
+
+    # Tickers añadidos después se alinean a las fechas del panel
+    extra = _universo(n_tickers=2, barras=400, semilla=9).rename(columns={"T000": "X1", "T001": "X2"})
+    panel.agregar_tickers(extra)
+    conjunto = esperado.join(extra.pct_change().iloc[-250:])
+    assert np.allclose(panel.correlacion(["X1", "T005"]).to_numpy(),
+                       conjunto[["X1", "T005"]].corr().to_numpy(), atol=1e-9)
+
+
+def test_subconjunto_sin_io():
+    """Test 3: Un subconjunto de un universo cargado no descarga y es O(k²)"""
+    cierres = _universo(n_tickers=500, barras=260)
+    fake = _FakeBatch(cierres)
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake
+    try:
+        analyzer = CorrelationAnalyzer()
+        analyzer.obtener_panel(list(cierres.columns), "1y")
+        assert len(fake.llamadas) == 1
+
+        subconjunto = ["T010", "T020", "T030", "T040", "T050"]
+        inicio = time.perf_counter()
+        resultado = analyzer.calcular_correlacion_activos(subconjunto, "1y")
+        duracion = time.perf_counter() - inicio
+
+        corr, std = _esperada(cierres, subconjunto)
+        assert len(fake.llamadas) == 1
+        assert np.allclose(pd.DataFrame(resultado["correlacion_pearson"]).to_numpy(), corr.to_numpy())
+        assert np.allclose(list(resultado["volatilidad_diaria_pct"].values()), std.to_numpy() * 100)
+        assert duracion < 0.05
+        logger.warning(f"✅ Submatriz 5 de 500 en {duracion * 1000:.1f}ms sin descargas")
+
+        # Un ticker nuevo descarga solo ese ticker
+        analyzer.calcular_correlacion_activos(["T010", "NUEVO"], "1y")
+        assert fake.llamadas[-1] == (["NUEVO"], None)
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+
+def test_refresco_incremental():
+    """Test 4: Vencido el TTL solo se piden las barras desde la última fecha"""
+    cierres = _universo(n_tickers=6, barras=300)
+    fake = _FakeBatch(cierres.iloc[:280])
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake
+    try:
+        analyzer = CorrelationAnalyzer()
+        analyzer.calcular_correlacion_activos(["T000", "T001"], "1y")
+        analyzer.calcular_correlacion_activos(["T002", "T003"], "1y")
+        assert [len(t) for t, _ in fake.llamadas] == [2, 2]
+
+        fake.cierres = cierres
+        analyzer.cache_ttl = 0
+        resultado = analyzer.calcular_correlacion_activos(["T000", "T003"], "1y")
+        tickers, inicio = fake.llamadas[-1]
+        assert sorted(tickers) == ["T000", "T001", "T002", "T003"]
+        assert inicio == cierres.index[279].strftime("%Y-%m-%d")
+
+        panel = analyzer.obtener_panel(["T000"], "1y")
+        assert panel.ultima_fecha == cierres.index[-1]
+        assert "error" not in resultado
+        assert analyzer.analizar_diversificacion(["T000", "T003"])["correlacion_promedio"] > 0
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+
+def test_primer_ticker_corto():
+    """Test 5: Un ticker con poca historia cargado primero no recorta la ventana del período"""
+    cierres = _universo(n_tickers=4, barras=320)
+    cierres.iloc[:-30, 0] = np.nan
+    fake = _FakeBatch(cierres)
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake
+    try:
+        analyzer = CorrelationAnalyzer()
+        analyzer.obtener_panel(["T000"], "1y")
+        resultado = analyzer.calcular_correlacion_activos(["T001", "T002"], "1y")
+        panel = analyzer.obtener_panel(["T003"], "1y")
+
+        # Ventana = días del período hasta la última barra, como una descarga "1y" nueva
+        retornos = cierres.apply(lambda s: s.dropna().pct_change())
+        retornos = retornos[retornos.index >= cierres.index[-1] - pd.Timedelta(days=366)]
+        assert panel.fechas.equals(retornos.index) and panel.get_stats()["dias"] == 366
+        esperada = retornos[["T001", "T002"]].corr().to_numpy()
+        assert np.allclose(pd.DataFrame(resultado["correlacion_pearson"]).to_numpy(), esperada)
+        assert np.allclose(panel.correlacion(["T000", "T003"]).to_numpy(),
+                           retornos[["T000", "T003"]].corr().to_numpy())
+
+        # El orden de carga no cambia el resultado
+        otro = CorrelationAnalyzer()
+        otro.obtener_panel(["T001", "T002"], "1y")
+        otro.obtener_panel(["T000"], "1y")
+        assert np.allclose(otro.obtener_panel([], "1y").correlacion(["T000", "T001", "T002"]).to_numpy(),
+                           panel.correlacion(["T000", "T001", "T002"]).to_numpy())
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Igual a pandas", test_igual_a_pandas),
+        ("Incremental y ventana", test_incremental_y_ventana),
+        ("Subconjunto sin I/O", test_subconjunto_sin_io),
+        ("Refresco incremental", test_refresco_incremental),
+        ("Primer ticker corto", test_primer_ticker_corto),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""
+test_screener_paralelo.py
+Pruebas del screener paralelo con resultados en streaming y ranking top-N acotado
+Usa históricos sintéticos y un gestor de datos simulado: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+from analisis.screener import ScreenerAutomatico, RankingTopN, ScreenerResult, Timeframe
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestScreenerParalelo")
+
+
+def _historico(semilla: int) -> pd.DataFrame:
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range(end="2024-06-28", periods=90, name="Date")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, len(fechas))))
+    return pd.DataFrame({
+        "Open": close, "High": close * 1.01, "Low": close * 0.99,
+        "Close": close, "Volume": rng.uniform(1e6, 2e6, len(fechas)),
+    }, index=fechas)
+
+
+class _MarketDataLento:
+    """Gestor simulado con latencia fija por cotización"""
+
+    def __init__(self, latencia: float):
+        self.latencia = latencia
+
+    def obtener_datos_actuales(self, ticker):
+        time.sleep(self.latencia)
+        return {"precio_actual": 100.0}
+
+
+def _screener(latencia: float = 0.0) -> ScreenerAutomatico:
+    screener = ScreenerAutomatico(market_data_manager=_MarketDataLento(latencia))
+    screener.logger.setLevel(logging.WARNING)
+    screener._obtener_datos_historicos_batch = lambda tickers, dias=90, tamano_lote=50: {
+        t: _historico(int(t[1:])) for t in tickers
+    }
+    return screener
+
+
+def _tickers(n):
+    return [f"T{i:03d}" for i in range(n)]
+
+
+def test_ranking_topn():
+    """Test 1: El ranking conserva solo los N mejores, en orden"""
+    ranking = RankingTopN(3)
+    for i, score in enumerate([10, 80, 35, 80, 5, 60]):
+        ranking.agregar(ScreenerResult(
+            ticker=f"T{i}", timestamp="", timeframe="", precio_actual=0, recomendacion="",
+            score=score, señales_compra=0, señales_venta=0, indicadores={},
+            razon_principal="", confianza=0, variacion_esperada=0, niveles_clave={}
+        ))
+    assert len(ranking) == 3
+    assert [r.score for r in ranking.ranking()] == [80, 80, 60]
+    assert [r.ticker for r in ranking.ranking()][:2] == ["T1", "T3"]
+    assert ranking.procesados == 6
+
+
+def test_paralelo_igual_que_secuencial():
+    """Test 2: El modo paralelo devuelve el mismo top N que el secuencial"""
+    tickers = _tickers(40)
+    secuencial = _screener().screener_por_sector(tickers, limite=5, max_workers=1)
+    paralelo = _screener().screener_por_sector(tickers, limite=5, max_workers=8)
+    assert [r.ticker for r in secuencial] == [r.ticker for r in paralelo]
+
+    completo = [_screener().analizar_simbolo(t, Timeframe.MEDIUM_TERM, 90, _historico(int(t[1:])))
+                for t in tickers]
+    esperado = sorted(completo, key=lambda r: r.score, reverse=True)[:5]
+    assert [r.score for r in paralelo] == [r.score for r in esperado]
+
+
+def test_streaming_y_callback():
+    """Test 3: Los resultados llegan uno a uno y el callback ve rankings parciales"""
+    screener = _screener()
+    vistos = list(screener.iterar_screener(_tickers(12), max_workers=4, tamano_lote=5))
+    assert len(vistos) == 12
+
+    parciales = []
+    screener.screener_por_sector(
+        _tickers(12), limite=3, max_workers=4,
+        callback=lambda resultado, ranking: parciales.append(len(ranking))
+    )
+    assert len(parciales) == 12
+    assert parciales[0] == 1 and parciales[-1] == 3
+
+
+def test_escala_con_workers():
+    """Test 4: Con latencia de red el tiempo baja con más workers"""
+    tickers = _tickers(16)
+
+    inicio = time.perf_counter()
+    _screener(0.05).screener_por_sector(tickers, max_workers=1)
+    secuencial = time.perf_counter() - inicio
+
+    inicio = time.perf_counter()
+    _screener(0.05).screener_por_sector(tickers, max_workers=8)
+    paralelo = time.perf_counter() - inicio
+
+    assert paralelo < secuencial / 2
+    logger.warning(f"✅ 16 símbolos: {secuencial:.2f}s secuencial vs {paralelo:.2f}s con 8 workers")
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Ranking top-N", test_ranking_topn),
+        ("Paralelo = secuencial", test_paralelo_igual_que_secuencial),
+        ("Streaming y callback", test_streaming_y_callback),
+        ("Escalado con workers", test_escala_con_workers),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
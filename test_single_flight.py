@@ -0,0 +1,163 @@
+"""
+test_single_flight.py
+Pruebas de coalescencia de solicitudes (data_sources/single_flight.py)
+Verifica que N hilos pidiendo el mismo ticker generan una sola descarga
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import data_sources.market_data as market_data_module
+from data_sources.market_data import MarketDataManager
+from data_sources.single_flight import SingleFlight, SingleFlightTimeout
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestSingleFlight")
+
+
+def test_una_ejecucion_por_clave():
+    """Test 1: Llamadas simultáneas con la misma clave ejecutan la función una vez"""
+    flight = SingleFlight()
+    ejecuciones = []
+
+    def descarga():
+        ejecuciones.append(1)
+        time.sleep(0.2)
+        return {"precio": 100}
+
+    with ThreadPoolExecutor(max_workers=10) as executor:
+        resultados = list(executor.map(lambda _: flight.ejecutar("AAPL", descarga), range(10)))
+
+    assert len(ejecuciones) == 1
+    assert all(r == {"precio": 100} for r in resultados)
+    stats = flight.get_stats()
+    assert stats["ejecuciones"] == 1 and stats["compartidas"] == 9
+    assert stats["en_vuelo"] == 0
+    logger.info(f"✅ 10 llamadas, 1 ejecución: {stats}")
+
+
+def test_error_compartido():
+    """Test 2: Los seguidores reciben la misma excepción que el líder"""
+    flight = SingleFlight()
+    barrera = threading.Event()
+
+    def descarga():
+        barrera.wait(1)
+        raise ConnectionError("Too Many Requests")
+
+    def llamar(_):
+        try:
+            flight.ejecutar("MSFT", descarga)
+        except ConnectionError as e:
+            return str(e)
+        return None
+
+    with ThreadPoolExecutor(max_workers=5) as executor:
+        futuros = [executor.submit(llamar, i) for i in range(5)]
+        time.sleep(0.1)
+        barrera.set()
+        errores = [f.result() for f in futuros]
+
+    assert errores == ["Too Many Requests"] * 5
+    assert flight.get_stats()["ejecuciones"] == 1
+    logger.info("✅ Error compartido por 5 llamadas")
+
+
+def test_timeout_seguidor():
+    """Test 3: Un seguidor respeta el timeout de espera configurado"""
+    flight = SingleFlight(timeout_espera=0.1)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        lider = executor.submit(flight.ejecutar, "GOOGL", lambda: time.sleep(0.5) or "ok")
+        time.sleep(0.05)
+        seguidor = executor.submit(flight.ejecutar, "GOOGL", lambda: "no debería ejecutarse")
+        try:
+            seguidor.result()
+            raise AssertionError("Se esperaba SingleFlightTimeout")
+        except SingleFlightTimeout:
+            pass
+        assert lider.result() == "ok"
+
+    assert flight.get_stats()["timeouts"] == 1
+    logger.info("✅ Timeout del seguidor respetado")
+
+
+class _FakeTickerLento:
+    """Sustituto de yf.Ticker con latencia para forzar solapamiento"""
+    descargas_info = 0
+    lock = threading.Lock()
+
+    def __init__(self, ticker, session=None):
+        self.ticker = ticker
+
+    @property
+    def info(self):
+        with _FakeTickerLento.lock:
+            _FakeTickerLento.descargas_info += 1
+        time.sleep(0.3)
+        return {
+            "currentPrice": 50.0, "open": 49.0, "dayHigh": 51.0, "dayLow": 48.0,
+            "volume": 1000, "marketCap": 10**9, "longName": "Hot Corp",
+        }
+
+
+def test_manager_coalesce_cotizaciones():
+    """Test 4: MarketDataManager hace una sola descarga por ráfaga de un ticker"""
+    original = market_data_module.yf.Ticker
+    market_data_module.yf.Ticker = _FakeTickerLento
+    MarketDataManager._request_cache.limpiar()
+    _FakeTickerLento.descargas_info = 0
+    try:
+        manager = MarketDataManager(usar_almacen_local=False)
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            resultados = list(executor.map(manager.obtener_datos_actuales, ["HOT"] * 8))
+
+        assert _FakeTickerLento.descargas_info == 1
+        assert all(r["precio_actual"] == 50.0 for r in resultados)
+
+        _FakeTickerLento.descargas_info = 0
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            fundamentales = list(executor.map(manager.obtener_fundamentales, ["HOT"] * 8))
+        assert _FakeTickerLento.descargas_info == 1
+        assert all(f["nombre"] == "Hot Corp" for f in fundamentales)
+        logger.info("✅ 8 cotizaciones y 8 fundamentales con 1 descarga cada uno")
+    finally:
+        market_data_module.yf.Ticker = original
+        MarketDataManager._request_cache.limpiar()
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Una ejecución por clave", test_una_ejecucion_por_clave),
+        ("Error compartido", test_error_compartido),
+        ("Timeout seguidor", test_timeout_seguidor),
+        ("Coalescencia en MarketDataManager", test_manager_coalesce_cotizaciones),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,231 @@
+"""
+test_streaming_indicators.py
+Pruebas de los indicadores incrementales con estado persistente
+(analisis/streaming_indicators.py + estado junto al OHLCVStore)
+Compara contra el motor vectorizado (analisis/indicator_engine.py): no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import json
+import logging
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from analisis.indicator_engine import BARRAS_ANALISIS, construir_panel, indicadores_tecnicos
+from analisis.streaming_indicators import (
+    IndicadorIncremental, IndicadoresIncrementales, IndicadoresPersistentes, IndicadoresVentana,
+    MediaVarianzaMovil
+)
+from cerebro.analysis_methodology import TechnicalAnalyzer
+from data_sources.ohlcv_store import OHLCVStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestStreamingIndicators")
+
+
+def _historico(n, semilla=0):
+    rng = np.random.default_rng(semilla)
+    fechas = pd.bdate_range(end="2024-06-28", periods=n, name="Date", tz="America/New_York")
+    close = 100 * np.exp(np.cumsum(rng.normal(0, 0.02, n)))
+    return pd.DataFrame({
+        "Open": close,
+        "High": close * (1 + rng.uniform(0, 0.02, n)),
+        "Low": close * (1 - rng.uniform(0, 0.02, n)),
+        "Close": close,
+        "Volume": rng.uniform(1e6, 2e6, n),
+    }, index=fechas)
+
+
+def _esperado(df, max_barras=BARRAS_ANALISIS):
+    return indicadores_tecnicos(construir_panel({"X": df}, max_barras=max_barras)).para("X")
+
+
+def _comparar(esperado, obtenido):
+    for nombre, valor in esperado.items():
+        assert np.isclose(valor, obtenido[nombre], rtol=1e-8, atol=1e-8, equal_nan=True), \
+            (nombre, valor, obtenido[nombre])
+
+
+def test_paridad_con_motor():
+    """Test 1: Barra a barra se obtienen los mismos valores que el motor vectorizado"""
+    df = _historico(260)
+    indicadores = IndicadoresIncrementales()
+    for i, fila in enumerate(df.itertuples()):
+        indicadores.actualizar(fila.High, fila.Low, fila.Close, fila.Volume)
+        if i + 1 in (10, 30, 60, 220, 260):
+            _comparar(_esperado(df.iloc[:i + 1], None), indicadores.valores())
+    logger.info("✅ Paridad con indicadores_tecnicos en 5 cortes de la serie")
+
+
+def test_varianza_movil_sin_deriva():
+    """Test 2: La varianza móvil no acumula error tras miles de barras"""
+    rng = np.random.default_rng(1)
+    x = 1e4 + rng.normal(0, 1, 5000)
+    movil = MediaVarianzaMovil(20, ddof=1)
+    for v in x:
+        movil.actualizar(float(v))
+    serie = pd.Series(x).rolling(20)
+    assert np.isclose(movil.valor, serie.mean().iloc[-1], rtol=1e-12)
+    assert np.isclose(movil.desviacion, serie.std().iloc[-1], rtol=1e-8)
+
+
+def test_estado_en_disco_y_coste_incremental():
+    """Test 3: El estado vive junto a la serie y solo se procesan barras nuevas"""
+    df = _historico(400, semilla=2)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        almacen.escribir("AAA", df.iloc[:399])
+        persistentes = IndicadoresPersistentes(almacen)
+
+        persistentes.actualizar("AAA")
+        assert os.path.exists(almacen.ruta_estado("AAA"))
+        assert persistentes.get_stats()["barras_procesadas"] == BARRAS_ANALISIS
+
+        # Una barra nueva: una barra procesada, con una instancia nueva (estado desde disco)
+        almacen.escribir("AAA", df.iloc[399:])
+        persistentes = IndicadoresPersistentes(almacen)
+        inicio = time.perf_counter()
+        valores = persistentes.actualizar("AAA")
+        duracion = time.perf_counter() - inicio
+        assert persistentes.get_stats() == {"barras_procesadas": 1, "reconstrucciones": 0, "revisiones": 0}
+        _comparar(_esperado(df), valores)
+
+        # Sin barras nuevas no se procesa nada ni se recorre la ventana
+        recorridos = []
+        original = IndicadoresVentana.valores
+        IndicadoresVentana.valores = lambda self: recorridos.append(1) or original(self)
+        try:
+            _comparar(valores, persistentes.actualizar("AAA"))
+        finally:
+            IndicadoresVentana.valores = original
+        assert persistentes.get_stats()["barras_procesadas"] == 1 and not recorridos
+
+        estado = almacen.leer_estado("AAA")
+        reconstruido = IndicadorIncremental.desde_dict(estado["indicadores"])
+        assert len(reconstruido.barras) == BARRAS_ANALISIS
+        _comparar(_esperado(df), reconstruido.valores())
+
+        # Sin ventana se acumula toda la historia
+        completos = IndicadoresPersistentes(almacen, nombre="completos", ventana=None)
+        _comparar(_esperado(df, None), completos.actualizar("AAA"))
+        assert completos.get_stats()["barras_procesadas"] == 400
+
+        almacen.eliminar("AAA")
+        assert not os.path.exists(almacen.ruta_estado("AAA"))
+        logger.info(f"✅ Barra nueva aplicada en {duracion * 1000:.1f}ms")
+
+
+def test_revisiones_y_reajustes():
+    """Test 4: Barra abierta revisada se reaplica; historia reajustada se reconstruye"""
+    df = _historico(120, semilla=3)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        almacen.escribir("BBB", df)
+        persistentes = IndicadoresPersistentes(almacen)
+        persistentes.actualizar("BBB")
+
+        # La última barra (aún abierta) cambia y llega otra nueva
+        revisado = df.copy()
+        revisado.iloc[-1, revisado.columns.get_loc("Close")] *= 1.01
+        siguiente = _historico(121, semilla=3).iloc[-1:]
+        siguiente.index = [df.index[-1] + pd.offsets.BDay(1)]
+        completo = pd.concat([revisado, siguiente])
+        almacen.escribir("BBB", completo.iloc[-2:])
+        valores = persistentes.actualizar("BBB")
+        stats = persistentes.get_stats()
+        assert stats["revisiones"] == 1 and stats["reconstrucciones"] == 1
+        _comparar(_esperado(completo), valores)
+
+        # Split: toda la historia se reajusta
+        ajustado = completo.copy()
+        ajustado[["Open", "High", "Low", "Close"]] /= 2
+        almacen.escribir("BBB", ajustado)
+        valores = persistentes.actualizar("BBB")
+        assert persistentes.get_stats()["reconstrucciones"] == 2
+        _comparar(_esperado(ajustado), valores)
+
+
+def test_watchlist():
+    """Test 5: Refrescar una watchlist usa el gestor de datos una vez"""
+    historicos = {f"T{i}": _historico(300, semilla=i) for i in range(5)}
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+
+        class _MarketDataFalso:
+            llamadas = 0
+
+            def obtener_historicos_batch(self, tickers, periodo="1y", intervalo="1d"):
+                self.llamadas += 1
+                for t in tickers:
+                    if t in historicos:
+                        almacen.escribir(t, historicos[t])
+
+        market_data = _MarketDataFalso()
+        resultados = IndicadoresPersistentes(almacen).refrescar(list(historicos) + ["ZZZ"], market_data)
+        assert market_data.llamadas == 1
+        assert set(resultados) == set(historicos)
+        _comparar(_esperado(historicos["T2"]), resultados["T2"])
+
+
+def test_paridad_con_analizador():
+    """Test 6: TechnicalAnalyzer desde el estado == analizar_indicadores sobre el histórico"""
+    df = _historico(400, semilla=6)
+    with tempfile.TemporaryDirectory() as tmp:
+        almacen = OHLCVStore(tmp)
+        almacen.escribir("CCC", df.iloc[:380])
+        analizador = TechnicalAnalyzer(IndicadoresPersistentes(almacen))
+        analizador.analizar_indicadores_almacen(["CCC"])
+        previo = 380
+        for fin in (381, 390, 400):
+            almacen.escribir("CCC", df.iloc[previo:fin])
+            previo = fin
+            obtenido = analizador.analizar_indicadores_ticker("CCC", df.iloc[:fin])
+            esperado = analizador.analizar_indicadores(df.iloc[:fin])
+            obtenido.pop("timestamp"), esperado.pop("timestamp")
+            # json: NaN == NaN (SMA_200 no existe con 60 barras)
+            assert json.dumps(obtenido, sort_keys=True) == json.dumps(esperado, sort_keys=True)
+        assert analizador.indicadores_persistentes.get_stats()["barras_procesadas"] == BARRAS_ANALISIS + 20
+
+        # Serie distinta de la almacenada o ticker fuera del almacén: cálculo directo
+        otro = _historico(100, semilla=7)
+        assert analizador.analizar_indicadores_ticker("CCC", otro)["precio_actual"] == otro["Close"].iloc[-1]
+        assert analizador.analizar_indicadores_almacen(["ZZZ"]) == {}
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Paridad con motor", test_paridad_con_motor),
+        ("Varianza sin deriva", test_varianza_movil_sin_deriva),
+        ("Estado en disco", test_estado_en_disco_y_coste_incremental),
+        ("Revisiones y reajustes", test_revisiones_y_reajustes),
+        ("Watchlist", test_watchlist),
+        ("Paridad con analizador", test_paridad_con_analizador),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.info(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.info(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
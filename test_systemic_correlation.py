@@ -0,0 +1,133 @@
+"""
+test_systemic_correlation.py
+Pruebas del detector de correlación sistémica en ventanas móviles
+(analisis/systemic_correlation.py) y de
+CorrelationAnalyzer.monitorear_correlacion_sistemica
+Datos sintéticos y descarga batch simulada: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import time
+
+import numpy as np
+import pandas as pd
+
+import analisis.correlation_analyzer as ca_module
+from analisis.correlation_analyzer import CorrelationAnalyzer
+from analisis.systemic_correlation import DetectorContagio
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestSystemicCorrelation")
+
+
+def _retornos(n=50, barras=400, cambio=200, carga_antes=0.3, carga_despues=1.5, semilla=0):
+    """Factor común cuyo peso cambia en la barra `cambio`"""
+    rng = np.random.default_rng(semilla)
+    factor = rng.normal(0, 0.01, (barras, 1))
+    carga = np.where(np.arange(barras)[:, None] < cambio, carga_antes, carga_despues)
+    retornos = factor * carga + rng.normal(0, 0.01, (barras, n))
+    return pd.DataFrame(retornos, index=pd.bdate_range("2022-01-03", periods=barras),
+                        columns=[f"C{i:03d}" for i in range(n)])
+
+
+def test_igual_a_recalcular():
+    """Test 1: Métricas incrementales == correlación y autovalores exactos por ventana"""
+    retornos = _retornos(n=30, barras=200)
+    serie = DetectorContagio(30, ventana=40).analizar(retornos)
+    assert len(serie) == 200 - 40 + 1
+
+    filas, columnas = np.triu_indices(30, k=1)
+    for fin in (40, 77, 120, 199):
+        ventana = retornos.iloc[fin - 39:fin + 1].to_numpy()
+        corr = np.corrcoef(ventana, rowvar=False)
+        metricas = serie.loc[retornos.index[fin]]
+        assert abs(metricas["correlacion_promedio"] - corr[filas, columnas].mean()) < 1e-9
+        assert abs(metricas["cuota_primer_autovalor"] - np.linalg.eigvalsh(corr)[-1] / 30) < 1e-6
+
+
+def test_evento_de_regimen():
+    """Test 2: Un salto de correlación emite un único evento bajo → alto"""
+    retornos = _retornos(n=40, barras=400, cambio=200, carga_antes=0.2, carga_despues=3.0)
+    detector = DetectorContagio(40, ventana=40)
+    serie = detector.analizar(retornos)
+
+    assert serie["regimen"].iloc[0] == "bajo" and detector.regimen == "alto"
+    eventos = detector.eventos_dict()
+    assert [e["hacia"] for e in eventos][-1] == "alto"
+    assert all(e["fecha"] >= retornos.index[200].strftime("%Y-%m-%d") for e in eventos)
+    assert serie["cuota_primer_autovalor"].iloc[-1] > 0.7
+
+    # Confirmación: un solo día atípico no cambia el régimen
+    tranquilo = DetectorContagio(40, ventana=40, confirmacion=3)
+    tranquilo.analizar(_retornos(n=40, barras=150, cambio=10_000))
+    assert tranquilo.eventos == []
+
+
+def test_rendimiento():
+    """Test 3: 300 tickers x 6 años diarios en segundos"""
+    retornos = _retornos(n=300, barras=1500, cambio=750)
+    inicio = time.perf_counter()
+    serie = DetectorContagio(300, ventana=60).analizar(retornos)
+    duracion = time.perf_counter() - inicio
+    assert len(serie) == 1500 - 60 + 1
+    assert duracion < 10
+    logger.warning(f"✅ 300 tickers x 1500 barras en {duracion:.2f}s")
+
+
+def test_monitoreo_analyzer():
+    """Test 4: monitorear_correlacion_sistemica sobre el panel compartido"""
+    retornos = _retornos(n=20, barras=300, cambio=150, carga_antes=0.2, carga_despues=3.0)
+    cierres = 100 * (1 + retornos).cumprod()
+
+    def fake_batch(simbolos, **kwargs):
+        return {t: pd.DataFrame({"Close": cierres[t]}) for t in simbolos if t in cierres}
+
+    original = ca_module.descargar_historicos_batch
+    ca_module.descargar_historicos_batch = fake_batch
+    try:
+        analyzer = CorrelationAnalyzer()
+        resultado = analyzer.monitorear_correlacion_sistemica(list(cierres.columns) + ["NADA"], ventana=40)
+        corto = analyzer.monitorear_correlacion_sistemica(["C000", "C001"], ventana=400)
+    finally:
+        ca_module.descargar_historicos_batch = original
+
+    assert "error" not in resultado, resultado
+    assert resultado["sin_datos"] == ["NADA"]
+    assert resultado["regimen_actual"] == "alto" and resultado["eventos"]
+    assert len(resultado["serie"]["fechas"]) == len(resultado["serie"]["correlacion_promedio"])
+    assert "error" in corto
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Igual a recalcular", test_igual_a_recalcular),
+        ("Evento de régimen", test_evento_de_regimen),
+        ("Rendimiento", test_rendimiento),
+        ("Monitoreo analyzer", test_monitoreo_analyzer),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,197 @@
+"""
+test_training_jobs.py
+Pruebas de los entrenamientos en segundo plano (ia/training_jobs.py) y del
+reemplazo atómico de modelos en ia/ml_predictions.MLPredictor
+Los procesos entrenan modelos pequeños sobre features sintéticas: no requiere conexión
+"""
+
+import sys
+import os
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+import logging
+import tempfile
+import threading
+
+import numpy as np
+
+from sklearn.preprocessing import StandardScaler
+from sklearn.ensemble import RandomForestClassifier, GradientBoostingClassifier
+
+from ia.ml_predictions import MLPredictor, ConjuntoModelos
+from ia.training_jobs import GestorEntrenamiento
+
+logging.basicConfig(
+    level=logging.WARNING,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger("TestTrainingJobs")
+
+
+def _conjunto_sintetico(semilla=0):
+    rng = np.random.default_rng(semilla)
+    X = rng.uniform(0, 1, (300, 20))
+    scaler = StandardScaler()
+    X_scaled = scaler.fit_transform(X)
+    return ConjuntoModelos(
+        scaler=scaler,
+        price_direction_model=RandomForestClassifier(n_estimators=10, random_state=semilla).fit(
+            X_scaled, (X[:, 0] > 0.5).astype(int)),
+        volatility_model=GradientBoostingClassifier(n_estimators=10, random_state=semilla).fit(
+            X_scaled, np.digitize(X[:, 2], [0.33, 0.66])),
+        confidence_model=GradientBoostingClassifier(n_estimators=10, random_state=semilla).fit(
+            X_scaled, np.digitize(X[:, 4], [0.5, 0.75])),
+    )
+
+
+def _objetivo_sintetico(tickers, periodo, directorio, cola, **opciones):
+    """Objetivo de proceso: entrena sobre datos sintéticos en lugar de descargar"""
+    cola.put(("progreso", 0.3, "entrenando", f"Entrenando {len(tickers)} tickers"))
+    predictor = MLPredictor(model_dir=directorio)
+    predictor.instalar_modelos(_conjunto_sintetico(semilla=len(tickers)))
+    predictor._save_models()
+    cola.put(("progreso", 0.9, "entrenando", "Guardando"))
+    cola.put(("completado", {"samples_trained": 300, "tickers": tickers, "opciones": opciones}))
+
+
+def _objetivo_fallido(tickers, periodo, directorio, cola, **opciones):
+    cola.put(("error", "sin datos"))
+
+
+def _objetivo_que_muere(tickers, periodo, directorio, cola, **opciones):
+    os._exit(3)
+
+
+def _indicadores(n):
+    rng = np.random.default_rng(1)
+    return {
+        f"X{i:03d}": {
+            "RSI": {"valor": float(rng.uniform(10, 90))},
+            "MACD": {"linea_macd": float(rng.normal(0, 2))},
+            "MEDIAS_MOVILES": {"SMA_20": float(rng.uniform(90, 110)), "SMA_50": 100.0},
+        }
+        for i in range(n)
+    }
+
+
+def test_trabajo_completo():
+    """Test 1: El trabajo se encola, informa progreso y reemplaza los modelos"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp)
+        gestor = GestorEntrenamiento(predictor, objetivo=_objetivo_sintetico)
+        antes = predictor.modelos
+        assert "error" in predictor.predict_many(_indicadores(3))["X000"]["precio"]
+
+        trabajo = gestor.enviar(["aapl", "MSFT", "AAPL"])
+        assert trabajo.tickers == ["AAPL", "MSFT"]
+        assert trabajo.estado in ("pendiente", "descargando", "entrenando")
+
+        # El predictor sigue sirviendo mientras entrena
+        predictor.predict_many(_indicadores(3))
+
+        trabajo = gestor.esperar(trabajo.id, timeout=120)
+        assert trabajo.estado == "completado", trabajo.a_dict()
+        assert trabajo.progreso == 1.0 and trabajo.metricas["samples_trained"] == 300
+        assert trabajo.metricas["opciones"] == {"incremental": False, "ventana_barras": None}
+        assert trabajo.a_dict()["duracion_segundos"] >= 0
+        assert predictor.modelos is not antes
+
+        lote = predictor.predict_many(_indicadores(3))
+        assert lote["X000"]["precio"]["direccion_predicha"] in ("ALCISTA", "BAJISTA")
+        # Persistidos en el directorio del predictor que sirve
+        assert MLPredictor.leer_modelos(tmp) is not None
+        assert gestor.listar()[0]["id"] == trabajo.id
+
+        # El modo incremental llega hasta el proceso de entrenamiento
+        trabajo = gestor.esperar(gestor.enviar(["AAPL"], incremental=True, ventana_barras=100).id, timeout=120)
+        assert trabajo.estado == "completado", trabajo.a_dict()
+        assert trabajo.a_dict()["incremental"] is True
+        assert trabajo.metricas["opciones"] == {"incremental": True, "ventana_barras": 100}
+
+
+def test_trabajo_con_error():
+    """Test 2: Errores del objetivo o muerte del proceso terminan en estado error"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp)
+        antes = predictor.modelos
+
+        gestor = GestorEntrenamiento(predictor, objetivo=_objetivo_fallido)
+        trabajo = gestor.esperar(gestor.enviar(["AAPL"]).id, timeout=120)
+        assert trabajo.estado == "error" and trabajo.error == "sin datos"
+
+        gestor = GestorEntrenamiento(predictor, objetivo=_objetivo_que_muere)
+        trabajo = gestor.esperar(gestor.enviar(["AAPL"]).id, timeout=120)
+        assert trabajo.estado == "error" and "código 3" in trabajo.error
+        assert predictor.modelos is antes
+        assert gestor.obtener("inexistente") is None
+
+
+def test_reemplazo_atomico():
+    """Test 3: Un lote en curso usa un único conjunto aunque se instale otro"""
+    with tempfile.TemporaryDirectory() as tmp:
+        predictor = MLPredictor(model_dir=tmp)
+        viejo, nuevo = _conjunto_sintetico(0), _conjunto_sintetico(1)
+        predictor.instalar_modelos(viejo)
+
+        class _ModeloQueReemplaza:
+            """Instala el conjunto nuevo en medio de la predicción"""
+            classes_ = viejo.price_direction_model.classes_
+
+            def predict_proba(self, X):
+                predictor.instalar_modelos(nuevo)
+                return viejo.price_direction_model.predict_proba(X)
+
+        predictor.price_direction_model = _ModeloQueReemplaza()
+        escalador = predictor.scaler
+        assert escalador is viejo.scaler
+        lote = predictor.predict_many(_indicadores(5))
+        # La volatilidad salió del conjunto tomado al empezar, no del nuevo
+        X = viejo.scaler.transform(np.vstack([
+            predictor._extract_features_from_indicators(i) for i in _indicadores(5).values()]))
+        esperada = viejo.volatility_model.predict(X)
+        assert [lote[t]["volatilidad"]["nivel_predicho"] for t in lote] == list(esperada)
+        assert predictor.modelos is nuevo
+
+        # Lecturas concurrentes mientras se reemplaza repetidamente
+        errores = []
+
+        def leer():
+            for _ in range(50):
+                conjunto = predictor.modelos
+                if conjunto.scaler not in (viejo.scaler, nuevo.scaler):
+                    errores.append(conjunto)
+                predictor.predict_many(_indicadores(2))
+
+        hilo = threading.Thread(target=leer)
+        hilo.start()
+        for k in range(50):
+            predictor.instalar_modelos(viejo if k % 2 else nuevo)
+        hilo.join()
+        assert not errores
+
+
+def main():
+    """Ejecutar todos los tests"""
+    tests = [
+        ("Trabajo completo", test_trabajo_completo),
+        ("Trabajo con error", test_trabajo_con_error),
+        ("Reemplazo atómico", test_reemplazo_atomico),
+    ]
+
+    resultados = []
+    for name, test_func in tests:
+        try:
+            test_func()
+            resultados.append((name, True))
+        except Exception as e:
+            logger.error(f"❌ Exception en {name}: {str(e)}")
+            resultados.append((name, False))
+
+    passed = sum(1 for _, r in resultados if r)
+    for name, resultado in resultados:
+        logger.warning(f"{'✅ PASS' if resultado else '❌ FAIL'}: {name}")
+    logger.warning(f"\nTotal: {passed}/{len(resultados)} tests pasados")
+
+
+if __name__ == "__main__":
+    main()